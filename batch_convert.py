@@ -8,15 +8,20 @@ and packages the results into zip archives in the out-ready directory.
 
 import os
 import shutil
-import subprocess
+import time
 import zipfile
 from pathlib import Path
-from typing import List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 
 import typer
 from rich.console import Console
-from rich.progress import Progress, TaskID
-from slugify import slugify
+
+if TYPE_CHECKING:
+    import threading
+
+    from core.utils.events import EventObserver
+    from core.utils.job_limits import JobLimits
+    from core.utils.metrics import ConversionMetrics
 
 
 app = typer.Typer(
@@ -46,6 +51,8 @@ def create_safe_name(docx_path: Path) -> str:
     # Remove extension and get the base name
     name = docx_path.stem
     
+    from slugify import slugify
+
     # Use slugify to transliterate and create safe filename
     # This will convert Cyrillic to Latin and handle special characters
     safe_name = slugify(name, separator='_', lowercase=False)
@@ -61,13 +68,42 @@ def convert_single_docx(
     docx_path: Path, 
     temp_output_dir: Path, 
     converter_script: Path,
-    safe_name: str
+    safe_name: str,
+    template_cache: Optional[Path] = None,
+    server: Optional[str] = None,
+    output_format: str = "directory",
+    limits: Optional["JobLimits"] = None,
+    failures: Optional[Dict[str, str]] = None,
+    metrics_json: Optional[Path] = None,
+    trace_heuristics: bool = False,
+    events: Optional["EventObserver"] = None,
 ) -> bool:
-    """Convert a single DOCX file using the doc2chapmd converter."""
+    """Convert a single DOCX file using the doc2chapmd converter (or a running `doc2chapmd serve`).
+
+    With ``output_format`` ``zip`` the converter writes ``<temp_output_dir>/<safe_name>.zip`` itself.
+    ``limits`` (a ``JobLimits``, none by default) bounds the converter process, which
+    is killed when it hits one; ``failures`` collects the reason per failed document name.
+    With ``metrics_json`` the converter writes the figures of the conversion there,
+    including its parser heuristics with ``trace_heuristics``.
+    ``events`` (the job's ``EventObserver``) receives the converter's stage and
+    progress events as they happen and a ``job_failed`` event on failure.
+    """
     try:
         # Ensure output directory exists
         temp_output_dir.mkdir(parents=True, exist_ok=True)
         
+        if server is not None:
+            from core.service.client import ServiceClient, ServiceError
+
+            timeout = limits.timeout if limits is not None else None
+            try:
+                ServiceClient(server, timeout=timeout).convert(docx_path, temp_output_dir, folder_name=safe_name)
+            except (ServiceError, OSError) as e:
+                console.print(f"[red]Error converting {docx_path.name}:[/red] {e}")
+                _record_failure(failures, docx_path, str(e), events)
+                return False
+            return True
+        
         # Run the converter
         cmd = [
             ".venv/bin/python",
@@ -78,27 +114,129 @@ def convert_single_docx(
             "--centralized-images",
             "--folder-name", safe_name
         ]
+        if template_cache is not None:
+            # Documents from the same template then parse styles and numbering once
+            cmd += ["--template-cache", str(template_cache)]
+        if output_format != "directory":
+            cmd += ["--format", output_format]
+        if metrics_json is not None:
+            cmd += ["--metrics-json", str(metrics_json)]
+            if trace_heuristics:
+                cmd.append("--trace-heuristics")
         
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            cwd=Path.cwd()
-        )
+        from core.utils.job_limits import JobLimits, run_limited
+
+        limits = limits if limits is not None else JobLimits()
+        relay = None
+        pass_fds = ()
+        if events is not None:
+            # The converter writes its events into a pipe that is relayed line by line
+            read_fd, write_fd = os.pipe()
+            relay = _start_relay(read_fd, events)
+            cmd += ["--events", "jsonl", "--events-file", f"/dev/fd/{write_fd}"]
+            pass_fds = (write_fd,)
+        try:
+            result = run_limited(cmd, limits, cwd=Path.cwd(), pass_fds=pass_fds)
+        finally:
+            if relay is not None:
+                os.close(write_fd)
+                relay.join(timeout=5)
+        if result.limit is not None:
+            reason = limits.describe(result.limit)
+            console.print(f"[red]Error converting {docx_path.name}:[/red] {reason}")
+            _record_failure(failures, docx_path, reason, events, result.limit)
+            return False
         
         if result.returncode != 0:
             console.print(f"[red]Error converting {docx_path.name}:[/red]")
             console.print(f"[red]STDOUT:[/red] {result.stdout}")
             console.print(f"[red]STDERR:[/red] {result.stderr}")
+            reason = f"converter exited with status {result.returncode}"
+            if result.worker_crashed:
+                reason = f"a parse worker crashed ({reason})"
+            _record_failure(failures, docx_path, reason, events)
             return False
         
         return True
         
     except Exception as e:
         console.print(f"[red]Exception converting {docx_path.name}:[/red] {e}")
+        _record_failure(failures, docx_path, str(e), events)
         return False
 
 
+def _record_failure(
+    failures: Optional[Dict[str, str]],
+    docx_path: Path,
+    reason: str,
+    events: Optional["EventObserver"] = None,
+    limit: Optional[str] = None,
+) -> None:
+    if failures is not None:
+        failures[docx_path.name] = reason
+    if events is not None:
+        events.job_failed(reason, limit)
+
+
+def _start_relay(read_fd: int, events: "EventObserver") -> "threading.Thread":
+    """Relay the converter's stage and progress events from ``read_fd`` to ``events``.
+
+    Its own job events are not relayed, the batch run reports the job itself;
+    the image count of its ``job_finished`` is kept for the batch's event.
+    """
+    import json
+    import threading
+
+    def relay() -> None:
+        with os.fdopen(read_fd, encoding="utf-8") as pipe:
+            for line in pipe:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event.get("event") == "job_finished":
+                    events.images = event.get("images", 0)
+                elif not str(event.get("event", "")).startswith("job_"):
+                    events.events.write_line(line)
+
+    thread = threading.Thread(target=relay, name="event-relay", daemon=True)
+    thread.start()
+    return thread
+
+
+def record_metrics(
+    metrics: "ConversionMetrics",
+    metrics_file: Path,
+    docx_path: Path,
+    archive_path: Path,
+    success: bool,
+    seconds: float,
+    metrics_json: Optional[Path] = None,
+) -> None:
+    """Count one document in ``metrics`` and rewrite the ``.prom`` file.
+
+    The converter's own figures are read from ``metrics_json`` when it wrote them;
+    the duration is the job's wall time as seen by the batch run.
+    """
+    import json
+
+    stats = {}
+    if metrics_json is not None and metrics_json.exists():
+        try:
+            stats = json.loads(metrics_json.read_text(encoding="utf-8"))
+        except ValueError:
+            pass
+        metrics_json.unlink()
+    stats["seconds"] = seconds
+    stats["bytes_in"] = docx_path.stat().st_size
+    stats["bytes_out"] = archive_path.stat().st_size if success and archive_path.exists() else 0
+    metrics.record(stats, success)
+    try:
+        metrics.write(metrics_file)
+    except OSError as e:
+        console.print(f"[yellow]Could not write metrics to {metrics_file}:[/yellow] {e}")
+
+
 def create_archive(source_dir: Path, archive_path: Path) -> bool:
     """Create a zip archive from the source directory contents."""
     try:
@@ -153,7 +291,43 @@ def convert(
     dry_run: bool = typer.Option(
         False, "--dry-run",
         help="Show what would be done without actually doing it"
-    )
+    ),
+    template_cache: Optional[Path] = typer.Option(
+        None, "--template-cache",
+        help="Directory caching parsed style and numbering tables across documents"
+    ),
+    server: Optional[str] = typer.Option(
+        None, "--server",
+        help="Submit conversions to a running `doc2chapmd serve` (http://host:port or unix:///path)"
+    ),
+    timeout: float = typer.Option(
+        900, "--timeout", min=0,
+        help="Wall-clock seconds per document before its converter is killed (0 for none)"
+    ),
+    max_cpu: Optional[int] = typer.Option(
+        None, "--max-cpu", min=1,
+        help="CPU seconds per document before its converter is killed"
+    ),
+    max_memory: Optional[str] = typer.Option(
+        None, "--max-memory",
+        help="Address space per converter process, e.g. 2G"
+    ),
+    metrics_file: Optional[Path] = typer.Option(
+        None, "--metrics-file",
+        help="Prometheus textfile (.prom) rewritten after every document, e.g. for node_exporter"
+    ),
+    trace_heuristics: bool = typer.Option(
+        False, "--trace-heuristics",
+        help="Include calls, hits and time of every parser heuristic in --metrics-file"
+    ),
+    events: Optional[str] = typer.Option(
+        None, "--events",
+        help="Emit batch, job, stage, progress and failure events in this format (jsonl) for orchestrators"
+    ),
+    events_file: str = typer.Option(
+        "-", "--events-file",
+        help="Where --events go: a file (appended to) or - for stdout"
+    ),
 ):
     """Convert all DOCX files to Markdown archives."""
     
@@ -162,10 +336,37 @@ def convert(
         console.print(f"[red]Input directory {input_dir} does not exist[/red]")
         raise typer.Exit(1)
     
-    if not converter.exists():
+    if server is None and not converter.exists():
         console.print(f"[red]Converter script {converter} does not exist[/red]")
         raise typer.Exit(1)
     
+    from core.utils.job_limits import JobLimits
+    from core.utils.memory_profile import parse_size
+
+    try:
+        address_space = parse_size(max_memory) if max_memory is not None else None
+    except ValueError as exc:
+        console.print(f"[red]--max-memory: {exc}[/red]")
+        raise typer.Exit(1)
+    # A pathological document is killed and marked failed instead of stalling the run
+    limits = JobLimits(timeout or None, max_cpu, address_space)
+    metrics = None
+    if metrics_file is not None:
+        from core.utils.metrics import ConversionMetrics
+
+        metrics = ConversionMetrics()
+    event_writer = None
+    if events is not None:
+        from core.utils.events import EVENT_FORMATS, EventWriter
+
+        if events not in EVENT_FORMATS:
+            console.print(f"[red]Unknown event format '{events}' (use {', '.join(EVENT_FORMATS)})[/red]")
+            raise typer.Exit(1)
+        if events_file == "-":
+            # Keep stdout to the event stream
+            console.stderr = True
+        event_writer = EventWriter.open(events_file)
+    
     # Find all DOCX files
     docx_files = find_docx_files(input_dir)
     
@@ -188,8 +389,16 @@ def convert(
     # Process each file
     successful_conversions = 0
     failed_conversions = 0
+    failures: Dict[str, str] = {}
+    batch_started = time.perf_counter()
+    if event_writer is not None:
+        from core.utils.events import EventObserver
+
+        event_writer.emit("batch_started", total=len(docx_files))
     
-    with Progress() as progress:
+    from rich.progress import Progress
+
+    with Progress(console=console) as progress:
         task = progress.add_task("Converting files...", total=len(docx_files))
         
         for docx_path in docx_files:
@@ -198,24 +407,70 @@ def convert(
             safe_name = create_safe_name(docx_path)
             temp_conversion_dir = temp_dir / safe_name
             archive_path = output_dir / f"{safe_name}.zip"
+            started = time.perf_counter()
+            job = None
+            if event_writer is not None:
+                job = EventObserver(event_writer, docx_path.name)
+                job.job_started(str(docx_path), docx_path.stat().st_size)
+            
+            if server is None:
+                metrics_json = None
+                if metrics is not None:
+                    temp_dir.mkdir(parents=True, exist_ok=True)
+                    metrics_json = temp_dir / f"{safe_name}.metrics.json"
+                # The converter writes the archive directly, nothing is staged or re-read
+                success = convert_single_docx(
+                    docx_path, output_dir, converter, safe_name, template_cache,
+                    output_format="zip", limits=limits, failures=failures,
+                    metrics_json=metrics_json, trace_heuristics=trace_heuristics, events=job,
+                )
+                if success and archive_path.exists():
+                    successful_conversions += 1
+                    console.print(f"[green]✓[/green] {docx_path.name} → {archive_path.name}")
+                    if job is not None:
+                        job.job_finished(1, archive_path.stat().st_size)
+                else:
+                    failed_conversions += 1
+                    if success:
+                        _record_failure(failures, docx_path, "no archive written", job)
+                    console.print(f"[red]✗[/red] Failed to convert {docx_path.name}")
+                if metrics is not None:
+                    record_metrics(
+                        metrics, metrics_file, docx_path, archive_path, success and archive_path.exists(),
+                        time.perf_counter() - started, metrics_json,
+                    )
+                progress.advance(task)
+                continue
             
             # Clean up any existing temp directory
             if temp_conversion_dir.exists():
                 shutil.rmtree(temp_conversion_dir)
             
             # Convert the DOCX file
-            success = convert_single_docx(docx_path, temp_conversion_dir, converter, safe_name)
+            success = convert_single_docx(
+                docx_path, temp_conversion_dir, converter, safe_name, template_cache, server,
+                limits=limits, failures=failures, events=job,
+            )
             
+            archived = False
             if success and temp_conversion_dir.exists():
                 # Create the archive
-                if create_archive(temp_conversion_dir, archive_path):
+                archived = create_archive(temp_conversion_dir, archive_path)
+                if archived:
                     successful_conversions += 1
                     console.print(f"[green]✓[/green] {docx_path.name} → {archive_path.name}")
+                    if job is not None:
+                        job.job_finished(1, archive_path.stat().st_size)
                 else:
                     failed_conversions += 1
+                    _record_failure(failures, docx_path, "archive could not be written", job)
             else:
+                if success:
+                    _record_failure(failures, docx_path, "no output written", job)
                 failed_conversions += 1
                 console.print(f"[red]✗[/red] Failed to convert {docx_path.name}")
+            if metrics is not None:
+                record_metrics(metrics, metrics_file, docx_path, archive_path, archived, time.perf_counter() - started)
             
             # Clean up temp directory if requested
             if clean_temp and temp_conversion_dir.exists():
@@ -223,10 +478,19 @@ def convert(
             
             progress.advance(task)
     
+    if event_writer is not None:
+        event_writer.emit(
+            "batch_finished", converted=successful_conversions, failed=failed_conversions,
+            seconds=round(time.perf_counter() - batch_started, 6),
+        )
+        event_writer.close()
+    
     # Summary
     console.print(f"\n[blue]Conversion Summary:[/blue]")
     console.print(f"  [green]Successful:[/green] {successful_conversions}")
     console.print(f"  [red]Failed:[/red] {failed_conversions}")
+    for name, reason in failures.items():
+        console.print(f"    {name}: {reason}")
     console.print(f"  [blue]Output directory:[/blue] {output_dir}")
 
 
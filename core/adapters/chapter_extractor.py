@@ -15,7 +15,8 @@ from dataclasses import dataclass
 # Import shared constants and utilities
 from core.utils.xml_constants import NS, DEFAULT_HEADING_PATTERNS
 from core.utils.text_processing import extract_heading_number_and_title
-from core.utils.docx_utils import read_docx_part, styles_map, heading_level
+from core.utils.docx_utils import read_docx_part, heading_level
+from core.utils.template_cache import style_tables
 
 
 @dataclass
@@ -81,7 +82,7 @@ def extract_chapter_structure(docx_path: str | Path) -> List[ChapterNode]:
     if not doc_xml:
         raise RuntimeError("word/document.xml not found")
     
-    style_map = styles_map(styles_xml)
+    style_map = style_tables(styles_xml).names
     body = ET.fromstring(doc_xml).find(".//w:body", NS)
     if body is None:
         raise RuntimeError("No <w:body> found")
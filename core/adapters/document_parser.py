@@ -1,29 +1,52 @@
-from typing import List, Tuple
+from __future__ import annotations
 
-from core.model.internal_doc import InternalDoc
-from core.model.resource_ref import ResourceRef
-from .docx_parser import parse_docx_to_internal_doc
+import os
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
 
-def _detect_file_type(file_path: str) -> str:
-    """Detect file type based on extension."""
-    file_path_lower = file_path.lower()
+if TYPE_CHECKING:
+    from core.model.internal_doc import Heading, InternalDoc
+    from core.model.resource_store import ResourceStore
+    from core.utils.stages import StageObserver
+    from core.utils.docx_utils import DocxSource
+    from .text_rules import TextRules
+
+def _detect_file_type(file_path: DocxSource) -> str:
+    """Detect file type based on extension; in-memory content is taken for DOCX."""
+    if not isinstance(file_path, (str, os.PathLike)):
+        return 'docx'
+    file_path_lower = os.fspath(file_path).lower()
     if file_path_lower.endswith('.docx'):
         return 'docx'
     else:
         return 'unknown'
 
 
-def parse_document(file_path: str) -> Tuple[InternalDoc, List[ResourceRef]]:
+def parse_document(file_path: DocxSource, resource_store: Optional[ResourceStore] = None, workers: int = 1,
+                   text_rules: Optional[TextRules] = None,
+                   heading_range: Optional[Callable[[List[Heading]], Tuple[int, int]]] = None,
+                   observer: Optional[StageObserver] = None) -> Tuple[InternalDoc, ResourceStore]:
     """
     Parses a document file using appropriate parser based on file type.
     Routes DOCX files to specialized XML parser for better chapter extraction.
-    Currently only supports DOCX files.
+    Currently only supports DOCX files; ``file_path`` may also be the DOCX bytes
+    or a binary file object.
+
+    Extracted images are placed in ``resource_store`` (or a new store with the
+    default memory budget) and the store is returned alongside the document.
+    With ``workers`` > 1 the document body is analysed in that many processes.
+    ``text_rules`` replaces the bundled text classification rules.
+    ``heading_range`` converts only some sections (see parse_docx_to_internal_doc).
+    ``observer`` is notified of the parsing stages (see core.utils.stages).
     """
     file_type = _detect_file_type(file_path)
     
     if file_type == 'docx':
+        # The parser pulls in the document model and the text rules; load it on first use
+        from .docx_parser import parse_docx_to_internal_doc
+
         # Use specialized DOCX parser for better chapter extraction
-        return parse_docx_to_internal_doc(file_path)
+        return parse_docx_to_internal_doc(file_path, resource_store, workers=workers, text_rules=text_rules,
+                                          heading_range=heading_range, observer=observer)
     
     # Only DOCX files are supported
-    raise ValueError(f"Unsupported file type: {file_type}. Only DOCX files are supported.")
\ No newline at end of file
+    raise ValueError(f"Unsupported file type: {file_type}. Only DOCX files are supported.")
@@ -11,9 +11,10 @@ This module provides specialized DOCX parsing to ensure
 proper chapter extraction and heading numbering preservation.
 """
 from __future__ import annotations
-import zipfile, re, argparse, hashlib, os
+import zipfile, re, argparse, copy, os
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Set, Tuple
 from xml.etree import ElementTree as ET
 
 # Internal model imports
@@ -31,12 +32,16 @@ from core.model.internal_doc import (
     ListBlock,
     ListItem,
 )
-from core.model.resource_ref import ResourceRef
+from core.model.resource_store import ResourceStore
 
 # Import shared constants and utilities
 from core.utils.xml_constants import NS, DEFAULT_HEADING_PATTERNS
-from core.utils.text_processing import clean_heading_text, extract_heading_number_and_title
-from core.utils.docx_utils import read_docx_part, styles_map, heading_level, style_num_map, numbering_formats
+from core.utils.text_processing import clean_heading_text, extract_heading_number_and_title, heading_number_parts
+from core.utils.docx_utils import DocxSource, docx_source, read_docx_part, heading_level
+from core.utils.heuristics import HeuristicStats
+from core.utils.stages import StageObserver, is_degraded, progress_step, stage
+from core.utils.template_cache import numbering_tables, style_tables
+from core.adapters.text_rules import CompiledTextRules, TextClasses, TextRules, default_text_rules
 
 # Use shared utility read_docx_part instead of local _read function
 
@@ -202,16 +207,18 @@ def _extract_section_mapping(docx_root: ET.Element) -> Dict[str, str]:
     
     return section_map
 
-def _replace_cross_references(text: str, section_map: Dict[str, str]) -> str:
+_TRAILING_SPACE_RE = re.compile(r'\s*$')
+
+
+def _replace_cross_references(text: str, section_map: Dict[str, str], rules: CompiledTextRules | None = None) -> str:
     """Replace numeric cross-references with section titles when possible."""
 
     if not text or not section_map:
         return text
 
-    patterns = [
-        re.compile(r'(?<!\w)(?P<prefix>п\.\s*)(?P<number>\d+(?:\.\d+)*)', re.IGNORECASE),
-        re.compile(r'(?<!\w)(?P<prefix>пункт[а-яё]*\s+)(?P<number>\d+(?:\.\d+)*)', re.IGNORECASE),
-    ]
+    pattern = (rules or default_text_rules()).cross_reference
+    if pattern is None:
+        return text
 
     def _replace(match: re.Match[str]) -> str:
         number = match.group('number')
@@ -220,16 +227,14 @@ def _replace_cross_references(text: str, section_map: Dict[str, str]) -> str:
             return match.group(0)
 
         prefix = match.group('prefix')
-        prefix = re.sub(r'\s*$', ' ', prefix)
+        prefix = _TRAILING_SPACE_RE.sub(' ', prefix)
         return f"{prefix}{title}"
 
-    result = text
-    for pattern in patterns:
-        result = pattern.sub(_replace, result)
+    # All prefixes are alternatives of one pattern: a single pass over the text
+    return pattern.sub(_replace, text)
 
-    return result
-
-def _text_of(p: ET.Element, section_map: Dict[str, str] = None) -> str:
+def _text_of(p: ET.Element, section_map: Dict[str, str] = None, rules: CompiledTextRules | None = None,
+             cross_references: Callable = _replace_cross_references) -> str:
     """Extract text from paragraph, including any manual numbering."""
     texts: List[str] = []
     for t in p.findall(".//w:t", NS):
@@ -238,12 +243,12 @@ def _text_of(p: ET.Element, section_map: Dict[str, str] = None) -> str:
     
     # Apply cross-reference replacement if section_map is provided
     if section_map and full_text:
-        full_text = _replace_cross_references(full_text, section_map)
+        full_text = cross_references(full_text, section_map, rules)
     
     return full_text
 
 def _extract_formatted_inlines(
-    p: ET.Element, section_map: Dict[str, str] | None = None
+    p: ET.Element, section_map: Dict[str, str] | None = None, cross_references: Callable = _replace_cross_references
 ) -> List:
     """Extract text with formatting information from paragraph runs."""
     from core.model.internal_doc import Text, Code, Bold, Italic
@@ -320,7 +325,7 @@ def _extract_formatted_inlines(
         if not content:
             continue
         if section_map:
-            content = _replace_cross_references(content, section_map)
+            content = cross_references(content, section_map)
         if style == "code":
             inlines.append(Code(content=content))
         elif style == "bold":
@@ -385,19 +390,18 @@ def _load_relationships(rels_xml: bytes | None) -> Dict[str, str]:
     
     return relationships
 
-def _extract_images_from_media(z: zipfile.ZipFile) -> Dict[str, ResourceRef]:
-    """Extract all images from word/media/ directory and create ResourceRef objects."""
+def _extract_images_from_media(z: zipfile.ZipFile, store: ResourceStore) -> Dict[str, str]:
+    """Add all images from word/media/ directory to the resource store.
+
+    Returns:
+        Mapping of media path inside the archive to resource ID.
+    """
     images = {}
     
     # Get list of media files
     media_files = [name for name in z.namelist() if name.startswith('word/media/')]
     
     for media_file in media_files:
-        # Read image content
-        content = z.read(media_file)
-        if not content:
-            continue
-            
         # Get filename and extension
         filename = os.path.basename(media_file)
         _, ext = os.path.splitext(filename)
@@ -405,21 +409,15 @@ def _extract_images_from_media(z: zipfile.ZipFile) -> Dict[str, ResourceRef]:
         # Determine MIME type from extension
         mime_type = _get_mime_type_from_extension(ext.lower())
         
-        # Create SHA256 hash for deduplication
-        sha256_hash = hashlib.sha256(content).hexdigest()
-        
         # Use filename without extension as resource ID
         resource_id = os.path.splitext(filename)[0]
         
-        # Create ResourceRef
-        resource_ref = ResourceRef(
-            id=resource_id,
-            mime_type=mime_type,
-            content=content,
-            sha256=sha256_hash
-        )
+        # Large images stay in the archive (or spill to disk) instead of RAM
+        stored = store.add_from_archive(resource_id, mime_type, z, media_file)
+        if stored is None:
+            continue
         
-        images[media_file] = resource_ref
+        images[media_file] = resource_id
     
     return images
 
@@ -437,13 +435,10 @@ def _get_mime_type_from_extension(ext: str) -> str:
     }
     return mime_types.get(ext, 'application/octet-stream')
 
-def _find_images_in_paragraph(p: ET.Element, relationships: Dict[str, str], media_images: Dict[str, ResourceRef], 
-                             all_paragraphs: List[ET.Element], style_map: Dict[str, str], 
-                             used_caption_paragraphs: set = None) -> Tuple[List[Image], Set[ET.Element]]:
-    """Find all images referenced in a paragraph and return Image blocks with captions and used caption paragraphs."""
+def _find_images_in_paragraph(p: ET.Element, relationships: Dict[str, str], media_images: Dict[str, str],
+                              captions: "_CaptionIndex") -> Tuple[List[Image], Set[int]]:
+    """Find all images referenced in a paragraph and return Image blocks with captions and the positions of the caption paragraphs used."""
     images = []
-    if used_caption_paragraphs is None:
-        used_caption_paragraphs = set()
     caption_paragraphs_for_this_image = set()
     
     # Look for drawing elements that contain image references
@@ -461,18 +456,18 @@ def _find_images_in_paragraph(p: ET.Element, relationships: Dict[str, str], medi
                 full_path = f"word/{target_path}"
                 
                 if full_path in media_images:
-                    resource_ref = media_images[full_path]
+                    resource_id = media_images[full_path]
                     
-                    # Find caption for this image, passing the image name
-                    caption, caption_para = _find_caption_for_image_with_paragraph(p, all_paragraphs, style_map, image_name)
-                    if caption_para:
-                        caption_paragraphs_for_this_image.add(caption_para)
+                    # Find caption for this image
+                    caption, caption_position = captions.caption_for(p)
+                    if caption_position is not None:
+                        caption_paragraphs_for_this_image.add(caption_position)
                     
                     # Create Image block with better alt text using image name
-                    alt_text = image_name if image_name else f"Image {resource_ref.id}"
+                    alt_text = image_name if image_name else f"Image {resource_id}"
                     image = Image(
                         alt=alt_text,
-                        resource_id=resource_ref.id,
+                        resource_id=resource_id,
                         caption=caption
                     )
                     images.append(image)
@@ -577,41 +572,65 @@ def _find_rosa_caption_paragraphs(all_paragraphs: List[ET.Element], style_map: D
     return rosa_captions
 
 
-def _find_caption_for_image_with_paragraph(image_para: ET.Element, all_paragraphs: List[ET.Element], style_map: Dict[str, str], image_name: str = "") -> Tuple[str, ET.Element | None]:
-    """Find caption text for an image paragraph by looking for ROSA_Рисунок_Номер style paragraphs. Returns (caption_text, caption_paragraph)."""
-    try:
-        img_index = all_paragraphs.index(image_para)
-        
-        # Strategy 1: Look for ROSA_Рисунок_Номер style paragraphs near the image
-        for offset in range(-3, 4):  # Search both before and after image
+class _CaptionIndex:
+    """
+    Positions of all paragraphs of the body (``.//w:p`` in document order) and the
+    ROSA_Рисунок_Номер caption paragraphs among them.
+
+    Captions are referred to by position instead of by element, so a position found
+    while analysing one part of the body in a worker process means the same
+    paragraph in the parent.
+    """
+
+    WINDOW = 3  # caption paragraphs are searched this many paragraphs before and after the image
+
+    def __init__(self, all_paragraphs: List[ET.Element], style_map: Dict[str, str]):
+        self.positions: Dict[ET.Element, int] = {}
+        self.captions: Dict[int, str] = {}
+        for position, para in enumerate(all_paragraphs):
+            self.positions[para] = position
+            # Get paragraph style
+            style_id = ""
+            pPr = para.find("w:pPr", NS)
+            if pPr is not None:
+                pStyle = pPr.find("w:pStyle", NS)
+                if pStyle is not None:
+                    style_id = pStyle.attrib.get(f"{{{NS['w']}}}val", "")
+            
+            style_name = style_map.get(style_id, "").lower()
+            
+            # Check for ROSA_Рисунок_Номер style
+            if "рисунок" in style_name and "номер" in style_name:
+                text = _extract_text_from_paragraph(para).strip()
+                if text:
+                    self.captions[position] = text
+
+    def position(self, p: ET.Element) -> int | None:
+        return self.positions.get(p)
+
+    def caption_for(self, image_para: ET.Element) -> Tuple[str, int | None]:
+        """Find the caption near an image paragraph. Returns (caption_text, caption_position)."""
+        img_index = self.positions.get(image_para)
+        if img_index is None:
+            return "", None
+        # Search both before and after image
+        for offset in range(-self.WINDOW, self.WINDOW + 1):
             para_index = img_index + offset
-            if 0 <= para_index < len(all_paragraphs):
-                para = all_paragraphs[para_index]
-                
-                # Get paragraph style
-                style_id = ""
-                pPr = para.find("w:pPr", NS)
-                if pPr is not None:
-                    pStyle = pPr.find("w:pStyle", NS)
-                    if pStyle is not None:
-                        style_id = pStyle.attrib.get(f"{{{NS['w']}}}val", "")
-                
-                style_name = style_map.get(style_id, "").lower()
-                
-                # Check for ROSA_Рисунок_Номер style
-                if "рисунок" in style_name and "номер" in style_name:
-                    text = _extract_text_from_paragraph(para).strip()
-                    if text:
-                        return text, para
-        
+            if para_index in self.captions:
+                return self.captions[para_index], para_index
         # Fallback: Return empty caption if no ROSA_Рисунок_Номер style found
         return "", None
-        
-    except ValueError:
-        # image_para not found in all_paragraphs
-        pass
-    
-    return "", None
+
+class _NoCaptions:
+    """Stands in for the caption index of a degraded parse: images get no caption."""
+
+    @staticmethod
+    def caption_for(image_para: ET.Element) -> Tuple[str, int | None]:
+        return "", None
+
+
+_NO_CAPTIONS = _NoCaptions()
+
 
 def _should_reorder_command_before_image(current_para: ET.Element, next_para: ET.Element, 
                                         current_text: str, style_map: Dict[str, str]) -> bool:
@@ -656,8 +675,8 @@ def _should_reorder_command_before_image(current_para: ET.Element, next_para: ET
     return False
 
 
-def _parse_table(tbl: ET.Element, relationships: Dict[str, str], media_images: Dict[str, ResourceRef], 
-                all_paragraphs: List[ET.Element], style_map: Dict[str, str]) -> Table:
+def _parse_table(tbl: ET.Element, relationships: Dict[str, str], media_images: Dict[str, str],
+                captions: _CaptionIndex) -> Table:
     """Convert a DOCX table element into a Table block."""
     rows = tbl.findall('w:tr', NS)
     if not rows:
@@ -668,7 +687,7 @@ def _parse_table(tbl: ET.Element, relationships: Dict[str, str], media_images: D
         for tc in tr.findall('w:tc', NS):
             blocks: List[Block] = []
             for p in tc.findall('w:p', NS):
-                images, _ = _find_images_in_paragraph(p, relationships, media_images, all_paragraphs, style_map)
+                images, _ = _find_images_in_paragraph(p, relationships, media_images, captions)
                 for img in images:
                     blocks.append(img)
                 
@@ -704,7 +723,7 @@ def split_docx_by_h1(
     if not doc_xml:
         raise RuntimeError("word/document.xml not found")
 
-    style_map = styles_map(styles_xml)
+    style_map = style_tables(styles_xml).names
     body = ET.fromstring(doc_xml).find(".//w:body", NS)
     if body is None:
         raise RuntimeError("No <w:body> found")
@@ -752,82 +771,337 @@ def split_docx_by_h1(
 
 
 
-def parse_docx_to_internal_doc(docx_path: str) -> Tuple[InternalDoc, List[ResourceRef]]:
+# Code-style detection via paragraph style name, shading and monospaced fonts
+_CODE_STYLE_NAME_PATTERNS = [
+    r".*Команда.*",
+    r".*Листинг.*",
+    r".*Code.*",
+    r".*Код.*",
+    r"ROSA_ТКом",
+    r"ROSA_Команда_Таблица",
+]
+_CODE_STYLE_NAME_RES = [re.compile(pat, re.IGNORECASE) for pat in _CODE_STYLE_NAME_PATTERNS]
+
+_MONO_FONTS = {"courier new", "consolas", "roboto mono", "menlo", "monaco", "lucida console"}
+
+_W_P = f"{{{NS['w']}}}p"
+_W_TBL = f"{{{NS['w']}}}tbl"
+
+
+def _para_style_name(p: ET.Element, style_map: Dict[str, str]) -> str:
+    pPr = p.find("w:pPr", NS)
+    if pPr is None:
+        return ""
+    pStyle = pPr.find("w:pStyle", NS)
+    if pStyle is None:
+        return ""
+    sid = pStyle.attrib.get(f"{{{NS['w']}}}val", "")
+    return style_map.get(sid, sid) or sid
+
+
+def _has_gray_shading(p: ET.Element) -> bool:
+    def has_shading(el: ET.Element | None) -> bool:
+        if el is None:
+            return False
+        shd = el.find("w:shd", NS)
+        if shd is None:
+            return False
+        fill = shd.attrib.get(f"{{{NS['w']}}}fill", "").lower()
+        # D9D9D9 или любой серый оттенок
+        return fill in {"d9d9d9", "e1dfdd", "ededed", "f2f2f2"} or bool(fill)
+
+    pPr = p.find("w:pPr", NS)
+    rPr = p.find("w:r/w:rPr", NS)
+    return has_shading(pPr) or has_shading(rPr)
+
+
+def _uses_mono_font(p: ET.Element) -> bool:
+    for r in p.findall(".//w:r", NS):
+        rPr = r.find("w:rPr", NS)
+        if rPr is None:
+            continue
+        rFonts = rPr.find("w:rFonts", NS)
+        if rFonts is None:
+            continue
+        for attr in ("ascii", "hAnsi", "cs"):
+            val = rFonts.attrib.get(f"{{{NS['w']}}}{attr}", "").lower()
+            if val in _MONO_FONTS:
+                return True
+    return False
+
+
+def _is_code_style_paragraph(p: ET.Element, style_map: Dict[str, str]) -> bool:
+    name = _para_style_name(p, style_map)
+    if name and any(rx.match(name) for rx in _CODE_STYLE_NAME_RES):
+        return True
+    if _has_gray_shading(p) and _uses_mono_font(p):
+        return True
+    return False
+
+
+# Parser heuristics, as named in HeuristicStats
+HEURISTICS = (
+    "heading_detection", "list_info", "text_classes", "cross_references", "caption_search", "code_style",
+    "command_reorder", "code_language", "code_start", "code_continuation", "note_detection",
+)
+
+# Methods of CompiledTextRules that are heuristics, by heuristic name
+_RULE_HEURISTICS = (
+    ("text_classes", "classify"),
+    ("code_language", "detect_language"),
+    ("code_start", "starts"),
+    ("code_continuation", "continues"),
+    ("note_detection", "is_note"),
+)
+
+
+class _Heuristics:
     """
-    Parse DOCX file and return InternalDoc AST format.
-    Uses comprehensive XML-based heading numbering extraction.
-    
-    Args:
-        docx_path: Path to the DOCX file
-        
-    Returns:
-        Tuple of (InternalDoc, List[ResourceRef])
+    The heuristics of one parse.
+
+    With ``stats`` every call the parse makes is recorded into it (see
+    core.utils.heuristics); without, the attributes are the plain functions and
+    ``rules``/``captions`` return their argument unchanged.
     """
-    from core.numbering.heading_numbering import extract_headings_with_numbers
-    
-    docx_path = Path(docx_path)
-    
-    # Extract numbered headings using comprehensive XML parsing
-    numbered_headings = extract_headings_with_numbers(str(docx_path))
-    
-    with zipfile.ZipFile(docx_path) as z:
-        doc_xml = read_docx_part(z, "word/document.xml")
-        styles_xml = read_docx_part(z, "word/styles.xml")
-        rels_xml = read_docx_part(z, "word/_rels/document.xml.rels")
-        numbering_xml = read_docx_part(z, "word/numbering.xml")
-        
-        # Extract images from media directory and create ResourceRef objects
-        media_images = _extract_images_from_media(z)
-    
-    if not doc_xml:
-        raise RuntimeError("word/document.xml not found")
-    
-    style_map = styles_map(styles_xml)
-    style_nums = style_num_map(styles_xml)
-    num_fmts = numbering_formats(numbering_xml)
-    relationships = _load_relationships(rels_xml)
+
+    def __init__(self, stats: HeuristicStats | None = None):
+        self.stats = stats
+        self.heading_level = self._timed("heading_detection", heading_level)
+        self.list_info = self._timed("list_info", _paragraph_list_info)
+        self.cross_references = self._timed("cross_references", _replace_cross_references,
+                                            lambda args, result: result != args[0])
+        self.code_style = self._timed("code_style", _is_code_style_paragraph)
+        self.command_reorder = self._timed("command_reorder", _should_reorder_command_before_image)
+
+    def _timed(self, name: str, function: Callable, *hit) -> Callable:
+        return function if self.stats is None else self.stats.timed(name, function, *hit)
+
+    def rules(self, rules: CompiledTextRules) -> CompiledTextRules:
+        """The text rules of the parse; a copy recording its classification methods with stats."""
+        if self.stats is None:
+            return rules
+        timed = copy.copy(rules)
+        for name, method in _RULE_HEURISTICS:
+            setattr(timed, method, self.stats.timed(name, getattr(rules, method)))
+        return timed
+
+    def captions(self, captions: _CaptionIndex) -> _CaptionIndex:
+        """The caption index of the parse; a copy recording ``caption_for`` with stats."""
+        if self.stats is None:
+            return captions
+        timed = copy.copy(captions)
+        timed.caption_for = self.stats.timed("caption_search", captions.caption_for, lambda args, result: bool(result[0]))
+        return timed
+
+
+@dataclass
+class _ParseContext:
+    """Document-wide lookup tables the analysis of a single body element needs."""
+    style_map: Dict[str, str]
+    style_nums: Dict[str, str]
+    num_fmts: Dict[str, str]
+    relationships: Dict[str, str]
+    media_images: Dict[str, str]
+    section_map: Dict[str, str]
+    captions: _CaptionIndex
+    rules: CompiledTextRules
+    # Skip caption search, cross-references and command reordering (see core.utils.time_budget)
+    degraded: bool = False
+    heuristics: _Heuristics = field(default_factory=_Heuristics)  # rules and captions above come from it
+
+
+@dataclass
+class _ElementInfo:
+    """
+    Context-free analysis of one top-level body element.
+
+    Everything here depends on the element (and for ``reorder_command`` on the next
+    element) only, so elements can be analysed in any order and in other processes.
+    """
+    kind: str  # "p", "tbl" or "" for other elements (e.g. w:sectPr)
+    heading_level: int | None = None
+    text: str = ""
+    classes: TextClasses = frozenset()  # text classifiers the text matched
+    list_info: Tuple[str, int] | None = None
+    images: List[Image] = field(default_factory=list)
+    caption_positions: Set[int] = field(default_factory=set)
+    position: int | None = None  # position of the paragraph in the .//w:p list
+    code_style: bool = False
+    inlines: List = field(default_factory=list)  # formatted inlines, only for list paragraphs
+    reorder_command: bool = False  # command to move before the image of the next paragraph
+    table: Table | None = None
+
+
+def _analyze_element(elements: List[ET.Element], i: int, ctx: _ParseContext) -> _ElementInfo:
+    el = elements[i]
+    section_map = {} if ctx.degraded else ctx.section_map
+    captions = _NO_CAPTIONS if ctx.degraded else ctx.captions
+    heuristics = ctx.heuristics
+    if el.tag == _W_P:
+        text = _text_of(el, section_map, ctx.rules, heuristics.cross_references)
+        list_info = heuristics.list_info(el, ctx.style_nums, ctx.num_fmts, ctx.style_map)
+        images, caption_positions = _find_images_in_paragraph(el, ctx.relationships, ctx.media_images, captions)
+        info = _ElementInfo(
+            kind="p",
+            heading_level=heuristics.heading_level(el, ctx.style_map, DEFAULT_HEADING_PATTERNS),
+            text=text,
+            classes=ctx.rules.classify(text) if text else frozenset(),
+            list_info=list_info,
+            images=images,
+            caption_positions=caption_positions,
+            position=ctx.captions.position(el),
+            code_style=bool(text) and heuristics.code_style(el, ctx.style_map),
+        )
+        if list_info and text:
+            info.inlines = _extract_formatted_inlines(el, section_map, heuristics.cross_references)
+        # Detect command-image patterns that need reordering
+        if not ctx.degraded and i + 1 < len(elements) and elements[i + 1].tag == _W_P:
+            info.reorder_command = heuristics.command_reorder(el, elements[i + 1], text, ctx.style_map)
+        return info
+    if el.tag == _W_TBL:
+        return _ElementInfo(kind="tbl", table=_parse_table(el, ctx.relationships, ctx.media_images, captions))
+    return _ElementInfo(kind="")
+
+
+def _chunk_ranges(elements: List[ET.Element], style_map: Dict[str, str], chunk_size: int) -> List[Tuple[int, int]]:
+    """
+    Cheap boundary scan of the body: split the top-level elements into ranges of
+    at least ``chunk_size`` elements, each new range starting at a table or heading.
+    """
+    ranges: List[Tuple[int, int]] = []
+    start = 0
+    i = chunk_size
+    while i < len(elements):
+        el = elements[i]
+        if el.tag == _W_TBL or (el.tag == _W_P and heading_level(el, style_map, DEFAULT_HEADING_PATTERNS)):
+            ranges.append((start, i))
+            start = i
+            i += chunk_size
+        else:
+            i += 1
+    ranges.append((start, len(elements)))
+    return ranges
+
+
+# State of a parse worker process: the body elements and the context built from them
+_worker_state: Tuple[List[ET.Element], _ParseContext] | None = None
+
+
+def _init_parse_worker(elements: List[ET.Element], ctx: _ParseContext) -> None:
+    """
+    Initializer of forked workers. Their arguments are inherited from the parent
+    rather than pickled, so the parsed body is shared and not parsed again.
+    """
+    global _worker_state
+    _worker_state = (elements, ctx)
+
+
+def _init_spawned_parse_worker(doc_xml: bytes, style_map: Dict[str, str], style_nums: Dict[str, str],
+                               num_fmts: Dict[str, str], relationships: Dict[str, str],
+                               media_images: Dict[str, str], section_map: Dict[str, str], text_rules: TextRules,
+                               degraded: bool = False, trace_heuristics: bool = False) -> None:
+    """Initializer of workers where fork is not available: each parses document.xml itself."""
     body = ET.fromstring(doc_xml).find(".//w:body", NS)
-    if body is None:
-        raise RuntimeError("No <w:body> found")
-    
-    # Extract section mapping for cross-reference replacement
-    docx_root = ET.fromstring(doc_xml)
-    section_map = _extract_section_mapping(docx_root)
-    
-    patterns = DEFAULT_HEADING_PATTERNS
+    heuristics = _Heuristics(HeuristicStats() if trace_heuristics else None)
+    captions = heuristics.captions(_CaptionIndex(body.findall(".//w:p", NS), style_map))
+    _init_parse_worker(list(body), _ParseContext(style_map, style_nums, num_fmts, relationships, media_images,
+                                                 section_map, captions, heuristics.rules(text_rules.compile()),
+                                                 degraded, heuristics))
+
+
+def _analyze_range(bounds: Tuple[int, int]) -> Tuple[List[_ElementInfo], Dict[str, dict] | None]:
+    """Analysed elements of a chunk and, when traced, the heuristics recorded for it."""
+    elements, ctx = _worker_state
+    infos = [_analyze_element(elements, i, ctx) for i in range(*bounds)]
+    stats = ctx.heuristics.stats
+    return infos, stats.drain() if stats is not None else None
+
+
+def _analyze_with_progress(elements: List[ET.Element], start: int, stop: int, ctx: _ParseContext,
+                           observer: StageObserver) -> List[_ElementInfo]:
+    """Analyse elements ``[start, stop)`` serially, reporting parse progress to the observer.
+
+    The parse turns degraded at the first report after the observer asks for it.
+    """
+    total = stop - start
+    step = progress_step(total)
+    infos: List[_ElementInfo] = []
+    for i in range(start, stop):
+        infos.append(_analyze_element(elements, i, ctx))
+        if len(infos) % step == 0 or len(infos) == total:
+            observer.progress("parse", len(infos), total)
+            if not ctx.degraded and observer.degraded():
+                ctx.degraded = True
+    return infos
+
+
+def _heading_block(numbered_heading, lvl: int, text: str) -> Heading:
+    """
+    Heading block of a heading paragraph, numbered from the next numbered heading when there is one.
+
+    A numbered heading below level 1 gets its number and title from the numbering
+    as they are. Chapter headings show no number, so their fields, like those of
+    unnumbered headings, are derived from the text by the model.
+    """
+    if numbered_heading is None:
+        return Heading(level=min(lvl, 6), text=text)
+    level = min(numbered_heading.level, 6)
+    if level == 1:
+        return Heading(level=level, text=numbered_heading.text, anchor=numbered_heading.anchor)
+    number = numbered_heading.number
+    return Heading(
+        level=level,
+        text=f"{number} {numbered_heading.text}",
+        number=number,
+        number_parts=heading_number_parts(number),
+        title=numbered_heading.text.strip(),
+        anchor=numbered_heading.anchor,
+    )
+
+
+def _takes_numbered_heading(lvl: int, text: str) -> bool:
+    """
+    Whether a paragraph takes the next of the numbered headings.
+
+    Every heading paragraph with text does, whatever block it ends up in (a code
+    block or caption absorbs it just the same), so that ``_scan_headings`` and
+    ``_assemble_blocks`` walk the numbered headings in step.
+    """
+    return bool(lvl and text)
+
+
+def _scan_headings(elements: List[ET.Element], style_map: Dict[str, str], numbered_headings,
+                   section_map: Dict[str, str], rules: CompiledTextRules,
+                   heuristics: _Heuristics) -> List[Tuple[int, Heading]]:
+    """
+    Numbering-only pass over the body: the heading block of every heading
+    paragraph and its element index, without analysing anything else.
+    """
+    headings: List[Tuple[int, Heading]] = []
+    heading_iter = iter(numbered_headings)
+    for i, el in enumerate(elements):
+        if el.tag != _W_P:
+            continue
+        lvl = heuristics.heading_level(el, style_map, DEFAULT_HEADING_PATTERNS)
+        text = _text_of(el, section_map, rules, heuristics.cross_references) if lvl else ""
+        if _takes_numbered_heading(lvl, text):
+            headings.append((i, _heading_block(next(heading_iter, None), lvl, text)))
+    return headings
+
+
+def _assemble_blocks(infos: List[_ElementInfo], numbered_headings, rules: CompiledTextRules) -> List[Block]:
+    """
+    Turn analysed body elements into blocks, in document order.
+
+    All state carried from one element to the next lives here: the open list
+    stack, the pending code block, the position in the numbered headings, command
+    and image reordering and the caption paragraphs already used.
+    """
     blocks: List[Block] = []
-    resources: List[ResourceRef] = list(media_images.values())  # Extract all images as resources
     heading_iter = iter(numbered_headings)
     
-    # Get all paragraphs for caption detection
-    all_paragraphs = body.findall(".//w:p", NS)
-    
     # Track paragraphs that have been used as captions to avoid duplication
-    used_caption_paragraphs = set()
-    
-    # Detect command-image patterns that need reordering
-    commands_to_reorder = set()  # Set of paragraph indices that contain commands to reorder
-    body_elements = list(body)
-    
-    for i, el in enumerate(body_elements):
-        if el.tag == f"{{{NS['w']}}}p" and i + 1 < len(body_elements):
-            current_para = el
-            next_el = body_elements[i + 1]
-            
-            if next_el.tag == f"{{{NS['w']}}}p":  # Next element is also a paragraph
-                next_para = next_el
-                current_text = _text_of(current_para, section_map)
-                
-                if _should_reorder_command_before_image(current_para, next_para, current_text, style_map):
-                    commands_to_reorder.add(i)
-
-    # --- Heuristics for code block detection ---
-    yaml_key_re = re.compile(r"^(?:-\s+.*|\s*[\w\./\[\]-]+\s*:\s*.*)$")
-    yaml_start_hint_re = re.compile(r"\.(ya?ml)\b", re.IGNORECASE)
-    yaml_first_line_re = re.compile(r"^(version|services|tls)\s*:\s*|^-\s+", re.IGNORECASE)
-
-    bash_line_re = re.compile(r"^(?:sudo\s+)?(docker|wget|curl|psql|createdb|apt|apt-get|dnf|systemctl|sh\b|touch|chmod|chown|echo|ls|cat|kubectl|helm)\b")
-    sql_line_re = re.compile(r"^(CREATE|GRANT|ALTER|INSERT|UPDATE|DELETE|DROP|TRUNCATE)\b", re.IGNORECASE)
+    used_caption_positions: Set[int] = set()
 
     code_acc: List[str] = []
     code_lang: str | None = None
@@ -841,110 +1115,8 @@ def parse_docx_to_internal_doc(docx_path: str) -> Tuple[InternalDoc, List[Resour
         code_lang = None
         code_title = None
 
-    def belongs_to_yaml(line: str) -> bool:
-        return bool(yaml_key_re.match(line))
-
-    def belongs_to_bash(line: str) -> bool:
-        return bool(bash_line_re.match(line))
-
-    def belongs_to_sql(line: str) -> bool:
-        return bool(sql_line_re.match(line))
-
-    # Code-style detection via paragraph style name, shading and monospaced fonts
-    CODE_STYLE_NAME_PATTERNS = [
-        r".*Команда.*",
-        r".*Листинг.*",
-        r".*Code.*",
-        r".*Код.*",
-        r"ROSA_ТКом",
-        r"ROSA_Команда_Таблица",
-    ]
-    code_style_name_res = [re.compile(pat, re.IGNORECASE) for pat in CODE_STYLE_NAME_PATTERNS]
-
-    MONO_FONTS = {"courier new", "consolas", "roboto mono", "menlo", "monaco", "lucida console"}
-
-    def _para_style_name(p: ET.Element) -> str:
-        pPr = p.find("w:pPr", NS)
-        if pPr is None:
-            return ""
-        pStyle = pPr.find("w:pStyle", NS)
-        if pStyle is None:
-            return ""
-        sid = pStyle.attrib.get(f"{{{NS['w']}}}val", "")
-        return style_map.get(sid, sid) or sid
-
-    def _has_gray_shading(p: ET.Element) -> bool:
-        def has_shading(el: ET.Element | None) -> bool:
-            if el is None:
-                return False
-            shd = el.find("w:shd", NS)
-            if shd is None:
-                return False
-            fill = shd.attrib.get(f"{{{NS['w']}}}fill", "").lower()
-            # D9D9D9 или любой серый оттенок
-            return fill in {"d9d9d9", "e1dfdd", "ededed", "f2f2f2"} or bool(fill)
-
-        pPr = p.find("w:pPr", NS)
-        rPr = p.find("w:r/w:rPr", NS)
-        return has_shading(pPr) or has_shading(rPr)
-
-    def _uses_mono_font(p: ET.Element) -> bool:
-        for r in p.findall(".//w:r", NS):
-            rPr = r.find("w:rPr", NS)
-            if rPr is None:
-                continue
-            rFonts = rPr.find("w:rFonts", NS)
-            if rFonts is None:
-                continue
-            for attr in ("ascii", "hAnsi", "cs"):
-                val = rFonts.attrib.get(f"{{{NS['w']}}}{attr}", "").lower()
-                if val in MONO_FONTS:
-                    return True
-        return False
-
-    def is_code_style_paragraph(p: ET.Element) -> bool:
-        name = _para_style_name(p)
-        if name and any(rx.match(name) for rx in code_style_name_res):
-            return True
-        if _has_gray_shading(p) and _uses_mono_font(p):
-            return True
-        return False
-
-    def is_note_paragraph(text: str) -> bool:
-        """Check if paragraph text starts with note pattern."""
-        return bool(re.match(r'^\s*Примечани[ея]\s*[-–—]', text.strip()))
-    
-    
-    def is_table_caption(text: str) -> bool:
-        """Check if paragraph text is a table caption that should not have dash prefix."""
-        # Pattern for table captions - common patterns found in documents
-        table_patterns = [
-            # Explicit table captions with numbers
-            r'^\s*Таблица\s+\d+\s*[-–—]\s*.+',
-            r'^\s*Table\s+\d+\s*[-–—]\s*.+',
-            r'^\s*Таблица\s+\d+\s*.+',
-            r'^\s*Table\s+\d+\s*.+',
-            # Table descriptions/captions about requirements/parameters
-            r'^\s*[Тт]ребования\s+к\s+аппаратным\s+средствам.+',
-            r'^\s*[Тт]ребования\s+к\s+программным\s+средствам.+',  
-            r'^\s*[Пп]араметры.+таблиц[еы].*',
-            r'^\s*[Хх]арактеристики.+',
-            # Generic patterns for table-like content descriptions
-            r'^\s*[Оо]писание\s+(параметров|характеристик).+',
-            r'^\s*[Сс]писок\s+(параметров|требований).+',
-        ]
-        text_stripped = text.strip()
-        for pattern in table_patterns:
-            if re.match(pattern, text_stripped, re.IGNORECASE):
-                return True
-        return False
-
-    def _clean_bash_prefix(line: str) -> str:
-        """Remove leading '# ' used in doc formatting before commands."""
-        m = re.match(r"^\s*#\s+(.*)$", line)
-        return m.group(1) if m else line
-
     prev_text: str = ""
+    prev_classes: TextClasses = frozenset()
     list_stack: List[tuple[ListBlock, int, bool]] = []
 
     def flush_lists() -> None:
@@ -980,108 +1152,78 @@ def parse_docx_to_internal_doc(docx_path: str) -> Tuple[InternalDoc, List[Resour
         list_stack.append((new_block, level, ordered))
         return new_block
     
-    for i, el in enumerate(body_elements):
-        if el.tag == f"{{{NS['w']}}}p":
-            p = el
-            lvl = heading_level(p, style_map, patterns)
-            text = _text_of(p, section_map)
-            list_info = _paragraph_list_info(p, style_nums, num_fmts, style_map)
-            paragraph_images, caption_paras = _find_images_in_paragraph(p, relationships, media_images, all_paragraphs, style_map, used_caption_paragraphs)
-            used_caption_paragraphs.update(caption_paras)
+    for i, info in enumerate(infos):
+        if info.kind == "p":
+            lvl = info.heading_level
+            text = info.text
+            classes = info.classes
+            list_info = info.list_info
+            paragraph_images = info.images
+            numbered_heading = next(heading_iter, None) if _takes_numbered_heading(lvl, text) else None
+            used_caption_positions.update(info.caption_positions)
             
             # Special handling for command-image reordering
-            if i in commands_to_reorder and i + 1 < len(body_elements):
-                next_para = body_elements[i + 1]
-                if next_para.tag == f"{{{NS['w']}}}p":
-                    next_images, next_caption_paras = _find_images_in_paragraph(next_para, relationships, media_images, all_paragraphs, style_map, used_caption_paragraphs)
-                    used_caption_paragraphs.update(next_caption_paras)
-                    
-                    
-                    # Flush any pending code block first
-                    if code_acc:
-                        blocks.append(CodeBlock(code="\n".join(code_acc), language=code_lang, title=code_title))
-                        code_acc = []
-                        code_lang = None
-                        code_title = None
-                    
-                    # Add command as code block immediately
-                    if text:
-                        command_code = (_clean_bash_prefix(text)).strip()
-                        blocks.append(CodeBlock(code=command_code, language="bash", title="Terminal"))
-                    
-                    # Add current paragraph images (if any)
-                    for image in paragraph_images:
-                        blocks.append(image)
-                    
-                    # Add images from next paragraph  
-                    for next_image in next_images:
-                        blocks.append(next_image)
-                    
-                    prev_text = text
-                    continue
+            if info.reorder_command:
+                next_info = infos[i + 1]
+                # The next paragraph emits its own images again when it is processed
+                next_images = [image.model_copy() for image in next_info.images]
+                used_caption_positions.update(next_info.caption_positions)
+                
+                # Flush any pending code block first
+                flush_code()
+                
+                # Add command as code block immediately
+                if text:
+                    command_code = rules.clean_prompt(text).strip()
+                    blocks.append(CodeBlock(code=command_code, language="bash", title="Terminal"))
+                
+                # Add current paragraph images (if any)
+                for image in paragraph_images:
+                    blocks.append(image)
+                
+                # Add images from next paragraph  
+                for next_image in next_images:
+                    blocks.append(next_image)
+                
+                prev_text = text
+                prev_classes = classes
+                continue
             
             # Skip paragraph if it was used as a caption
-            if p in used_caption_paragraphs:
+            if info.position in used_caption_positions:
                 # Add images even if text is skipped (to preserve order)
                 for image in paragraph_images:
                     blocks.append(image)
                 continue
                 
             # Skip paragraph if its images were already processed by command reordering  
-            if i > 0 and (i - 1) in commands_to_reorder and not text.strip():
+            if i > 0 and infos[i - 1].reorder_command and not text.strip():
                 # This is likely an image-only paragraph that was processed by the previous command
                 continue
                 
             if text:
                 # Style-based code detection (highest priority)
-                if is_code_style_paragraph(p):
+                if info.code_style:
                     # Start or continue a code block; guess language from content
                     if code_lang is None:
-                        if text.strip().startswith("#!/") or belongs_to_bash(text):
-                            code_lang = "bash"
-                            code_title = "Terminal"
-                        elif belongs_to_yaml(text):
-                            code_lang = "yaml"
-                            code_title = None
-                        elif belongs_to_sql(text):
-                            code_lang = "sql"
-                            code_title = None
-                        else:
-                            code_lang = "bash"  # default for command listings
-                            code_title = "Terminal"
-                    code_acc.append((_clean_bash_prefix(text)).strip())
+                        # Scripts ("#!/...") and command listings fall back to the default language
+                        code_lang = rules.detect_language(classes) or rules.default_language
+                        code_title = rules.title(code_lang)
+                    code_acc.append(rules.clean_prompt(text).strip())
                     prev_text = text
+                    prev_classes = classes
                     # Add images after processing code text (to preserve order)
                     for image in paragraph_images:
                         blocks.append(image)
                     continue
 
                 # If we are inside a code block, try to continue it
-                if code_lang == "yaml":
-                    if belongs_to_yaml(text):
-                        code_acc.append(text.strip())
+                if code_lang is not None:
+                    if rules.continues(classes, code_lang):
+                        code_acc.append(rules.clean_prompt(text).strip() if rules.strips_prompt(code_lang) else text.strip())
                         prev_text = text
-                        # Add images after processing yaml text (to preserve order)
-                        for image in paragraph_images:
-                            blocks.append(image)
-                        continue
-                    else:
-                        flush_code()
-                elif code_lang == "bash":
-                    if belongs_to_bash(text):
-                        code_acc.append((_clean_bash_prefix(text)).strip())
-                        prev_text = text
-                        # Add images after processing bash text (to preserve order)
-                        for image in paragraph_images:
-                            blocks.append(image)
-                        continue
-                    else:
-                        flush_code()
-                elif code_lang == "sql":
-                    if belongs_to_sql(text) or text.strip().endswith(";"):
-                        code_acc.append(text.strip())
-                        prev_text = text
-                        # Add images after processing sql text (to preserve order)
+                        prev_classes = classes
+                        # Add images after processing code text (to preserve order)
                         for image in paragraph_images:
                             blocks.append(image)
                         continue
@@ -1091,59 +1233,38 @@ def parse_docx_to_internal_doc(docx_path: str) -> Tuple[InternalDoc, List[Resour
                 if lvl:
                     if list_stack:
                         flush_lists()
-                    try:
-                        numbered_heading = next(heading_iter)
-                        level = min(numbered_heading.level, 6)
-                        if level == 1:
-                            numbered_text = numbered_heading.text
-                        else:
-                            numbered_text = f"{numbered_heading.number} {numbered_heading.text}"
-                        blocks.append(Heading(level=level, text=numbered_text))
-                    except StopIteration:
-                        level = min(lvl, 6)
-                        blocks.append(Heading(level=level, text=text))
+                    blocks.append(_heading_block(numbered_heading, lvl, text))
                 else:
-                    # Decide if a new code block should start
+                    # Decide if a new code block should start, trying languages in rule order
                     started_code = False
-                    # YAML detection: hint in previous line about *.yml/.yaml or typical first YAML keys
-                    if yaml_start_hint_re.search(prev_text) and yaml_first_line_re.search(text):
-                        code_lang = "yaml"
-                        m = re.search(r"([\w\./-]+\.(?:ya?ml))", prev_text, flags=re.IGNORECASE)
-                        code_title = m.group(1) if m else None
-                        code_acc.append(text.strip())
-                        started_code = True
-                    elif yaml_first_line_re.search(text) and belongs_to_yaml(text):
-                        code_lang = "yaml"
-                        code_title = None
-                        code_acc.append(text.strip())
-                        started_code = True
-                    # Bash detection
-                    elif belongs_to_bash(text):
-                        code_lang = "bash"
-                        code_title = "Terminal"
-                        code_acc.append((_clean_bash_prefix(text)).strip())
-                        started_code = True
-                    # SQL detection
-                    elif belongs_to_sql(text):
-                        code_lang = "sql"
-                        code_title = None
-                        code_acc.append(text.strip())
+                    for language in rules.languages:
+                        # e.g. YAML announced by a "*.yml" file name in the previous paragraph
+                        if rules.starts_after_hint(classes, prev_classes, language):
+                            code_title = rules.hint_title(language, prev_text)
+                        elif rules.starts(classes, language):
+                            code_title = rules.title(language)
+                        else:
+                            continue
+                        code_lang = language
+                        code_acc.append(rules.clean_prompt(text).strip() if rules.strips_prompt(language) else text.strip())
                         started_code = True
+                        break
 
                     if started_code:
                         prev_text = text
+                        prev_classes = classes
                         # Add images after processing started code text (to preserve order)
                         for image in paragraph_images:
                             blocks.append(image)
                         continue
 
-                    if list_info and not is_table_caption(text):
+                    if list_info and not rules.is_table_caption(classes):
                         fmt, list_level = list_info
                         ordered = fmt not in {"bullet", "none"}
                         target_list = ensure_list_block(list_level, ordered)
                         list_item = ListItem(blocks=[])
                         target_list.items.append(list_item)
-                        formatted_inlines = _extract_formatted_inlines(p, section_map)
+                        formatted_inlines = info.inlines
                         if formatted_inlines:
                             list_item.blocks.append(Paragraph(inlines=formatted_inlines))
                         else:
@@ -1151,12 +1272,13 @@ def parse_docx_to_internal_doc(docx_path: str) -> Tuple[InternalDoc, List[Resour
                         for image in paragraph_images:
                             list_item.blocks.append(image)
                         prev_text = text
+                        prev_classes = classes
                         continue
                     else:
                         if list_stack:
                             flush_lists()
 
-                    if is_note_paragraph(text):
+                    if rules.is_note(classes):
                         text = f"> {text}"
                     inlines = [InlineText(content=text)]
                     blocks.append(Paragraph(inlines=inlines))
@@ -1168,16 +1290,174 @@ def parse_docx_to_internal_doc(docx_path: str) -> Tuple[InternalDoc, List[Resour
             for image in paragraph_images:
                 blocks.append(image)
             prev_text = text
-        elif el.tag == f"{{{NS['w']}}}tbl":
+            prev_classes = classes
+        elif info.kind == "tbl":
             if list_stack:
                 flush_lists()
             # If a code block was open before a table, flush it
             flush_code()
-            table_block = _parse_table(el, relationships, media_images, all_paragraphs, style_map)
-            blocks.append(table_block)
+            blocks.append(info.table)
     # Flush any pending code block at the end
     flush_code()
+    return blocks
+
+
+# Smallest number of top-level body elements worth sending to a worker process
+PARALLEL_MIN_CHUNK = 256
+
+def parse_docx_to_internal_doc(docx_path: DocxSource, resource_store: ResourceStore | None = None,
+                               workers: int = 1, text_rules: TextRules | None = None,
+                               heading_range: Callable[[List[Heading]], Tuple[int, int]] | None = None,
+                               observer: StageObserver | None = None) -> Tuple[InternalDoc, ResourceStore]:
+    """
+    Parse DOCX file and return InternalDoc AST format.
+    Uses comprehensive XML-based heading numbering extraction.
+
+    With ``workers`` > 1 the top-level body elements are split into chunks at
+    heading or table boundaries and analysed in a process pool. Blocks are then
+    assembled from the analysed elements sequentially, so the result is identical
+    to parsing serially.
+
+    ``heading_range`` converts part of the document: it is called with the
+    heading blocks of a numbering-only scan of the body and returns the
+    ``[start, stop)`` positions of the headings to convert. The body before
+    heading ``start`` contributes its headings only, so numbering stays as in
+    the whole document, and nothing from heading ``stop`` on is analysed.
+    
+    Args:
+        docx_path: Path to the DOCX file, or its bytes or a binary file object
+        resource_store: Store receiving the extracted images. A store with the
+            default memory budget is created when omitted.
+        workers: Number of processes analysing the body (1 parses serially)
+        text_rules: Text classification rules (see core.adapters.text_rules);
+            the bundled text_rules.yaml when omitted
+        heading_range: Picks the headings to convert (whole document when omitted)
+        observer: Notified of the numbering and parse stages and of the parsed document;
+            its heuristic statistics, if any, receive the calls, hits and time of HEURISTICS,
+            those of parse workers included
+        
+    Returns:
+        Tuple of (InternalDoc, ResourceStore)
+    """
+    from core.numbering.heading_numbering import extract_headings_with_numbers
+    
+    source = docx_source(docx_path)
+    rules = text_rules.compile() if text_rules is not None else default_text_rules()
+    
+    with stage(observer, "numbering"):
+        # Extract numbered headings using comprehensive XML parsing
+        numbered_headings = extract_headings_with_numbers(source)
+    heuristics = _Heuristics(observer.heuristic_stats() if observer is not None else None)
+    with stage(observer, "parse"):
+        internal_doc, resources = _parse_body(source, numbered_headings, resource_store, workers, rules, heading_range,
+                                              observer, heuristics)
+    if observer is not None:
+        observer.document_parsed(internal_doc)
+    return internal_doc, resources
+
+
+def _parse_body(source: DocxSource, numbered_headings, resource_store: ResourceStore | None, workers: int,
+                rules: CompiledTextRules, heading_range, observer: StageObserver | None = None,
+                heuristics: _Heuristics | None = None) -> Tuple[InternalDoc, ResourceStore]:
+    """Everything of parse_docx_to_internal_doc after the numbering scan."""
+    heuristics = heuristics if heuristics is not None else _Heuristics()
+    plain_rules, rules = rules, heuristics.rules(rules)
+    with zipfile.ZipFile(source) as z:
+        doc_xml = read_docx_part(z, "word/document.xml")
+        styles_xml = read_docx_part(z, "word/styles.xml")
+        rels_xml = read_docx_part(z, "word/_rels/document.xml.rels")
+        numbering_xml = read_docx_part(z, "word/numbering.xml")
+        
+        # Extract images from media directory into the resource store
+        resources = resource_store if resource_store is not None else ResourceStore()
+        media_images = _extract_images_from_media(z, resources)
+    
+    if not doc_xml:
+        raise RuntimeError("word/document.xml not found")
+    
+    # Style and numbering tables are shared by documents built from the same template
+    styles = style_tables(styles_xml)
+    style_map = styles.names
+    style_nums = styles.num_ids
+    num_fmts = numbering_tables(numbering_xml).formats
+    relationships = _load_relationships(rels_xml)
+    docx_root = ET.fromstring(doc_xml)
+    body = docx_root.find(".//w:body", NS)
+    if body is None:
+        raise RuntimeError("No <w:body> found")
+    
+    # Extract section mapping for cross-reference replacement
+    section_map = _extract_section_mapping(docx_root)
+    
+    body_elements = list(body)
+    start, stop = 0, len(body_elements)
+    blocks: List[Block] = []
+    if heading_range is not None:
+        scanned = _scan_headings(body_elements, style_map, numbered_headings, section_map, rules, heuristics)
+        first, last = heading_range([heading for _, heading in scanned])
+        start = scanned[first][0] if first < len(scanned) else len(body_elements)
+        stop = scanned[last][0] if last < len(scanned) else len(body_elements)
+        blocks = [heading for _, heading in scanned[:first]]
+        numbered_headings = numbered_headings[first:]
+
+    chunks = _chunk_ranges(body_elements[start:stop], style_map, max(PARALLEL_MIN_CHUNK, -(-(stop - start) // (workers * 4)))) if workers > 1 else []
+    chunks = [(chunk_start + start, chunk_stop + start) for chunk_start, chunk_stop in chunks]
+    
+    if len(chunks) > 1:
+        # multiprocessing is only worth importing when the body is actually split
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Workers cannot switch over mid-chunk; a parse starting past its budget is degraded throughout
+        degraded = is_degraded(observer)
+        if "fork" in multiprocessing.get_all_start_methods():
+            # Workers record their heuristics separately and send them back with each chunk
+            worker_heuristics = _Heuristics(HeuristicStats() if heuristics.stats is not None else None)
+            caption_index = _CaptionIndex(body.findall(".//w:p", NS), style_map)
+            mp_context = multiprocessing.get_context("fork")
+            initializer, initargs = _init_parse_worker, (
+                body_elements,
+                _ParseContext(style_map, style_nums, num_fmts, relationships, media_images, section_map,
+                              worker_heuristics.captions(caption_index), worker_heuristics.rules(plain_rules),
+                              degraded, worker_heuristics),
+            )
+        else:
+            mp_context = None
+            initializer, initargs = _init_spawned_parse_worker, (
+                doc_xml, style_map, style_nums, num_fmts, relationships, media_images, section_map, plain_rules.rules,
+                degraded, heuristics.stats is not None,
+            )
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=mp_context,
+                                 initializer=initializer, initargs=initargs) as pool:
+            infos = []
+            try:
+                for chunk, records in pool.map(_analyze_range, chunks):
+                    infos += chunk
+                    if records is not None:
+                        heuristics.stats.merge(records)
+                    if observer is not None:
+                        observer.progress("parse", len(infos), stop - start)
+            except BaseException:
+                # A cancelled parse does not wait for the chunks still queued
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+    else:
+        # Get all paragraphs for caption detection
+        captions = heuristics.captions(_CaptionIndex(body.findall(".//w:p", NS), style_map))
+        ctx = _ParseContext(style_map, style_nums, num_fmts, relationships, media_images, section_map, captions, rules,
+                            is_degraded(observer), heuristics)
+        if observer is None:
+            infos = [_analyze_element(body_elements, i, ctx) for i in range(start, stop)]
+        else:
+            infos = _analyze_with_progress(body_elements, start, stop, ctx, observer)
+    if infos and stop < len(body_elements):
+        # The paragraph after the range is not converted, so nothing is moved before its images
+        infos[-1].reorder_command = False
+    
+    blocks += _assemble_blocks(infos, numbered_headings, rules)
     internal_doc = InternalDoc(blocks=blocks)
+    # Index sections once here; splitting and export read the structure from it
+    internal_doc.build_outline()
     return internal_doc, resources
 
 # Simple CLI
@@ -0,0 +1,207 @@
+"""
+Rule registry of the DOCX parser's text classifiers.
+
+Code language detection, note and table caption recognition, the shell prompt
+cleanup and the cross-reference prefixes are declared in YAML (``text_rules.yaml``
+next to this module by default) and compiled into combined patterns: every
+classifier becomes an optional named lookahead of one pattern, so a paragraph is
+classified with a single ``match`` call however many rules there are. The regex
+engine still tries the lookaheads one after another (classes may overlap, e.g. a
+line opening and belonging to a language, so they cannot be one alternation);
+what the combined pattern saves is a Python-level call per classifier.
+"""
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import FrozenSet, List, Optional
+
+import yaml
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+# Names of the classifiers a text matched, e.g. {"line0", "start0"}
+TextClasses = FrozenSet[str]
+
+DEFAULT_TEXT_RULES_PATH = Path(__file__).with_name("text_rules.yaml")
+
+
+def _check_regex(value: Optional[str]) -> Optional[str]:
+    if value is not None:
+        try:
+            re.compile(value)
+        except re.error as exc:
+            raise ValueError(f"invalid regular expression {value!r}: {exc}") from exc
+    return value
+
+
+class CodeLanguageRule(BaseModel):
+    """Detection of one code block language."""
+
+    language: str
+    title: Optional[str] = Field(default=None, description="Code block title")
+    line: str = Field(..., description="Regex of lines belonging to the language")
+    start: Optional[str] = Field(default=None, description="Regex of lines opening a block (default: line)")
+    continues: Optional[str] = Field(default=None, description="Regex of further lines of an open block besides line")
+    hint: Optional[str] = Field(default=None, description="Regex of a paragraph announcing a block")
+    hint_start: Optional[str] = Field(default=None, description="Regex of lines opening a block after a hint")
+    hint_title: Optional[str] = Field(default=None, description="Regex whose group 1 in the hint is the block title")
+    ignore_case: bool = False
+    strip_prompt: bool = Field(default=False, description="Remove a leading shell prompt from the lines")
+
+    _check_patterns = field_validator("line", "start", "continues", "hint", "hint_start", "hint_title")(_check_regex)
+
+    @model_validator(mode="after")
+    def _check_hint(self) -> "CodeLanguageRule":
+        if self.hint and not self.hint_start:
+            raise ValueError(f"code language {self.language!r}: 'hint' needs 'hint_start'")
+        return self
+
+
+class PatternSet(BaseModel):
+    """Alternative regular expressions of one classifier."""
+
+    patterns: List[str] = Field(default_factory=list)
+    ignore_case: bool = False
+
+    @field_validator("patterns")
+    @classmethod
+    def _check_patterns(cls, patterns: List[str]) -> List[str]:
+        for pattern in patterns:
+            _check_regex(pattern)
+        return patterns
+
+
+class TextRules(BaseModel):
+    """The parser's text classification rules."""
+
+    code_languages: List[CodeLanguageRule] = Field(default_factory=list)
+    default_code_language: str = Field(default="bash", description="Language of code-styled paragraphs no rule matches")
+    prompt: str = Field(default=r"\s*#\s+(.*)$", description="Leading shell prompt; group 1 is kept")
+    note: PatternSet = Field(default_factory=PatternSet)
+    table_caption: PatternSet = Field(default_factory=PatternSet)
+    cross_reference_prefixes: PatternSet = Field(default_factory=PatternSet)
+
+    _check_prompt = field_validator("prompt")(_check_regex)
+
+    @model_validator(mode="after")
+    def _check_default_language(self) -> "TextRules":
+        if self.code_languages and self.default_code_language not in {rule.language for rule in self.code_languages}:
+            raise ValueError(f"default_code_language {self.default_code_language!r} has no code language rule")
+        return self
+
+    def compile(self) -> "CompiledTextRules":
+        return CompiledTextRules(self)
+
+
+def load_text_rules(path: str | Path | None = None) -> TextRules:
+    """Load text rules from a YAML file (the bundled defaults when ``path`` is None)."""
+    with open(path or DEFAULT_TEXT_RULES_PATH, "r", encoding="utf-8") as f:
+        return TextRules.model_validate(yaml.safe_load(f) or {})
+
+
+@lru_cache(maxsize=None)
+def default_text_rules() -> "CompiledTextRules":
+    """The bundled rules, compiled once per process."""
+    return load_text_rules().compile()
+
+
+def _scoped(pattern: str, ignore_case: bool) -> str:
+    return f"(?i:{pattern})" if ignore_case else f"(?:{pattern})"
+
+
+class CompiledTextRules:
+    """Text rules compiled into one combined classification pattern."""
+
+    def __init__(self, rules: TextRules):
+        self.rules = rules
+        self.languages = [rule.language for rule in rules.code_languages]
+        self.default_language = rules.default_code_language
+        self._by_language = {rule.language: rule for rule in rules.code_languages}
+        self._hint_titles = {
+            rule.language: re.compile(_scoped(rule.hint_title, rule.ignore_case))
+            for rule in rules.code_languages if rule.hint_title
+        }
+        self.prompt = re.compile(rules.prompt)
+
+        lookaheads: List[str] = []
+
+        def add(name: str, pattern: Optional[str], ignore_case: bool) -> None:
+            if pattern:
+                lookaheads.append(f"(?:(?=(?P<{name}>{_scoped(pattern, ignore_case)})))?")
+
+        for index, rule in enumerate(rules.code_languages):
+            add(f"line{index}", rule.line, rule.ignore_case)
+            add(f"start{index}", rule.start, rule.ignore_case)
+            add(f"continues{index}", rule.continues, rule.ignore_case)
+            add(f"hint{index}", rule.hint, rule.ignore_case)
+            add(f"hint_start{index}", rule.hint_start, rule.ignore_case)
+        for name in ("note", "table_caption"):
+            pattern_set: PatternSet = getattr(rules, name)
+            add(name, "|".join(f"(?:{pattern})" for pattern in pattern_set.patterns), pattern_set.ignore_case)
+        self._classifier = re.compile("".join(lookaheads))
+        self._index = {language: index for index, language in enumerate(self.languages)}
+
+        prefixes = rules.cross_reference_prefixes
+        self.cross_reference = None
+        if prefixes.patterns:
+            alternatives = "|".join(f"(?:{pattern})" for pattern in prefixes.patterns)
+            self.cross_reference = re.compile(
+                rf"(?<!\w)(?P<prefix>{alternatives})(?P<number>\d+(?:\.\d+)*)",
+                re.IGNORECASE if prefixes.ignore_case else 0,
+            )
+
+    def classify(self, text: str) -> TextClasses:
+        """Run every classifier over the text in one ``match`` call (each lookahead still scans the text)."""
+        groups = self._classifier.match(text).groupdict()
+        return frozenset(name for name, value in groups.items() if value is not None)
+
+    # --- Queries on a classification ---
+
+    def belongs_to(self, classes: TextClasses, language: str) -> bool:
+        return f"line{self._index[language]}" in classes
+
+    def detect_language(self, classes: TextClasses) -> Optional[str]:
+        """First language the text belongs to."""
+        for index, language in enumerate(self.languages):
+            if f"line{index}" in classes:
+                return language
+        return None
+
+    def continues(self, classes: TextClasses, language: str) -> bool:
+        index = self._index[language]
+        return f"line{index}" in classes or f"continues{index}" in classes
+
+    def starts(self, classes: TextClasses, language: str) -> bool:
+        index = self._index[language]
+        if self._by_language[language].start:
+            return f"start{index}" in classes
+        return f"line{index}" in classes
+
+    def starts_after_hint(self, classes: TextClasses, previous: TextClasses, language: str) -> bool:
+        index = self._index[language]
+        return f"hint{index}" in previous and f"hint_start{index}" in classes
+
+    def hint_title(self, language: str, previous_text: str) -> Optional[str]:
+        pattern = self._hint_titles.get(language)
+        if pattern is None:
+            return None
+        m = pattern.match(previous_text)
+        return m.group(1) if m else None
+
+    def title(self, language: str) -> Optional[str]:
+        return self._by_language[language].title
+
+    def strips_prompt(self, language: str) -> bool:
+        return self._by_language[language].strip_prompt
+
+    def is_note(self, classes: TextClasses) -> bool:
+        return "note" in classes
+
+    def is_table_caption(self, classes: TextClasses) -> bool:
+        return "table_caption" in classes
+
+    def clean_prompt(self, line: str) -> str:
+        """Remove a leading shell prompt (e.g. '# ') used in doc formatting before commands."""
+        m = self.prompt.match(line)
+        return m.group(1) if m else line
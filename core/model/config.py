@@ -1,9 +1,39 @@
 """Configuration models for the document processing pipeline."""
 
-import yaml
 from pathlib import Path
-from typing import Optional
-from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field, model_validator
+
+
+class ReorderRule(BaseModel):
+    """Moves the first paragraph matching ``match`` (substring) or ``pattern`` (regex) to the end of a section."""
+
+    match: Optional[str] = Field(default=None, description="Substring the paragraph text must contain")
+    pattern: Optional[str] = Field(default=None, description="Regular expression searched in the paragraph text")
+    target: str = Field(..., description="Exact text of the target section heading")
+    target_level: int = Field(default=3, gt=0, le=6, description="Level of the target section heading")
+
+    @model_validator(mode="after")
+    def _check_matcher(self) -> "ReorderRule":
+        if not self.match and not self.pattern:
+            raise ValueError("reorder rule needs either 'match' or 'pattern'")
+        return self
+
+
+# Architecture overview paragraphs that the admin guide places outside section 2.1
+DEFAULT_REORDER_RULES = [
+    ReorderRule(match=text, target="2.1 Основные компоненты")
+    for text in (
+        "Состав архитектуры Комплекса включает в себя следующие части",
+        "CMS-сервер (Winter CMS) — основной элемент серверной части",
+        "плагины Winter CMS — модули, расширяющие функциональность CMS",
+        "обратный прокси (Traefik) — обеспечивает маршрутизацию",
+        "СУБД PostgreSQL — хранение основной структурированной информации",
+        "кеширующая система Redis — хранение сессий и промежуточных данных",
+        "система поиска Typesense — полнотекстовый поиск",
+        "интеграция с внешней системой аутентификации РОСА ID",
+    )
+]
 
 
 class PipelineConfig(BaseModel):
@@ -16,6 +46,68 @@ class PipelineConfig(BaseModel):
     assets_dir: str = Field(default="assets", description="Directory name for assets within output")
     chapter_pattern: str = Field(default="{index:02d}-{slug}.md", description="Filename pattern for chapters")
     
+    # Resource configuration
+    resource_memory_budget: Optional[int] = Field(
+        default=64 * 1024 * 1024,
+        description="Bytes of extracted images kept in memory before spilling to disk (null for unlimited)",
+    )
+    
+    # Parsing configuration
+    parse_workers: int = Field(
+        default=1,
+        ge=1,
+        description="Processes analysing the document body in parallel (1 parses serially)",
+    )
+    template_cache_dir: Optional[str] = Field(
+        default=None,
+        description="Directory caching style and numbering tables across processes (null for in-memory only)",
+    )
+    text_rules_file: Optional[str] = Field(
+        default=None,
+        description="YAML file replacing the parser's text classification rules (null for the bundled ones)",
+    )
+    
+    # Output format
+    output_format: Literal["directory", "zip", "tar"] = Field(
+        default="directory",
+        description="Write the document folder as files or as <name>.zip / <name>.tar in the output directory",
+    )
+    
+    # Diagnostics
+    profile_memory: bool = Field(
+        default=False,
+        description="Record tracemalloc snapshots, RSS and AST block counts per stage (PipelineResult.memory_profile)",
+    )
+    profile_transforms: bool = Field(
+        default=False,
+        description="Time each transform of the fused traversal (PipelineResult.transform_stats)",
+    )
+    max_rss: Optional[int] = Field(
+        default=None,
+        gt=0,
+        description="Abort the conversion once the resident set size exceeds this many bytes (null for no limit)",
+    )
+    
+    # Preview builds
+    time_budget: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Seconds after which the rest of the conversion skips its optional heuristics and the output "
+                    "is marked degraded (null for no budget)",
+    )
+    
+    # AST export configuration
+    ast_export: bool = Field(
+        default=False,
+        description="Write each chapter's AST as JSON Lines (<chapter>.ast.jsonl) next to the Markdown file",
+    )
+    
+    # Content reordering
+    reorder_rules: List[ReorderRule] = Field(
+        default_factory=lambda: [rule.model_copy() for rule in DEFAULT_REORDER_RULES],
+        description="Rules moving misplaced paragraphs to the end of their target section",
+    )
+    
     # Content configuration
     frontmatter_enabled: bool = Field(default=True, description="Whether to include frontmatter in output")
     locale: str = Field(default="en", description="Language/locale for processing")
@@ -27,6 +119,8 @@ class PipelineConfig(BaseModel):
             # Return default config if file doesn't exist
             return cls()
         
+        import yaml
+
         with open(config_path, 'r', encoding='utf-8') as f:
             config_data = yaml.safe_load(f) or {}
         
@@ -39,6 +133,8 @@ class PipelineConfig(BaseModel):
     
     def to_yaml(self, config_path: Path) -> None:
         """Save configuration to a YAML file."""
+        import yaml
+
         config_path.parent.mkdir(parents=True, exist_ok=True)
         
         with open(config_path, 'w', encoding='utf-8') as f:
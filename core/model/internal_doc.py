@@ -1,6 +1,8 @@
 from __future__ import annotations
-from typing import List, Union, Literal
-from pydantic import BaseModel, Field
+from typing import Any, List, Union, Literal
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
+
+from core.utils.text_processing import heading_anchor, split_heading_text
 
 # --- Inline Elements ---
 
@@ -40,10 +42,38 @@ class Paragraph(BaseModel):
     inlines: List[Inline] = Field(default_factory=list)
 
 class Heading(BaseModel):
-    """A document heading."""
+    """A document heading.
+
+    The parser gives ``number``, ``number_parts`` and ``title`` where it knows them.
+    When ``title`` is not given they are filled in from ``text`` (and ``anchor`` from
+    the title unless given), so downstream code never has to re-split the text.
+    """
     type: Literal["heading"] = "heading"
     level: int = Field(..., gt=0, le=6)
     text: str
+    number: str = ""  # numbering prefix, e.g. "1.2", "Б.1", "Приложение А"
+    number_parts: List[int] = Field(default_factory=list)  # e.g. [1, 2]; letters map to their alphabet position
+    title: str = ""  # text without the numbering prefix
+    anchor: str = ""  # link anchor slug of the title
+
+    @model_validator(mode="after")
+    def _fill_structured_fields(self) -> "Heading":
+        if "title" not in self.model_fields_set:
+            self.set_text(self.text, anchor=self.anchor or None)
+        return self
+
+    def set_text(self, text: str, anchor: str | None = None) -> None:
+        """Replace the heading text and recompute its structured fields."""
+        self.text = text
+        self.number, self.number_parts, self.title = split_heading_text(text)
+        self.anchor = anchor if anchor is not None else heading_anchor(self.title)
+
+    @property
+    def display_title(self) -> str:
+        """Heading as output shows it: without numeric or Roman numbering, letter numbering ("Б.1") kept."""
+        if self.number_parts and not self.number[:1].isdigit():
+            return self.text.strip()
+        return self.title
 
 class Image(BaseModel):
     """An image reference."""
@@ -96,3 +126,22 @@ TableCell.model_rebuild()
 class InternalDoc(BaseModel):
     """Represents the entire document as a tree of blocks."""
     blocks: List[Block] = Field(default_factory=list)
+    _outline: Any = PrivateAttr(default=None)
+
+    @property
+    def outline(self):
+        """
+        OutlineIndex of the blocks (see core.model.outline).
+
+        Built on first access and rebuilt when ``blocks`` has been replaced or resized.
+        """
+        if self._outline is None or not self._outline.is_valid_for(self.blocks):
+            return self.build_outline()
+        return self._outline
+
+    def build_outline(self):
+        """Build the OutlineIndex of the current blocks and cache it on the document."""
+        from core.model.outline import OutlineIndex
+
+        self._outline = OutlineIndex(self.blocks)
+        return self._outline
@@ -0,0 +1,219 @@
+"""
+Outline index of a document.
+
+The index is built in one pass over the top-level blocks and records the heading
+tree with block index ranges, the images of every section (including images
+nested in lists and tables) and table positions. Splitting, asset export and the
+hierarchical writer read section structure from it instead of re-walking the
+document, and chapters are exposed as block-range views instead of copied lists.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from collections import abc
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+BlockRange = Tuple[int, int]
+
+
+@dataclass
+class OutlineHeading:
+    """A top-level heading and the block range of its section."""
+    index: int  # block index of the heading
+    level: int
+    end: int  # exclusive end of the subtree (next heading of the same or a higher level)
+    content_end: int  # exclusive end of the own content (next heading of any level)
+    parent: Optional[int] = None  # position of the parent in OutlineIndex.headings
+    # Positions in OutlineIndex.headings of the current heading by level (index 0 is level 1),
+    # None where the document skips a level
+    path: Tuple[Optional[int], ...] = ()
+    children: List[int] = field(default_factory=list)
+
+
+@dataclass
+class OutlineImage:
+    """An image reference and the top-level block that contains it."""
+    block_index: int
+    resource_id: str
+    nested: bool  # True when the image sits inside a list or table
+
+
+class OutlineIndex:
+    """Heading tree, section ranges, image and table positions of a block list."""
+
+    def __init__(self, blocks: Sequence):
+        self._blocks = blocks
+        self.block_count = len(blocks)
+        self.headings: List[OutlineHeading] = []
+        self.heading_positions: List[int] = []
+        self.images: List[OutlineImage] = []
+        self.image_positions: List[int] = []
+        self.table_positions: List[int] = []
+        self.min_level: Optional[int] = None
+        self._build(blocks)
+
+    @classmethod
+    def of(cls, doc) -> "OutlineIndex":
+        """Return the outline of a document, using the one cached on it when still valid."""
+        outline = getattr(doc, "outline", None)
+        if isinstance(outline, cls):
+            return outline
+        return cls(doc.blocks)
+
+    def is_valid_for(self, blocks: Sequence) -> bool:
+        """Check that the index was built for this very block list and it has not grown or shrunk."""
+        return self._blocks is blocks and self.block_count == len(blocks)
+
+    # --- Building ---
+
+    def _build(self, blocks: Sequence) -> None:
+        open_headings: List[int] = []  # heading positions whose subtree is still open
+        stack: List[Optional[int]] = []
+        for i, block in enumerate(blocks):
+            block_type = getattr(block, "type", None)
+            if block_type == "heading":
+                level = block.level
+                position = len(self.headings)
+                if self.headings:
+                    self.headings[-1].content_end = i
+                while open_headings and self.headings[open_headings[-1]].level >= level:
+                    self.headings[open_headings.pop()].end = i
+                parent = open_headings[-1] if open_headings else None
+
+                depth = max(level, 1)
+                stack = stack[: depth - 1]
+                while len(stack) < depth - 1:
+                    stack.append(None)
+                stack.append(position)
+
+                self.headings.append(OutlineHeading(i, level, len(blocks), len(blocks), parent, tuple(stack)))
+                self.heading_positions.append(i)
+                if parent is not None:
+                    self.headings[parent].children.append(position)
+                open_headings.append(position)
+                if self.min_level is None or level < self.min_level:
+                    self.min_level = level
+                continue
+            if block_type == "table":
+                self.table_positions.append(i)
+            self._collect_images(block, i, False)
+
+    def _collect_images(self, block, block_index: int, nested: bool) -> None:
+        block_type = getattr(block, "type", None)
+        if block_type == "image":
+            if block.resource_id:
+                self.images.append(OutlineImage(block_index, block.resource_id, nested))
+                self.image_positions.append(block_index)
+        elif block_type == "list":
+            for item in block.items:
+                for child in item.blocks:
+                    self._collect_images(child, block_index, True)
+        elif block_type == "table":
+            for row in [block.header, *block.rows]:
+                for cell in row.cells:
+                    for child in cell.blocks:
+                        self._collect_images(child, block_index, True)
+
+    # --- Queries ---
+
+    def heading_block(self, position: int):
+        """Return the heading block at a position of ``headings``."""
+        return self._blocks[self.headings[position].index]
+
+    def headings_at_level(self, level: int) -> List[OutlineHeading]:
+        return [heading for heading in self.headings if heading.level == level]
+
+    def headings_in(self, ranges: Sequence[BlockRange]) -> Iterator[OutlineHeading]:
+        """Yield the headings located inside the given block ranges."""
+        for start, end in ranges:
+            first = bisect_left(self.heading_positions, start)
+            last = bisect_left(self.heading_positions, end)
+            yield from self.headings[first:last]
+
+    def enclosing_heading(self, block_index: int) -> Optional[int]:
+        """Return the position of the last heading at or before a block, if any."""
+        position = bisect_right(self.heading_positions, block_index) - 1
+        return position if position >= 0 else None
+
+    def images_in(self, start: int, end: int, nested: bool = True) -> List[str]:
+        """Return resource ids of images inside blocks ``start`` to ``end`` in document order."""
+        first = bisect_left(self.image_positions, start)
+        last = bisect_left(self.image_positions, end)
+        return [image.resource_id for image in self.images[first:last] if nested or not image.nested]
+
+    def section_images(self, position: int, nested: bool = True) -> List[str]:
+        """Return the images in the own content of a section (up to the next heading)."""
+        heading = self.headings[position]
+        return self.images_in(heading.index, heading.content_end, nested)
+
+    def tables_in(self, start: int, end: int) -> List[int]:
+        """Return block indices of tables inside blocks ``start`` to ``end``."""
+        return self.table_positions[bisect_left(self.table_positions, start):bisect_left(self.table_positions, end)]
+
+
+class BlockRangeSequence(abc.Sequence):
+    """A read-only sequence over index ranges of a block list, without copying it."""
+
+    def __init__(self, blocks: Sequence, ranges: Sequence[BlockRange]):
+        self._blocks = blocks
+        self.ranges = [(start, end) for start, end in ranges if end > start]
+        self._length = sum(end - start for start, end in self.ranges)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self):
+        blocks = self._blocks
+        for start, end in self.ranges:
+            for index in range(start, end):
+                yield blocks[index]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("block index out of range")
+        for start, end in self.ranges:
+            if index < end - start:
+                return self._blocks[start + index]
+            index -= end - start
+        raise IndexError("block index out of range")
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (BlockRangeSequence, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"BlockRangeSequence(ranges={self.ranges!r})"
+
+
+class DocumentView:
+    """A chapter or section of a document defined by block index ranges."""
+
+    def __init__(self, blocks: Sequence, ranges: Sequence[BlockRange], outline: Optional[OutlineIndex] = None):
+        self.blocks = BlockRangeSequence(blocks, ranges)
+        self.ranges = self.blocks.ranges
+        self._outline = outline
+
+    @property
+    def outline(self) -> OutlineIndex:
+        if self._outline is None:
+            self._outline = OutlineIndex(self.blocks._blocks)
+        return self._outline
+
+    def headings(self) -> Iterator:
+        """Yield the heading blocks of the view in document order."""
+        outline = self.outline
+        for heading in outline.headings_in(self.ranges):
+            yield outline._blocks[heading.index]
+
+    def image_ids(self, nested: bool = True) -> List[str]:
+        """Return the resource ids of images referenced in the view."""
+        ids: List[str] = []
+        for start, end in self.ranges:
+            ids.extend(self.outline.images_in(start, end, nested))
+        return ids
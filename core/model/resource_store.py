@@ -0,0 +1,266 @@
+"""
+Storage for binary resources extracted from a source document.
+
+Keeps resource bytes in memory up to a configurable budget. Resources that do
+not fit are either left in the source archive (when it is a file on disk) or
+spilled to a temporary directory, so peak memory no longer grows with the
+total size of embedded media.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import weakref
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Union
+
+from core.model.resource_ref import ResourceRef
+
+# Default amount of resource bytes kept in RAM per document
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+
+_COPY_CHUNK = 1024 * 1024
+
+
+@dataclass
+class StoredResource:
+    """Metadata of a resource held by a ResourceStore (without its content)."""
+    id: str
+    mime_type: str
+    sha256: str
+    size: int
+    location: str  # "memory", "spill" or "archive"
+
+
+class ResourceStore:
+    """
+    Holds extracted resources, spilling to disk once the memory budget is used up.
+
+    Iterating the store yields ResourceRef objects with their content loaded, which
+    keeps code written against ``List[ResourceRef]`` working. Budget-aware consumers
+    should use ``entries()``, ``open()``/``copy_to()`` and ``release()`` instead.
+    """
+
+    def __init__(self, memory_budget: Optional[int] = DEFAULT_MEMORY_BUDGET, spill_dir: Optional[str] = None,
+                 reference_buffers: bool = False):
+        """
+        Args:
+            memory_budget: Maximum number of resource bytes kept in RAM. None means unlimited.
+            spill_dir: Parent directory for spilled resources. Defaults to the system temp dir.
+            reference_buffers: Leave members of archives opened from an in-memory buffer in
+                the buffer instead of spilling them, so the store never writes to disk.
+        """
+        self.memory_budget = memory_budget
+        self.reference_buffers = reference_buffers
+        self.memory_used = 0
+        self._spill_parent = spill_dir
+        self._spill_dir: Optional[Path] = None
+        self._finalizer = None
+        self._entries: Dict[str, StoredResource] = {}
+        self._memory: Dict[str, bytes] = {}
+        self._spilled: Dict[str, Path] = {}
+        self._archived: Dict[str, tuple[Union[str, bytes], str]] = {}
+
+    # --- Adding resources ---
+
+    def add(self, resource_id: str, mime_type: str, content: bytes) -> StoredResource:
+        """Store resource bytes, spilling them to disk if they exceed the remaining budget."""
+        sha256 = hashlib.sha256(content).hexdigest()
+        if self._fits(len(content)):
+            return self._keep_in_memory(resource_id, mime_type, content, sha256)
+
+        path = self._spill_path(resource_id)
+        with open(path, "wb") as f:
+            f.write(content)
+        return self._register_spilled(resource_id, mime_type, sha256, len(content), path)
+
+    def add_from_archive(self, resource_id: str, mime_type: str, archive: zipfile.ZipFile, member: str) -> Optional[StoredResource]:
+        """
+        Store a member of a ZIP archive without reading it fully into memory when it is too large.
+
+        If the member does not fit into the budget and the archive is a file on disk (or an
+        in-memory buffer with ``reference_buffers``), only a reference to the archive member
+        is kept. Otherwise the member is spilled to disk.
+
+        Returns:
+            The stored resource metadata, or None for empty members.
+        """
+        size = archive.getinfo(member).file_size
+        if size == 0:
+            return None
+
+        if self._fits(size):
+            content = archive.read(member)
+            return self._keep_in_memory(resource_id, mime_type, content, hashlib.sha256(content).hexdigest())
+
+        archive_path = _archive_source(archive, self.reference_buffers)
+        digest = hashlib.sha256()
+        if archive_path is not None:
+            with archive.open(member) as src:
+                for chunk in iter(lambda: src.read(_COPY_CHUNK), b""):
+                    digest.update(chunk)
+            entry = StoredResource(resource_id, mime_type, digest.hexdigest(), size, "archive")
+            self._entries[resource_id] = entry
+            self._archived[resource_id] = (archive_path, member)
+            return entry
+
+        path = self._spill_path(resource_id)
+        with archive.open(member) as src, open(path, "wb") as dst:
+            for chunk in iter(lambda: src.read(_COPY_CHUNK), b""):
+                digest.update(chunk)
+                dst.write(chunk)
+        return self._register_spilled(resource_id, mime_type, digest.hexdigest(), size, path)
+
+    # --- Reading resources ---
+
+    def entries(self) -> List[StoredResource]:
+        """Return metadata of all live resources in insertion order."""
+        return list(self._entries.values())
+
+    def info(self, resource_id: str) -> StoredResource:
+        """Return metadata of a single resource."""
+        return self._entries[resource_id]
+
+    def open(self, resource_id: str) -> BinaryIO:
+        """Open a resource for streaming reads."""
+        if resource_id in self._memory:
+            return io.BytesIO(self._memory[resource_id])
+        if resource_id in self._spilled:
+            return open(self._spilled[resource_id], "rb")
+        if resource_id in self._archived:
+            archive_path, member = self._archived[resource_id]
+            archive = _open_archive(archive_path)
+            # The member stream keeps the underlying file open after the archive is closed
+            stream = archive.open(member)
+            archive.close()
+            return stream
+        raise KeyError(resource_id)
+
+    def read(self, resource_id: str) -> bytes:
+        """Return the full content of a resource."""
+        if resource_id in self._memory:
+            return self._memory[resource_id]
+        with self.open(resource_id) as src:
+            return src.read()
+
+    def loader(self, resource_id: str) -> Callable[[], bytes]:
+        """
+        Return a function reading the resource later, even after it has been released.
+
+        Archive members are read from the archive on each call; other resources are
+        captured now.
+        """
+        if resource_id in self._archived:
+            archive_path, member = self._archived[resource_id]
+            return lambda: _read_archive_member(archive_path, member)
+        content = self.read(resource_id)
+        return lambda: content
+
+    def copy_to(self, resource_id: str, dst: BinaryIO) -> int:
+        """Stream a resource into a writable binary file object. Returns the number of bytes copied."""
+        if resource_id in self._memory:
+            content = self._memory[resource_id]
+            dst.write(content)
+            return len(content)
+        with self.open(resource_id) as src:
+            shutil.copyfileobj(src, dst, _COPY_CHUNK)
+        return self._entries[resource_id].size
+
+    def get(self, resource_id: str) -> ResourceRef:
+        """Return a resource as a ResourceRef with its content loaded."""
+        entry = self._entries[resource_id]
+        return ResourceRef(id=entry.id, mime_type=entry.mime_type, content=self.read(resource_id), sha256=entry.sha256)
+
+    # --- Releasing resources ---
+
+    def release(self, resource_id: str) -> None:
+        """Free the memory or disk space used by a resource once it is no longer needed."""
+        self._entries.pop(resource_id, None)
+        content = self._memory.pop(resource_id, None)
+        if content is not None:
+            self.memory_used -= len(content)
+        path = self._spilled.pop(resource_id, None)
+        if path is not None:
+            path.unlink(missing_ok=True)
+        self._archived.pop(resource_id, None)
+
+    def close(self) -> None:
+        """Release all resources and remove the spill directory."""
+        self._entries.clear()
+        self._memory.clear()
+        self._spilled.clear()
+        self._archived.clear()
+        self.memory_used = 0
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+            self._spill_dir = None
+
+    def __enter__(self) -> "ResourceStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # --- Sequence-like access ---
+
+    def __iter__(self) -> Iterator[ResourceRef]:
+        for resource_id in list(self._entries):
+            yield self.get(resource_id)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, resource_id: object) -> bool:
+        return resource_id in self._entries
+
+    # --- Internals ---
+
+    def _fits(self, size: int) -> bool:
+        return self.memory_budget is None or self.memory_used + size <= self.memory_budget
+
+    def _keep_in_memory(self, resource_id: str, mime_type: str, content: bytes, sha256: str) -> StoredResource:
+        self.release(resource_id)
+        entry = StoredResource(resource_id, mime_type, sha256, len(content), "memory")
+        self._entries[resource_id] = entry
+        self._memory[resource_id] = content
+        self.memory_used += len(content)
+        return entry
+
+    def _register_spilled(self, resource_id: str, mime_type: str, sha256: str, size: int, path: Path) -> StoredResource:
+        entry = StoredResource(resource_id, mime_type, sha256, size, "spill")
+        self._entries[resource_id] = entry
+        self._spilled[resource_id] = path
+        return entry
+
+    def _spill_path(self, resource_id: str) -> Path:
+        if self._spill_dir is None:
+            self._spill_dir = Path(tempfile.mkdtemp(prefix="doc2chapmd-resources-", dir=self._spill_parent))
+            self._finalizer = weakref.finalize(self, shutil.rmtree, str(self._spill_dir), True)
+        self.release(resource_id)
+        digest = hashlib.sha1(resource_id.encode("utf-8")).hexdigest()
+        return self._spill_dir / digest
+
+
+def _archive_source(archive: zipfile.ZipFile, buffers: bool) -> Optional[Union[str, bytes]]:
+    """Path of an archive file on disk, or (with ``buffers``) the bytes of an archive opened from a BytesIO."""
+    if isinstance(archive.filename, str) and os.path.isfile(archive.filename):
+        return archive.filename
+    if buffers and isinstance(archive.fp, io.BytesIO):
+        # getvalue() of an unmodified BytesIO returns its initial bytes without copying
+        return archive.fp.getvalue()
+    return None
+
+
+def _open_archive(source: Union[str, bytes]) -> zipfile.ZipFile:
+    return zipfile.ZipFile(source if isinstance(source, str) else io.BytesIO(source))
+
+
+def _read_archive_member(source: Union[str, bytes], member: str) -> bytes:
+    with _open_archive(source) as archive:
+        return archive.read(member)
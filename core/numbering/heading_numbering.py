@@ -2,7 +2,9 @@
 import zipfile, re
 from xml.etree import ElementTree as ET
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+
+from core.utils.text_processing import heading_anchor
 
 NS = {"w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main"}
 SERVICE_HEADINGS = {
@@ -54,10 +56,7 @@ def _fmt(fmt: str, n: int) -> str:
     return str(n)
 
 def _slug(s:str)->str:
-    s = s.strip().lower()
-    s = re.sub(r'[^a-z0-9\u0400-\u04FF\s-]+', '', s)
-    s = re.sub(r'\s+', '-', s)
-    return re.sub(r'-+', '-', s).strip('-')
+    return heading_anchor(s)
 
 
 def _normalize_number_text(number_text: str, level: int, last_numbers: List[int]) -> str:
@@ -136,7 +135,7 @@ def _style_to_level(styles_xml: Optional[bytes]) -> Dict[str, int]:
             lvl = int(ol.get(f"{{{NS['w']}}}val")); res[sid] = min(res.get(sid, lvl), lvl) if sid in res else lvl
     return res
 
-def extract_headings_with_numbers(docx_path: str) -> List[NumberedHeading]:
+def extract_headings_with_numbers(docx_path: Union[str, BinaryIO]) -> List[NumberedHeading]:
     with zipfile.ZipFile(docx_path, "r") as z:
         doc = z.read("word/document.xml")
         try:
@@ -148,8 +147,11 @@ def extract_headings_with_numbers(docx_path: str) -> List[NumberedHeading]:
         except KeyError:
             styles = b"<styles/>"  # Empty styles if file doesn't exist
     
-    nums = _parse_numbering(numbering)
-    style2lvl = _style_to_level(styles)
+    # Parsed once per template across documents
+    from core.utils.template_cache import numbering_tables, style_tables
+
+    nums = numbering_tables(numbering).definitions
+    style2lvl = style_tables(styles).levels
     root = ET.fromstring(doc); body = root.find("w:body", NS)
     counters_by_numId: Dict[int, List[int]] = {}
     last_numbers: List[int] = [0] * 10
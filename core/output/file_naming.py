@@ -1,6 +1,6 @@
 import re
 from slugify import slugify
-from ..utils.text_processing import extract_heading_number_and_title, extract_letter_index
+from ..utils.text_processing import split_heading_text
 
 def chapter_index_from_h1(heading_line: str) -> int:
     """Extract chapter index from H1 heading line.
@@ -15,40 +15,19 @@ def chapter_index_from_h1(heading_line: str) -> int:
     """
     # Remove markdown hashes if present
     text = re.sub(r'^#+\s*', '', heading_line.strip())
-    
-    # Try to extract structured number and title first
-    number, title = extract_heading_number_and_title(text)
-    
-    if number:
-        # Check for alphabetic patterns first
-        letter_index = extract_letter_index(number)
-        if letter_index > 0:
-            return letter_index
-            
-        # Fall back to numeric extraction
-        first = re.split(r'[.\-]', number)[0]
-        try:
-            return int(first)
-        except ValueError:
-            return 1
-    
-    # Legacy fallback for old format
-    m = re.match(r'^([^\s]+)\s+.*$', text.strip())
-    if not m:
-        return 1
-    num = m.group(1)  # e.g., "3" or "3.1"
-    first = re.split(r'[.\-]', num)[0]
-    try:
-        return int(first)
-    except ValueError:
-        return 1
+
+    # Same split as the number_parts of a Heading
+    _, number_parts, _ = split_heading_text(text)
+    return number_parts[0] if number_parts else 1
 
 def generate_chapter_filename(index: int, title: str, pattern: str = "{index:02d}-{slug}.md") -> str:
     """
-    Generates a deterministic filename for a chapter.
+    Generates a deterministic filename for a chapter from its heading text.
     Extracts the chapter number from the heading text if available.
     Index 0 is for title page/TOC, chapters start from index 1.
 
+    Callers holding a Heading should use ``chapter_filename`` with its fields instead.
+
     Args:
         index: The 0-based index (0 for title page, 1+ for chapters).
         title: The title of the chapter (may include numbering like "1.2 Title").
@@ -69,17 +48,24 @@ def generate_chapter_filename(index: int, title: str, pattern: str = "{index:02d
         # Use extracted index if it's different from the default (1), otherwise use provided index
         chapter_index = extracted_index if extracted_index > 1 else index
     
-    # Clean title for slug (remove the number part if present)
-    # Handle both numeric and alphabetic numbering patterns
-    number, extracted_title = extract_heading_number_and_title(first_line_title)
-    clean_title = extracted_title if extracted_title else first_line_title
-    
-    # Legacy fallback for old numeric patterns
-    if not extracted_title:
-        clean_title = re.sub(r'^[\dIVXLCDM]+(?:[.\-]\d+)*\s+', '', first_line_title, flags=re.IGNORECASE)
-    
-    # Slugify the clean title
-    slug = slugify(clean_title, max_length=60, word_boundary=True)
-    
-    return pattern.format(index=chapter_index, slug=slug)
+    # Slug from the title without its number, as a Heading's title field has it
+    _, _, clean_title = split_heading_text(first_line_title)
+    return chapter_filename(chapter_index, clean_title, pattern)
+
+
+def chapter_filename(index: int, title: str, pattern: str = "{index:02d}-{slug}.md") -> str:
+    """
+    Filename for a chapter whose index and title (without numbering) are known,
+    e.g. from the fields of its Heading.
+
+    Args:
+        index: The chapter index (0 for title page, 1+ for chapters).
+        title: The chapter title without its number.
+        pattern: The pattern for the filename.
+
+    Returns:
+        A safe, deterministic filename string.
+    """
+    slug = slugify(title.split('\n')[0], max_length=60, word_boundary=True)
+    return pattern.format(index=index, slug=slug)
 
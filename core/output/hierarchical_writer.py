@@ -1,53 +1,43 @@
 from __future__ import annotations
 
+import io
 import os
 import re
 from dataclasses import dataclass
+from fnmatch import fnmatchcase
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple
 
 from ..adapters.document_parser import parse_document
-from ..render.markdown_renderer import render_markdown
-from ..render.assets_exporter import AssetsExporter, _transliterate
-from ..utils.text_processing import extract_heading_number_and_title, extract_letter_index
+from ..model.outline import BlockRangeSequence, OutlineIndex
+from ..model.resource_store import ResourceStore
+from ..utils.docx_utils import DocxSource
+from ..utils.stages import StageObserver, is_degraded, progress_step, stage
+from ..utils.text_processing import split_heading_text
+from ..utils.time_budget import DEGRADED_FILE, PARSE_SKIPS, degraded_marker
+from ..render.assets_exporter import MIME_TYPE_EXTENSIONS, AssetsExporter, _resource_entries, _transliterate
+from .sinks import MemorySink, OutputTree, open_sink
 from .writer import Writer
 
-_HEADING_RE = re.compile(r"^(\d+(?:\.\d+)*)\s+(.+)$")
-_HEADING_RE_DOT = re.compile(r"^(\d+(?:\.\d+)*)\.\s+(.+)$")
-_HEADING_RE_DASH = re.compile(r"^(\d+(?:\.\d+)*)\s*[-–—]\s*(.+)$")
+_SECTION_NUMBER_RE = re.compile(r"^\d+(?:\.\d+)*$")
+
+# Optional heuristics a degraded export skips (see core.utils.time_budget); no content reordering runs here
+DEGRADED_SKIPS = PARSE_SKIPS + ("image_action_lists",)
 
 
 def _split_number_and_title(text: str) -> Tuple[List[int], str]:
     """Splits heading text into numbering and title."""
-    s = text.strip()
-    
-    # Try new structured extraction first
-    number_str, title = extract_heading_number_and_title(s)
-    if number_str:
-        # Handle alphabetic numbering
-        letter_index = extract_letter_index(number_str)
-        if letter_index > 0:
-            # For letter-based numbering like "Б.1", "Приложение А"
-            # Extract sub-numbers if any (e.g., "Б.1.2" -> [2, 1, 2])
-            sub_parts = re.findall(r'\d+', number_str)
-            if sub_parts:
-                nums = [letter_index] + [int(x) for x in sub_parts]
-            else:
-                nums = [letter_index]
-            return nums, title
-            
-        # Handle numeric numbering
-        if re.match(r'^\d+', number_str):
-            nums = [int(x) for x in number_str.split(".")]
-            return nums, title
-    
-    # Legacy fallback for old format
-    for rx in (_HEADING_RE_DOT, _HEADING_RE_DASH, _HEADING_RE):
-        m = rx.match(s)
-        if m:
-            nums = [int(x) for x in m.group(1).split(".")]
-            return nums, m.group(2).strip()
-    return [], s
+    _, number_parts, title = split_heading_text(text)
+    if number_parts:
+        return number_parts, title
+    return [], text.strip()
+
+
+def _heading_number_and_title(heading) -> Tuple[List[int], str]:
+    """Return numbering and title of a heading block from its structured fields."""
+    if heading.number_parts:
+        return list(heading.number_parts), heading.title
+    return [], heading.text.strip()
 
 
 def _clean_filename(title: str) -> str:
@@ -71,200 +61,290 @@ class _Section:
     level: int
     number: List[int]
     title: str
-    blocks: list
+    blocks: Sequence
+    start: int = 0  # block index range of the section in the document
+    end: int = 0
 
 
-def _find_min_heading_level(blocks: list) -> int:
-    """Find the minimum heading level in the document."""
-    min_level = float('inf')
-    for blk in blocks:
-        if getattr(blk, "type", None) == "heading":
-            min_level = min(min_level, blk.level)
-    return int(min_level) if min_level != float('inf') else 1
+def _collect_sections(blocks: Sequence, outline: Optional[OutlineIndex] = None) -> List[_Section]:
+    """Breaks blocks into hierarchical sections.
 
+    Sections are contiguous block ranges starting at a top-level heading or a numbered
+    second-level heading; deeper headings stay inside the enclosing section. Blocks
+    before the first section are dropped.
+    """
+    if outline is None or not outline.is_valid_for(blocks):
+        outline = OutlineIndex(blocks)
+    min_level = outline.min_level or 1
+    starts: List[Tuple[int, int, List[int], str]] = []  # (block index, level, number, title)
+    h1_counter = 0
+
+    for heading in outline.headings:
+        block = blocks[heading.index]
+        text = block.text or ""
+        nums, ttl = _heading_number_and_title(block)
+        normalized_lvl = heading.level - min_level + 1
+
+        if normalized_lvl == 1:
+            if nums:
+                number = [nums[0]]
+                title = ttl
+            else:
+                h1_counter += 1
+                number = [h1_counter]
+                title = text
+            starts.append((heading.index, normalized_lvl, number, title))
+        elif normalized_lvl == 2 and nums:
+            number = [nums[0], nums[1]] if len(nums) >= 2 else nums + [0]
+            starts.append((heading.index, normalized_lvl, number, ttl))
 
-def _collect_sections(blocks: list) -> List[_Section]:
-    """Breaks blocks into hierarchical sections."""
     sections: List[_Section] = []
-    cur_h1: Optional[_Section] = None
-    cur_h2_intro: Optional[_Section] = None
-    h1_counter = 0
+    for position, (start, level, number, title) in enumerate(starts):
+        end = starts[position + 1][0] if position + 1 < len(starts) else len(blocks)
+        sections.append(_Section(level, number, title, BlockRangeSequence(blocks, [(start, end)]), start, end))
+    return sections
 
-    min_level = _find_min_heading_level(blocks)
-
-    def flush_h2() -> None:
-        nonlocal cur_h2_intro
-        if cur_h2_intro and cur_h2_intro.blocks:
-            sections.append(cur_h2_intro)
-        cur_h2_intro = None
-
-    for blk in blocks:
-        if getattr(blk, "type", None) == "heading":
-            text = blk.text or ""
-            lvl = blk.level
-            nums, ttl = _split_number_and_title(text)
-            normalized_lvl = lvl - min_level + 1
-
-            if normalized_lvl == 1:
-                flush_h2()
-                if nums:
-                    number = [nums[0]]
-                    title = ttl
-                else:
-                    h1_counter += 1
-                    number = [h1_counter]
-                    title = text
-                cur_h1 = _Section(normalized_lvl, number, title, [blk])
-                sections.append(cur_h1)
-                continue
-            if normalized_lvl == 2 and nums:
-                flush_h2()
-                if len(nums) >= 2:
-                    cur_h2_intro = _Section(normalized_lvl, [nums[0], nums[1]], ttl, [blk])
-                else:
-                    cur_h2_intro = _Section(normalized_lvl, nums + [0], ttl, [blk])
-                continue
-            if normalized_lvl >= 3 and nums:
-                target = cur_h2_intro or cur_h1
-                if target:
-                    target.blocks.append(blk)
+
+class SectionSelectionError(ValueError):
+    """A section selection that is empty or matches no section of the document."""
+
+
+class SectionSelection:
+    """
+    Sections picked by number (``3``, ``5.2``) or by a title glob (``Установка*``).
+
+    Picking a section also picks its subsections.
+    """
+
+    def __init__(self, specs: Sequence[str]):
+        self.specs = [spec.strip() for spec in specs if spec.strip()]
+        if not self.specs:
+            raise SectionSelectionError("no sections to select")
+        self._numbers = [[int(part) for part in spec.split(".")] for spec in self.specs if _SECTION_NUMBER_RE.match(spec)]
+        self._globs = [spec.casefold() for spec in self.specs if not _SECTION_NUMBER_RE.match(spec)]
+
+    def matches(self, section: _Section) -> bool:
+        return section.number in self._numbers or any(fnmatchcase(section.title.casefold(), glob) for glob in self._globs)
+
+    def pick(self, sections: Sequence[_Section]) -> List[bool]:
+        """Whether each section is selected itself or lies inside a selected section."""
+        picked: List[bool] = []
+        open_level: Optional[int] = None  # level of the picked section whose subsections follow
+        for section in sections:
+            if open_level is not None and section.level > open_level:
+                picked.append(True)
                 continue
-            target = cur_h2_intro or cur_h1
-            if target:
-                target.blocks.append(blk)
-            continue
-        target = cur_h2_intro or cur_h1
-        if target:
-            target.blocks.append(blk)
+            open_level = section.level if self.matches(section) else None
+            picked.append(open_level is not None)
+        return picked
 
-    flush_h2()
-    return sections
+    def heading_range(self, headings: Sequence) -> Tuple[int, int]:
+        """Positions ``[start, stop)`` of the headings spanning the selected sections (see parse_document)."""
+        sections = _collect_sections(headings)
+        picked = [section for section, selected in zip(sections, self.pick(sections)) if selected]
+        if not picked:
+            raise SectionSelectionError(f"no section matches {', '.join(self.specs)}")
+        return picked[0].start, picked[-1].end
 
 
-def _copy_section_images(blocks: list, asset_map: dict, temp_dir: Path, target_dir: Path, writer) -> dict:
-    """Copy images used in this section to the target images directory and return updated asset_map."""
-    import shutil
-    
+def _selected_sections(sections: List[_Section], only: Optional[SectionSelection]) -> List[bool]:
+    return only.pick(sections) if only is not None else [True] * len(sections)
+
+
+def _plan_section_images(resources) -> Dict[str, Tuple[str, object]]:
+    """File name and content source of every image; duplicates share the first copy's name."""
+    plan: Dict[str, Tuple[str, object]] = {}
+    by_hash: Dict[str, Tuple[str, object]] = {}
+    for resource in _resource_entries(resources):
+        if resource.sha256 not in by_hash:
+            by_hash[resource.sha256] = (f"{resource.id}{MIME_TYPE_EXTENSIONS.get(resource.mime_type, '')}", resource)
+        plan[resource.id] = by_hash[resource.sha256]
+    return plan
+
+
+def _copy_section_images(image_ids: List[str], plan: Dict[str, Tuple[str, object]], resources, target_dir: Path,
+                         writer, written: Dict[str, Path]) -> dict:
+    """Write images used in this section to the target images directory and return its asset_map.
+
+    An image already written for another section becomes a link to that copy.
+    ``written`` maps file names to their first written path.
+    """
     section_asset_map = {}
-    used_image_ids = set()
+    used_image_ids = set(image_ids)
     
-    # Find all image blocks in this section
-    for block in blocks:
-        if getattr(block, "type", None) == "image":
-            resource_id = getattr(block, "resource_id", None)
-            if resource_id:
-                used_image_ids.add(resource_id)
-    
-    # Copy relevant images to target directory
-    for resource_id, relative_path in asset_map.items():
-        if resource_id in used_image_ids:
-            # Source file in temp directory
-            source_file = temp_dir / Path(relative_path).name
-            if source_file.exists():
-                # Target file in section's images directory
-                filename = source_file.name
-                target_file = target_dir / filename
-                
-                # Copy file
-                shutil.copy2(source_file, target_file)
-                
-                # Update asset map to point to images/ subdirectory
-                section_asset_map[resource_id] = f"images/{filename}"
+    for resource_id, (filename, source) in plan.items():
+        if resource_id not in used_image_ids:
+            continue
+        target_file = target_dir / filename
+        first = written.get(filename)
+        if first is None:
+            writer.write_resource(target_file, resources, source)
+            written[filename] = target_file
+        elif first != target_file:
+            try:
+                writer.sink.link(target_file, first)
+            except io.UnsupportedOperation:
+                writer.write_resource(target_file, resources, source)
+        
+        # Update asset map to point to images/ subdirectory
+        section_asset_map[resource_id] = f"images/{filename}"
     
     return section_asset_map
 
 
-def export_docx_hierarchy(docx_path: str | os.PathLike, out_root: str | os.PathLike) -> List[Path]:
-    """Exports a DOCX into a folder hierarchy by headings."""
-    writer = Writer()
+def _parse_options(parse_workers: int, only: Optional[SectionSelection] = None,
+                   observer: Optional[StageObserver] = None) -> dict:
+    """Keyword arguments for parse_document; the serial whole-document default passes none."""
+    options = {"workers": parse_workers} if parse_workers > 1 else {}
+    if only is not None:
+        options["heading_range"] = only.heading_range
+    if observer is not None:
+        options["observer"] = observer
+    return options
+
+
+def export_docx_hierarchy(docx_path: str | os.PathLike, out_root: str | os.PathLike, ast_export: bool = False, parse_workers: int = 1,
+                          output_format: str = "directory", stream: Optional[BinaryIO] = None,
+                          only: Optional[Sequence[str]] = None, observer: Optional[StageObserver] = None) -> List[Path]:
+    """Exports a DOCX into a folder hierarchy by headings.
+
+    With ``ast_export`` every Markdown file gets a ``.ast.jsonl`` sibling with its AST.
+    ``parse_workers`` > 1 parses the document body in that many processes.
+    ``output_format`` ``zip`` or ``tar`` writes ``<out_root>/<document>.zip|.tar``
+    holding the document folder instead, or that archive is written to ``stream``
+    with entries named as below ``out_root`` (see ``open_sink``).
+    ``only`` converts just the sections with these numbers or title globs (see
+    ``SectionSelection``); the parser stops after the last of them and other files
+    already in the output are left as they are.
+    ``observer`` is notified of the conversion stages (see core.utils.stages); once a
+    ``TimeBudget`` among them runs out, the rest of the conversion skips its optional
+    heuristics and the document folder gets a ``degraded.json`` marker.
+    """
     out_root = Path(out_root)
-    out_root.mkdir(parents=True, exist_ok=True)
     
     # Extract document name from path and create document folder
     docx_path = Path(docx_path)
     doc_name = _clean_filename(docx_path.stem)
     doc_root = out_root / doc_name
-    doc_root.mkdir(parents=True, exist_ok=True)
-    
-    doc, resources = parse_document(str(docx_path))
     
-    # Export assets to a temporary location and get asset_map
-    temp_assets_dir = doc_root / "temp_assets"
-    asset_map = export_assets(resources, str(temp_assets_dir)) if resources else {}
+    selection = SectionSelection(only) if only is not None else None
+    doc, resources = parse_document(str(docx_path), **_parse_options(parse_workers, selection, observer))
+    with open_sink(output_format, out_root, doc_name, stream) as sink:
+        writer = Writer(ast_export=ast_export, sink=sink)
+        writer.ensure_dir(out_root)
+        writer.ensure_dir(doc_root)
+        try:
+            written = _write_distributed(doc, resources, doc_root, writer, selection, observer)
+        finally:
+            if isinstance(resources, ResourceStore):
+                resources.close()
+    if observer is not None:
+        observer.output_written(sink.bytes_written)
+    return written
+
+
+def _write_distributed(doc, resources, doc_root: Path, writer: Writer, only: Optional[SectionSelection] = None,
+                       observer: Optional[StageObserver] = None) -> List[Path]:
+    """Writes section Markdown with an images/ folder per top-level section.
+
+    With ``only`` just the selected sections and their images are written.
+    """
+    with stage(observer, "render"):
+        return _write_distributed_sections(doc, resources, doc_root, writer, only, observer)
+
+
+def _write_distributed_sections(doc, resources, doc_root: Path, writer: Writer, only: Optional[SectionSelection],
+                                observer: Optional[StageObserver] = None) -> List[Path]:
+    # Images are written per section straight from the resource store
+    plan = _plan_section_images(resources) if resources else {}
+    images_written: Dict[str, Path] = {}
     
-    sections = _collect_sections(doc.blocks)
+    outline = OutlineIndex.of(doc)
+    sections = _collect_sections(doc.blocks, outline)
     written: List[Path] = []
     h1_dir: Optional[Path] = None
     last_h1_num: Optional[int] = None
     current_images_dir: Optional[Path] = None
+    selection = _selected_sections(sections, only)
+    total = sum(selection)
+    step = progress_step(total)
     
-    for sec in sections:
+    for sec, selected in zip(sections, selection):
+        if observer is not None and selected and len(written) % step == 0:
+            observer.progress("render", len(written), total)
+        degraded = is_degraded(observer)
         code = _code_for_levels(sec.number)
         safe_title = _clean_filename(sec.title)
         if sec.level == 1:
             last_h1_num = sec.number[0]
             h1_dir = doc_root / f"{code}.{safe_title}"
-            writer.ensure_dir(h1_dir)
             current_images_dir = h1_dir / "images"
+            if not selected:
+                continue
+            writer.ensure_dir(h1_dir)
             writer.ensure_dir(current_images_dir)
             
             # Copy relevant images to this section's images directory
-            section_asset_map = _copy_section_images(sec.blocks, asset_map, temp_assets_dir, current_images_dir, writer)
+            section_asset_map = _copy_section_images(outline.images_in(sec.start, sec.end, nested=False), plan, resources, current_images_dir, writer, images_written)
             
-            md = render_markdown(type("Doc", (), {"blocks": sec.blocks}), section_asset_map)
             path = h1_dir / "0.index.md"
-            writer.write_text(path, md)
+            writer.write_markdown(path, sec, section_asset_map, image_action_lists=not degraded)
             written.append(path)
         elif sec.level == 2:
             # Handle orphaned level 2 sections (no matching H1 parent)
             if h1_dir is None or last_h1_num != sec.number[0]:
                 # Create a fallback directory structure for orphaned sections
                 fallback_dir = doc_root / f"{code}.{safe_title}"
-                writer.ensure_dir(fallback_dir)
                 current_images_dir = fallback_dir / "images"
+                if not selected:
+                    continue
+                writer.ensure_dir(fallback_dir)
                 writer.ensure_dir(current_images_dir)
                 
                 # Copy relevant images to this section's images directory
-                section_asset_map = _copy_section_images(sec.blocks, asset_map, temp_assets_dir, current_images_dir, writer)
+                section_asset_map = _copy_section_images(outline.images_in(sec.start, sec.end, nested=False), plan, resources, current_images_dir, writer, images_written)
                 
-                md = render_markdown(type("Doc", (), {"blocks": sec.blocks}), section_asset_map)
                 path = fallback_dir / "0.index.md"
-                writer.write_text(path, md)
+                writer.write_markdown(path, sec, section_asset_map, image_action_lists=not degraded)
                 written.append(path)
-            else:
+            elif selected:
                 # Normal case: level 2 section under existing H1
                 # Copy relevant images to the current H1's images directory
-                section_asset_map = _copy_section_images(sec.blocks, asset_map, temp_assets_dir, current_images_dir, writer)
+                writer.ensure_dir(current_images_dir)
+                section_asset_map = _copy_section_images(outline.images_in(sec.start, sec.end, nested=False), plan, resources, current_images_dir, writer, images_written)
                 
-                md = render_markdown(type("Doc", (), {"blocks": sec.blocks}), section_asset_map)
                 path = h1_dir / f"{code}.{safe_title}.md"
-                writer.write_text(path, md)
+                writer.write_markdown(path, sec, section_asset_map, image_action_lists=not degraded)
                 written.append(path)
-        else:
+        elif selected:
             # For level 3+ sections, use current images directory or create fallback
             target_images_dir = current_images_dir if current_images_dir else doc_root / "images"
             if not current_images_dir:
                 writer.ensure_dir(target_images_dir)
             
-            section_asset_map = _copy_section_images(sec.blocks, asset_map, temp_assets_dir, target_images_dir, writer)
+            section_asset_map = _copy_section_images(outline.images_in(sec.start, sec.end, nested=False), plan, resources, target_images_dir, writer, images_written)
             
-            md = render_markdown(type("Doc", (), {"blocks": sec.blocks}), section_asset_map)
             fallback_code = _code_for_levels(sec.number[:3])
             if h1_dir:
                 path = h1_dir / f"{fallback_code}.{safe_title}.md"
             else:
                 path = doc_root / f"{fallback_code}.{safe_title}.md"
-            writer.write_text(path, md)
+            writer.write_markdown(path, sec, section_asset_map, image_action_lists=not degraded)
             written.append(path)
     
-    # Clean up temporary assets directory
-    if temp_assets_dir.exists():
-        import shutil
-        shutil.rmtree(temp_assets_dir)
-    
+    if observer is not None:
+        observer.progress("render", len(written), total)
+        observer.images_exported(len(images_written))
+    _mark_degraded(doc_root, writer, observer)
     return written
 
 
+def _mark_degraded(doc_root: Path, writer: Writer, observer: Optional[StageObserver]) -> None:
+    """Write the degraded marker into the document folder when the time budget ran out."""
+    if is_degraded(observer):
+        writer.write_text(doc_root / DEGRADED_FILE, degraded_marker(DEGRADED_SKIPS, observer.time_budget()))
+
+
 def _sanitize_dir_name(name: str) -> str:
     """Sanitize a string to be safe for use as a directory name."""
     import re
@@ -284,7 +364,9 @@ def _sanitize_dir_name(name: str) -> str:
     return sanitized
 
 
-def export_docx_hierarchy_centralized(docx_path: str | os.PathLike, out_root: str | os.PathLike, custom_folder_name: Optional[str] = None) -> List[Path]:
+def export_docx_hierarchy_centralized(docx_path: str | os.PathLike, out_root: str | os.PathLike, custom_folder_name: Optional[str] = None, ast_export: bool = False, parse_workers: int = 1,
+                                      output_format: str = "directory", stream: Optional[BinaryIO] = None,
+                                      only: Optional[Sequence[str]] = None, observer: Optional[StageObserver] = None) -> List[Path]:
     """
     Exports a DOCX into a folder hierarchy by headings with centralized images structure.
 
@@ -300,47 +382,118 @@ def export_docx_hierarchy_centralized(docx_path: str | os.PathLike, out_root: st
     │   └── index.md (references ../document_name/section1_name/...)
     └── section2_dir/
         └── index.md (references ../document_name/section2_name/...)
+
+    With ``ast_export`` every Markdown file gets a ``.ast.jsonl`` sibling with its AST.
+    ``parse_workers`` > 1 parses the document body in that many processes.
+    ``output_format`` ``zip`` or ``tar`` writes ``<out_root>/<folder>.zip|.tar``
+    holding the document folder instead, or that archive is written to ``stream``
+    with entries named as below ``out_root`` (see ``open_sink``).
+    ``only`` converts just the sections with these numbers or title globs (see
+    ``SectionSelection``); the parser stops after the last of them and other files
+    already in the output are left as they are.
+    ``observer`` is notified of the conversion stages (see core.utils.stages); once a
+    ``TimeBudget`` among them runs out, the rest of the conversion skips its optional
+    heuristics and the document folder gets a ``degraded.json`` marker.
     """
-    from ..render.assets_exporter import AssetsExporter
-    
-    writer = Writer()
     out_root = Path(out_root)
-    out_root.mkdir(parents=True, exist_ok=True)
     
     # Extract document name from path and create document folder
     docx_path = Path(docx_path)
     doc_name = custom_folder_name or _clean_filename(docx_path.stem)
     doc_root = out_root / doc_name
-    doc_root.mkdir(parents=True, exist_ok=True)
     
-    doc, resources = parse_document(str(docx_path))
-    
-    # Use new hierarchical assets exporter
+    selection = SectionSelection(only) if only is not None else None
+    doc, resources = parse_document(str(docx_path), **_parse_options(parse_workers, selection, observer))
+    with open_sink(output_format, out_root, doc_name, stream) as sink:
+        writer = Writer(ast_export=ast_export, sink=sink)
+        writer.ensure_dir(out_root)
+        writer.ensure_dir(doc_root)
+        written = _write_centralized(doc, resources, doc_root, doc_name, writer, selection, observer)
+    if observer is not None:
+        observer.output_written(sink.bytes_written)
+    return written
+
+
+def export_docx_hierarchy_to_tree(docx: DocxSource, folder_name: str = "document", ast_export: bool = False,
+                                  parse_workers: int = 1, lazy_images: bool = False) -> OutputTree:
+    """
+    Converts a DOCX into the layout of ``export_docx_hierarchy_centralized`` without disk I/O.
+
+    ``docx`` may be a path, the DOCX bytes or a binary file object. Returns a mapping of
+    paths relative to the output root (``<folder_name>/...``) to file contents. With
+    ``lazy_images`` images stay compressed in the DOCX and are only extracted when
+    their entry is read.
+    """
+    tree = OutputTree()
+    writer = Writer(ast_export=ast_export, sink=MemorySink(tree, lazy_resources=lazy_images))
+    # Nothing spills to disk: images are kept in memory or left in the in-memory archive
+    resources = ResourceStore(memory_budget=0 if lazy_images else None, reference_buffers=True)
+    doc, resources = parse_document(docx, resource_store=resources, **_parse_options(parse_workers))
+    _write_centralized(doc, resources, Path(folder_name), folder_name, writer)
+    return tree
+
+
+def _write_centralized(doc, resources, doc_root: Path, doc_name: str, writer: Writer,
+                       only: Optional[SectionSelection] = None, observer: Optional[StageObserver] = None) -> List[Path]:
+    """Writes images and section Markdown of a parsed document in the centralized layout.
+
+    With ``only`` just the selected sections and their images are written.
+    """
+    outline = OutlineIndex.of(doc)
+    sections = _collect_sections(doc.blocks, outline)
+    selection = _selected_sections(sections, only)
+    ranges = [(sec.start, sec.end) for sec, selected in zip(sections, selection) if selected] if only is not None else None
+
+    # Use new hierarchical assets exporter; exported images are released from the store
     central_images_dir = doc_root / doc_name
-    exporter = AssetsExporter(central_images_dir)
-    final_asset_map = exporter.export_hierarchical_images(doc, resources)
+    exporter = AssetsExporter(central_images_dir, writer.sink)
+    try:
+        with stage(observer, "assets"):
+            final_asset_map = exporter.export_hierarchical_images(doc, resources, ranges, observer)
+    finally:
+        # Also when the export is cancelled: spilled images are not kept for the caller
+        if isinstance(resources, ResourceStore):
+            resources.close()
+    if observer is not None:
+        observer.images_exported(len(set(final_asset_map.values())))
     
-    sections = _collect_sections(doc.blocks)
+    with stage(observer, "render"):
+        written = _write_centralized_sections(sections, selection, doc_root, writer, final_asset_map, observer)
+    _mark_degraded(doc_root, writer, observer)
+    return written
+
+
+def _write_centralized_sections(sections: List[_Section], selection: List[bool], doc_root: Path, writer: Writer,
+                                final_asset_map: Dict[str, str], observer: Optional[StageObserver] = None) -> List[Path]:
+    """Writes the Markdown of the selected sections, reporting ``render`` progress to ``observer``."""
     written: List[Path] = []
+    total = sum(selection)
+    step = progress_step(total)
     
     # Generate markdown files using the hierarchical asset map
     h1_dir: Optional[Path] = None
     last_h1_num: Optional[int] = None
     
-    for sec in sections:
+    for sec, selected in zip(sections, selection):
+        if observer is not None and selected and len(written) % step == 0:
+            observer.progress("render", len(written), total)
+        degraded = is_degraded(observer)
         code = _code_for_levels(sec.number)
         safe_title = _clean_filename(sec.title)
         
         if sec.level == 1:
             last_h1_num = sec.number[0]
             h1_dir = doc_root / f"{code}.{safe_title}"
+            if not selected:
+                continue
             writer.ensure_dir(h1_dir)
             
-            md = render_markdown(type("Doc", (), {"blocks": sec.blocks}), final_asset_map)
             path = h1_dir / "0.index.md"
-            writer.write_text(path, md)
+            writer.write_markdown(path, sec, final_asset_map, image_action_lists=not degraded)
             written.append(path)
             
+        elif not selected:
+            continue
         elif sec.level == 2:
             # Handle orphaned level 2 sections (no matching H1 parent)
             if h1_dir is None or last_h1_num != sec.number[0]:
@@ -348,25 +501,25 @@ def export_docx_hierarchy_centralized(docx_path: str | os.PathLike, out_root: st
                 fallback_dir = doc_root / f"{code}.{safe_title}"
                 writer.ensure_dir(fallback_dir)
                 
-                md = render_markdown(type("Doc", (), {"blocks": sec.blocks}), final_asset_map)
                 path = fallback_dir / "0.index.md"
-                writer.write_text(path, md)
+                writer.write_markdown(path, sec, final_asset_map, image_action_lists=not degraded)
                 written.append(path)
             else:
                 # Normal case: level 2 section under existing H1
-                md = render_markdown(type("Doc", (), {"blocks": sec.blocks}), final_asset_map)
+                writer.ensure_dir(h1_dir)
                 path = h1_dir / f"{code}.{safe_title}.md"
-                writer.write_text(path, md)
+                writer.write_markdown(path, sec, final_asset_map, image_action_lists=not degraded)
                 written.append(path)
         else:
             # For level 3+ sections
-            md = render_markdown(type("Doc", (), {"blocks": sec.blocks}), final_asset_map)
             fallback_code = _code_for_levels(sec.number[:3])
             if h1_dir:
                 path = h1_dir / f"{fallback_code}.{safe_title}.md"
             else:
                 path = doc_root / f"{fallback_code}.{safe_title}.md"
-            writer.write_text(path, md)
+            writer.write_markdown(path, sec, final_asset_map, image_action_lists=not degraded)
             written.append(path)
     
+    if observer is not None:
+        observer.progress("render", len(written), total)
     return written
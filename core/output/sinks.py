@@ -0,0 +1,328 @@
+"""
+Output sinks: where the files of a conversion go.
+
+Exporters compute the same paths whatever the output format and hand every
+file to an ``OutputSink``. ``FileSystemSink`` writes them as they are; the
+archive and memory sinks store them relative to their ``root``, so a zip or tar
+holds exactly the tree that would have been written below that directory.
+Every sink counts the bytes of the files it was given in ``bytes_written``
+(before compression, a repeated or linked file counting again).
+"""
+from __future__ import annotations
+
+import io
+import os
+import shutil
+import tarfile
+import zipfile
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path, PurePath
+from typing import BinaryIO, Callable, Dict, Iterator, Mapping, Optional, TextIO, Union
+
+from core.model.resource_store import ResourceStore
+
+OUTPUT_FORMATS = ("directory", "zip", "tar")
+
+# Fixed archive timestamp so that converting the same document twice gives identical archives
+_ARCHIVE_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+_Content = Union[bytes, Callable[[], bytes]]
+
+
+class OutputSink(ABC):
+    """Destination of the files of a conversion; sinks implement ``write_bytes`` and ``link``."""
+
+    def __init__(self, root: Union[str, os.PathLike] = "."):
+        self.root = PurePath(root)
+        self.bytes_written = 0
+
+    def name(self, path: Union[str, os.PathLike]) -> str:
+        """Entry name of ``path`` relative to the sink root."""
+        return PurePath(path).relative_to(self.root).as_posix()
+
+    def ensure_dir(self, path: Union[str, os.PathLike]) -> None:
+        """Make sure a directory exists (archives and memory need none)."""
+
+    @abstractmethod
+    def write_bytes(self, path: Union[str, os.PathLike], data: bytes) -> None:
+        """Write ``data`` as the file ``path``."""
+
+    def write_text(self, path: Union[str, os.PathLike], text: str) -> None:
+        self.write_bytes(path, text.encode("utf-8"))
+
+    def write_stream(self, path: Union[str, os.PathLike], src: BinaryIO, size: Optional[int] = None) -> None:
+        """Write the content of a readable binary stream (``size`` bytes when known)."""
+        self.write_bytes(path, src.read())
+
+    @abstractmethod
+    def link(self, path: Union[str, os.PathLike], target: Union[str, os.PathLike]) -> None:
+        """Make ``path`` another file with the content of the already written ``target``."""
+
+    @contextmanager
+    def open_text(self, path: Union[str, os.PathLike]) -> Iterator[TextIO]:
+        """Text file object whose content becomes the file once the block exits."""
+        buffer = io.StringIO()
+        yield buffer
+        self.write_text(path, buffer.getvalue())
+
+    @contextmanager
+    def open_binary(self, path: Union[str, os.PathLike]) -> Iterator[BinaryIO]:
+        """Binary file object whose content becomes the file once the block exits."""
+        buffer = io.BytesIO()
+        yield buffer
+        self.write_bytes(path, buffer.getvalue())
+
+    def write_resource(self, path: Union[str, os.PathLike], resources, resource) -> None:
+        """Write an extracted resource, streaming it from a ResourceStore when possible."""
+        if isinstance(resources, ResourceStore):
+            with resources.open(resource.id) as src:
+                self.write_stream(path, src, resources.info(resource.id).size)
+        else:
+            self.write_bytes(path, resource.content)
+
+    def close(self) -> None:
+        """Finish the output (writes archive trailers)."""
+
+    def __enter__(self) -> "OutputSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class FileSystemSink(OutputSink):
+    """Writes files to their paths on disk."""
+
+    def name(self, path: Union[str, os.PathLike]) -> str:
+        return os.fspath(path)
+
+    def ensure_dir(self, path: Union[str, os.PathLike]) -> None:
+        os.makedirs(path, exist_ok=True)
+
+    def write_bytes(self, path: Union[str, os.PathLike], data: bytes) -> None:
+        with open(path, "wb") as f:
+            f.write(data)
+        self.bytes_written += len(data)
+
+    def write_text(self, path: Union[str, os.PathLike], text: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+            self.bytes_written += f.tell()
+
+    def write_stream(self, path: Union[str, os.PathLike], src: BinaryIO, size: Optional[int] = None) -> None:
+        with open(path, "wb") as f:
+            shutil.copyfileobj(src, f, 1024 * 1024)
+            self.bytes_written += f.tell()
+
+    def link(self, path: Union[str, os.PathLike], target: Union[str, os.PathLike]) -> None:
+        if os.path.lexists(path) and not os.path.samefile(path, target):
+            os.unlink(path)
+        if not os.path.lexists(path):
+            try:
+                os.link(target, path)
+            except OSError:
+                shutil.copyfile(target, path)
+        self.bytes_written += os.path.getsize(path)
+
+    @contextmanager
+    def open_text(self, path: Union[str, os.PathLike]) -> Iterator[TextIO]:
+        with open(path, "w", encoding="utf-8") as f:
+            yield f
+            self.bytes_written += f.tell()
+
+    @contextmanager
+    def open_binary(self, path: Union[str, os.PathLike]) -> Iterator[BinaryIO]:
+        with open(path, "wb") as f:
+            yield f
+            self.bytes_written += f.tell()
+
+
+class ZipSink(OutputSink):
+    """Writes files into a zip archive (a path or a writable binary stream)."""
+
+    def __init__(self, file: Union[str, os.PathLike, BinaryIO], root: Union[str, os.PathLike] = "."):
+        super().__init__(root)
+        if isinstance(file, (str, os.PathLike)):
+            Path(file).parent.mkdir(parents=True, exist_ok=True)
+        self._zip = zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED)
+
+    def _info(self, path: Union[str, os.PathLike]) -> zipfile.ZipInfo:
+        info = zipfile.ZipInfo(self.name(path), _ARCHIVE_DATE_TIME)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        return info
+
+    def write_bytes(self, path: Union[str, os.PathLike], data: bytes) -> None:
+        self._zip.writestr(self._info(path), data)
+        self.bytes_written += len(data)
+
+    def write_stream(self, path: Union[str, os.PathLike], src: BinaryIO, size: Optional[int] = None) -> None:
+        with self._zip.open(self._info(path), "w", force_zip64=size is None or size > 0x7FFFFFFF) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        self.bytes_written += self._zip.filelist[-1].file_size
+
+    @contextmanager
+    def open_binary(self, path: Union[str, os.PathLike]) -> Iterator[BinaryIO]:
+        with self._zip.open(self._info(path), "w", force_zip64=True) as dst:
+            yield dst
+        self.bytes_written += self._zip.filelist[-1].file_size
+
+    def link(self, path: Union[str, os.PathLike], target: Union[str, os.PathLike]) -> None:
+        # Zip has no links; repeat the entry, reading it back from a seekable archive
+        try:
+            data = self._zip.read(self.name(target))
+        except (OSError, ValueError) as exc:
+            raise io.UnsupportedOperation(f"cannot repeat {self.name(target)!r} in a zip stream") from exc
+        self.write_bytes(path, data)
+
+    def close(self) -> None:
+        self._zip.close()
+
+
+class TarSink(OutputSink):
+    """Writes files into an uncompressed tar archive; streams work without seeking."""
+
+    def __init__(self, file: Union[str, os.PathLike, BinaryIO], root: Union[str, os.PathLike] = "."):
+        super().__init__(root)
+        if isinstance(file, (str, os.PathLike)):
+            Path(file).parent.mkdir(parents=True, exist_ok=True)
+            self._tar = tarfile.open(file, "w", format=tarfile.PAX_FORMAT)
+        else:
+            self._tar = tarfile.open(fileobj=file, mode="w|", format=tarfile.PAX_FORMAT)
+        self._dirs: set = set()
+
+    def _info(self, name: str, kind: bytes = tarfile.REGTYPE, size: int = 0) -> tarfile.TarInfo:
+        info = tarfile.TarInfo(name)
+        info.type = kind
+        info.size = size
+        info.mode = 0o755 if kind == tarfile.DIRTYPE else 0o644
+        return info
+
+    def ensure_dir(self, path: Union[str, os.PathLike]) -> None:
+        try:
+            name = self.name(path)
+        except ValueError:
+            return  # directories above the archive root
+        parts = [] if name == "." else name.split("/")
+        for depth in range(1, len(parts) + 1):
+            directory = "/".join(parts[:depth])
+            if directory not in self._dirs:
+                self._dirs.add(directory)
+                self._tar.addfile(self._info(directory, tarfile.DIRTYPE))
+
+    def write_bytes(self, path: Union[str, os.PathLike], data: bytes) -> None:
+        self._tar.addfile(self._info(self.name(path), size=len(data)), io.BytesIO(data))
+        self.bytes_written += len(data)
+
+    def write_stream(self, path: Union[str, os.PathLike], src: BinaryIO, size: Optional[int] = None) -> None:
+        if size is None:
+            self.write_bytes(path, src.read())
+            return
+        self._tar.addfile(self._info(self.name(path), size=size), src)
+        self.bytes_written += size
+
+    def link(self, path: Union[str, os.PathLike], target: Union[str, os.PathLike]) -> None:
+        info = self._info(self.name(path), tarfile.LNKTYPE)
+        info.linkname = self.name(target)
+        self._tar.addfile(info)
+        self.bytes_written += self._tar.getmember(info.linkname).size
+
+    def close(self) -> None:
+        self._tar.close()
+
+
+class OutputTree(Mapping[str, bytes]):
+    """Relative output path -> file content, in the order the files were written."""
+
+    def __init__(self) -> None:
+        self._files: Dict[str, _Content] = {}
+
+    def add(self, path: str, content: bytes) -> None:
+        self._files[path] = content
+
+    def add_lazy(self, path: str, loader: Callable[[], bytes]) -> None:
+        """Add a file whose content is produced by ``loader`` on every access."""
+        self._files[path] = loader
+
+    def link(self, path: str, target: str) -> None:
+        self._files[path] = self._files[target]
+
+    def is_lazy(self, path: str) -> bool:
+        return callable(self._files[path])
+
+    def __getitem__(self, path: str) -> bytes:
+        content = self._files[path]
+        return content() if callable(content) else content
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._files)
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def __repr__(self) -> str:
+        return f"OutputTree({list(self._files)!r})"
+
+
+class MemorySink(OutputSink):
+    """
+    Collects files in an OutputTree without any disk I/O.
+
+    With ``lazy_resources`` images are read from the source DOCX only when their
+    entry is accessed.
+    """
+
+    def __init__(self, tree: Optional[OutputTree] = None, root: Union[str, os.PathLike] = ".", lazy_resources: bool = False):
+        super().__init__(root)
+        self.tree = tree if tree is not None else OutputTree()
+        self.lazy_resources = lazy_resources
+        self._sizes: Dict[str, int] = {}
+
+    def _add(self, name: str, size: int) -> None:
+        self._sizes[name] = size
+        self.bytes_written += size
+
+    def write_bytes(self, path: Union[str, os.PathLike], data: bytes) -> None:
+        self.tree.add(self.name(path), data)
+        self._add(self.name(path), len(data))
+
+    def write_resource(self, path: Union[str, os.PathLike], resources, resource) -> None:
+        if self.lazy_resources and isinstance(resources, ResourceStore):
+            self.tree.add_lazy(self.name(path), resources.loader(resource.id))
+            self._add(self.name(path), resources.info(resource.id).size)
+        elif isinstance(resources, ResourceStore):
+            self.write_bytes(path, resources.read(resource.id))
+        else:
+            self.write_bytes(path, resource.content)
+
+    def link(self, path: Union[str, os.PathLike], target: Union[str, os.PathLike]) -> None:
+        self.tree.link(self.name(path), self.name(target))
+        self._add(self.name(path), self._sizes[self.name(target)])
+
+
+def open_sink(output_format: str, out_root: Union[str, os.PathLike], name: str,
+              stream: Optional[BinaryIO] = None) -> OutputSink:
+    """
+    Sink for the tree of ``<out_root>/<name>`` in an output format.
+
+    ``directory`` writes the files in place; ``zip`` and ``tar`` write
+    ``<out_root>/<name>.zip`` / ``.tar`` holding the contents of that directory.
+    With ``stream`` the zip or tar archive is written to it instead, entries named
+    as below ``out_root`` (``<name>/...``) so that extracting it gives the directory
+    layout; entries are emitted as the files are produced.
+    """
+    out_root = Path(out_root)
+    if stream is not None:
+        if output_format == "zip":
+            return ZipSink(stream, root=out_root)
+        if output_format == "tar":
+            return TarSink(stream, root=out_root)
+        raise ValueError(f"streamed output needs the zip or tar format, not {output_format!r}")
+    if output_format == "directory":
+        return FileSystemSink()
+    if output_format == "zip":
+        return ZipSink(out_root / f"{name}.zip", root=out_root / name)
+    if output_format == "tar":
+        return TarSink(out_root / f"{name}.tar", root=out_root / name)
+    raise ValueError(f"unknown output format {output_format!r} (expected one of {', '.join(OUTPUT_FORMATS)})")
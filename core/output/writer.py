@@ -1,25 +1,59 @@
-import os
 from pathlib import Path
+from typing import Dict, Optional
+
+from core.output.sinks import FileSystemSink, OutputSink
+from core.render.ast_exporter import ast_path_for, write_ast_jsonl
+from core.render.markdown_renderer import render_markdown_to
 
 class Writer:
-    """Handles file system operations for writing chapters and assets."""
+    """Handles writing chapters and assets through an output sink (the file system by default)."""
+
+    def __init__(self, ast_export: bool = False, sink: Optional[OutputSink] = None):
+        """
+        Args:
+            ast_export: Also write each chapter's AST as JSON Lines next to its Markdown file.
+            sink: Destination of the files; a FileSystemSink when omitted.
+        """
+        self.ast_export = ast_export
+        self.sink = sink if sink is not None else FileSystemSink()
 
     def ensure_dir(self, dir_path: Path) -> None:
         """
         Ensures that a directory exists. If it doesn't, it's created.
         """
-        os.makedirs(dir_path, exist_ok=True)
+        self.sink.ensure_dir(dir_path)
 
     def write_text(self, file_path: Path, content: str) -> None:
         """
         Writes text content to a file.
         """
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(content)
+        self.sink.write_text(file_path, content)
+
+    def write_markdown(self, file_path: Path, doc, asset_map: Dict[str, str], document_name: str = "",
+                       image_action_lists: bool = True) -> None:
+        """
+        Renders a document as Markdown straight into a file.
+        """
+        with self.sink.open_text(file_path) as f:
+            render_markdown_to(f, doc, asset_map, document_name, image_action_lists)
+        if self.ast_export:
+            self.write_ast(ast_path_for(file_path), doc)
+
+    def write_ast(self, file_path: Path, doc) -> None:
+        """
+        Writes the blocks of a document as JSON Lines.
+        """
+        with self.sink.open_binary(file_path) as f:
+            write_ast_jsonl(f, doc.blocks)
 
     def write_binary(self, file_path: Path, content: bytes) -> None:
         """
         Writes binary content to a file.
         """
-        with open(file_path, "wb") as f:
-            f.write(content)
+        self.sink.write_bytes(file_path, content)
+
+    def write_resource(self, file_path: Path, resources, resource) -> None:
+        """
+        Writes an extracted resource, streaming it from a ResourceStore when possible.
+        """
+        self.sink.write_resource(file_path, resources, resource)
@@ -1,19 +1,30 @@
 import json
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List, NamedTuple
+from typing import Dict, List, NamedTuple, Optional
 
 from core.adapters.document_parser import parse_document
+from core.adapters.text_rules import load_text_rules
 from core.model.metadata import Metadata
 from core.model.config import PipelineConfig
+from core.model.resource_store import ResourceStore
+from core.output.sinks import MemorySink, OutputTree, open_sink
 from core.output.writer import Writer
-from core.output.file_naming import generate_chapter_filename
+from core.output.file_naming import chapter_filename
 from core.output.toc_builder import build_index, build_manifest
 from core.render.assets_exporter import AssetsExporter
-from core.render.markdown_renderer import render_markdown
 from core.split.chapter_splitter import split_into_chapters, ChapterRules
-from core.transforms.normalize import run as normalize
-from core.transforms.structure_fixes import run as fix_structure
-from core.transforms.content_reorder import run as reorder_content
+from core.transforms.engine import run_transforms
+from core.transforms.normalize import NormalizeText
+from core.transforms.content_reorder import ContentReorder
+from core.utils.docx_utils import DocxSource
+from core.utils.memory_profile import MemoryProfiler
+from core.utils.stages import StageObserver, combine_observers, is_degraded, progress_step, stage
+from core.utils.time_budget import PARSE_SKIPS, TimeBudget, degraded_note
+from core.utils.template_cache import configure_template_cache
+
+# Optional heuristics a degraded run skips (see core.utils.time_budget)
+DEGRADED_SKIPS = PARSE_SKIPS + ("content_reorder", "image_action_lists")
 
 
 class PipelineResult(NamedTuple):
@@ -24,94 +35,187 @@ class PipelineResult(NamedTuple):
     manifest_file: str
     asset_files: List[str]
     error_message: str = ""
+    transform_stats: Optional[Dict[str, float]] = None  # seconds spent per transform when config.profile_transforms is set
+    archive_file: str = ""  # zip/tar holding the output when config.output_format is an archive; the paths above are inside it
+    memory_profile: Optional[dict] = None  # MemoryProfiler.report() when config.profile_memory or config.max_rss is set
+    degraded: bool = False  # config.time_budget ran out, optional heuristics were skipped from then on
 
 
 class DocumentPipeline:
     def __init__(self, config: PipelineConfig):
         self.config = config
-        self.writer = Writer()
+        self.writer = Writer(ast_export=config.ast_export)
+        if config.template_cache_dir:
+            configure_template_cache(config.template_cache_dir)
+        self.text_rules = load_text_rules(config.text_rules_file) if config.text_rules_file else None
 
-    def process(self, input_path: str, output_dir: str) -> PipelineResult:
+    def process(self, input_path: str, output_dir: str, observer: Optional[StageObserver] = None) -> PipelineResult:
         """
         Runs the full document processing pipeline.
         
         Args:
             input_path: Path to the input document (DOCX)
             output_dir: Directory to write output files
+            observer: Notified of the stages and their progress (see core.utils.stages);
+                a cancelled CancelToken ends the run with an unsuccessful result
             
         Returns:
-            PipelineResult with success status and file paths
+            PipelineResult with success status and file paths (entries of
+            ``archive_file`` when ``config.output_format`` is zip or tar)
         """
+        resources = ResourceStore(memory_budget=self.config.resource_memory_budget)
+        profiler = self._memory_profiler()
+        budget = TimeBudget(self.config.time_budget) if self.config.time_budget is not None else None
         try:
-            # Setup output directories
-            output_path = Path(output_dir)
-            input_basename = Path(input_path).stem.lower()  # Convert to lowercase
-            doc_output_dir = output_path / input_basename
-            chapters_dir = doc_output_dir / "chapters"
-            assets_dir = doc_output_dir / self.config.assets_dir
-            
-            # Ensure directories exist
-            self.writer.ensure_dir(doc_output_dir)
-            self.writer.ensure_dir(chapters_dir)
-            
-            # 1. Parse with document adapter
-            doc, resources = parse_document(input_path)
-            
+            with profiler if profiler is not None else nullcontext():
+                result = self._process(input_path, Path(output_dir), resources, combine_observers(profiler, budget, observer))
+        except Exception as e:
+            result = PipelineResult(
+                success=False,
+                chapter_files=[],
+                index_file="",
+                manifest_file="",
+                asset_files=[],
+                error_message=str(e)
+            )
+        finally:
+            resources.close()
+        if profiler is not None:
+            result = result._replace(memory_profile=profiler.report())
+        if budget is not None and budget.exceeded:
+            result = result._replace(degraded=True)
+        return result
 
-            # 2. Apply transforms
-            doc = normalize(doc)
-            doc = fix_structure(doc)
-            doc = reorder_content(doc)
+    def _memory_profiler(self) -> Optional[MemoryProfiler]:
+        if not self.config.profile_memory and self.config.max_rss is None:
+            return None
+        return MemoryProfiler(trace=self.config.profile_memory, max_rss=self.config.max_rss)
 
-            # 3. Split into chapters
-            rules = ChapterRules(level=self.config.split_level)
+    def _process(self, input_path: str, output_path: Path, resources: ResourceStore,
+                 observer: Optional[StageObserver]) -> PipelineResult:
+        input_basename = Path(input_path).stem.lower()  # Convert to lowercase
+        if self.config.output_format == "directory":
+            return self._run(input_path, input_basename, output_path / input_basename, self.writer, resources, observer)
+        
+        # Archive formats write <output_dir>/<name>.zip|.tar holding the document folder
+        with open_sink(self.config.output_format, output_path, input_basename) as sink:
+            writer = Writer(ast_export=self.config.ast_export, sink=sink)
+            result = self._run(input_path, input_basename, output_path / input_basename, writer, resources, observer)
+        return result._replace(archive_file=str(output_path / f"{input_basename}.{self.config.output_format}"))
+
+    def process_to_tree(self, source: DocxSource, name: str = "document", lazy_images: bool = False) -> OutputTree:
+        """
+        Runs the pipeline without disk I/O and returns the output as an in-memory tree.
+
+        Args:
+            source: DOCX bytes, a binary file object or a path
+            name: Document name used for the output folder and metadata (like the input stem)
+            lazy_images: Leave images compressed in the DOCX until their entry is read
+
+        Returns:
+            OutputTree mapping paths relative to the output directory
+            (``<name>/chapters/...``, ``<name>/0.index.md``, ``<name>/manifest.json``,
+            images) to file contents
+
+        Raises:
+            Any parsing or conversion error, unlike ``process``.
+        """
+        tree = OutputTree()
+        writer = Writer(ast_export=self.config.ast_export, sink=MemorySink(tree, lazy_resources=lazy_images))
+        # Nothing spills to disk: images are kept in memory or left in the in-memory archive
+        resources = ResourceStore(memory_budget=0 if lazy_images else None, reference_buffers=True)
+        try:
+            basename = name.lower()
+            self._run(source, basename, Path(basename), writer, resources)
+        finally:
+            resources.close()
+        return tree
+
+    def _run(self, source: DocxSource, input_basename: str, doc_output_dir: Path, writer: Writer,
+             resources: ResourceStore, observer: Optional[StageObserver] = None) -> PipelineResult:
+        """Parses, transforms and writes one document below ``doc_output_dir``."""
+        # The traversal is clocked only when the stats are asked for
+        transform_stats: Optional[Dict[str, float]] = {} if self.config.profile_transforms else None
+        chapters_dir = doc_output_dir / "chapters"
+        assets_dir = doc_output_dir / self.config.assets_dir
+        
+        # Ensure directories exist
+        writer.ensure_dir(doc_output_dir)
+        writer.ensure_dir(chapters_dir)
+        
+        # 1. Parse with document adapter
+        parse_options = {"workers": self.config.parse_workers} if self.config.parse_workers > 1 else {}
+        if self.text_rules is not None:
+            parse_options["text_rules"] = self.text_rules
+        if observer is not None:
+            parse_options["observer"] = observer
+        doc, resources = parse_document(source, resource_store=resources, **parse_options)
+        
+
+        # 2. Apply transforms in a single fused traversal
+        transforms = [NormalizeText()]
+        if not is_degraded(observer):
+            transforms.append(ContentReorder(self.config.reorder_rules))
+        with stage(observer, "transform"):
+            doc = run_transforms(doc, transforms, transform_stats)
+
+        # 3. Split into chapters
+        rules = ChapterRules(level=self.config.split_level)
+        with stage(observer, "split"):
             chapters = split_into_chapters(doc, rules)
 
-            # 4. Export assets using hierarchical organization
-            images_dir = doc_output_dir / input_basename
-            exporter = AssetsExporter(images_dir)
-            asset_map = exporter.export_hierarchical_images(doc, resources)
-            
-            # 5. Prepare chapter data
-            chapter_data = []
-            chapter_files = []
-            chapter_info = []
+        # 4. Export assets using hierarchical organization
+        images_dir = doc_output_dir / input_basename
+        exporter = AssetsExporter(images_dir, writer.sink)
+        with stage(observer, "assets"):
+            asset_map = exporter.export_hierarchical_images(doc, resources, observer=observer)
+        
+        # 5. Prepare chapter data
+        chapter_data = []
+        chapter_files = []
+        chapter_info = []
+        
+        for i, chapter in enumerate(chapters):
+            # Generate chapter title
+            if i == 0:
+                # For chapter 0, combine special sections into a meaningful title
+                chapter_title = name = _get_zero_chapter_title(chapter)
+            else:
+                # For main chapters, find first heading and renumber it
+                name = _get_main_chapter_title(chapter)
+                chapter_title = f"{i} {name}" if name is not None else ""
             
-            for i, chapter in enumerate(chapters):
-                # Generate chapter title
-                if i == 0:
-                    # For chapter 0, combine special sections into a meaningful title
-                    chapter_title = _get_zero_chapter_title(chapter)
-                else:
-                    # For main chapters, find first heading and renumber it
-                    chapter_title = _get_main_chapter_title(chapter, i)
-                
-                # Fallback
-                if not chapter_title:
-                    chapter_title = f"Chapter {i}"
-                
-                # Store chapter data
-                chapter_data.append((chapter, chapter_title))
+            # Fallback
+            if not chapter_title:
+                chapter_title = name = f"Chapter {i}"
             
-            # 6. Render markdown for each chapter and write files
-            for i, (chapter, chapter_title) in enumerate(chapter_data):
+            # Store chapter data
+            chapter_data.append((chapter, chapter_title, name))
+        
+        # 6. Render markdown for each chapter and write files
+        step = progress_step(len(chapter_data))
+        with stage(observer, "render"):
+            for i, (chapter, chapter_title, name) in enumerate(chapter_data):
+                if observer is not None and i % step == 0:
+                    observer.progress("render", i, len(chapter_data))
+                degraded = is_degraded(observer)
                 # Generate filename - start numbering from 0 for title page/TOC
-                filename = generate_chapter_filename(i, chapter_title, self.config.chapter_pattern)
+                filename = chapter_filename(i, name, self.config.chapter_pattern)
                 chapter_path = chapters_dir / filename
-                
-                # Render markdown
-                markdown_content = render_markdown(chapter, asset_map, input_basename)
-                
-                # Write chapter file
-                self.writer.write_text(chapter_path, markdown_content)
+            
+                # Render markdown straight into the chapter file
+                writer.write_markdown(chapter_path, chapter, asset_map, input_basename, image_action_lists=not degraded)
                 chapter_files.append(str(chapter_path))
-                
+            
                 # Store chapter info for TOC
                 chapter_info.append({
                     "title": chapter_title,
                     "path": f"chapters/{filename}"
                 })
+            if observer is not None:
+                observer.progress("render", len(chapter_data), len(chapter_data))
 
+        with stage(observer, "write"):
             # 7. Generate metadata
             metadata = Metadata(
                 title=input_basename.replace('-', ' ').replace('_', ' ').title(),
@@ -121,38 +225,31 @@ class DocumentPipeline:
             # 8. Generate and write index.md (TOC)
             index_content = build_index(chapter_info, metadata)
             index_path = doc_output_dir / "0.index.md"
-            self.writer.write_text(index_path, index_content)
+            writer.write_text(index_path, index_content)
 
             # 9. Generate and write manifest.json
             manifest_data = build_manifest(chapter_info, asset_map, metadata)
+            if is_degraded(observer):
+                manifest_data["degraded"] = degraded_note(DEGRADED_SKIPS, self.config.time_budget)
             manifest_path = doc_output_dir / "manifest.json"
             manifest_json = json.dumps(manifest_data, indent=2, ensure_ascii=False)
-            self.writer.write_text(manifest_path, manifest_json)
-
-            # Get list of asset files - asset_map values are relative paths from base output dir
-            asset_files = []
-            for relative_path in asset_map.values():
-                # Convert relative path to absolute path
-                full_asset_path = doc_output_dir / relative_path
-                asset_files.append(str(full_asset_path))
-
-            return PipelineResult(
-                success=True,
-                chapter_files=chapter_files,
-                index_file=str(index_path),
-                manifest_file=str(manifest_path),
-                asset_files=asset_files
-            )
+            writer.write_text(manifest_path, manifest_json)
 
-        except Exception as e:
-            return PipelineResult(
-                success=False,
-                chapter_files=[],
-                index_file="",
-                manifest_file="",
-                asset_files=[],
-                error_message=str(e)
-            )
+        # Get list of asset files - asset_map values are relative paths from base output dir
+        asset_files = []
+        for relative_path in asset_map.values():
+            # Convert relative path to absolute path
+            full_asset_path = doc_output_dir / relative_path
+            asset_files.append(str(full_asset_path))
+
+        return PipelineResult(
+            success=True,
+            chapter_files=chapter_files,
+            index_file=str(index_path),
+            manifest_file=str(manifest_path),
+            asset_files=asset_files,
+            transform_stats=transform_stats
+        )
 
 
 def _get_zero_chapter_title(chapter) -> str:
@@ -160,7 +257,7 @@ def _get_zero_chapter_title(chapter) -> str:
     Generate title for chapter 0 (title page, TOC, annotation, etc.).
     
     Args:
-        chapter: The chapter document
+        chapter: The chapter view
         
     Returns:
         Appropriate title for zero chapter
@@ -168,13 +265,9 @@ def _get_zero_chapter_title(chapter) -> str:
     # Look for specific section titles
     found_sections = []
     
-    for block in chapter.blocks:
-        if block.type == "heading" and hasattr(block, 'text') and block.text.strip():
-            heading_text = block.text.strip().lower()
-            
-            # Clean heading text
-            import re
-            clean_heading = re.sub(r'^\d+(\.\d+)*\.?\s*', '', heading_text).strip()
+    for block in chapter.headings():
+        if block.text.strip():
+            clean_heading = block.display_title.lower()
             
             if 'аннотация' in clean_heading:
                 found_sections.append('АННОТАЦИЯ')
@@ -188,26 +281,18 @@ def _get_zero_chapter_title(chapter) -> str:
     return 'АННОТАЦИЯ'  # Default for zero chapter
 
 
-def _get_main_chapter_title(chapter, chapter_num: int) -> str:
+def _get_main_chapter_title(chapter) -> Optional[str]:
     """
-    Generate title for main chapters (1, 2, 3, etc.) with proper renumbering.
+    Title of a main chapter (1, 2, 3, etc.) without its old numbering.
     
     Args:
-        chapter: The chapter document
-        chapter_num: The new chapter number (1, 2, 3...)
+        chapter: The chapter view
         
     Returns:
-        Properly numbered chapter title
+        Title of the first heading, None if the chapter has no heading text
     """
-    for block in chapter.blocks:
-        if block.type == "heading" and hasattr(block, 'text') and block.text.strip():
-            heading_text = block.text.strip()
-            
-            # Remove old numbering
-            import re
-            clean_title = re.sub(r'^\d+(\.\d+)*\.?\s*', '', heading_text).strip()
-            
-            # Return with new numbering
-            return f"{chapter_num} {clean_title}"
+    for block in chapter.headings():
+        if block.text.strip():
+            return block.display_title
     
-    return ""
+    return None
@@ -1,17 +1,14 @@
 import os
 import re
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
+from typing import Iterable, List, Dict, Sequence, Tuple, Optional, Union
 
 from core.model.resource_ref import ResourceRef
-from core.model.internal_doc import (
-    InternalDoc,
-    Image,
-    Heading,
-    Table,
-    ListBlock,
-    Paragraph,
-)
+from core.model.resource_store import ResourceStore, StoredResource
+from core.model.internal_doc import InternalDoc, Image
+from core.model.outline import BlockRange, OutlineIndex
+from core.output.sinks import FileSystemSink, OutputSink
+from core.utils.stages import StageObserver, progress_step
 
 # A simple map to get file extensions from mime types
 MIME_TYPE_EXTENSIONS = {
@@ -67,13 +64,30 @@ def _transliterate(text: str) -> str:
     # Keep all lowercase - removed uppercase conversion
     return result
 
-def export_assets(resources: List[ResourceRef], output_dir: str) -> Dict[str, str]:
+Resources = Union[ResourceStore, Iterable[ResourceRef]]
+
+
+def _resource_entries(resources: Resources) -> List[Union[ResourceRef, StoredResource]]:
+    """Return resource metadata without loading spilled content into memory."""
+    if isinstance(resources, ResourceStore):
+        return resources.entries()
+    return list(resources)
+
+
+def _release_resource(resources: Resources, resource_id: str) -> None:
+    """Free a resource held by a store once it has been exported."""
+    if isinstance(resources, ResourceStore):
+        resources.release(resource_id)
+
+
+def export_assets(resources: Resources, output_dir: str, sink: Optional[OutputSink] = None) -> Dict[str, str]:
     """
     Saves binary resources to disk, avoiding duplicates based on SHA256 hash.
 
     Args:
-        resources: A list of ResourceRef objects to be exported.
+        resources: A list of ResourceRef objects or a ResourceStore to be exported.
         output_dir: The path to the directory where assets will be saved.
+        sink: Destination of the files; the file system when omitted.
 
     Returns:
         A dictionary mapping resource IDs to their new relative file paths.
@@ -81,14 +95,17 @@ def export_assets(resources: List[ResourceRef], output_dir: str) -> Dict[str, st
     asset_map: Dict[str, str] = {}
     hashes_written: Dict[str, str] = {}  # {sha256: relative_path}
 
+    sink = sink if sink is not None else FileSystemSink()
+
     # Ensure the output directory exists
-    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    sink.ensure_dir(output_dir)
 
-    for resource in resources:
+    for resource in _resource_entries(resources):
         if resource.sha256 in hashes_written:
             # This resource is a duplicate of one we've already saved.
             # Map its ID to the path of the existing file.
             asset_map[resource.id] = hashes_written[resource.sha256]
+            _release_resource(resources, resource.id)
             continue
 
         # This is a new resource, so we save it.
@@ -97,8 +114,8 @@ def export_assets(resources: List[ResourceRef], output_dir: str) -> Dict[str, st
         relative_path = os.path.join(Path(output_dir).name, filename)
         absolute_path = Path(output_dir) / filename
 
-        with open(absolute_path, "wb") as f:
-            f.write(resource.content)
+        sink.write_resource(absolute_path, resources, resource)
+        _release_resource(resources, resource.id)
 
         # Store the mapping for this new file
         asset_map[resource.id] = relative_path
@@ -108,17 +125,19 @@ def export_assets(resources: List[ResourceRef], output_dir: str) -> Dict[str, st
 
 
 def export_assets_by_chapter(
-    resources: List[ResourceRef], 
+    resources: Resources, 
     chapters: List[Tuple[InternalDoc, str]], 
-    base_output_dir: str
+    base_output_dir: str,
+    sink: Optional[OutputSink] = None,
 ) -> Dict[str, str]:
     """
     Saves binary resources organized by chapter directories.
     
     Args:
-        resources: A list of ResourceRef objects to be exported.
+        resources: A list of ResourceRef objects or a ResourceStore to be exported.
         chapters: List of tuples (chapter_doc, chapter_title).
         base_output_dir: The base path where images directory will be created.
+        sink: Destination of the files; the file system when omitted.
         
     Returns:
         A dictionary mapping resource IDs to their relative file paths.
@@ -135,8 +154,8 @@ def export_assets_by_chapter(
                 resource_to_chapter[block.resource_id] = chapter_title
     
     # Group resources by chapter
-    chapter_resources: Dict[str, List[ResourceRef]] = {}
-    for resource in resources:
+    chapter_resources: Dict[str, List[Union[ResourceRef, StoredResource]]] = {}
+    for resource in _resource_entries(resources):
         chapter_title = resource_to_chapter.get(resource.id)
         if chapter_title:  # Only process resources that are used in chapters
             if chapter_title not in chapter_resources:
@@ -147,19 +166,21 @@ def export_assets_by_chapter(
     base_path = Path(base_output_dir)
     base_folder = base_path.name
     images_base_dir = base_path / base_folder
-    images_base_dir.mkdir(parents=True, exist_ok=True)
+    sink = sink if sink is not None else FileSystemSink()
+    sink.ensure_dir(images_base_dir)
     
     # Process each chapter's resources
     for chapter_title, chapter_resource_list in chapter_resources.items():
         # Sanitize chapter title for directory name
         safe_chapter_name = _sanitize_filename(chapter_title)
         chapter_images_dir = images_base_dir / safe_chapter_name
-        chapter_images_dir.mkdir(parents=True, exist_ok=True)
+        sink.ensure_dir(chapter_images_dir)
         
         for resource in chapter_resource_list:
             if resource.sha256 in hashes_written:
                 # This resource is a duplicate - reuse existing file
                 asset_map[resource.id] = hashes_written[resource.sha256]
+                _release_resource(resources, resource.id)
                 continue
             
             # Save new resource
@@ -168,8 +189,8 @@ def export_assets_by_chapter(
             relative_path = f"{base_folder}/{safe_chapter_name}/{filename}"
             absolute_path = chapter_images_dir / filename
             
-            with open(absolute_path, "wb") as f:
-                f.write(resource.content)
+            sink.write_resource(absolute_path, resources, resource)
+            _release_resource(resources, resource.id)
             
             # Store mappings
             asset_map[resource.id] = relative_path
@@ -209,11 +230,19 @@ def _sanitize_filename(name: str) -> str:
 class AssetsExporter:
     """Handles exporting assets with different organizational strategies."""
     
-    def __init__(self, assets_dir: Path):
+    def __init__(self, assets_dir: Path, sink: Optional[OutputSink] = None):
+        """
+        Args:
+            assets_dir: Directory receiving the images.
+            sink: Destination of the image files; the file system when omitted.
+        """
         self.assets_dir = Path(assets_dir)
+        self.sink = sink if sink is not None else FileSystemSink()
         self.hashes_written: Dict[str, str] = {}  # {sha256: relative_path}
         
-    def export_hierarchical_images(self, doc: InternalDoc, resources: List[ResourceRef]) -> Dict[str, str]:
+    def export_hierarchical_images(self, doc: InternalDoc, resources: Resources,
+                                   ranges: Optional[Sequence[BlockRange]] = None,
+                                   observer: Optional[StageObserver] = None) -> Dict[str, str]:
         """
         Export images organized in hierarchical folder structure without numeric prefixes.
         
@@ -226,7 +255,10 @@ class AssetsExporter:
         
         Args:
             doc: The document containing hierarchical structure
-            resources: List of image resources to export
+            resources: List of image resources or a ResourceStore to export.
+                Stored resources are released as soon as they are written.
+            ranges: Block index ranges whose images are exported (all when omitted)
+            observer: Receives the ``assets`` progress in images handled
             
         Returns:
             Dictionary mapping resource IDs to their relative file paths
@@ -235,12 +267,20 @@ class AssetsExporter:
         
         # Build hierarchical structure from document
         hierarchy = self._build_hierarchical_structure(doc)
+        if ranges is not None:
+            outline = OutlineIndex.of(doc)
+            wanted = {resource_id for start, end in ranges for resource_id in outline.images_in(start, end)}
+            hierarchy = {resource_id: path_info for resource_id, path_info in hierarchy.items() if resource_id in wanted}
         
         # Create resource mapping
-        resource_map = {r.id: r for r in resources}
+        resource_map = {r.id: r for r in _resource_entries(resources)}
         
         # Export each image to its hierarchical location
-        for resource_id, path_info in hierarchy.items():
+        total = len(hierarchy)
+        step = progress_step(total)
+        for done, (resource_id, path_info) in enumerate(hierarchy.items()):
+            if observer is not None and done % step == 0:
+                observer.progress("assets", done, total)
             if resource_id not in resource_map:
                 continue
                 
@@ -249,6 +289,7 @@ class AssetsExporter:
             # Check for duplicate content
             if resource.sha256 in self.hashes_written:
                 asset_map[resource.id] = self.hashes_written[resource.sha256]
+                _release_resource(resources, resource.id)
                 continue
             
             # Build hierarchical directory path
@@ -257,17 +298,15 @@ class AssetsExporter:
             for part in dir_parts:
                 target_dir = target_dir / part
             
-            # Ensure directory exists
-            target_dir.mkdir(parents=True, exist_ok=True)
-            
             # Generate filename (convert resource_id to image number + extension)
             ext = MIME_TYPE_EXTENSIONS.get(resource.mime_type, "")
             filename = self._convert_resource_id_to_filename(resource.id, ext)
             target_path = target_dir / filename
             
             # Write file
-            with open(target_path, "wb") as f:
-                f.write(resource.content)
+            self.sink.ensure_dir(target_dir)
+            self.sink.write_resource(target_path, resources, resource)
+            _release_resource(resources, resource.id)
             
             # Build relative path for asset map
             relative_parts = [self.assets_dir.name] + dir_parts + [filename]
@@ -277,77 +316,37 @@ class AssetsExporter:
             asset_map[resource.id] = relative_path
             self.hashes_written[resource.sha256] = relative_path
             
+        if observer is not None:
+            observer.progress("assets", total, total)
         return asset_map
     
     def _build_hierarchical_structure(self, doc: InternalDoc) -> Dict[str, Dict]:
         """
-        Build hierarchical structure mapping from document blocks.
+        Build hierarchical structure mapping from the document's outline index.
 
         Returns:
             Dict mapping resource_id to {"path_parts": [section, subsection, ...]}
         """
         hierarchy: Dict[str, Dict] = {}
-        current_sections: List[str] = []  # Stack of current section names by level
-
-        for block in doc.blocks:
-            if isinstance(block, Heading):
-                current_sections = self._update_section_stack(block, current_sections)
-            else:
-                self._collect_images_from_block(block, current_sections, hierarchy)
-
-        return hierarchy
-
-    def _update_section_stack(self, heading: Heading, current_sections: List[str]) -> List[str]:
-        """Update the section stack based on heading level and text."""
-        level = max(heading.level, 1)
-        title = self._clean_heading_text(heading.text)
-
-        updated = current_sections[: level - 1]
-        while len(updated) < level - 1:
-            updated.append("Unnamed")
-        updated.append(title)
-        return updated
-
-    def _collect_images_from_block(
-        self,
-        block,
-        current_sections: List[str],
-        hierarchy: Dict[str, Dict],
-    ) -> None:
-        """Recursively collect image references from nested blocks."""
-        if isinstance(block, Image) and block.resource_id:
-            hierarchy[block.resource_id] = {
+        outline = OutlineIndex.of(doc)
+        titles: Dict[int, str] = {}
+
+        for image in outline.images:
+            position = outline.enclosing_heading(image.block_index)
+            current_sections: List[str] = []
+            if position is not None:
+                for section in outline.headings[position].path:
+                    if section is None:
+                        current_sections.append("Unnamed")
+                        continue
+                    if section not in titles:
+                        titles[section] = outline.heading_block(section).display_title or "Unnamed"
+                    current_sections.append(titles[section])
+            hierarchy[image.resource_id] = {
                 "path_parts": self._path_parts_for_sections(current_sections)
             }
-            return
-
-        if isinstance(block, Table):
-            self._collect_images_from_table(block, current_sections, hierarchy)
-            return
-
-        if isinstance(block, ListBlock):
-            for item in block.items:
-                for child in item.blocks:
-                    self._collect_images_from_block(child, current_sections, hierarchy)
-            return
-
-        if isinstance(block, Paragraph):
-            return
-
-    def _collect_images_from_table(
-        self,
-        table: Table,
-        current_sections: List[str],
-        hierarchy: Dict[str, Dict],
-    ) -> None:
-        """Traverse table structure and collect images from cells."""
-        for cell in table.header.cells:
-            for cell_block in cell.blocks:
-                self._collect_images_from_block(cell_block, current_sections, hierarchy)
-        for row in table.rows:
-            for cell in row.cells:
-                for cell_block in cell.blocks:
-                    self._collect_images_from_block(cell_block, current_sections, hierarchy)
+
+        return hierarchy
 
     def _path_parts_for_sections(self, current_sections: List[str]) -> List[str]:
         """Return appropriate path parts for the current section stack."""
@@ -357,12 +356,6 @@ class AssetsExporter:
             return [current_sections[0]]
         return ["Без раздела"]
     
-    def _clean_heading_text(self, text: str) -> str:
-        """Clean heading text by removing numeric prefixes."""
-        # Remove numeric prefixes like "1.", "1.1", "12345.", etc.
-        cleaned = re.sub(r'^\d+(\.\d+)*\.?\s*', '', text)
-        return cleaned.strip() if cleaned.strip() else "Unnamed"
-    
     def _sanitize_for_hierarchy(self, name: str) -> str:
         """Sanitize name for use in directory hierarchy."""
         # Remove or replace problematic characters
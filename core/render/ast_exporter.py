@@ -0,0 +1,54 @@
+"""
+JSON Lines export of the document AST.
+
+Each top-level block of a chapter is written as one compact JSON object per line,
+so indexers can stream chapter structure (heading levels, block types, image
+resource ids and captions) without re-parsing the generated Markdown.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import BinaryIO, Iterable
+
+try:  # orjson is optional; it is several times faster than the stdlib encoder
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+from core.model.internal_doc import Block
+
+AST_SUFFIX = ".ast.jsonl"
+
+
+def _dumps(data: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def ast_path_for(markdown_path: Path) -> Path:
+    """Return the path of the AST file written next to a chapter file."""
+    markdown_path = Path(markdown_path)
+    return markdown_path.with_name(markdown_path.stem + AST_SUFFIX)
+
+
+def write_ast_jsonl(stream: BinaryIO, blocks: Iterable[Block]) -> int:
+    """
+    Write blocks to a binary stream as JSON Lines, one block per line.
+
+    Returns:
+        The number of blocks written.
+    """
+    count = 0
+    for block in blocks:
+        stream.write(_dumps(block.model_dump(mode="json")))
+        stream.write(b"\n")
+        count += 1
+    return count
+
+
+def read_ast_jsonl(path: Path) -> list[dict]:
+    """Load an AST file back into a list of block dictionaries."""
+    with open(path, "rb") as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -1,5 +1,6 @@
+import io
 import re
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Tuple
 
 from core.model.internal_doc import (
     InternalDoc,
@@ -8,6 +9,25 @@ from core.model.internal_doc import (
     ListBlock,
 )
 
+# Paragraphs formatted as "# command" (optionally inside a list marker) become terminal blocks
+_COMMAND_RE = re.compile(r"(?:[-*]\s+|\d+[.)]\s+)?#\s+(.*)")
+# Dash separating image descriptions in table cells: "Кнопки: – сохранить – отменить"
+_DASH_RE = re.compile(r"(?:(?<=^)|(?<=\s))[–—]\s*")
+
+# Inline type -> formatter taking (content, href)
+_INLINE_FORMATS: Dict[str, Callable[[str, Optional[str]], str]] = {
+    "text": lambda content, href: content,
+    "bold": lambda content, href: f"**{content}**",
+    "italic": lambda content, href: f"*{content}*",
+    "link": lambda content, href: f"[{content}]({href})",
+    "code": lambda content, href: f"`{content}`",
+}
+
+INLINE_CONTEXTS = {"paragraph", "table", "list_item"}
+
+ParentContext = Tuple[str, ...]
+
+
 def _escape_table_content(text: str) -> str:
     """Escape markdown special characters in table cells."""
     # Escape pipe characters that would break table structure
@@ -16,60 +36,10 @@ def _escape_table_content(text: str) -> str:
 
 def _render_inline(inline: Inline) -> str:
     """Renders a single inline element to its Markdown representation."""
-    type = inline.type
-    if type == "text":
-        return inline.content
-    if type == "bold":
-        return f"**{inline.content}**"
-    if type == "italic":
-        return f"*{inline.content}*"
-    if type == "link":
-        return f"[{inline.content}]({inline.href})"
-    if type == "code":
-        return f"`{inline.content}`"
-    raise ValueError(f"Unknown inline type: {type}")
-
-def _render_inline_for_table(inline: Inline) -> str:
-    """Renders a single inline element for table cells with proper escaping."""
-    rendered = _render_inline(inline)
-    return _escape_table_content(rendered)
-
-ParentContext = Tuple[str, ...]
-
-
-def _render_block_for_table(
-    block: Block,
-    asset_map: Dict[str, str],
-    document_name: str = "",
-    parent_stack: ParentContext = (),
-) -> str:
-    """Renders a block element for table cells with proper escaping."""
-    type = block.type
-    if type == "paragraph":
-        text = "".join(_render_inline_for_table(inline) for inline in block.inlines)
-        stripped = text.lstrip()
-        match = re.match(r"(?:[-*]\s+|\d+[.)]\s+)?#\s+(.*)", stripped)
-        if match:
-            command = match.group(1)
-            return f"```bash Terminal\n{command}\n```"
-        return text
-    # For other block types, render normally with table context and escape
-    rendered = _render_block(block, asset_map, document_name, parent_stack + ("table",))
-    return _escape_table_content(rendered)
-
-def _clean_heading_text(text: str) -> str:
-    """Remove leading numbering like '1', '1.2', '1.2.3', optional dots/brackets/dashes.
-
-    Examples:
-    - "3.7 Настройка" -> "Настройка"
-    - "3.4.3 — Функции" -> "Функции"
-    - "1) Введение" -> "Введение"
-    - "(2.1) - Описание" -> "Описание"
-    """
-    pattern = r"^\s*(?:\(?\d+(?:[.\-]\d+)*\)?|[IVXLCDM]+(?=[.\s]))\.?\)?\s*(?:[-–—]\s*)?"
-    return re.sub(pattern, "", text, flags=re.IGNORECASE).strip()
-
-
+    render = _INLINE_FORMATS.get(inline.type)
+    if render is None:
+        raise ValueError(f"Unknown inline type: {inline.type}")
+    return render(inline.content, getattr(inline, "href", None))
 
 def _escape_list_item_text(text: str) -> str:
     """Escape leading blockquote markers inside list items."""
@@ -81,52 +51,13 @@ def _escape_list_item_text(text: str) -> str:
         return f"{leading}\\{stripped}"
     return text
 
-def _render_list_block(
-    list_block: ListBlock,
-    asset_map: Dict[str, str],
-    level: int = 0,
-    document_name: str = "",
-    parent_stack: ParentContext = (),
-) -> str:
-    """Render a list block with proper indentation and nested items."""
-    lines: List[str] = []
-    for index, item in enumerate(list_block.items, start=1):
-        marker = f"{index}. " if list_block.ordered else "- "
-        prefix = "  " * level
-        item_blocks = list(item.blocks)
-        first_line = ""
-        if item_blocks and getattr(item_blocks[0], "type", None) == "paragraph":
-            first_paragraph = item_blocks.pop(0)
-            first_line = "".join(_render_inline(inline) for inline in first_paragraph.inlines).strip()
-            first_line = _escape_list_item_text(first_line)
-        lines.append(f"{prefix}{marker}{first_line}".rstrip())
-        for child in item_blocks:
-            if getattr(child, "type", None) == "list":
-                rendered_child = _render_list_block(
-                    child,
-                    asset_map,
-                    level + 1,
-                    document_name,
-                    parent_stack + ("list_item",),
-                )
-                if rendered_child:
-                    lines.extend(rendered_child.splitlines())
-                continue
-            rendered_child = _render_block(
-                child,
-                asset_map,
-                document_name,
-                parent_stack + ("list_item",),
-            )
-            child_lines = rendered_child.splitlines() if rendered_child else [""]
-            for child_line in child_lines:
-                if child_line:
-                    lines.append(f"{prefix}  {child_line}")
-                else:
-                    lines.append("")
-    return "\n".join(lines)
 
-INLINE_CONTEXTS = {"paragraph", "table", "list_item"}
+def _command_block(text: str) -> Optional[str]:
+    """Return a terminal code block if the text is a '# command' line."""
+    match = _COMMAND_RE.match(text.lstrip())
+    if match:
+        return f"```bash Terminal\n{match.group(1)}\n```"
+    return None
 
 
 def _image_sign_text(block: Block) -> str:
@@ -134,46 +65,150 @@ def _image_sign_text(block: Block) -> str:
     return block.caption if block.caption else (block.alt if block.alt else f"Рисунок {block.resource_id}")
 
 
-def _render_image(block: Block, parent_stack: ParentContext) -> str:
-    """Render an image block depending on its parent context."""
-    sign_text = _image_sign_text(block)
-    if any(context in INLINE_CONTEXTS for context in parent_stack):
-        return f"[{sign_text}](/{block.resource_id}.png)"
-    return (
-        f"::sign-image\n"
-        f"---\n"
-        f"src: /{block.resource_id}.png\n"
-        f"sign: {sign_text}\n"
-        f"---\n"
-        f"::"
-    )
+class _LineWriter:
+    """Writes lines to a stream separated by newlines, holding back trailing blank lines.
 
+    Blank lines are buffered until a non-blank line arrives so that a nested list can
+    drop its trailing blank line, as the string-based renderer did by re-splitting
+    rendered child lists.
+    """
 
-def _render_block(
-    block: Block,
-    asset_map: Dict[str, str],
-    document_name: str = "",
-    parent_stack: ParentContext = (),
-) -> str:
-    """Renders a single block element to its Markdown representation."""
-    type = block.type
-    if type == "heading":
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.started = False
+        self.pending_blank = 0
+
+    def line(self, text: str) -> None:
+        if not text:
+            self.pending_blank += 1
+            return
+        self._flush_blank()
+        self._write(text)
+
+    def drop_trailing_blank(self) -> None:
+        if self.pending_blank:
+            self.pending_blank -= 1
+
+    def flush(self) -> None:
+        self._flush_blank()
+
+    def _flush_blank(self) -> None:
+        while self.pending_blank:
+            self.pending_blank -= 1
+            self._write("")
+
+    def _write(self, text: str) -> None:
+        if self.started:
+            self.stream.write("\n")
+        self.stream.write(text)
+        self.started = True
+
+
+class MarkdownRenderer:
+    """
+    Renders InternalDoc blocks to Markdown.
+
+    Regular expressions are compiled once at import time and blocks are
+    dispatched through a per-type table.
+    """
+
+    def __init__(self, asset_map: Optional[Dict[str, str]] = None, document_name: str = "",
+                 image_action_lists: bool = True):
+        """
+        Args:
+            asset_map: Resource IDs mapped to their file paths.
+            document_name: The document name for image path generation.
+            image_action_lists: Render table cells of images followed by '– description'
+                parts as linked lists (off in degraded conversions, see core.utils.time_budget).
+        """
+        self.asset_map = asset_map or {}
+        self.document_name = document_name
+        self.image_action_lists = image_action_lists
+        self._block_renderers: Dict[str, Callable[[Block, ParentContext], str]] = {
+            "heading": self._render_heading,
+            "list": self._render_list,
+            "paragraph": self._render_paragraph,
+            "image": self._render_image,
+            "code": self._render_code,
+            "table": self._render_table,
+        }
+
+    # --- Public API ---
+
+    def render(self, doc: InternalDoc) -> str:
+        """Render a document into a Markdown string."""
+        buffer = io.StringIO()
+        self.render_to(buffer, doc)
+        return buffer.getvalue()
+
+    def render_to(self, stream: TextIO, doc: InternalDoc) -> None:
+        """Render a document as Markdown directly into a text stream."""
+        started = False
+        prev_list = False
+        for block in doc.blocks:
+            block_type = getattr(block, "type", None)
+            is_list = block_type == "list"
+            if started:
+                stream.write("\n" if is_list and prev_list else "\n\n")
+            started = True
+            prev_list = is_list
+            if is_list:
+                out = _LineWriter(stream)
+                self._emit_list(out, block, 0, ("list",))
+                out.flush()
+            elif block_type == "table":
+                for line_index, line in enumerate(self._table_lines(block, ())):
+                    if line_index:
+                        stream.write("\n")
+                    stream.write(line)
+            else:
+                stream.write(self.render_block(block))
+
+    def render_block(self, block: Block, parent_stack: ParentContext = ()) -> str:
+        """Render a single block element to its Markdown representation."""
+        render = self._block_renderers.get(block.type)
+        if render is None:
+            raise ValueError(f"Unknown block type: {block.type}")
+        return render(block, parent_stack)
+
+    # --- Inlines ---
+
+    def inline_text(self, inlines: List[Inline]) -> str:
+        """Render a run of inline elements."""
+        parts = []
+        for inline in inlines:
+            render = _INLINE_FORMATS.get(inline.type)
+            if render is None:
+                raise ValueError(f"Unknown inline type: {inline.type}")
+            parts.append(render(inline.content, getattr(inline, "href", None)))
+        return "".join(parts)
+
+    # --- Blocks ---
+
+    def _render_heading(self, block: Block, parent_stack: ParentContext) -> str:
         adjusted_level = max(1, block.level - 1)
-        clean_text = _clean_heading_text(block.text)
-        return f"{'#' * adjusted_level} {clean_text}"
-    if type == "list":
-        return _render_list_block(block, asset_map, 0, document_name, parent_stack + ("list",))
-    if type == "paragraph":
-        text = "".join(_render_inline(inline) for inline in block.inlines)
-        stripped = text.lstrip()
-        match = re.match(r"(?:[-*]\s+|\d+[.)]\s+)?#\s+(.*)", stripped)
-        if match:
-            command = match.group(1)
-            return f"```bash Terminal\n{command}\n```"
-        return text
-    if type == "image":
-        return _render_image(block, parent_stack)
-    if type == "code":
+        return f"{'#' * adjusted_level} {block.display_title}"
+
+    def _render_paragraph(self, block: Block, parent_stack: ParentContext) -> str:
+        text = self.inline_text(block.inlines)
+        command = _command_block(text)
+        return command if command is not None else text
+
+    def _render_image(self, block: Block, parent_stack: ParentContext) -> str:
+        """Render an image block depending on its parent context."""
+        sign_text = _image_sign_text(block)
+        if any(context in INLINE_CONTEXTS for context in parent_stack):
+            return f"[{sign_text}](/{block.resource_id}.png)"
+        return (
+            f"::sign-image\n"
+            f"---\n"
+            f"src: /{block.resource_id}.png\n"
+            f"sign: {sign_text}\n"
+            f"---\n"
+            f"::"
+        )
+
+    def _render_code(self, block: Block, parent_stack: ParentContext) -> str:
         info = []
         if block.language:
             info.append(block.language)
@@ -181,99 +216,142 @@ def _render_block(
             info.append(block.title)
         fence = " ".join(info)
         return f"```{fence}\n{block.code}\n```"
-    if type == "table":
-        def _render_image_action_list(cell) -> str | None:
-            blocks = list(cell.blocks)
-            if not blocks:
-                return None
-            images = []
-            index = 0
-            for block in blocks:
-                if getattr(block, "type", None) != "image":
-                    break
-                rendered_image = _render_block(
-                    block,
-                    asset_map,
-                    document_name,
-                    parent_stack + ("table",),
-                )
-                if rendered_image.startswith("::sign-image"):
-                    return None
-                images.append(block)
-                index += 1
-            if not images:
-                return None
-            tail_blocks = blocks[index:]
-            if len(tail_blocks) != 1:
-                return None
-            last_block = tail_blocks[0]
-            if getattr(last_block, "type", None) != "paragraph":
-                return None
-            paragraph_text = "".join(
-                _render_inline_for_table(inline) for inline in last_block.inlines
-            )
-            dash_pattern = re.compile(r"(?:(?<=^)|(?<=\s))[–—]\s*")
-            matches = dash_pattern.findall(paragraph_text)
-            if not matches:
-                return None
-            if len(matches) != len(images):
-                return None
-            parts = dash_pattern.split(paragraph_text)
-            if len(parts) != len(images) + 1:
+
+    def _render_list(self, block: Block, parent_stack: ParentContext) -> str:
+        buffer = io.StringIO()
+        out = _LineWriter(buffer)
+        self._emit_list(out, block, 0, parent_stack + ("list",))
+        out.flush()
+        return buffer.getvalue()
+
+    def _emit_list(self, out: _LineWriter, list_block: ListBlock, level: int, parent_stack: ParentContext) -> None:
+        """Emit a list block line by line with proper indentation and nested items."""
+        prefix = "  " * level
+        child_stack = parent_stack + ("list_item",)
+        for index, item in enumerate(list_block.items, start=1):
+            marker = f"{index}. " if list_block.ordered else "- "
+            item_blocks = item.blocks
+            start = 0
+            first_line = ""
+            if item_blocks and getattr(item_blocks[0], "type", None) == "paragraph":
+                first_line = _escape_list_item_text(self.inline_text(item_blocks[0].inlines).strip())
+                start = 1
+            marker_line = f"{prefix}{marker}{first_line}".rstrip()
+            if level:
+                # Nested list output used to be re-split by its parent list
+                marker_line = "\n".join(marker_line.splitlines())
+            out.line(marker_line)
+            for child in item_blocks[start:]:
+                if getattr(child, "type", None) == "list":
+                    if child.items:
+                        self._emit_list(out, child, level + 1, child_stack)
+                        out.drop_trailing_blank()
+                    continue
+                rendered_child = self.render_block(child, child_stack)
+                child_lines = rendered_child.splitlines() if rendered_child else [""]
+                for child_line in child_lines:
+                    out.line(f"{prefix}  {child_line}" if child_line else "")
+
+    # --- Tables ---
+
+    def _render_table(self, block: Block, parent_stack: ParentContext) -> str:
+        return "\n".join(self._table_lines(block, parent_stack))
+
+    def _table_lines(self, block: Block, parent_stack: ParentContext) -> Iterator[str]:
+        """Yield the Markdown lines of a table block row by row."""
+        yield from self._row_lines(block.header, parent_stack)
+        yield "| " + " | ".join(["---"] * len(block.header.cells)) + " |"
+        for row in block.rows:
+            yield from self._row_lines(row, parent_stack)
+
+    def _row_lines(self, row, parent_stack: ParentContext) -> Iterator[str]:
+        rendered_cells = [self._render_cell(cell, parent_stack) for cell in row.cells]
+        if any("\n" in cell for cell in rendered_cells):
+            split_cells = [cell.splitlines() for cell in rendered_cells]
+            max_lines = max(len(lines) for lines in split_cells)
+            for line_index in range(max_lines):
+                line_cells = [lines[line_index] if line_index < len(lines) else "" for lines in split_cells]
+                yield "| " + " | ".join(line_cells) + " |"
+            return
+        yield "| " + " | ".join(rendered_cells) + " |"
+
+    def _render_cell(self, cell, parent_stack: ParentContext) -> str:
+        special = self._render_image_action_list(cell) if self.image_action_lists else None
+        if special is not None:
+            return special
+        cell_parts = [self._render_block_for_table(b, parent_stack) for b in cell.blocks]
+        return " ".join(cell_parts).strip()
+
+    def _render_block_for_table(self, block: Block, parent_stack: ParentContext) -> str:
+        """Renders a block element for table cells with proper escaping."""
+        if block.type == "paragraph":
+            text = _escape_table_content(self.inline_text(block.inlines))
+            command = _command_block(text)
+            return command if command is not None else text
+        # For other block types, render normally with table context and escape
+        rendered = self.render_block(block, parent_stack + ("table",))
+        return _escape_table_content(rendered)
+
+    def _render_image_action_list(self, cell) -> Optional[str]:
+        """Render a cell of images followed by '– description' parts as a linked list."""
+        blocks = cell.blocks
+        if not blocks:
+            return None
+        # Images inside tables are always rendered inline, never as ::sign-image blocks
+        index = 0
+        while index < len(blocks) and getattr(blocks[index], "type", None) == "image":
+            index += 1
+        if not index or len(blocks) - index != 1:
+            return None
+        images = blocks[:index]
+        last_block = blocks[index]
+        if getattr(last_block, "type", None) != "paragraph":
+            return None
+        paragraph_text = _escape_table_content(self.inline_text(last_block.inlines))
+        matches = _DASH_RE.findall(paragraph_text)
+        if not matches or len(matches) != len(images):
+            return None
+        parts = _DASH_RE.split(paragraph_text)
+        if len(parts) != len(images) + 1:
+            return None
+        intro_text = parts[0].strip()
+        descriptions: List[str] = []
+        for segment in parts[1:]:
+            stripped = segment.strip()
+            if not stripped:
                 return None
-            intro_text = parts[0].strip()
-            descriptions: List[str] = []
-            for segment in parts[1:]:
-                stripped = segment.strip()
-                if not stripped:
-                    return None
-                descriptions.append(stripped)
-            list_lines: List[str] = []
-            if intro_text:
-                list_lines.append(intro_text)
-            for image, description in zip(images, descriptions):
-                caption = _escape_table_content(_image_sign_text(image))
-                item = f"- [{caption}](/{image.resource_id}.png)"
-                if description:
-                    item = f"{item} {description}"
-                list_lines.append(item)
-            return "\n".join(list_lines)
-
-        def _render_cell(cell) -> str:
-            special = _render_image_action_list(cell)
-            if special is not None:
-                return special
-            cell_parts = [
-                _render_block_for_table(
-                    b,
-                    asset_map,
-                    document_name,
-                    parent_stack,
-                )
-                for b in cell.blocks
-            ]
-            return " ".join(cell_parts).strip()
-
-        def _row(r) -> str:
-            rendered_cells = [_render_cell(cell) for cell in r.cells]
-            if any("\n" in cell for cell in rendered_cells):
-                split_cells = [cell.splitlines() for cell in rendered_cells]
-                max_lines = max(len(lines) for lines in split_cells)
-                padded_cells: List[List[str]] = [
-                    lines + [""] * (max_lines - len(lines)) for lines in split_cells
-                ]
-                assembled_lines = []
-                for line_index in range(max_lines):
-                    line_cells = [cells[line_index] for cells in padded_cells]
-                    assembled_lines.append("| " + " | ".join(line_cells) + " |")
-                return "\n".join(assembled_lines)
-            return "| " + " | ".join(rendered_cells) + " |"
-
-        header = _row(block.header)
-        sep = "| " + " | ".join(["---"] * len(block.header.cells)) + " |"
-        rows = [_row(r) for r in block.rows]
-        return "\n".join([header, sep, *rows])
-    raise ValueError(f"Unknown block type: {type}")
+            descriptions.append(stripped)
+        list_lines: List[str] = []
+        if intro_text:
+            list_lines.append(intro_text)
+        for image, description in zip(images, descriptions):
+            caption = _escape_table_content(_image_sign_text(image))
+            list_lines.append(f"- [{caption}](/{image.resource_id}.png) {description}")
+        return "\n".join(list_lines)
+
+
+def render_markdown_to(
+    stream: TextIO,
+    doc: InternalDoc,
+    asset_map: Dict[str, str],
+    document_name: str = "",
+    image_action_lists: bool = True,
+) -> None:
+    """
+    Renders an InternalDoc object as Markdown directly into a text stream.
+
+    Lines are written incrementally, so large chapters are never assembled
+    in memory as a single string. The output is identical to render_markdown.
+
+    Args:
+        stream: Writable text stream, e.g. an open file.
+        doc: The InternalDoc object to render.
+        asset_map: A dictionary mapping resource IDs to their file paths.
+        document_name: The document name for image path generation.
+        image_action_lists: Render cells of images and '– description' parts as lists.
+    """
+    MarkdownRenderer(asset_map, document_name, image_action_lists).render_to(stream, doc)
+
 
 def render_markdown(doc: InternalDoc, asset_map: Dict[str, str], document_name: str = "") -> str:
     """
@@ -288,19 +366,4 @@ def render_markdown(doc: InternalDoc, asset_map: Dict[str, str], document_name:
     Returns:
         A string containing the rendered Markdown document.
     """
-    markdown_lines = []
-    prev_list = False
-    for block in doc.blocks:
-        rendered = _render_block(block, asset_map, document_name)
-        is_list = getattr(block, "type", None) == "list"
-        if is_list:
-            if not prev_list and markdown_lines:
-                markdown_lines.append("")
-            markdown_lines.append(rendered)
-        else:
-            if markdown_lines:
-                markdown_lines.append("")
-            markdown_lines.append(rendered)
-        prev_list = is_list
-
-    return "\n".join(markdown_lines)
+    return MarkdownRenderer(asset_map, document_name).render(doc)
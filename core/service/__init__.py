@@ -0,0 +1 @@
+# Local conversion service: warm worker pool behind a localhost HTTP or Unix socket endpoint
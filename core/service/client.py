@@ -0,0 +1,93 @@
+"""Thin client of the local conversion service (see ``core.service.server``)."""
+from __future__ import annotations
+
+import http.client
+import json
+import socket
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+
+class ServiceError(RuntimeError):
+    """The service rejected or failed a request."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ServiceClient:
+    """
+    Submits conversions to a running ``doc2chapmd serve``.
+
+    ``url`` is ``http://host:port`` or ``unix:///path/to/socket``. A busy service
+    (503) is retried up to ``busy_retries`` times, waiting as its ``Retry-After``
+    header asks.
+    """
+
+    def __init__(self, url: str, timeout: Optional[float] = None, busy_retries: int = 60):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "unix"):
+            raise ValueError(f"unsupported service URL {url!r} (use http://host:port or unix:///path)")
+        self.url = url
+        self._parts = parts
+        self.timeout = timeout
+        self.busy_retries = busy_retries
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._parts.scheme == "unix":
+            return _UnixHTTPConnection(self._parts.path, timeout=self.timeout)
+        return http.client.HTTPConnection(self._parts.hostname, self._parts.port or 80, timeout=self.timeout)
+
+    def _request(self, method: str, path: str, body: bytes = b"", content_type: Optional[str] = None) -> Tuple[str, bytes]:
+        headers = {"Content-Type": content_type} if content_type else {}
+        for attempt in range(self.busy_retries + 1):
+            connection = self._connection()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                payload = response.read()
+            finally:
+                connection.close()
+            if response.status == 503 and attempt < self.busy_retries:
+                time.sleep(float(response.getheader("Retry-After") or 1))
+                continue
+            if response.status != 200:
+                try:
+                    message = json.loads(payload)["error"]
+                except (ValueError, KeyError, TypeError):
+                    message = payload.decode("utf-8", "replace")
+                raise ServiceError(response.status, message)
+            return response.getheader("Content-Type", ""), payload
+        raise AssertionError("unreachable")
+
+    def health(self) -> Dict[str, Any]:
+        _, payload = self._request("GET", "/health")
+        return json.loads(payload)
+
+    def convert(self, docx_path: str | Path, out_dir: str | Path, **options: Any) -> List[Path]:
+        """Convert a DOCX the service can read into ``out_dir``; returns the written paths."""
+        request = {"docx": str(Path(docx_path).resolve()), "out": str(Path(out_dir).resolve()), **options}
+        _, payload = self._request("POST", "/convert", json.dumps(request).encode("utf-8"), "application/json")
+        return [Path(path) for path in json.loads(payload)["written"]]
+
+    def convert_to_zip(self, docx_path: str | Path, **options: Any) -> bytes:
+        """Upload a DOCX and return the output tree as zip archive bytes."""
+        docx_path = Path(docx_path)
+        query = urlencode({"filename": docx_path.name, **options})
+        _, payload = self._request("POST", f"/convert?{query}", docx_path.read_bytes(), "application/octet-stream")
+        return payload
@@ -0,0 +1,316 @@
+"""
+Local conversion service behind ``doc2chapmd serve``.
+
+A pool of worker processes imports the parser and compiles the text rules once,
+then runs ``export_docx_hierarchy_centralized`` for every request, so save hooks
+and CI jobs skip the interpreter start-up and import cost of a fresh CLI call.
+
+HTTP API (localhost TCP port or Unix socket):
+
+* ``GET /health`` – pool size and queue occupancy as JSON.
+* ``POST /convert`` with a JSON body ``{"docx": <path>, "out": <dir>, ...options}``
+  converts a DOCX the server can read. With ``out`` the tree is written there and
+  the written paths are returned as JSON, otherwise the tree comes back as a zip.
+* ``POST /convert?filename=<name.docx>&...options`` with the DOCX as the request
+  body converts an upload the same way.
+
+Options are ``folder_name``, ``ast_export`` and ``parse_workers``. At most
+``workers + max_queue`` conversions are accepted at a time; further requests get
+``503 Service Unavailable`` with a ``Retry-After`` header instead of queueing
+without bound. With a metrics file the service keeps conversion counters and
+histograms and rewrites that Prometheus textfile after every conversion.
+"""
+from __future__ import annotations
+
+import io
+import json
+import os
+import socketserver
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Seconds a client is asked to wait after a 503
+RETRY_AFTER = 1
+
+
+class ServiceBusy(RuntimeError):
+    """All worker and queue slots of the service are taken."""
+
+
+def job_options(params: Mapping[str, Any]) -> Dict[str, Any]:
+    """Validate conversion options given as JSON values or query strings."""
+    options: Dict[str, Any] = {}
+    if params.get("folder_name"):
+        options["folder_name"] = str(params["folder_name"])
+    ast_export = params.get("ast_export", False)
+    if isinstance(ast_export, str):
+        ast_export = ast_export.lower() in ("1", "true", "yes")
+    if ast_export:
+        options["ast_export"] = True
+    if params.get("parse_workers") is not None:
+        try:
+            parse_workers = int(params["parse_workers"])
+        except (TypeError, ValueError):
+            raise ValueError(f"parse_workers must be an integer, got {params['parse_workers']!r}")
+        if parse_workers < 1:
+            raise ValueError("parse_workers must be at least 1")
+        if parse_workers > 1:
+            options["parse_workers"] = parse_workers
+    return options
+
+
+# --- Worker side ---
+
+def _warm_worker(template_cache_dir: Optional[str]) -> None:
+    """Pay the import and rule compilation cost once per worker process."""
+    from core.adapters.text_rules import default_text_rules
+    from core.output import hierarchical_writer  # noqa: F401
+    from core.utils.template_cache import configure_template_cache
+
+    if template_cache_dir:
+        configure_template_cache(template_cache_dir)
+    default_text_rules()
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _convert(docx_path: str, out_dir: str, options: Dict[str, Any], observer=None) -> List[str]:
+    from core.output.hierarchical_writer import export_docx_hierarchy_centralized
+
+    export_options = {key: value for key, value in options.items() if key != "folder_name"}
+    if observer is not None:
+        export_options["observer"] = observer
+    written = export_docx_hierarchy_centralized(docx_path, out_dir, options.get("folder_name"), **export_options)
+    return [str(path) for path in written]
+
+
+def _convert_to_zip(docx_path: str, options: Dict[str, Any], observer=None) -> bytes:
+    # The tree is zipped as it is produced, entries named as below the output root
+    buffer = io.BytesIO()
+    _convert(docx_path, ".", {**options, "output_format": "zip", "stream": buffer}, observer)
+    return buffer.getvalue()
+
+
+def _measured(fn, trace_heuristics: bool, docx_path: str, *args) -> Tuple[Any, Dict[str, Any]]:
+    """Run a conversion function with a ConversionStats observer; returns its result and the figures."""
+    from core.utils.metrics import ConversionStats
+
+    with ConversionStats(bytes_in=os.path.getsize(docx_path), trace_heuristics=trace_heuristics) as stats:
+        result = fn(docx_path, *args, observer=stats)
+    if isinstance(result, bytes):
+        stats.bytes_out = len(result)  # the zip sent back rather than the files in it
+    return result, stats.as_dict()
+
+
+# --- Pool ---
+
+class ConversionService:
+    """Pre-warmed process pool with a bounded number of accepted conversions."""
+
+    def __init__(self, workers: int = 1, max_queue: int = 8, template_cache_dir: Optional[str | Path] = None,
+                 metrics_file: Optional[str | Path] = None, trace_heuristics: bool = False):
+        """
+        With ``metrics_file`` conversions are measured and that Prometheus textfile is
+        rewritten after each; ``trace_heuristics`` adds the parser heuristics to it.
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if max_queue < 0:
+            raise ValueError("max_queue must not be negative")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.metrics_file = Path(metrics_file) if metrics_file else None
+        self.metrics = None
+        self.trace_heuristics = trace_heuristics
+        if self.metrics_file is not None:
+            from core.utils.metrics import ConversionMetrics
+
+            self.metrics = ConversionMetrics()
+            self.metrics.write(self.metrics_file)
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_warm_worker,
+            initargs=(str(template_cache_dir) if template_cache_dir else None,),
+        )
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._accepted = 0
+
+    def warm_up(self) -> None:
+        """Start every worker process now instead of on the first requests."""
+        for future in [self._pool.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise ServiceBusy(f"{self.workers} workers busy and {self.max_queue} conversions queued")
+        with self._lock:
+            self._accepted += 1
+        try:
+            if self.metrics is None:
+                return self._pool.submit(fn, *args).result()
+            return self._run_measured(fn, *args)
+        finally:
+            with self._lock:
+                self._accepted -= 1
+            self._slots.release()
+
+    def _run_measured(self, fn, *args):
+        try:
+            result, stats = self._pool.submit(_measured, fn, self.trace_heuristics, *args).result()
+        except BaseException:
+            self._record(None, False)
+            raise
+        self._record(stats, True)
+        return result
+
+    def _record(self, stats: Optional[Dict[str, Any]], success: bool) -> None:
+        self.metrics.record(stats, success)
+        try:
+            self.metrics.write(self.metrics_file)
+        except OSError:
+            # Metrics must not fail a conversion
+            pass
+
+    def convert(self, docx_path: str | Path, out_dir: str | Path, options: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Convert into ``out_dir`` and return the written paths."""
+        return self._run(_convert, str(docx_path), str(out_dir), options or {})
+
+    def convert_to_zip(self, docx_path: str | Path, options: Optional[Dict[str, Any]] = None) -> bytes:
+        """Convert and return the output tree as zip archive bytes."""
+        return self._run(_convert_to_zip, str(docx_path), options or {})
+
+    def status(self) -> Dict[str, int]:
+        with self._lock:
+            accepted = self._accepted
+        return {
+            "workers": self.workers,
+            "running": min(accepted, self.workers),
+            "queued": max(accepted - self.workers, 0),
+            "max_queue": self.max_queue,
+        }
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+# --- HTTP ---
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "doc2chapmd"
+
+    @property
+    def service(self) -> ConversionService:
+        return self.server.service
+
+    def address_string(self) -> str:
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status: HTTPStatus, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: HTTPStatus, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json", headers)
+
+    def do_GET(self) -> None:
+        if urlsplit(self.path).path != "/health":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"unknown path {self.path}"})
+            return
+        self._send_json(HTTPStatus.OK, {"status": "ok", **self.service.status()})
+
+    def do_POST(self) -> None:
+        url = urlsplit(self.path)
+        if url.path != "/convert":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"unknown path {self.path}"})
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        try:
+            if self.headers.get_content_type() == "application/json":
+                params = json.loads(body or b"{}")
+                if not isinstance(params, dict) or not params.get("docx"):
+                    raise ValueError("JSON request needs a 'docx' path")
+                self._convert(Path(params["docx"]), params)
+            else:
+                params = dict(parse_qsl(url.query))
+                filename = Path(params.get("filename") or "document.docx").name
+                with tempfile.TemporaryDirectory(prefix="doc2chapmd-upload-") as tmp:
+                    docx_path = Path(tmp) / filename
+                    docx_path.write_bytes(body)
+                    self._convert(docx_path, params)
+        except ServiceBusy as exc:
+            self._send_json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(exc)}, {"Retry-After": str(RETRY_AFTER)})
+        except (ValueError, json.JSONDecodeError) as exc:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
+        except FileNotFoundError as exc:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": str(exc)})
+        except Exception as exc:
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(exc).__name__}: {exc}"})
+
+    def _convert(self, docx_path: Path, params: Mapping[str, Any]) -> None:
+        options = job_options(params)
+        if not docx_path.is_file():
+            raise FileNotFoundError(f"DOCX file not found: {docx_path}")
+        if params.get("out"):
+            written = self.service.convert(docx_path, params["out"], options)
+            self._send_json(HTTPStatus.OK, {"written": written})
+        else:
+            archive = self.service.convert_to_zip(docx_path, options)
+            self._send(HTTPStatus.OK, archive, "application/zip")
+
+
+class _TCPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(
+    service: ConversionService,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: Optional[str | Path] = None,
+    verbose: bool = False,
+) -> socketserver.BaseServer:
+    """Bind the HTTP endpoint of ``service`` to a TCP port or, if given, a Unix socket."""
+    if socket_path is not None:
+        socket_path = Path(socket_path)
+        if socket_path.exists():
+            socket_path.unlink()
+        server = _UnixServer(str(socket_path), _Handler)
+    else:
+        server = _TCPServer((host, port), _Handler)
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def server_url(server: socketserver.BaseServer) -> str:
+    """Address of a server from ``make_server`` in the form the client accepts."""
+    if isinstance(server, _UnixServer):
+        return f"unix://{server.server_address}"
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
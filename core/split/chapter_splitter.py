@@ -1,7 +1,8 @@
 from typing import List, Set
 from pydantic import BaseModel
 
-from core.model.internal_doc import InternalDoc, Heading, Block
+from core.model.internal_doc import InternalDoc
+from core.model.outline import BlockRange, DocumentView, OutlineIndex
 
 class ChapterRules(BaseModel):
     """Defines the rules for splitting a document into chapters."""
@@ -9,87 +10,51 @@ class ChapterRules(BaseModel):
     # Special section titles that should be grouped with title page as chapter 0
     zero_chapter_sections: Set[str] = {"аннотация", "содержание", "ао \"нтц ит роса\""}
 
-def split_into_chapters(doc: InternalDoc, rules: ChapterRules) -> List[InternalDoc]:
+def split_into_chapters(doc: InternalDoc, rules: ChapterRules) -> List[DocumentView]:
     """
-    Splits a single InternalDoc into a list of InternalDocs, each representing a chapter.
+    Splits a single InternalDoc into chapters.
+
+    Chapters are views over block index ranges of ``doc`` taken from its outline
+    index, so no block lists are copied.
 
     Args:
         doc: The document to split.
         rules: The rules defining how to split the document.
 
     Returns:
-        A list of InternalDoc objects, where each is a chapter.
+        A list of DocumentView objects, where each is a chapter.
     """
     if not doc.blocks:
         return []
 
-    # First pass: collect zero-chapter blocks (title page, annotation, TOC, etc.)
-    zero_chapter_blocks: List[Block] = []
-    main_content_blocks: List[Block] = []
-    
-    collecting_zero_chapter = True
-    
-    for block in doc.blocks:
-        is_split_heading = isinstance(block, Heading) and block.level == rules.level
-        
-        if is_split_heading:
-            heading_text = block.text.strip().lower()
-            # Remove numbering and check if this should be in zero chapter
-            clean_heading = _clean_heading_for_comparison(heading_text)
-            
-            if clean_heading in rules.zero_chapter_sections:
-                # This heading belongs to zero chapter
-                zero_chapter_blocks.append(block)
-                collecting_zero_chapter = True
-            else:
-                # This is the first "real" chapter - stop collecting for zero chapter
-                collecting_zero_chapter = False
-                main_content_blocks.append(block)
+    outline = OutlineIndex.of(doc)
+    block_count = len(doc.blocks)
+    split_starts = [heading.index for heading in outline.headings_at_level(rules.level)]
+
+    # Blocks before the first split heading belong to zero chapter (title page, annotation, TOC, etc.)
+    zero_chapter_ranges: List[BlockRange] = [(0, split_starts[0] if split_starts else block_count)]
+    main_chapter_ranges: List[BlockRange] = []
+
+    for position, start in enumerate(split_starts):
+        end = split_starts[position + 1] if position + 1 < len(split_starts) else block_count
+        # Compare the title without its numbering to decide if this belongs to zero chapter
+        clean_heading = doc.blocks[start].display_title.lower()
+
+        if clean_heading in rules.zero_chapter_sections:
+            # This section belongs to zero chapter
+            zero_chapter_ranges.append((start, end))
         else:
-            if collecting_zero_chapter:
-                zero_chapter_blocks.append(block)
-            else:
-                main_content_blocks.append(block)
-    
-    # Now split main content into chapters
-    chapters: List[InternalDoc] = []
-    
+            # Every other split heading starts its own chapter
+            main_chapter_ranges.append((start, end))
+
+    chapters: List[DocumentView] = []
+
     # Add zero chapter if it has content
-    if zero_chapter_blocks:
-        chapters.append(InternalDoc(blocks=zero_chapter_blocks))
-    
-    # Split remaining content into chapters
-    current_chapter_blocks: List[Block] = []
-    
-    for block in main_content_blocks:
-        is_split_heading = isinstance(block, Heading) and block.level == rules.level
-        
-        if is_split_heading and current_chapter_blocks:
-            # Start of a new chapter, so we finalize the previous one
-            chapters.append(InternalDoc(blocks=current_chapter_blocks))
-            current_chapter_blocks = [block]  # Start the new chapter with the heading
-        else:
-            # Continue adding to the current chapter
-            current_chapter_blocks.append(block)
-    
-    # Add the last remaining chapter
-    if current_chapter_blocks:
-        chapters.append(InternalDoc(blocks=current_chapter_blocks))
-    
-    return chapters
+    zero_chapter = DocumentView(doc.blocks, zero_chapter_ranges, outline)
+    if zero_chapter.blocks:
+        chapters.append(zero_chapter)
 
+    for chapter_range in main_chapter_ranges:
+        chapters.append(DocumentView(doc.blocks, [chapter_range], outline))
 
-def _clean_heading_for_comparison(heading_text: str) -> str:
-    """
-    Clean heading text for comparison by removing numbers and extra formatting.
-    
-    Args:
-        heading_text: The raw heading text
-        
-    Returns:
-        Cleaned text for comparison
-    """
-    import re
-    # Remove various numbering patterns (1, 1.1, 0.0.0.0.0.0.0.0.1, etc.)
-    cleaned = re.sub(r'^\d+(\.\d+)*\.?\s*', '', heading_text)
-    return cleaned.strip().lower()
+    return chapters
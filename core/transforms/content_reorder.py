@@ -5,10 +5,41 @@ This transform addresses documents where content paragraphs are not properly
 positioned under their corresponding section headings across all chapters.
 """
 
-from typing import List, Dict, Optional, Tuple, Set
+import re
+from bisect import bisect_right
+from typing import List, Dict, Optional, Sequence
+
+from core.model.config import DEFAULT_REORDER_RULES, ReorderRule
 from core.model.internal_doc import InternalDoc, Block, Heading, Paragraph
+from core.transforms.engine import Transform
+
+
+class ContentReorder(Transform):
+    """
+    Moves misplaced paragraphs into their target sections.
+
+    Targets and matching paragraphs are collected while the engine walks the
+    top-level blocks; ``finish`` only rebuilds the block list when something moves.
+    """
+
+    name = "content_reorder"
 
-def run(doc: InternalDoc) -> InternalDoc:
+    def __init__(self, rules: Optional[Sequence[ReorderRule]] = None):
+        self.rules = rules
+        self._scan = _MoveScan(rules)
+
+    def visit_top_level(self, index: int, block: Block) -> None:
+        self._scan.add(index, block)
+
+    def finish(self, doc: InternalDoc) -> InternalDoc:
+        scan, self._scan = self._scan, _MoveScan(self.rules)
+        moves = scan.moves(len(doc.blocks))
+        if not moves:
+            return doc
+        return InternalDoc(blocks=_apply_content_moves(doc.blocks, moves))
+
+
+def run(doc: InternalDoc, rules: Optional[Sequence[ReorderRule]] = None) -> InternalDoc:
     """
     Reorders specific misplaced content throughout the document.
     
@@ -17,6 +48,7 @@ def run(doc: InternalDoc) -> InternalDoc:
     
     Args:
         doc: The document to fix
+        rules: Reorder rules to apply. Defaults to DEFAULT_REORDER_RULES.
         
     Returns:
         Document with reordered content
@@ -25,117 +57,141 @@ def run(doc: InternalDoc) -> InternalDoc:
         return doc
     
     # Only fix specific known misplaced content, not rebuild entire structure
-    return _fix_misplaced_content(doc)
+    return _fix_misplaced_content(doc, rules)
 
 
-def _fix_misplaced_content(doc: InternalDoc) -> InternalDoc:
+def _fix_misplaced_content(doc: InternalDoc, rules: Optional[Sequence[ReorderRule]] = None) -> InternalDoc:
     """
     Fix specific misplaced content blocks without completely rebuilding document structure.
     
     This preserves the natural document flow while moving only clearly misplaced content.
     """
-    blocks = doc.blocks[:]  # Copy blocks list
-    
-    # Find specific misplaced content that needs to be moved
-    moves = _identify_content_moves(blocks)
-    
-    # Apply the moves
-    for move in moves:
-        blocks = _apply_content_move(blocks, move)
-    
-    return InternalDoc(blocks=blocks)
+    moves = _identify_content_moves(doc.blocks, rules)
+    if not moves:
+        return doc
+    return InternalDoc(blocks=_apply_content_moves(doc.blocks, moves))
 
 
-def _identify_content_moves(blocks: List[Block]) -> List[Dict]:
-    """Identify specific content blocks that need to be moved."""
-    
-    moves = []
-    
-    # Find chapter and section boundaries
-    chapter_boundaries = {}
-    section_boundaries = {}
-    
-    for i, block in enumerate(blocks):
+def _paragraph_text(block: Paragraph) -> str:
+    return "".join(inline.content for inline in block.inlines if hasattr(inline, "content"))
+
+
+def _section_breaks(headings: Sequence[tuple], levels: set) -> Dict[int, List[int]]:
+    """Indices of the headings that close a section of each level, from (index, level) pairs."""
+    return {level: [i for i, heading_level in headings if heading_level <= level] for level in levels}
+
+
+def _section_end(breaks: List[int], target_idx: int, end: int) -> int:
+    """Index of the next section break after the target heading, or the end of the document."""
+    position = bisect_right(breaks, target_idx)
+    return breaks[position] if position < len(breaks) else end
+
+
+class _MoveScan:
+    """
+    Collects target headings and the first paragraph each rule matches, one
+    top-level block at a time, and turns them into moves.
+    """
+
+    def __init__(self, rules: Optional[Sequence[ReorderRule]] = None):
+        self.rules = DEFAULT_REORDER_RULES if rules is None else rules
+        self._patterns = [re.compile(rule.pattern) if rule.pattern else None for rule in self.rules]
+        self._targets = {(rule.target, rule.target_level) for rule in self.rules}
+        self._heading_index: Dict[tuple, int] = {}
+        self._headings: List[tuple] = []
+        self._first_match: Dict[int, int] = {}
+        self._pending = list(range(len(self.rules)))
+
+    def add(self, i: int, block: Block) -> None:
+        """Record the top-level block at index ``i``."""
         if isinstance(block, Heading):
-            if block.level == 2:
-                chapter_boundaries[block.text.strip()] = i
-            elif block.level == 3:
-                section_boundaries[block.text.strip()] = i
-    
-    # Specific content that should be moved to section 2.1
-    section_2_1_content = [
-        "Состав архитектуры Комплекса включает в себя следующие части",
-        "CMS-сервер (Winter CMS) — основной элемент серверной части",
-        "плагины Winter CMS — модули, расширяющие функциональность CMS",
-        "обратный прокси (Traefik) — обеспечивает маршрутизацию",
-        "СУБД PostgreSQL — хранение основной структурированной информации",
-        "кеширующая система Redis — хранение сессий и промежуточных данных",
-        "система поиска Typesense — полнотекстовый поиск",
-        "интеграция с внешней системой аутентификации РОСА ID"
-    ]
-    
-    # Find these content blocks and mark them for moving
-    section_2_1_idx = section_boundaries.get("2.1 Основные компоненты")
-    if section_2_1_idx is not None:
-        
-        for content_text in section_2_1_content:
-            for i, block in enumerate(blocks):
-                if isinstance(block, Paragraph) and block.inlines:
-                    text = ""
-                    for inline in block.inlines:
-                        if hasattr(inline, 'content'):
-                            text += inline.content
-                    
-                    if content_text in text:
-                        # Check if this block is NOT already in the right place
-                        # (i.e., it's not between section 2.1 and the next section)
-                        next_section_idx = _find_next_section_after(blocks, section_2_1_idx)
-                        
-                        if not (section_2_1_idx < i < next_section_idx):
-                            moves.append({
-                                'block_idx': i,
-                                'target_section_idx': section_2_1_idx,
-                                'content_preview': content_text[:50] + "...",
-                                'move_type': 'to_section_end'
-                            })
-                        break
-    
-    return moves
+            self._headings.append((i, block.level))
+            key = (block.text.strip(), block.level)
+            if key in self._targets:
+                self._heading_index[key] = i
+        elif self._pending and isinstance(block, Paragraph) and block.inlines:
+            text = _paragraph_text(block)
+            still_pending = []
+            for rule_idx in self._pending:
+                rule = self.rules[rule_idx]
+                pattern = self._patterns[rule_idx]
+                if (rule.match and rule.match in text) or (pattern is not None and pattern.search(text)):
+                    self._first_match[rule_idx] = i
+                else:
+                    still_pending.append(rule_idx)
+            self._pending = still_pending
 
+    def moves(self, block_count: int) -> List[Dict]:
+        """
+        Moves of the recorded blocks, in rule order.
 
-def _find_next_section_after(blocks: List[Block], section_idx: int) -> int:
-    """Find the index of the next section heading after the given section."""
-    for i in range(section_idx + 1, len(blocks)):
-        if isinstance(blocks[i], Heading) and blocks[i].level <= 3:
-            return i
-    return len(blocks)
+        Each rule moves the first paragraph it matches, unless that paragraph
+        already lies inside the target section.
+        """
+        if not self._first_match:
+            return []
+        breaks = _section_breaks(self._headings, {rule.target_level for rule in self.rules})
+        moves = []
+        moved = set()
+        for rule_idx, rule in enumerate(self.rules):
+            block_idx = self._first_match.get(rule_idx)
+            target_idx = self._heading_index.get((rule.target, rule.target_level))
+            if block_idx is None or target_idx is None or block_idx in moved:
+                continue
+            # The target section ends at the next heading of its level or above
+            next_section_idx = _section_end(breaks[rule.target_level], target_idx, block_count)
+            if target_idx < block_idx < next_section_idx:
+                continue
+            moved.add(block_idx)
+            preview = rule.match or rule.pattern
+            moves.append({
+                'block_idx': block_idx,
+                'target_section_idx': target_idx,
+                'content_preview': preview[:50] + "...",
+                'move_type': 'to_section_end'
+            })
+        return moves
 
 
-def _apply_content_move(blocks: List[Block], move: Dict) -> List[Block]:
-    """Apply a single content move to the blocks list."""
-    
-    block_to_move = blocks[move['block_idx']]
-    
-    # Remove the block from its current position
-    new_blocks = blocks[:move['block_idx']] + blocks[move['block_idx'] + 1:]
-    
-    # Adjust target index due to removal
-    target_idx = move['target_section_idx']
-    if move['block_idx'] < target_idx:
-        target_idx -= 1
-    
-    # Find insertion point (after the section heading, at the end of section content)
-    if move['move_type'] == 'to_section_end':
-        next_section_idx = _find_next_section_after(new_blocks, target_idx)
-        # Insert just before the next section/chapter
-        insert_idx = next_section_idx
-    else:
-        # Insert right after the section heading
-        insert_idx = target_idx + 1
-    
-    # Insert the moved block
-    new_blocks = new_blocks[:insert_idx] + [block_to_move] + new_blocks[insert_idx:]
-    
-    return new_blocks
+def _identify_content_moves(blocks: List[Block], rules: Optional[Sequence[ReorderRule]] = None) -> List[Dict]:
+    """
+    Identify content blocks that need to be moved, in a single pass over the blocks.
 
+    Each rule moves the first paragraph it matches, unless that paragraph already
+    lies inside the target section. Moves are returned in rule order.
+    """
+    scan = _MoveScan(rules)
+    for i, block in enumerate(blocks):
+        scan.add(i, block)
+    return scan.moves(len(blocks))
+
+
+def _apply_content_moves(blocks: List[Block], moves: List[Dict]) -> List[Block]:
+    """
+    Apply all moves at once, rebuilding the block list in a single pass.
+
+    Moved blocks are gathered into per-section buckets and emitted in move order,
+    either right after the target heading or just before the next heading of
+    the target's level or above.
+    """
+    moved = {move['block_idx'] for move in moves}
+    headings = [(i, block.level) for i, block in enumerate(blocks) if isinstance(block, Heading)]
+    breaks = _section_breaks(headings, {blocks[move['target_section_idx']].level for move in moves})
+    buckets: Dict[int, List[Block]] = {}
+    for move in moves:
+        if move['move_type'] == 'to_section_end':
+            target_idx = move['target_section_idx']
+            insert_idx = _section_end(breaks[blocks[target_idx].level], target_idx, len(blocks))
+        else:
+            insert_idx = move['target_section_idx'] + 1
+        buckets.setdefault(insert_idx, []).append(blocks[move['block_idx']])
+
+    new_blocks: List[Block] = []
+    for i, block in enumerate(blocks):
+        if i in buckets:
+            new_blocks.extend(buckets[i])
+        if i not in moved:
+            new_blocks.append(block)
+    new_blocks.extend(buckets.get(len(blocks), []))
+    return new_blocks
 
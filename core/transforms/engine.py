@@ -0,0 +1,160 @@
+"""
+Fused transform engine.
+
+Transforms register as visitors over blocks and inlines. The engine walks the
+document once, including list items and table cells, and calls every transform
+on each node, so adding a transform does not add another full document walk.
+Transforms that work on the top-level block sequence (e.g. content reordering)
+collect what they need in ``visit_top_level`` and change the document in
+``finish``, which runs after the traversal.
+"""
+from __future__ import annotations
+
+import time
+from typing import Dict, List, Optional, Sequence
+
+from core.model.internal_doc import Block, Inline, InternalDoc
+
+
+class Transform:
+    """Base class for document transforms. Override only the hooks you need."""
+
+    name = "transform"
+
+    def visit_block(self, block: Block) -> None:
+        """Called for every block, nested ones included. Modify the block in place."""
+
+    def visit_inline(self, inline: Inline) -> None:
+        """Called for every inline of every paragraph. Modify the inline in place."""
+
+    def visit_top_level(self, index: int, block: Block) -> None:
+        """Called for every top-level block with its index, after everything in it has been visited."""
+
+    def finish(self, doc: InternalDoc) -> InternalDoc:
+        """Called once after the traversal. May return a new document."""
+        return doc
+
+
+def _overrides(transform: Transform, hook: str) -> bool:
+    return getattr(type(transform), hook) is not getattr(Transform, hook)
+
+
+class TransformEngine:
+    """
+    Runs a sequence of transforms fused into a single document traversal.
+
+    With ``timed`` every visit is clocked into ``stats``; without it only the
+    ``finish`` calls are, and the traversal reads no clock at all.
+    """
+
+    def __init__(self, transforms: Sequence[Transform], timed: bool = True):
+        self.transforms = list(transforms)
+        self.timed = timed
+        self._block_visitors = [t for t in self.transforms if _overrides(t, "visit_block")]
+        self._inline_visitors = [t for t in self.transforms if _overrides(t, "visit_inline")]
+        self._top_visitors = [t for t in self.transforms if _overrides(t, "visit_top_level")]
+        self._finishers = [t for t in self.transforms if _overrides(t, "finish")]
+        self.stats: Dict[str, float] = {}
+
+    def run(self, doc: InternalDoc) -> InternalDoc:
+        """
+        Apply all transforms to the document.
+
+        Per-transform cost in seconds is available in ``stats`` afterwards.
+        """
+        self.stats = {t.name: 0.0 for t in self.transforms}
+        walk = self._walk_timed if self.timed else self._walk
+        if self._top_visitors:
+            self._walk_top_level(doc.blocks, walk)
+        elif self._block_visitors or self._inline_visitors:
+            walk(doc.blocks)
+        for transform in self._finishers:
+            start = time.perf_counter()
+            doc = transform.finish(doc)
+            self.stats[transform.name] += time.perf_counter() - start
+        return doc
+
+    def _walk_top_level(self, blocks: List[Block], walk) -> None:
+        # Each top-level block is walked on its own so the top-level visitors see it finished
+        stats = self.stats
+        top_visitors = self._top_visitors
+        clock = time.perf_counter
+        for index, block in enumerate(blocks):
+            walk((block,))
+            for transform in top_visitors:
+                if not self.timed:
+                    transform.visit_top_level(index, block)
+                    continue
+                start = clock()
+                transform.visit_top_level(index, block)
+                stats[transform.name] += clock() - start
+
+    def _walk(self, blocks: List[Block]) -> None:
+        block_visitors = self._block_visitors
+        inline_visitors = self._inline_visitors
+        for block in blocks:
+            for transform in block_visitors:
+                transform.visit_block(block)
+            block_type = block.type
+            if block_type == "paragraph":
+                if inline_visitors:
+                    for inline in block.inlines:
+                        for transform in inline_visitors:
+                            transform.visit_inline(inline)
+            elif block_type == "list":
+                for item in block.items:
+                    self._walk(item.blocks)
+            elif block_type == "table":
+                for row in [block.header, *block.rows]:
+                    for cell in row.cells:
+                        self._walk(cell.blocks)
+
+    def _walk_timed(self, blocks: List[Block]) -> None:
+        # One clock reading per visit: each visit ends where the next one starts
+        stats = self.stats
+        block_visitors = self._block_visitors
+        inline_visitors = self._inline_visitors
+        clock = time.perf_counter
+        for block in blocks:
+            start = clock()
+            for transform in block_visitors:
+                transform.visit_block(block)
+                now = clock()
+                stats[transform.name] += now - start
+                start = now
+            block_type = block.type
+            if block_type == "paragraph":
+                if inline_visitors:
+                    for inline in block.inlines:
+                        for transform in inline_visitors:
+                            transform.visit_inline(inline)
+                            now = clock()
+                            stats[transform.name] += now - start
+                            start = now
+            elif block_type == "list":
+                for item in block.items:
+                    self._walk_timed(item.blocks)
+            elif block_type == "table":
+                for row in [block.header, *block.rows]:
+                    for cell in row.cells:
+                        self._walk_timed(cell.blocks)
+
+
+def run_transforms(doc: InternalDoc, transforms: Sequence[Transform], stats: Optional[Dict[str, float]] = None) -> InternalDoc:
+    """
+    Run transforms over a document in one fused traversal.
+
+    Args:
+        doc: The document to transform
+        transforms: Transforms in the order they should see each node
+        stats: Optional dictionary that receives per-transform cost in seconds;
+            without it the traversal is not timed
+
+    Returns:
+        The transformed document
+    """
+    engine = TransformEngine(transforms, timed=stats is not None)
+    doc = engine.run(doc)
+    if stats is not None:
+        stats.update(engine.stats)
+    return doc
@@ -1,13 +1,50 @@
-from core.model.internal_doc import InternalDoc
+from core.model.internal_doc import Block, Inline, InternalDoc
+from core.transforms.engine import Transform, run_transforms
+
+# Soft hyphens and invisible characters that Word leaves in text.
+# Zero-width (non-)joiners are kept because they affect how some scripts render.
+_INVISIBLE_CHARS = str.maketrans({
+    "\u00ad": None,  # soft hyphen
+    "\u200b": None,  # zero width space
+    "\u2060": None,  # word joiner
+    "\ufeff": None,  # zero width no-break space (BOM)
+})
+
+
+def clean_text(text: str) -> str:
+    """Remove soft hyphens and zero-width characters from text."""
+    return text.translate(_INVISIBLE_CHARS)
+
+
+class NormalizeText(Transform):
+    """
+    Normalizes text in the document's AST.
+
+    - Removes soft hyphens and zero-width spaces from inline text, headings
+      and image captions (code is left untouched)
+    """
+
+    name = "normalize"
+
+    def visit_block(self, block: Block) -> None:
+        if block.type == "heading":
+            text = clean_text(block.text)
+            if text != block.text:
+                block.set_text(text)
+        elif block.type == "image":
+            block.caption = clean_text(block.caption)
+            block.alt = clean_text(block.alt)
+
+    def visit_inline(self, inline: Inline) -> None:
+        if inline.type != "code":
+            inline.content = clean_text(inline.content)
+
 
 def run(doc: InternalDoc) -> InternalDoc:
     """
     Performs normalization on the document's AST.
-    (Placeholder for future implementation)
-    
-    - Trim whitespace
-    - Fix soft hyphens
-    - Merge broken paragraphs
-    """
-    # For now, it's a no-op
-    return doc
+
+    See NormalizeText; to combine it with other transforms in one traversal
+    use core.transforms.engine.run_transforms.
+    """
+    return run_transforms(doc, [NormalizeText()])
@@ -0,0 +1,208 @@
+"""
+CPU profiling of a conversion for ``doc2chapmd profile``.
+
+``CpuProfiler`` runs the block under cProfile and, at the same time, samples
+the stack of the profiled thread at a fixed interval. cProfile gives exact call
+counts and times (saved as ``.pstats`` for pstats, snakeviz and friends); the
+samples are written as collapsed stacks, one ``frame;frame;... count`` line per
+distinct stack, which flamegraph.pl, inferno and speedscope read directly.
+
+Frames are labelled ``module:function`` with the dotted module name, so the
+flame graph and the summary use the same names (``core.adapters.docx_parser``).
+"""
+from __future__ import annotations
+
+import cProfile
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Package whose modules are reported individually; everything else is grouped by top-level package
+_OWN_PACKAGE = "core"
+
+
+def _module_index() -> Dict[str, str]:
+    """Source file -> dotted module name of the modules imported so far."""
+    index = {}
+    for name, module in list(sys.modules.items()):
+        filename = getattr(module, "__file__", None)
+        if filename:
+            index[os.path.normcase(os.path.abspath(filename))] = name
+    return index
+
+
+def module_name(filename: str, index: Optional[Dict[str, str]] = None) -> str:
+    """Dotted module name of a source file (``builtins`` for C functions)."""
+    if filename in ("~", ""):
+        return "builtins"
+    if filename.startswith("<frozen "):
+        return filename[len("<frozen "):-1]
+    if filename.startswith("<"):
+        return filename
+    index = index if index is not None else _module_index()
+    name = index.get(os.path.normcase(os.path.abspath(filename)))
+    return name if name is not None else Path(filename).stem
+
+
+def module_group(module: str) -> str:
+    """Summary group of a module: our own modules by their last name part, others by top-level package."""
+    parts = module.split(".")
+    if parts[0] == _OWN_PACKAGE and len(parts) > 1:
+        return parts[-1]
+    return parts[0]
+
+
+class StackSampler:
+    """Counts the stacks of one thread, sampled every ``interval`` seconds from a background thread."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: Counter = Counter()  # tuple of code objects, outermost first -> count
+        self._thread_id = 0
+        self._base = None  # frame that entered the sampler; it and its callers are left out
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "StackSampler":
+        self.start(sys._getframe(1))
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def start(self, base) -> None:
+        """Sample the calling thread below the frame ``base``."""
+        self._thread_id = threading.get_ident()
+        self._base = base
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._base = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None and frame is not self._base:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            # Samples inside the profiler switching itself off are dropped
+            if stack and stack[-1].co_filename != __file__:
+                self.samples[tuple(reversed(stack))] += 1
+
+    def collapsed(self) -> List[str]:
+        """Collapsed stack lines, ``module:function;...;module:function count``."""
+        index = _module_index()
+        labels: Dict[object, str] = {}
+
+        def label(code) -> str:
+            if code not in labels:
+                name = f"{module_name(code.co_filename, index)}:{getattr(code, 'co_qualname', code.co_name)}"
+                # ';' separates frames and the last space the count
+                labels[code] = name.replace(";", ":").replace(" ", "_")
+            return labels[code]
+
+        counts: Counter = Counter()
+        for stack, count in self.samples.items():
+            counts[";".join(label(code) for code in stack)] += count
+        return [f"{stack} {count}" for stack, count in sorted(counts.items())]
+
+
+@dataclass
+class FunctionTime:
+    function: str
+    calls: int
+    self_seconds: float
+    cumulative_seconds: float
+
+
+@dataclass
+class ModuleTime:
+    module: str
+    own: bool = False  # one of our modules rather than a library group
+    self_seconds: float = 0.0
+    functions: List[FunctionTime] = field(default_factory=list)
+
+
+def _function_label(key: Tuple[str, int, str]) -> str:
+    filename, lineno, name = key
+    if filename == "~":
+        return name
+    return f"{name} (line {lineno})"
+
+
+def module_summary(stats: pstats.Stats, top: int = 5) -> List[ModuleTime]:
+    """
+    Functions grouped by module group, functions by cumulative time.
+
+    Our own modules come first, then the library groups; both by self time.
+    """
+    index = _module_index()
+    groups: Dict[str, ModuleTime] = {}
+    for key, (_, calls, self_seconds, cumulative_seconds, _) in stats.stats.items():
+        module = module_name(key[0], index)
+        if module == __name__:
+            continue  # the profiler switching itself off
+        group = module_group(module)
+        record = groups.setdefault(group, ModuleTime(group, module.startswith(_OWN_PACKAGE + ".")))
+        record.self_seconds += self_seconds
+        record.functions.append(FunctionTime(_function_label(key), calls, self_seconds, cumulative_seconds))
+    for record in groups.values():
+        record.functions.sort(key=lambda function: function.cumulative_seconds, reverse=True)
+        del record.functions[top:]
+    return sorted(groups.values(), key=lambda record: (not record.own, -record.self_seconds))
+
+
+def format_summary(summary: List[ModuleTime], total_seconds: float, libraries: int = 6) -> str:
+    """Human-readable form of ``module_summary``: all our modules and the ``libraries`` busiest library groups."""
+    lines = [f"Total {total_seconds:.2f}s; top functions by cumulative time per module:"]
+    shown = [record for record in summary if record.own] + [record for record in summary if not record.own][:libraries]
+    for record in shown:
+        lines.append("")
+        lines.append(f"{record.module}  self {record.self_seconds:.3f}s")
+        for function in record.functions:
+            lines.append(
+                f"  {function.cumulative_seconds:8.3f}s cum {function.self_seconds:8.3f}s self"
+                f" {function.calls:>9} calls  {function.function}"
+            )
+    return "\n".join(lines)
+
+
+class CpuProfiler:
+    """cProfile and a stack sampler around a block; ``save`` writes the results."""
+
+    def __init__(self, interval: float = 0.005):
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(interval)
+
+    def __enter__(self) -> "CpuProfiler":
+        self.sampler.start(sys._getframe(1))
+        self.profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.profile.disable()
+        self.sampler.stop()
+
+    def stats(self) -> pstats.Stats:
+        return pstats.Stats(self.profile)
+
+    def save(self, prefix: str | os.PathLike) -> Tuple[Path, Path]:
+        """Write ``<prefix>.pstats`` and ``<prefix>.collapsed``; returns both paths."""
+        prefix = Path(prefix)
+        prefix.parent.mkdir(parents=True, exist_ok=True)
+        pstats_path = prefix.with_name(prefix.name + ".pstats")
+        collapsed_path = prefix.with_name(prefix.name + ".collapsed")
+        self.profile.dump_stats(pstats_path)
+        collapsed_path.write_text("".join(line + "\n" for line in self.sampler.collapsed()), encoding="utf-8")
+        return pstats_path, collapsed_path
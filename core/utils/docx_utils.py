@@ -1,13 +1,32 @@
 """DOCX parsing utilities shared across modules."""
 
+import io
+import os
 import zipfile
 import re
-from typing import Dict, List, Optional
+from typing import BinaryIO, Dict, List, Optional, Union
 from xml.etree import ElementTree as ET
 
 from .xml_constants import NS, DEFAULT_HEADING_PATTERNS
 from core.numbering.heading_numbering import SERVICE_HEADINGS
 
+# A DOCX given as a path, its bytes or a readable binary file object
+DocxSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+
+def docx_source(source: DocxSource) -> Union[str, io.BytesIO]:
+    """Normalize a DOCX source into something zipfile can open repeatedly.
+
+    Paths stay paths; bytes and file objects become a BytesIO (bytes are not copied).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    if isinstance(source, io.BytesIO):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(bytes(source))
+    return io.BytesIO(source.read())
+
 
 def read_docx_part(zip_file: zipfile.ZipFile, part_name: str) -> Optional[bytes]:
     """Read a part from DOCX archive, returning None if not found.
@@ -0,0 +1,109 @@
+"""
+Structured progress events for orchestrators (``--events jsonl``).
+
+Every event is one JSON object per line with at least ``event`` (its kind)
+and ``time`` (Unix seconds); the conversion events also carry ``job``:
+
+* ``job_started`` – ``input``, ``bytes_in``
+* ``stage_started`` / ``stage_finished`` – ``stage``, and ``seconds`` when finished
+* ``progress`` – ``stage``, ``done`` and ``total`` units of work (body elements of the parse)
+* ``job_finished`` – ``seconds``, ``outputs`` (files written), ``bytes_out``, ``images``,
+  ``degraded`` (the time budget ran out)
+* ``job_failed`` – ``seconds``, ``error`` and for killed batch jobs ``limit``
+
+Batch runs add ``batch_started`` (``total``) and ``batch_finished`` (``converted``,
+``failed``, ``seconds``) around the jobs. Lines are flushed as they are written so
+that a scheduler reading the stream sees stalls as they happen.
+"""
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, TextIO
+
+from core.utils.stages import StageObserver
+
+EVENT_FORMATS = ("jsonl",)
+
+
+class EventWriter:
+    """Writes events as JSON Lines to a text stream (thread-safe)."""
+
+    def __init__(self, stream: TextIO, owns_stream: bool = False):
+        self.stream = stream
+        self.owns_stream = owns_stream
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, target: str) -> "EventWriter":
+        """Writer to stdout for ``-``, otherwise appending to the file ``target``."""
+        if target == "-":
+            return cls(sys.stdout)
+        return cls(open(target, "a", encoding="utf-8"), owns_stream=True)
+
+    def emit(self, event: str, **fields: Any) -> None:
+        self.write_line(json.dumps({"event": event, "time": round(time.time(), 3), **fields}, ensure_ascii=False))
+
+    def write_line(self, line: str) -> None:
+        """Write an already encoded event (e.g. one relayed from a child process)."""
+        with self._lock:
+            self.stream.write(line.rstrip("\n") + "\n")
+            self.stream.flush()
+
+    def close(self) -> None:
+        if self.owns_stream:
+            self.stream.close()
+
+
+class EventObserver(StageObserver):
+    """Emits the stage and progress events of one conversion job."""
+
+    def __init__(self, events: EventWriter, job: str):
+        self.events = events
+        self.job = job
+        self.images = 0
+        self.bytes_out: Optional[int] = None  # as reported by the exporters
+        self._started = time.perf_counter()
+
+    def stage_started(self, name: str) -> None:
+        self.events.emit("stage_started", job=self.job, stage=name)
+
+    def stage_finished(self, name: str, seconds: float) -> None:
+        self.events.emit("stage_finished", job=self.job, stage=name, seconds=round(seconds, 6))
+
+    def progress(self, stage: str, done: int, total: int) -> None:
+        self.events.emit("progress", job=self.job, stage=stage, done=done, total=total)
+
+    def images_exported(self, count: int) -> None:
+        self.images += count
+
+    def output_written(self, size: int) -> None:
+        self.bytes_out = size
+
+    def job_started(self, input_path: str, bytes_in: int) -> None:
+        self._started = time.perf_counter()
+        self.events.emit("job_started", job=self.job, input=input_path, bytes_in=bytes_in)
+
+    def job_finished(self, outputs: int, bytes_out: Optional[int], degraded: bool = False) -> None:
+        self.events.emit("job_finished", job=self.job, seconds=self._elapsed(), outputs=outputs,
+                         bytes_out=bytes_out, images=self.images, degraded=degraded)
+
+    def job_failed(self, error: str, limit: Optional[str] = None) -> None:
+        fields = {"limit": limit} if limit is not None else {}
+        self.events.emit("job_failed", job=self.job, seconds=self._elapsed(), error=error, **fields)
+
+    @contextmanager
+    def running(self, input_path: str, bytes_in: int) -> Iterator["EventObserver"]:
+        """Emit ``job_started`` now and ``job_failed`` if the block raises (``job_finished`` is the caller's)."""
+        self.job_started(input_path, bytes_in)
+        try:
+            yield self
+        except BaseException as exc:
+            self.job_failed(f"{type(exc).__name__}: {exc}" if str(exc) else type(exc).__name__)
+            raise
+
+    def _elapsed(self) -> float:
+        return round(time.perf_counter() - self._started, 6)
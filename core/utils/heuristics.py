@@ -0,0 +1,85 @@
+"""
+Calls, hits and time of the parser heuristics.
+
+A parse that is asked for statistics wraps its heuristic functions with
+``HeuristicStats.timed`` and calls the wrappers instead of the plain functions,
+so every call is recorded into the stats of that parse only. Without statistics
+the parser calls its plain functions with no overhead at all. Worker processes
+of a parallel parse record into their own stats and send them back to be
+``merge``d.
+"""
+from __future__ import annotations
+
+import functools
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict
+
+
+def _truthy(args: tuple, result: Any) -> bool:
+    return bool(result)
+
+
+@dataclass
+class HeuristicRecord:
+    calls: int = 0
+    hits: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class HeuristicStats:
+    """Calls, hits and cumulative seconds per heuristic name."""
+
+    records: Dict[str, HeuristicRecord] = field(default_factory=dict)
+
+    def record(self, name: str) -> HeuristicRecord:
+        return self.records.setdefault(name, HeuristicRecord())
+
+    def timed(self, name: str, function: Callable, hit: Callable[[tuple, Any], bool] = _truthy) -> Callable:
+        """
+        ``function`` recording its calls under ``name``; ``hit`` tells from the
+        call arguments and the result whether the heuristic fired.
+        """
+        record = self.record(name)
+        clock = time.perf_counter
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            result = function(*args, **kwargs)
+            record.seconds += clock() - start
+            record.calls += 1
+            if hit(args, result):
+                record.hits += 1
+            return result
+
+        return wrapper
+
+    def merge(self, records: Dict[str, dict]) -> None:
+        """Add ``as_dict()`` records of another parse (e.g. of a worker process)."""
+        for name, other in records.items():
+            record = self.record(name)
+            record.calls += other["calls"]
+            record.hits += other["hits"]
+            record.seconds += other["seconds"]
+
+    def as_dict(self) -> Dict[str, dict]:
+        return {name: asdict(record) for name, record in self.records.items()}
+
+    def drain(self) -> Dict[str, dict]:
+        """``as_dict()`` of the records so far, which then start again from zero."""
+        records = self.as_dict()
+        for record in self.records.values():
+            record.calls = record.hits = 0
+            record.seconds = 0.0
+        return records
+
+
+def format_heuristics(records: Dict[str, dict]) -> str:
+    """Table of ``HeuristicStats.as_dict()``, most expensive first."""
+    lines = [f"{'heuristic':<22} {'calls':>9} {'hits':>9} {'hit %':>6} {'seconds':>9}"]
+    for name, record in sorted(records.items(), key=lambda item: item[1]["seconds"], reverse=True):
+        rate = 100 * record["hits"] / record["calls"] if record["calls"] else 0.0
+        lines.append(f"{name:<22} {record['calls']:>9} {record['hits']:>9} {rate:>5.1f}% {record['seconds']:>9.4f}")
+    return "\n".join(lines)
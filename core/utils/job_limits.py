@@ -0,0 +1,127 @@
+"""
+Resource limits for conversion jobs run as child processes.
+
+``run_limited`` starts a command in its own process group, puts a CPU-time and
+an address-space limit on it (``resource.prlimit`` right after the start,
+inherited by the parse workers it forks) and kills the whole group once the
+wall-clock timeout passes. The result says which limit, if any, ended the job.
+"""
+from __future__ import annotations
+
+import os
+import signal
+import subprocess
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from core.utils.memory_profile import format_size
+
+# Limits a job can hit, as named in failure records
+WALL_CLOCK = "wall-clock"
+CPU_TIME = "cpu-time"
+ADDRESS_SPACE = "address-space"
+
+# Seconds between SIGXCPU at the soft CPU limit and SIGKILL at the hard one
+_CPU_GRACE = 5
+
+# What a child that ran out of address space prints before exiting
+_OUT_OF_MEMORY_MARKERS = ("MemoryError", "Cannot allocate memory", "std::bad_alloc", "out of memory")
+
+# What a converter prints when one of its parse workers died (SIGXCPU, a crash, the OOM killer)
+_BROKEN_POOL_MARKER = "BrokenProcessPool"
+
+
+@dataclass(frozen=True)
+class JobLimits:
+    timeout: Optional[float] = None  # wall-clock seconds
+    cpu_seconds: Optional[int] = None
+    address_space: Optional[int] = None  # bytes of virtual memory per process
+
+    def apply(self, pid: int) -> None:
+        """Set the CPU and address-space limits on process ``pid``."""
+        import resource
+
+        if self.cpu_seconds is not None:
+            resource.prlimit(pid, resource.RLIMIT_CPU, (self.cpu_seconds, self.cpu_seconds + _CPU_GRACE))
+        if self.address_space is not None:
+            resource.prlimit(pid, resource.RLIMIT_AS, (self.address_space, self.address_space))
+
+    def describe(self, limit: str) -> str:
+        """Failure message for a job that hit ``limit``."""
+        if limit == WALL_CLOCK:
+            return f"killed after the wall-clock limit of {self.timeout:g} s"
+        if limit == CPU_TIME:
+            return f"killed after the CPU-time limit of {self.cpu_seconds} s"
+        return f"ran out of the address-space limit of {format_size(self.address_space)}"
+
+
+@dataclass
+class JobResult:
+    returncode: int
+    stdout: str
+    stderr: str
+    limit: Optional[str] = None  # WALL_CLOCK, CPU_TIME or ADDRESS_SPACE when a limit ended the job
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+    @property
+    def worker_crashed(self) -> bool:
+        """A parse worker of the failed job died without one of the limits explaining it."""
+        return not self.ok and self.limit is None and _BROKEN_POOL_MARKER in self.stderr
+
+
+def run_limited(
+    cmd: List[str], limits: JobLimits, cwd: Optional[str | os.PathLike] = None, pass_fds: Sequence[int] = ()
+) -> JobResult:
+    """Run ``cmd`` under ``limits``, capturing its text output; ``pass_fds`` stay open in the child."""
+    import resource
+
+    cpu_before = _children_cpu(resource)
+    # No preexec_fn: it is unsafe once the caller runs threads (e.g. the event relay)
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        cwd=cwd,
+        start_new_session=True,
+        pass_fds=tuple(pass_fds),
+    )
+    try:
+        limits.apply(proc.pid)
+    except ProcessLookupError:
+        pass  # already gone; its exit status tells the rest
+    try:
+        stdout, stderr = proc.communicate(timeout=limits.timeout)
+    except subprocess.TimeoutExpired:
+        _kill_group(proc.pid)
+        stdout, stderr = proc.communicate()
+        return JobResult(proc.returncode, stdout, stderr, WALL_CLOCK)
+    result = JobResult(proc.returncode, stdout, stderr)
+    if result.ok:
+        return result
+    # Parse workers of a failed job must not outlive it
+    _kill_group(proc.pid)
+    # RLIMIT_CPU is per process: a parse worker hitting it only breaks the converter's
+    # pool, so besides the signal look at the CPU time the job used, its workers included
+    if limits.cpu_seconds is not None and (
+        proc.returncode == -signal.SIGXCPU or _children_cpu(resource) - cpu_before >= limits.cpu_seconds
+    ):
+        result.limit = CPU_TIME
+    elif limits.address_space is not None and any(marker in stderr for marker in _OUT_OF_MEMORY_MARKERS):
+        result.limit = ADDRESS_SPACE
+    return result
+
+
+def _children_cpu(resource) -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _kill_group(pgid: int) -> None:
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
@@ -0,0 +1,261 @@
+"""
+Memory profiling and a peak-RSS guard for conversions.
+
+``MemoryProfiler`` is a stage observer. With ``trace`` it takes a tracemalloc
+snapshot at every stage boundary and records what each stage allocated, its
+peak and the top allocation sites; it also counts the AST blocks by type. With
+``max_rss`` a watchdog thread polls the resident set size and aborts the
+conversion with ``MemoryLimitExceeded`` once it passes the limit, well before the
+kernel OOM killer would.
+
+Worker processes of a parallel parse are neither traced nor guarded.
+"""
+from __future__ import annotations
+
+import _thread
+import os
+import re
+import signal
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from core.utils.stages import StageObserver
+
+_SIZE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*$", re.IGNORECASE)
+_SIZE_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+
+
+class MemoryLimitExceeded(RuntimeError):
+    """The process grew past the configured RSS limit."""
+
+    def __init__(self, rss: int, limit: int, stage: str = ""):
+        self.rss = rss
+        self.limit = limit
+        self.stage = stage
+        where = f" during {stage}" if stage else ""
+        super().__init__(f"resident memory {format_size(rss)} exceeded the limit of {format_size(limit)}{where}")
+
+
+def parse_size(text: str) -> int:
+    """Bytes of a size such as ``1500000``, ``512M`` or ``2GiB``."""
+    match = _SIZE_RE.match(text)
+    if not match:
+        raise ValueError(f"invalid size {text!r} (expected e.g. 512M or 2G)")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).lower()])
+
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} GiB"
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (the peak where the current size is unavailable)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss()
+
+
+def peak_rss() -> int:
+    """Peak resident set size of this process in bytes, 0 where unknown."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def count_blocks(blocks: Iterable) -> Dict[str, int]:
+    """Number of AST blocks by type, including blocks nested in lists and tables."""
+    counts: Counter = Counter()
+    pending = list(blocks)
+    while pending:
+        block = pending.pop()
+        block_type = getattr(block, "type", type(block).__name__)
+        counts[block_type] += 1
+        if block_type == "list":
+            pending.extend(child for item in block.items for child in item.blocks)
+        elif block_type == "table":
+            pending.extend(child for row in [block.header, *block.rows] for cell in row.cells for child in cell.blocks)
+    return dict(counts.most_common())
+
+
+@dataclass
+class AllocationSite:
+    site: str  # file:line
+    size: int  # bytes allocated there during the stage (net)
+    count: int  # blocks allocated there during the stage (net)
+
+
+@dataclass
+class StageMemory:
+    stage: str
+    seconds: float
+    rss: int  # resident set size at the end of the stage
+    traced_delta: int = 0  # net bytes traced by tracemalloc over the stage
+    traced_peak: int = 0  # highest traced memory during the stage
+    top: List[AllocationSite] = field(default_factory=list)
+
+
+# What the profiler and the import system allocate themselves is left out of the report
+_IGNORED_FILES = {
+    tracemalloc.__file__, __file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>",
+}
+
+
+class MemoryProfiler(StageObserver):
+    """
+    Records memory per conversion stage and optionally guards the peak RSS.
+
+    Use it as a context manager around the conversion and pass it as the
+    ``observer`` of the parser or exporter; ``report()`` returns the results.
+    """
+
+    def __init__(self, trace: bool = True, max_rss: Optional[int] = None, top: int = 10,
+                 poll_interval: float = 0.05):
+        self.trace = trace
+        self.max_rss = max_rss
+        self.top = top
+        self.poll_interval = poll_interval
+        self.stages: List[StageMemory] = []
+        self.blocks: Dict[str, int] = {}
+        self.current_stage = ""
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._started_tracing = False
+        self._exceeded: Optional[int] = None  # RSS seen by the watchdog
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+        self._armed = False
+        self._interrupting = False  # the watchdog interrupted the main thread and the handler has not run yet
+        self._previous_handler = None
+
+    # --- Context ---
+
+    def __enter__(self) -> "MemoryProfiler":
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        # Only the main thread can be interrupted; elsewhere the limit is checked between stages
+        if self.max_rss is not None and threading.current_thread() is threading.main_thread():
+            self._previous_handler = signal.signal(signal.SIGINT, self._on_interrupt)
+            self._armed = True
+            self._stop.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="rss-guard", daemon=True)
+            self._watchdog.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._watchdog is not None:
+            with self._lock:
+                self._stop.set()
+                self._armed = False
+            self._watchdog.join()
+            self._watchdog = None
+            # An interrupt already sent is absorbed by our handler before the previous one is restored
+            while self._interrupting:
+                time.sleep(0.001)
+            signal.signal(signal.SIGINT, self._previous_handler)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            rss = current_rss()
+            if rss > self.max_rss:
+                with self._lock:
+                    if self._stop.is_set():
+                        return
+                    self._exceeded = rss
+                    self._interrupting = True
+                    _thread.interrupt_main()
+                return
+
+    def _on_interrupt(self, signum, frame) -> None:
+        if not self._interrupting:
+            # A real Ctrl-C
+            if callable(self._previous_handler):
+                self._previous_handler(signum, frame)
+                return
+            raise KeyboardInterrupt
+        self._interrupting = False
+        if self._armed:
+            raise MemoryLimitExceeded(self._exceeded, self.max_rss, self.current_stage)
+
+    # --- StageObserver ---
+
+    def stage_started(self, name: str) -> None:
+        self.current_stage = name
+        self._check_rss()
+        if self.trace and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            self._snapshot = tracemalloc.take_snapshot()
+
+    def stage_finished(self, name: str, seconds: float) -> None:
+        record = StageMemory(name, seconds, current_rss())
+        if self._snapshot is not None and tracemalloc.is_tracing():
+            record.traced_peak = tracemalloc.get_traced_memory()[1]
+            snapshot = tracemalloc.take_snapshot()
+            differences = [
+                difference for difference in snapshot.compare_to(self._snapshot, "lineno")
+                if difference.traceback[0].filename not in _IGNORED_FILES
+            ]
+            record.traced_delta = sum(difference.size_diff for difference in differences)
+            record.top = [
+                AllocationSite(f"{frame.filename}:{frame.lineno}", difference.size_diff, difference.count_diff)
+                for difference in differences[: self.top]
+                for frame in difference.traceback[:1]
+            ]
+            self._snapshot = None
+        self.stages.append(record)
+        self._check_rss()
+
+    def document_parsed(self, doc) -> None:
+        self.blocks = count_blocks(doc.blocks)
+
+    def _check_rss(self) -> None:
+        if self.max_rss is None:
+            return
+        rss = current_rss()
+        if rss > self.max_rss:
+            raise MemoryLimitExceeded(rss, self.max_rss, self.current_stage)
+
+    # --- Results ---
+
+    def report(self) -> dict:
+        """Stages, block counts and RSS figures as plain data (JSON-serialisable)."""
+        return {
+            "peak_rss": peak_rss(),
+            "max_rss": self.max_rss,
+            "stages": [asdict(record) for record in self.stages],
+            "blocks": dict(self.blocks),
+        }
+
+
+def format_report(report: dict) -> str:
+    """Human-readable form of ``MemoryProfiler.report()``."""
+    lines = [f"Peak RSS: {format_size(report['peak_rss'])}"]
+    if report.get("max_rss"):
+        lines[0] += f" (limit {format_size(report['max_rss'])})"
+    for record in report["stages"]:
+        lines.append(
+            f"{record['stage']:<10} {record['seconds']:7.2f}s  rss {format_size(record['rss']):>10}"
+            f"  traced {format_size(record['traced_delta']):>10}  peak {format_size(record['traced_peak']):>10}"
+        )
+        for site in record["top"]:
+            lines.append(f"    {format_size(site['size']):>10} {site['count']:>8}  {site['site']}")
+    if report["blocks"]:
+        lines.append("Blocks: " + ", ".join(f"{name} {count}" for name, count in report["blocks"].items()))
+    return "\n".join(lines)
@@ -0,0 +1,292 @@
+"""
+Conversion metrics in the Prometheus text format.
+
+``ConversionStats`` is a stage observer that collects the figures of one
+conversion: stage durations, images exported, input size, template cache use
+and optionally the parser heuristics. ``ConversionMetrics`` accumulates them over a batch run or the lifetime of
+the service and writes a ``.prom`` file for node_exporter's textfile collector;
+the file is replaced atomically so that a scrape never sees half of it.
+"""
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from dataclasses import InitVar, asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from core.utils.heuristics import HeuristicStats
+from core.utils.stages import StageObserver
+
+# Upper bounds (seconds) of the duration histogram buckets
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(labels: _Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> _Labels:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes the labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, _Labels, float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name}{_format_labels(labels)} {_format_value(value)}" for name, labels, value in self.samples()]
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[_Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("counters only go up")
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[Tuple[str, _Labels, float]]:
+        return [(self.name, labels, value) for labels, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[_Labels, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def samples(self) -> List[Tuple[str, _Labels, float]]:
+        return [(self.name, labels, value) for labels, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DURATION_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: Dict[_Labels, List[int]] = {}
+        self._sums: Dict[_Labels, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        counts = self._counts.setdefault(key, [0] * len(self.buckets))
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+        self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def count(self, **labels: str) -> int:
+        counts = self._counts.get(self._key(labels))
+        return counts[-1] if counts else 0
+
+    def samples(self) -> List[Tuple[str, _Labels, float]]:
+        samples = []
+        for labels, counts in sorted(self._counts.items()):
+            for bound, count in zip(self.buckets, counts):
+                samples.append((f"{self.name}_bucket", labels + (("le", _format_value(bound)),), count))
+            samples.append((f"{self.name}_sum", labels, self._sums[labels]))
+            samples.append((f"{self.name}_count", labels, counts[-1]))
+        return samples
+
+
+class MetricsRegistry:
+    """Metrics rendered together into one exposition."""
+
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def _add(self, metric: _Metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DURATION_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        """The Prometheus text exposition of every metric."""
+        return "".join(line + "\n" for metric in self._metrics for line in metric.render())
+
+
+def write_textfile(path: str | os.PathLike, text: str) -> None:
+    """Replace ``path`` with ``text`` atomically (a temporary file in the same directory, then a rename)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # node_exporter only reads *.prom, so the temporary file is never collected
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+@dataclass
+class ConversionStats(StageObserver):
+    """
+    Figures of one conversion, collected as its observer.
+
+    Use it as a context manager around the conversion: it measures the wall time
+    and the template cache lookups in between; ``bytes_out`` is what the exporters
+    report to ``output_written``. With ``trace_heuristics`` the parser also
+    records calls, hits and time of its heuristics (see core.utils.heuristics).
+    """
+
+    bytes_in: int = 0
+    bytes_out: int = 0
+    seconds: float = 0.0
+    images: int = 0
+    stages: Dict[str, float] = field(default_factory=dict)
+    template_cache: Dict[str, int] = field(default_factory=dict)  # hits, disk_hits, misses
+    heuristics: Dict[str, dict] = field(default_factory=dict)  # name -> calls, hits, seconds
+    trace_heuristics: InitVar[bool] = False
+
+    def __post_init__(self, trace_heuristics: bool) -> None:
+        self._started = 0.0
+        self._cache_before: Dict[str, int] = {}
+        self._heuristic_stats = HeuristicStats() if trace_heuristics else None
+
+    def __enter__(self) -> "ConversionStats":
+        self._started = time.perf_counter()
+        self._cache_before = self._cache_stats()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.seconds = time.perf_counter() - self._started
+        after = self._cache_stats()
+        self.template_cache = {name: after[name] - self._cache_before.get(name, 0) for name in after}
+        if self._heuristic_stats is not None:
+            self.heuristics = self._heuristic_stats.as_dict()
+
+    @staticmethod
+    def _cache_stats() -> Dict[str, int]:
+        from core.utils.template_cache import get_template_cache
+
+        return asdict(get_template_cache().stats)
+
+    def stage_finished(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def images_exported(self, count: int) -> None:
+        self.images += count
+
+    def output_written(self, size: int) -> None:
+        self.bytes_out = size
+
+    def heuristic_stats(self) -> Optional[HeuristicStats]:
+        return self._heuristic_stats
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+# Template cache statistics -> value of the ``result`` label
+_CACHE_RESULTS = {"hits": "hit", "disk_hits": "disk_hit", "misses": "miss"}
+
+
+class ConversionMetrics:
+    """Conversion counters and histograms of a batch run or a service (thread-safe)."""
+
+    def __init__(self, prefix: str = "doc2chapmd"):
+        self.registry = MetricsRegistry()
+        self.documents = self.registry.counter(
+            f"{prefix}_documents_total", "Documents processed, by outcome.", ["status"])
+        self.duration = self.registry.histogram(
+            f"{prefix}_conversion_duration_seconds", "Wall time per document conversion.")
+        self.stage_duration = self.registry.histogram(
+            f"{prefix}_stage_duration_seconds", "Wall time per conversion stage.", ["stage"])
+        self.bytes_in = self.registry.counter(
+            f"{prefix}_input_bytes_total", "Bytes of DOCX input converted.")
+        self.bytes_out = self.registry.counter(
+            f"{prefix}_output_bytes_total", "Bytes of output written.")
+        self.images = self.registry.counter(
+            f"{prefix}_images_exported_total", "Image files exported.")
+        self.template_cache = self.registry.counter(
+            f"{prefix}_template_cache_lookups_total", "Style and numbering table lookups, by result.", ["result"])
+        self.heuristic_calls = self.registry.counter(
+            f"{prefix}_parser_heuristic_calls_total", "Calls of a parser heuristic.", ["heuristic"])
+        self.heuristic_hits = self.registry.counter(
+            f"{prefix}_parser_heuristic_hits_total", "Calls of a parser heuristic that matched.", ["heuristic"])
+        self.heuristic_seconds = self.registry.counter(
+            f"{prefix}_parser_heuristic_seconds_total", "Time spent in a parser heuristic.", ["heuristic"])
+        self.updated = self.registry.gauge(
+            f"{prefix}_metrics_updated_timestamp_seconds", "Unix time the metrics were last written.")
+        self._lock = threading.Lock()
+
+    def record(self, stats: Optional[dict], success: bool) -> None:
+        """Count one document from ``ConversionStats.as_dict()`` (None when nothing was measured)."""
+        with self._lock:
+            self.documents.inc(status="converted" if success else "failed")
+            if not stats:
+                return
+            self.duration.observe(stats.get("seconds", 0.0))
+            for name, seconds in stats.get("stages", {}).items():
+                self.stage_duration.observe(seconds, stage=name)
+            self.bytes_in.inc(stats.get("bytes_in", 0))
+            self.bytes_out.inc(stats.get("bytes_out", 0))
+            self.images.inc(stats.get("images", 0))
+            for name, count in stats.get("template_cache", {}).items():
+                if name in _CACHE_RESULTS and count:
+                    self.template_cache.inc(count, result=_CACHE_RESULTS[name])
+            for name, record in stats.get("heuristics", {}).items():
+                self.heuristic_calls.inc(record["calls"], heuristic=name)
+                self.heuristic_hits.inc(record["hits"], heuristic=name)
+                self.heuristic_seconds.inc(record["seconds"], heuristic=name)
+
+    def render(self) -> str:
+        with self._lock:
+            self.updated.set(round(time.time(), 3))
+            return self.registry.render()
+
+    def write(self, path: str | os.PathLike) -> None:
+        """Write the metrics to a ``.prom`` file, replacing it atomically."""
+        write_textfile(path, self.render())
@@ -0,0 +1,175 @@
+"""
+Stages of a conversion and observers of their boundaries.
+
+The parser, the exporters and the pipeline wrap each stage of a conversion in
+``stage(observer, name)``. Observers such as the memory profiler hook into the
+stage boundaries; without an observer the wrapping costs nothing.
+
+The loops of the parse, assets and render stages also report their progress,
+which is where ``ProgressCallback`` listens and a ``CancelToken`` stops the
+conversion by raising ``ConversionCancelled``.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Sequence
+
+# Stage names in the order a conversion runs them (exporters skip the ones they do not have)
+STAGES = ("numbering", "parse", "transform", "split", "assets", "render", "write")
+
+# Progress reports per stage loop, at most (plus the final one)
+PROGRESS_STEPS = 100
+
+
+def progress_step(total: int) -> int:
+    """Units of work between two progress reports of a loop over ``total`` units."""
+    return max(1, -(-total // PROGRESS_STEPS))
+
+
+class StageObserver:
+    """Receives the boundaries of conversion stages; the base class ignores them."""
+
+    def stage_started(self, name: str) -> None:
+        pass
+
+    def stage_finished(self, name: str, seconds: float) -> None:
+        pass
+
+    def document_parsed(self, doc) -> None:
+        """Called with the InternalDoc once the parser has built it."""
+
+    def progress(self, stage: str, done: int, total: int) -> None:
+        """Called from the loop of a stage with the units of work done so far (about PROGRESS_STEPS times).
+
+        The units are top-level body elements for ``parse``, images for ``assets``
+        and Markdown files for ``render``.
+        """
+
+    def images_exported(self, count: int) -> None:
+        """Called by the exporters with the number of image files they wrote."""
+
+    def output_written(self, size: int) -> None:
+        """Called by the exporters once their output is complete, with the bytes of its files."""
+
+    def heuristic_stats(self):
+        """HeuristicStats the parser should record its heuristics into (None leaves them uninstrumented)."""
+        return None
+
+    def degraded(self) -> bool:
+        """Whether the conversion should skip its optional heuristics from now on (see core.utils.time_budget)."""
+        return False
+
+    def time_budget(self) -> Optional[float]:
+        """Seconds of the time budget behind ``degraded()`` (None when there is none)."""
+        return None
+
+
+class ObserverGroup(StageObserver):
+    """Passes every notification on to several observers, in order."""
+
+    def __init__(self, observers: Sequence[StageObserver]):
+        self.observers = list(observers)
+
+    def stage_started(self, name: str) -> None:
+        for observer in self.observers:
+            observer.stage_started(name)
+
+    def stage_finished(self, name: str, seconds: float) -> None:
+        for observer in self.observers:
+            observer.stage_finished(name, seconds)
+
+    def document_parsed(self, doc) -> None:
+        for observer in self.observers:
+            observer.document_parsed(doc)
+
+    def progress(self, stage: str, done: int, total: int) -> None:
+        for observer in self.observers:
+            observer.progress(stage, done, total)
+
+    def images_exported(self, count: int) -> None:
+        for observer in self.observers:
+            observer.images_exported(count)
+
+    def output_written(self, size: int) -> None:
+        for observer in self.observers:
+            observer.output_written(size)
+
+    def heuristic_stats(self):
+        return next((stats for stats in (observer.heuristic_stats() for observer in self.observers) if stats is not None), None)
+
+    def degraded(self) -> bool:
+        return any(observer.degraded() for observer in self.observers)
+
+    def time_budget(self) -> Optional[float]:
+        return next((seconds for seconds in (observer.time_budget() for observer in self.observers) if seconds is not None), None)
+
+
+class ProgressCallback(StageObserver):
+    """Passes the progress reports to ``callback(stage, done, total)``."""
+
+    def __init__(self, callback: Callable[[str, int, int], None]):
+        self.callback = callback
+
+    def progress(self, stage: str, done: int, total: int) -> None:
+        self.callback(stage, done, total)
+
+
+class ConversionCancelled(Exception):
+    """Raised inside a conversion whose CancelToken was cancelled."""
+
+
+class CancelToken(StageObserver):
+    """
+    Cooperative cancellation of a conversion, passed as (one of) its observers.
+
+    ``cancel()`` may be called from any thread; the conversion raises
+    ``ConversionCancelled`` at its next stage boundary or progress report, and
+    the exporters release the images they hold on the way out.
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self) -> None:
+        if self._event.is_set():
+            raise ConversionCancelled("conversion cancelled")
+
+    def stage_started(self, name: str) -> None:
+        self.check()
+
+    def progress(self, stage: str, done: int, total: int) -> None:
+        self.check()
+
+
+def combine_observers(*observers: Optional[StageObserver]) -> Optional[StageObserver]:
+    """One observer notifying all the given ones (None when none is given)."""
+    present = [observer for observer in observers if observer is not None]
+    if len(present) <= 1:
+        return present[0] if present else None
+    return ObserverGroup(present)
+
+
+def is_degraded(observer: Optional[StageObserver]) -> bool:
+    """Whether the optional heuristics are switched off for the rest of the conversion."""
+    return observer is not None and observer.degraded()
+
+
+@contextmanager
+def stage(observer: Optional[StageObserver], name: str) -> Iterator[None]:
+    """Run the block as stage ``name``; a stage that raises is not reported finished."""
+    if observer is None:
+        yield
+        return
+    observer.stage_started(name)
+    start = time.perf_counter()
+    yield
+    observer.stage_finished(name, time.perf_counter() - start)
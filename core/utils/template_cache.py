@@ -0,0 +1,173 @@
+"""
+Cross-document cache of the tables derived from styles.xml and numbering.xml.
+
+Documents built from the same templates carry byte-identical styles and numbering
+parts, so the tables derived from them are cached by the SHA-256 of the part: in
+the process, and optionally in a directory on disk so that separate processes
+(batch conversion runs one per document) parse each template once.
+
+Cached tables are shared between documents and must not be modified.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from core.numbering.heading_numbering import Lvl, NumDef, _parse_numbering, _style_to_level
+from core.utils.docx_utils import numbering_formats, style_num_map, styles_map
+
+# Bump when the derived tables or their on-disk form change
+CACHE_FORMAT_VERSION = 1
+
+
+@dataclass(frozen=True)
+class StyleTables:
+    """Tables derived from word/styles.xml."""
+    names: Dict[str, str]  # styleId -> style name
+    levels: Dict[str, int]  # styleId -> zero-based heading level
+    num_ids: Dict[str, str]  # styleId -> numId of list styles
+
+
+@dataclass(frozen=True)
+class NumberingTables:
+    """Tables derived from word/numbering.xml."""
+    formats: Dict[str, str]  # numId -> numFmt of the first level
+    definitions: Dict[int, NumDef]  # numId -> level definitions
+
+
+@dataclass
+class TemplateCacheStats:
+    hits: int = 0  # served from memory
+    disk_hits: int = 0  # loaded from the cache directory
+    misses: int = 0  # parsed from XML
+
+
+def _build_style_tables(styles_xml: bytes) -> StyleTables:
+    return StyleTables(styles_map(styles_xml), _style_to_level(styles_xml), style_num_map(styles_xml))
+
+
+def _build_numbering_tables(numbering_xml: bytes) -> NumberingTables:
+    return NumberingTables(numbering_formats(numbering_xml), _parse_numbering(numbering_xml or b"<numbering/>"))
+
+
+def _load_style_tables(data: dict) -> StyleTables:
+    return StyleTables(data["names"], data["levels"], data["num_ids"])
+
+
+def _load_numbering_tables(data: dict) -> NumberingTables:
+    definitions = {
+        int(num_id): NumDef(
+            numId=definition["numId"],
+            abstractNumId=definition["abstractNumId"],
+            lvls={int(ilvl): Lvl(**lvl) for ilvl, lvl in definition["lvls"].items()},
+        )
+        for num_id, definition in data["definitions"].items()
+    }
+    return NumberingTables(data["formats"], definitions)
+
+
+class TemplateCache:
+    """Memory (LRU) and optional on-disk cache of template tables keyed by part digest."""
+
+    def __init__(self, cache_dir: str | os.PathLike | None = None, max_entries: int = 32):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_entries = max_entries
+        self.stats = TemplateCacheStats()
+        self._entries: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def style_tables(self, styles_xml: Optional[bytes]) -> StyleTables:
+        return self._get("styles", styles_xml or b"", _build_style_tables, _load_style_tables)
+
+    def numbering_tables(self, numbering_xml: Optional[bytes]) -> NumberingTables:
+        return self._get("numbering", numbering_xml or b"", _build_numbering_tables, _load_numbering_tables)
+
+    def clear(self) -> None:
+        """Drop the in-memory entries and reset the statistics (the cache directory is kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.stats = TemplateCacheStats()
+
+    def _get(self, kind: str, part: bytes, build: Callable, load: Callable):
+        key = f"{kind}-{hashlib.sha256(part).hexdigest()}"
+        with self._lock:
+            tables = self._entries.get(key)
+            if tables is not None:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return tables
+
+        tables = self._read(key, load)
+        from_disk = tables is not None
+        if not from_disk:
+            tables = build(part)
+            self._write(key, tables)
+
+        with self._lock:
+            if from_disk:
+                self.stats.disk_hits += 1
+            else:
+                self.stats.misses += 1
+            self._entries[key] = tables
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return tables
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _read(self, key: str, load: Callable):
+        if self.cache_dir is None:
+            return None
+        try:
+            data = json.loads(self._path(key).read_text(encoding="utf-8"))
+            if data.get("version") != CACHE_FORMAT_VERSION:
+                return None
+            return load(data["tables"])
+        except (OSError, ValueError, KeyError, TypeError):
+            # Missing, unreadable or outdated entries are rebuilt and overwritten
+            return None
+
+    def _write(self, key: str, tables) -> None:
+        if self.cache_dir is None:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._path(key).with_suffix(f".{os.getpid()}.tmp")
+            payload = {"version": CACHE_FORMAT_VERSION, "tables": asdict(tables)}
+            tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            # The disk cache is an optimisation only
+            pass
+
+
+_default_cache = TemplateCache()
+
+
+def get_template_cache() -> TemplateCache:
+    """Return the process-wide template cache."""
+    return _default_cache
+
+
+def configure_template_cache(cache_dir: str | os.PathLike | None) -> TemplateCache:
+    """Set (or with None, unset) the on-disk directory of the process-wide template cache."""
+    _default_cache.cache_dir = Path(cache_dir) if cache_dir else None
+    return _default_cache
+
+
+def style_tables(styles_xml: Optional[bytes]) -> StyleTables:
+    """Tables of a styles.xml part from the process-wide cache."""
+    return _default_cache.style_tables(styles_xml)
+
+
+def numbering_tables(numbering_xml: Optional[bytes]) -> NumberingTables:
+    """Tables of a numbering.xml part from the process-wide cache."""
+    return _default_cache.numbering_tables(numbering_xml)
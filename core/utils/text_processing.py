@@ -1,7 +1,10 @@
 """Text processing utilities for document parsing."""
 
 import re
-from typing import Tuple
+from typing import List, Tuple
+
+# "IV. Title": Roman numbering, which has no numeric components
+_ROMAN_NUMBER_RE = re.compile(r"^\s*([IVXLCDM]+)[.)]\s*(?:[-–—]\s*)?(.*)")
 
 
 def clean_heading_text(text: str) -> str:
@@ -145,6 +148,59 @@ def extract_letter_index(number_str: str) -> int:
     return 0
 
 
+def heading_number_parts(number: str) -> List[int]:
+    """Convert a heading number to its numeric components.
+
+    Args:
+        number (str): Number as returned by extract_heading_number_and_title.
+
+    Returns:
+        List[int]: Numeric components; a leading letter is replaced by its alphabet position.
+                   Empty for missing or unsupported numbering.
+
+    Examples:
+        "1.2.3" -> [1, 2, 3]
+        "Б.1" -> [2, 1]
+        "Приложение А" -> [1]
+    """
+    if not number:
+        return []
+    letter_index = extract_letter_index(number)
+    if letter_index > 0:
+        return [letter_index] + [int(x) for x in re.findall(r"\d+", number)]
+    if re.match(r"^\d+", number):
+        return [int(x) for x in re.split(r"[.\-]", number) if x]
+    return []
+
+
+def split_heading_text(text: str) -> Tuple[str, List[int], str]:
+    """Split heading text into number, numeric components and title.
+
+    Returns:
+        Tuple[str, List[int], str]: (number, number_parts, title), e.g.
+        "1.2 Introduction" -> ("1.2", [1, 2], "Introduction")
+        "IV. Appendix" -> ("IV", [], "Appendix")
+    """
+    number, title = extract_heading_number_and_title(text)
+    if not number:
+        match = _ROMAN_NUMBER_RE.match(text)
+        if match:
+            return match.group(1), [], match.group(2).strip()
+    return number, heading_number_parts(number), title
+
+
+def heading_anchor(text: str) -> str:
+    """Create a link anchor for heading text (keeps Cyrillic letters).
+
+    Examples:
+        "Технические требования" -> "технические-требования"
+    """
+    s = text.strip().lower()
+    s = re.sub(r'[^a-z0-9\u0400-\u04FF\s-]+', '', s)
+    s = re.sub(r'\s+', '-', s)
+    return re.sub(r'-+', '-', s).strip('-')
+
+
 def create_slug(text: str, max_length: int = 50) -> str:
     """Create URL-safe slug from text.
     
@@ -0,0 +1,69 @@
+"""
+Time budget of a conversion (degraded preview builds).
+
+``TimeBudget`` is a stage observer. Once the conversion has run longer than
+its budget, its ``degraded()`` answers True for the rest of the run, and the
+parser, the transforms and the renderer skip their optional heuristics from
+there on:
+
+* ``caption_search`` – images get no caption and caption paragraphs stay in the text
+* ``command_reorder`` – commands are not moved before the image that follows them
+* ``cross_references`` – section numbers in the text are not replaced by titles
+* ``content_reorder`` – misplaced blocks are not moved into their sections (pipeline only)
+* ``image_action_lists`` – table cells of images and "– action" parts render as plain cells
+
+The output of a degraded run is marked: the pipeline adds ``degraded`` to its
+manifest and the hierarchy exporters write ``DEGRADED_FILE`` into the document folder.
+Each lists the skips of the steps it runs: ``PARSE_SKIPS`` and those of its own.
+"""
+from __future__ import annotations
+
+import time
+from typing import Optional, Sequence
+
+from core.utils.stages import StageObserver
+
+# Skipped by the parser, whichever exporter runs it
+PARSE_SKIPS = ("caption_search", "command_reorder", "cross_references")
+
+DEGRADED_FILE = "degraded.json"
+
+
+def degraded_note(skipped: Sequence[str], budget: Optional[float] = None) -> dict:
+    """What a degraded output is marked with; ``skipped`` are the skips of the exporter."""
+    note = {"reason": "time budget exceeded", "skipped": list(skipped)}
+    if budget is not None:
+        note["time_budget_seconds"] = budget
+    return note
+
+
+def degraded_marker(skipped: Sequence[str], budget: Optional[float] = None) -> str:
+    """Content of ``DEGRADED_FILE``."""
+    import json
+
+    return json.dumps({"degraded": True, **degraded_note(skipped, budget)}, indent=2) + "\n"
+
+
+class TimeBudget(StageObserver):
+    """Switches the conversion to its cheap path once ``seconds`` have passed since it was created."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self._deadline = time.perf_counter() + seconds
+        self._stage: Optional[str] = None
+        self.exceeded_in: Optional[str] = None  # stage running when the budget ran out
+
+    @property
+    def exceeded(self) -> bool:
+        return self.exceeded_in is not None
+
+    def stage_started(self, name: str) -> None:
+        self._stage = name
+
+    def time_budget(self) -> Optional[float]:
+        return self.seconds
+
+    def degraded(self) -> bool:
+        if self.exceeded_in is None and time.perf_counter() > self._deadline:
+            self.exceeded_in = self._stage or "start"
+        return self.exceeded_in is not None
@@ -5,14 +5,34 @@ Document to Chapter Markdown Converter
 CLI tool to convert DOCX documents into structured Markdown chapters using custom XML parsing.
 """
 
+import sys
+from contextlib import nullcontext
 from pathlib import Path
 from typing import Optional
 
 import typer
 from rich.console import Console
 
-from core.model.config import load_config, PipelineConfig
-from core.output.hierarchical_writer import export_docx_hierarchy, export_docx_hierarchy_centralized
+# Everything else is imported inside the commands so that `--help` and typos
+# stay fast. The two exporters are the exception: build and profile look them
+# up as attributes of this module, loaded on first access, only so that
+# tests/output/test_hierarchical_writer.py can monkeypatch them here.
+_EXPORTERS = ("export_docx_hierarchy", "export_docx_hierarchy_centralized")
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTERS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from core.output import hierarchical_writer
+
+    value = getattr(hierarchical_writer, name)
+    globals()[name] = value
+    return value
+
+
+def _exporter(centralized: bool):
+    """The exporter for the centralized or the distributed images layout."""
+    return getattr(sys.modules[__name__], _EXPORTERS[centralized])
 
 
 app = typer.Typer(
@@ -33,6 +53,8 @@ def config_show(
     )
 ):
     """Show current configuration values."""
+    from core.model.config import load_config
+
     try:
         config = load_config(config_file)
         console.print("[blue]Current configuration:[/blue]")
@@ -59,6 +81,8 @@ def config_create(
     )
 ):
     """Create a default configuration file."""
+    from core.model.config import PipelineConfig
+
     if output_file.exists() and not force:
         console.print(f"[red]Configuration file '{output_file}' already exists. Use --force to overwrite.[/red]")
         raise typer.Exit(1)
@@ -76,7 +100,8 @@ def config_create(
 def build(
     docx: Path = typer.Argument(..., help="Path to DOCX file"),
     out: Path = typer.Option(
-        Path("out"), "--out", "-o", help="Output directory for chapter hierarchy"
+        Path("out"), "--out", "-o",
+        help="Output directory for chapter hierarchy, or - to stream a tar (or --format zip) archive to stdout"
     ),
     centralized_images: bool = typer.Option(
         True, "--centralized-images/--distributed-images", 
@@ -86,17 +111,269 @@ def build(
         None, "--folder-name", 
         help="Custom folder name for output (if not provided, uses document name)"
     ),
+    ast_jsonl: bool = typer.Option(
+        False, "--ast-jsonl",
+        help="Also write each chapter's AST as JSON Lines (<chapter>.ast.jsonl) next to it"
+    ),
+    parse_workers: int = typer.Option(
+        1, "--parse-workers", min=1,
+        help="Parse the document body in this many processes (large documents)"
+    ),
+    template_cache: Optional[Path] = typer.Option(
+        None, "--template-cache",
+        help="Directory caching parsed style and numbering tables across runs"
+    ),
+    output_format: str = typer.Option(
+        "directory", "--format", "-f",
+        help="Write the document folder as files (directory) or as <folder>.zip / <folder>.tar in --out"
+    ),
+    only: Optional[str] = typer.Option(
+        None, "--only",
+        help="Convert just these sections, by number or title glob (e.g. 3,5.2,'Установка*'); other files in --out are kept"
+    ),
+    profile_memory: bool = typer.Option(
+        False, "--profile-memory",
+        help="Report memory per stage: tracemalloc top allocation sites, RSS and AST block counts"
+    ),
+    max_rss: Optional[str] = typer.Option(
+        None, "--max-rss",
+        help="Abort with an error once resident memory exceeds this size (e.g. 2G)"
+    ),
+    metrics_json: Optional[Path] = typer.Option(
+        None, "--metrics-json",
+        help="Write stage durations, images exported and template cache use of the conversion to this JSON file"
+    ),
+    trace_heuristics: bool = typer.Option(
+        False, "--trace-heuristics",
+        help="Record calls, hits and time of every parser heuristic (printed, and in --metrics-json)"
+    ),
+    events: Optional[str] = typer.Option(
+        None, "--events",
+        help="Emit job, stage, progress and failure events in this format (jsonl) for orchestrators"
+    ),
+    events_file: str = typer.Option(
+        "-", "--events-file",
+        help="Where --events go: a file (appended to) or - for stdout"
+    ),
+    time_budget: Optional[float] = typer.Option(
+        None, "--time-budget", min=0,
+        help="Seconds after which optional heuristics are skipped and the output is marked degraded (previews)"
+    ),
 ):
     """Export DOCX into hierarchical chapter structure."""
-    if centralized_images:
-        if custom_folder_name is None:
-            written = export_docx_hierarchy_centralized(docx, out)
-        else:
-            written = export_docx_hierarchy_centralized(docx, out, custom_folder_name)
-    else:
-        written = export_docx_hierarchy(docx, out)
+    from core.output.hierarchical_writer import SectionSelection, SectionSelectionError
+    from core.utils.memory_profile import MemoryLimitExceeded, MemoryProfiler, format_report, parse_size
+    from core.utils.stages import combine_observers
+    from core.utils.template_cache import configure_template_cache
+
+    if template_cache is not None:
+        configure_template_cache(template_cache)
+    export_options = {"ast_export": ast_jsonl}
+    if parse_workers > 1:
+        export_options["parse_workers"] = parse_workers
+    if output_format not in ("directory", "zip", "tar"):
+        console.print(f"[red]Unknown output format '{output_format}' (use directory, zip or tar)[/red]")
+        raise typer.Exit(1)
+    log = console
+    if str(out) == "-":
+        # The archive owns stdout; entries are named <folder>/... as they would be below --out
+        log = Console(stderr=True)
+        if output_format == "directory":
+            output_format = "tar"
+        export_options["stream"] = sys.stdout.buffer
+        out = Path(".")
+    if output_format != "directory":
+        export_options["output_format"] = output_format
+    job = None
+    if events is not None:
+        from core.utils.events import EVENT_FORMATS, EventObserver, EventWriter
+
+        if events not in EVENT_FORMATS:
+            console.print(f"[red]Unknown event format '{events}' (use {', '.join(EVENT_FORMATS)})[/red]")
+            raise typer.Exit(1)
+        if events_file == "-":
+            if "stream" in export_options:
+                console.print("[red]--events needs --events-file when the archive streams to stdout[/red]")
+                raise typer.Exit(1)
+            # Events own stdout; everything else goes to stderr
+            log = Console(stderr=True)
+        job = EventObserver(EventWriter.open(events_file), docx.name)
+    if only is not None:
+        try:
+            SectionSelection(only.split(","))
+        except SectionSelectionError as exc:
+            console.print(f"[red]--only: {exc}[/red]")
+            raise typer.Exit(1)
+        export_options["only"] = only.split(",")
+    profiler = None
+    if profile_memory or max_rss is not None:
+        try:
+            limit = parse_size(max_rss) if max_rss is not None else None
+        except ValueError as exc:
+            console.print(f"[red]--max-rss: {exc}[/red]")
+            raise typer.Exit(1)
+        profiler = MemoryProfiler(trace=profile_memory, max_rss=limit)
+    stats = None
+    if metrics_json is not None or trace_heuristics:
+        from core.utils.metrics import ConversionStats
+
+        stats = ConversionStats(bytes_in=docx.stat().st_size, trace_heuristics=trace_heuristics)
+    budget = None
+    if time_budget is not None:
+        from core.utils.time_budget import TimeBudget
+
+        budget = TimeBudget(time_budget)
+    observer = combine_observers(profiler, stats, job, budget)
+    if observer is not None:
+        export_options["observer"] = observer
+    try:
+        with profiler if profiler is not None else nullcontext(), stats if stats is not None else nullcontext(), \
+                job.running(str(docx), docx.stat().st_size) if job is not None else nullcontext():
+            export = _exporter(centralized_images)
+            if centralized_images and custom_folder_name is not None:
+                written = export(docx, out, custom_folder_name, **export_options)
+            else:
+                written = export(docx, out, **export_options)
+    except MemoryLimitExceeded as exc:
+        log.print(f"[red]Aborted: {exc}[/red]")
+        if profile_memory:
+            log.print(format_report(profiler.report()), markup=False, highlight=False, soft_wrap=True)
+        raise typer.Exit(1)
+    except SectionSelectionError as exc:
+        log.print(f"[red]--only: {exc}[/red]")
+        raise typer.Exit(1)
     for path in written:
-        console.print(f"\u2713 {path}")
+        log.print(f"\u2713 {path}")
+    degraded = budget is not None and budget.exceeded
+    if degraded:
+        log.print(f"[yellow]Time budget of {time_budget:g} s ran out during {budget.exceeded_in}: "
+                  f"optional heuristics were skipped from there on and the output is marked degraded[/yellow]")
+    if job is not None:
+        folder = custom_folder_name if centralized_images and custom_folder_name else None
+        job.job_finished(len(written), _output_bytes(job, docx, out, folder, output_format, "stream" in export_options),
+                         degraded)
+        job.events.close()
+    if metrics_json is not None:
+        import json
+
+        metrics_json.write_text(json.dumps(stats.as_dict(), indent=2), encoding="utf-8")
+    if trace_heuristics:
+        from core.utils.heuristics import format_heuristics
+
+        log.print(format_heuristics(stats.heuristics), markup=False, highlight=False, soft_wrap=True)
+    if profile_memory:
+        log.print(format_report(profiler.report()), markup=False, highlight=False, soft_wrap=True)
+
+
+def _output_bytes(job, docx: Path, out: Path, folder: Optional[str], output_format: str,
+                  streamed: bool) -> Optional[int]:
+    """Size of what build wrote for ``docx`` (None when it went to a stream)."""
+    if streamed:
+        return None
+    if output_format == "directory":
+        return job.bytes_out
+    from core.output.hierarchical_writer import _clean_filename
+
+    return (out / f"{folder or _clean_filename(docx.stem)}.{output_format}").stat().st_size
+
+
+@app.command()
+def profile(
+    docx: Path = typer.Argument(..., help="Path to DOCX file"),
+    out: Optional[Path] = typer.Option(
+        None, "--out", "-o",
+        help="Keep the converted output here (a temporary directory by default)"
+    ),
+    prefix: Optional[Path] = typer.Option(
+        None, "--prefix",
+        help="Write <prefix>.pstats and <prefix>.collapsed (default: the document name in the current directory)"
+    ),
+    centralized_images: bool = typer.Option(
+        True, "--centralized-images/--distributed-images",
+        help="Profile the centralized or the distributed images layout"
+    ),
+    interval: float = typer.Option(
+        0.005, "--interval", min=0.0005,
+        help="Seconds between stack samples for the collapsed stacks"
+    ),
+    top: int = typer.Option(5, "--top", min=1, help="Functions listed per module"),
+    libraries: int = typer.Option(
+        6, "--libraries", min=0,
+        help="Library groups (stdlib and third-party packages) listed after our modules, by self time"
+    ),
+):
+    """Profile a full build: cProfile stats, flamegraph-ready collapsed stacks and a summary per module."""
+    import tempfile
+
+    from core.utils.cpu_profile import CpuProfiler, format_summary, module_summary
+
+    if not docx.exists():
+        console.print(f"[red]Input file {docx} does not exist[/red]")
+        raise typer.Exit(1)
+    export = _exporter(centralized_images)
+    with tempfile.TemporaryDirectory(prefix="doc2chapmd-profile-") as tmp:
+        with CpuProfiler(interval) as profiler:
+            export(docx, out if out is not None else Path(tmp))
+    pstats_path, collapsed_path = profiler.save(prefix if prefix is not None else Path(docx.stem))
+    stats = profiler.stats()
+    console.print(format_summary(module_summary(stats, top), stats.total_tt, libraries),
+                  markup=False, highlight=False, soft_wrap=True)
+    console.print(f"\n\u2713 {pstats_path}")
+    console.print(f"\u2713 {collapsed_path} (flamegraph.pl, inferno-flamegraph or speedscope)")
+
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", "--host", help="Interface to listen on (keep it local)"),
+    port: int = typer.Option(8765, "--port", "-p", help="TCP port to listen on"),
+    socket_path: Optional[Path] = typer.Option(
+        None, "--socket",
+        help="Listen on this Unix socket instead of a TCP port"
+    ),
+    workers: int = typer.Option(2, "--workers", "-w", min=1, help="Pre-warmed conversion processes"),
+    max_queue: int = typer.Option(
+        8, "--max-queue", min=0,
+        help="Conversions waiting for a worker before new requests get 503"
+    ),
+    template_cache: Optional[Path] = typer.Option(
+        None, "--template-cache",
+        help="Directory caching parsed style and numbering tables across runs"
+    ),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Log every request"),
+    metrics_file: Optional[Path] = typer.Option(
+        None, "--metrics-file",
+        help="Prometheus textfile (.prom) rewritten after every conversion, e.g. for node_exporter"
+    ),
+    trace_heuristics: bool = typer.Option(
+        False, "--trace-heuristics",
+        help="Include calls, hits and time of every parser heuristic in --metrics-file"
+    ),
+):
+    """Run a local conversion service with a warm worker pool."""
+    from core.service.server import ConversionService, make_server, server_url
+
+    try:
+        service = ConversionService(workers, max_queue, template_cache, metrics_file, trace_heuristics)
+    except OSError as e:
+        console.print(f"[red]Error starting service:[/red] {e}")
+        raise typer.Exit(1)
+    try:
+        service.warm_up()
+        server = make_server(service, host, port, socket_path, verbose=verbose)
+    except Exception as e:
+        service.close()
+        console.print(f"[red]Error starting service:[/red] {e}")
+        raise typer.Exit(1)
+    console.print(f"[green]Serving on {server_url(server)}[/green] ({workers} workers, queue {max_queue})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if socket_path is not None and socket_path.exists():
+            socket_path.unlink()
 
 
 if __name__ == "__main__":
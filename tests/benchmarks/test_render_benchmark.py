@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+# Timing runs are slow and machine dependent, so they are opt-in
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("DOC2CHAPMD_BENCHMARKS"), reason="set DOC2CHAPMD_BENCHMARKS=1 to run benchmarks"
+)
+
+from core.model.internal_doc import (
+    InternalDoc, Heading, Paragraph, Text, Bold, Italic, Code, Link, Image, CodeBlock,
+    ListBlock, ListItem, Table, TableRow, TableCell,
+)
+from core.render.markdown_renderer import render_markdown
+
+SECTIONS = 200
+
+
+def _cell(*inlines):
+    return TableCell(blocks=[Paragraph(inlines=list(inlines))])
+
+
+def _build_large_doc() -> InternalDoc:
+    """Build a synthetic document resembling a long user manual."""
+    blocks = []
+    for section in range(1, SECTIONS + 1):
+        blocks.append(Heading(level=2, text=f"{section} Раздел {section}"))
+        blocks.append(Paragraph(inlines=[
+            Text(content="Для настройки откройте "),
+            Bold(content="Параметры"),
+            Text(content=" и выберите "),
+            Italic(content="Сеть"),
+            Text(content=". Подробнее см. "),
+            Link(content="документацию", href="https://example.com/docs"),
+            Text(content="."),
+        ]))
+        blocks.append(Paragraph(inlines=[Text(content="# systemctl restart service")]))
+        blocks.append(ListBlock(ordered=True, items=[
+            ListItem(blocks=[
+                Paragraph(inlines=[Text(content=f"Шаг {step}: выполните "), Code(content="make install")]),
+                ListBlock(ordered=False, items=[
+                    ListItem(blocks=[Paragraph(inlines=[Text(content="Проверьте журнал")])]),
+                ]),
+            ])
+            for step in range(1, 6)
+        ]))
+        blocks.append(Image(resource_id=f"img{section}", alt="", caption=f"Рисунок {section}"))
+        blocks.append(Table(
+            header=TableRow(cells=[_cell(Text(content="Параметр")), _cell(Text(content="Описание"))]),
+            rows=[
+                TableRow(cells=[
+                    _cell(Code(content=f"option_{row}")),
+                    _cell(Text(content="Значение | по умолчанию")),
+                ])
+                for row in range(10)
+            ],
+        ))
+        blocks.append(CodeBlock(language="bash", code="echo ok"))
+    return InternalDoc(blocks=blocks)
+
+
+def test_render_markdown_benchmark(benchmark):
+    """Measures rendering throughput of a large synthetic document."""
+    doc = _build_large_doc()
+
+    markdown = benchmark(render_markdown, doc, {})
+
+    assert markdown.startswith("# Раздел 1")
+    if benchmark.stats:
+        mean = benchmark.stats.stats.mean
+        benchmark.extra_info["blocks"] = len(doc.blocks)
+        benchmark.extra_info["blocks_per_sec"] = round(len(doc.blocks) / mean) if mean else None
@@ -0,0 +1,41 @@
+"""Shared fixtures."""
+
+import io
+import struct
+import zlib
+
+import pytest
+from docx import Document
+
+
+def _png(width: int = 2, height: int = 2) -> bytes:
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    rows = b"".join(b"\x00" + b"\xff\x00\x00" * width for _ in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
+
+
+def _docx_bytes() -> bytes:
+    doc = Document()
+    doc.add_heading("Введение", level=1)
+    doc.add_paragraph("Текст первой главы.")
+    doc.add_picture(io.BytesIO(_png()))
+    doc.add_heading("Установка", level=1)
+    doc.add_paragraph("sudo apt install nginx")
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def docx_bytes() -> bytes:
+    """A small two-chapter DOCX with one image."""
+    return _docx_bytes()
+
+
+@pytest.fixture
+def make_png():
+    """Factory of small PNG images; different sizes give different image content."""
+    return _png
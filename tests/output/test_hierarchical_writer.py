@@ -94,8 +94,9 @@ def test_cli_build_invokes_export(monkeypatch, tmp_path):
     runner = CliRunner()
     called: dict[str, tuple[Path, Path]] = {}
 
-    def fake_export_centralized(docx_path: Path, out_root: Path):
+    def fake_export_centralized(docx_path: Path, out_root: Path, ast_export: bool = False):
         called["args"] = (docx_path, out_root)
+        called["ast_export"] = ast_export
         return []
 
     # Mock both functions since the build command can use either
@@ -105,3 +106,4 @@ def test_cli_build_invokes_export(monkeypatch, tmp_path):
     result = runner.invoke(app, ["build", "file.docx", "--out", str(tmp_path)])
     assert result.exit_code == 0
     assert called["args"] == (Path("file.docx"), tmp_path)
+    assert called["ast_export"] is False
@@ -2,6 +2,7 @@ import hashlib
 from pathlib import Path
 from core.adapters.document_parser import parse_document
 from core.model.internal_doc import Paragraph, Image
+from core.model.resource_store import ResourceStore
 
 def test_parse_with_real_docx():
     """
@@ -21,13 +22,9 @@ def test_parse_with_real_docx():
     has_paragraph = any(isinstance(b, Paragraph) for b in doc.blocks)
     assert has_paragraph, "Should have at least one paragraph"
 
-    # Assert: Check the ResourceRef objects for images
-    # Current implementation does not extract image resources from DOCX
-    # This is expected behavior - resources list should be empty
-    assert isinstance(resources, list), "Resources should be a list"
+    # Assert: Images are collected in a ResourceStore
+    assert isinstance(resources, ResourceStore), "Resources should be a ResourceStore"
     
-    # Current parser focuses on text content and structure
-    # Image extraction is not implemented yet
     print(f"Resources extracted: {len(resources)}")
     print(f"Total blocks: {len(doc.blocks)}")
     
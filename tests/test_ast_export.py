@@ -0,0 +1,71 @@
+"""Tests for the JSON Lines AST export."""
+
+import io
+from pathlib import Path
+
+from core.model.internal_doc import (
+    InternalDoc, Heading, Paragraph, Text, Image, Table, TableRow, TableCell,
+)
+from core.output.writer import Writer
+from core.render import ast_exporter
+from core.render.ast_exporter import ast_path_for, read_ast_jsonl, write_ast_jsonl
+
+
+def _sample_doc() -> InternalDoc:
+    return InternalDoc(blocks=[
+        Heading(level=2, text="1.1 Установка"),
+        Paragraph(inlines=[Text(content="Текст")]),
+        Image(resource_id="image1", alt="alt", caption="Рисунок 1 – Окно"),
+        Table(
+            header=TableRow(cells=[TableCell(blocks=[Image(resource_id="image2")])]),
+            rows=[],
+        ),
+    ])
+
+
+def test_write_ast_jsonl_one_block_per_line():
+    stream = io.BytesIO()
+
+    count = write_ast_jsonl(stream, _sample_doc().blocks)
+
+    lines = stream.getvalue().decode("utf-8").splitlines()
+    assert count == 4
+    assert len(lines) == 4
+    assert lines[0] == (
+        '{"type":"heading","level":2,"text":"1.1 Установка","number":"1.1","number_parts":[1,1],"title":"Установка","anchor":"установка"}'
+    )
+
+
+def test_ast_carries_structure(tmp_path: Path):
+    path = tmp_path / "chapter.ast.jsonl"
+    with open(path, "wb") as f:
+        write_ast_jsonl(f, _sample_doc().blocks)
+
+    blocks = read_ast_jsonl(path)
+
+    assert [b["type"] for b in blocks] == ["heading", "paragraph", "image", "table"]
+    assert blocks[2]["resource_id"] == "image1"
+    assert blocks[2]["caption"] == "Рисунок 1 – Окно"
+    assert blocks[3]["header"]["cells"][0]["blocks"][0]["resource_id"] == "image2"
+
+
+def test_ast_export_without_orjson(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(ast_exporter, "orjson", None)
+    stream = io.BytesIO()
+
+    write_ast_jsonl(stream, _sample_doc().blocks[:1])
+
+    assert stream.getvalue() == (
+        '{"type":"heading","level":2,"text":"1.1 Установка","number":"1.1","number_parts":[1,1],"title":"Установка","anchor":"установка"}\n'
+    ).encode("utf-8")
+
+
+def test_writer_writes_ast_next_to_markdown(tmp_path: Path):
+    chapter = tmp_path / "01-intro.md"
+
+    Writer(ast_export=True).write_markdown(chapter, _sample_doc(), {})
+    Writer().write_markdown(tmp_path / "02-plain.md", _sample_doc(), {})
+
+    assert ast_path_for(chapter) == tmp_path / "01-intro.ast.jsonl"
+    assert len(read_ast_jsonl(tmp_path / "01-intro.ast.jsonl")) == 4
+    assert not (tmp_path / "02-plain.ast.jsonl").exists()
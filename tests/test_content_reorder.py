@@ -1,7 +1,10 @@
 """Tests for content reordering transform."""
 
 import pytest
-from core.transforms.content_reorder import run, _identify_content_moves, _find_next_section_after, _apply_content_move
+from core.transforms.content_reorder import (
+    run, _identify_content_moves, _apply_content_moves,
+)
+from core.model.config import PipelineConfig, ReorderRule
 from core.model.internal_doc import InternalDoc, Heading, Paragraph, Text
 
 
@@ -122,115 +125,132 @@ class TestIdentifyContentMoves:
         assert moves[0]['block_idx'] == 3
 
 
-class TestFindNextSectionAfter:
-    """Test the _find_next_section_after function."""
-    
-    def test_find_next_section_level_3(self):
-        """Test finding next level 3 section."""
+class TestSectionEnd:
+    """Test where the target section of a rule ends."""
+
+    def _texts(self, blocks):
+        return [b.text if isinstance(b, Heading) else b.inlines[0].content for b in blocks]
+
+    def _moved(self, blocks, target="Section 1", target_level=3):
+        rules = [ReorderRule(match="Content to move", target=target, target_level=target_level)]
+        return self._texts(run(InternalDoc(blocks=blocks), rules).blocks)
+
+    def test_next_section_of_same_level(self):
+        """Test that the next heading of the target's level ends the section."""
         blocks = [
             Heading(level=3, text="Section 1"),
             Paragraph(inlines=[Text(content="Content")]),
-            Heading(level=3, text="Section 2")
+            Heading(level=3, text="Section 2"),
+            Paragraph(inlines=[Text(content="Content to move")]),
         ]
-        
-        next_idx = _find_next_section_after(blocks, 0)
-        assert next_idx == 2
-    
-    def test_find_next_section_higher_level(self):
-        """Test finding next section of higher level (level 2)."""
+
+        assert self._moved(blocks) == ["Section 1", "Content", "Content to move", "Section 2"]
+
+    def test_next_section_of_higher_level(self):
+        """Test that a heading above the target's level ends the section."""
         blocks = [
-            Heading(level=3, text="Section 3.1"),
+            Heading(level=3, text="Section 1"),
             Paragraph(inlines=[Text(content="Content")]),
-            Heading(level=2, text="Chapter 2")
+            Heading(level=2, text="Chapter 2"),
+            Paragraph(inlines=[Text(content="Content to move")]),
         ]
-        
-        next_idx = _find_next_section_after(blocks, 0)
-        assert next_idx == 2
-    
+
+        assert self._moved(blocks) == ["Section 1", "Content", "Content to move", "Chapter 2"]
+
     def test_no_next_section(self):
-        """Test when there's no next section."""
+        """Test that a section without a following heading ends with the document."""
         blocks = [
-            Heading(level=3, text="Last Section"),
-            Paragraph(inlines=[Text(content="Content")])
+            Paragraph(inlines=[Text(content="Content to move")]),
+            Heading(level=3, text="Section 1"),
+            Paragraph(inlines=[Text(content="Content")]),
         ]
-        
-        next_idx = _find_next_section_after(blocks, 0)
-        assert next_idx == 2  # Length of blocks
-    
+
+        assert self._moved(blocks) == ["Section 1", "Content", "Content to move"]
+
     def test_ignore_deeper_levels(self):
-        """Test that deeper level headings are ignored."""
+        """Test that deeper level headings stay inside the section."""
         blocks = [
             Heading(level=3, text="Section 1"),
             Heading(level=4, text="Subsection 1.1"),
             Paragraph(inlines=[Text(content="Content")]),
-            Heading(level=3, text="Section 2")
+            Heading(level=3, text="Section 2"),
+            Paragraph(inlines=[Text(content="Content to move")]),
         ]
-        
-        next_idx = _find_next_section_after(blocks, 0)
-        assert next_idx == 3  # Should skip level 4 heading
-    
-    def test_section_at_end(self):
-        """Test when section is at the end of document."""
+
+        assert self._moved(blocks) == ["Section 1", "Subsection 1.1", "Content", "Content to move", "Section 2"]
+
+    def test_level_four_target_ends_at_its_sibling(self):
+        """Test that a level-4 target section ends at the next level-4 heading."""
         blocks = [
+            Heading(level=3, text="Section 1"),
+            Heading(level=4, text="Item A"),
             Paragraph(inlines=[Text(content="Content")]),
-            Heading(level=3, text="Last Section")
+            Heading(level=4, text="Item B"),
+            Paragraph(inlines=[Text(content="Content to move")]),
+            Heading(level=4, text="Item C"),
         ]
-        
-        next_idx = _find_next_section_after(blocks, 1)
-        assert next_idx == 2  # Length of blocks
 
+        assert self._moved(blocks, target="Item A", target_level=4) == [
+            "Section 1", "Item A", "Content", "Content to move", "Item B", "Item C",
+        ]
 
-class TestApplyContentMove:
-    """Test the _apply_content_move function."""
-    
-    def test_move_to_section_end(self):
-        """Test moving content to end of section."""
+    def test_level_two_target_spans_its_subsections(self):
+        """Test that a level-2 target section runs past its level-3 headings."""
         blocks = [
-            Heading(level=3, text="Target Section"),
-            Paragraph(inlines=[Text(content="Existing content")]),
-            Heading(level=3, text="Next Section"),
-            Paragraph(inlines=[Text(content="Content to move")])
+            Heading(level=2, text="Chapter 1"),
+            Heading(level=3, text="Section 1.1"),
+            Paragraph(inlines=[Text(content="Content")]),
+            Heading(level=2, text="Chapter 2"),
+            Paragraph(inlines=[Text(content="Content to move")]),
+            Heading(level=2, text="Chapter 3"),
         ]
-        
-        move = {
-            'block_idx': 3,
-            'target_section_idx': 0,
-            'move_type': 'to_section_end'
-        }
-        
-        result = _apply_content_move(blocks, move)
-        
-        # Should move paragraph to before "Next Section"
-        assert len(result) == 4
-        assert result[0].text == "Target Section"
-        assert result[1].inlines[0].content == "Existing content"
-        assert result[2].inlines[0].content == "Content to move"
-        assert result[3].text == "Next Section"
-    
-    def test_move_after_section_heading(self):
-        """Test moving content right after section heading."""
+
+        assert self._moved(blocks, target="Chapter 1", target_level=2) == [
+            "Chapter 1", "Section 1.1", "Content", "Content to move", "Chapter 2", "Chapter 3",
+        ]
+
+    def test_content_inside_a_level_two_section_stays(self):
+        """Test that content under a subsection of the target is already in place."""
         blocks = [
+            Heading(level=2, text="Chapter 1"),
+            Heading(level=3, text="Section 1.1"),
+            Paragraph(inlines=[Text(content="Content to move")]),
+            Heading(level=2, text="Chapter 2"),
+        ]
+        rules = [ReorderRule(match="Content to move", target="Chapter 1", target_level=2)]
+
+        assert _identify_content_moves(blocks, rules) == []
+
+
+class TestApplyContentMoves:
+    """Test the _apply_content_moves function."""
+
+    def _blocks(self):
+        return [
             Heading(level=3, text="Target Section"),
             Paragraph(inlines=[Text(content="Existing content")]),
             Heading(level=3, text="Next Section"),
             Paragraph(inlines=[Text(content="Content to move")])
         ]
-        
-        move = {
-            'block_idx': 3,
-            'target_section_idx': 0,
-            'move_type': 'after_heading'
-        }
-        
-        result = _apply_content_move(blocks, move)
-        
-        # Should move paragraph right after "Target Section"
-        assert len(result) == 4
-        assert result[0].text == "Target Section"
-        assert result[1].inlines[0].content == "Content to move"
-        assert result[2].inlines[0].content == "Existing content"
-        assert result[3].text == "Next Section"
-    
+
+    def test_move_to_section_end(self):
+        """Test moving content to end of section."""
+        blocks = self._blocks()
+        move = {'block_idx': 3, 'target_section_idx': 0, 'move_type': 'to_section_end'}
+
+        result = _apply_content_moves(blocks, [move])
+
+        assert result == [blocks[0], blocks[1], blocks[3], blocks[2]]
+
+    def test_move_after_section_heading(self):
+        """Test moving content right after section heading."""
+        blocks = self._blocks()
+        move = {'block_idx': 3, 'target_section_idx': 0, 'move_type': 'after_heading'}
+
+        result = _apply_content_moves(blocks, [move])
+
+        assert result == [blocks[0], blocks[3], blocks[1], blocks[2]]
+
     def test_move_from_before_target(self):
         """Test moving content from before target section."""
         blocks = [
@@ -239,42 +259,73 @@ class TestApplyContentMove:
             Paragraph(inlines=[Text(content="Existing content")]),
             Heading(level=3, text="Next Section")
         ]
-        
-        move = {
-            'block_idx': 0,
-            'target_section_idx': 1,
-            'move_type': 'to_section_end'
-        }
-        
-        result = _apply_content_move(blocks, move)
-        
-        # Should move paragraph to before "Next Section"
-        assert len(result) == 4
-        assert result[0].text == "Target Section"
-        assert result[1].inlines[0].content == "Existing content"
-        assert result[2].inlines[0].content == "Content to move"
-        assert result[3].text == "Next Section"
-    
-    def test_move_to_document_end(self):
-        """Test moving content when target section is at document end."""
+        rules = [ReorderRule(match="Content to move", target="Target Section")]
+
+        result = run(InternalDoc(blocks=blocks), rules)
+
+        assert result.blocks == [blocks[1], blocks[2], blocks[0], blocks[3]]
+
+class TestReorderRules:
+    """Test config-driven reorder rules."""
+
+    def _texts(self, blocks):
+        return [b.text if isinstance(b, Heading) else b.inlines[0].content for b in blocks]
+
+    def test_regex_rule_moves_to_target(self):
+        """Test that pattern rules move matching paragraphs to the end of the target section."""
+        doc = InternalDoc(blocks=[
+            Heading(level=2, text="Install"),
+            Heading(level=3, text="Requirements"),
+            Paragraph(inlines=[Text(content="CPU")]),
+            Heading(level=3, text="Steps"),
+            Paragraph(inlines=[Text(content="RAM: 8 GB")]),
+        ])
+        rules = [ReorderRule(pattern=r"^RAM:\s*\d+", target="Requirements")]
+
+        result = run(doc, rules)
+
+        assert self._texts(result.blocks) == ["Install", "Requirements", "CPU", "RAM: 8 GB", "Steps"]
+
+    def test_moves_keep_rule_order(self):
+        """Test that several moved blocks land in the target section in rule order."""
         blocks = [
-            Heading(level=3, text="Other Section"),
-            Paragraph(inlines=[Text(content="Content to move")]),
-            Heading(level=3, text="Target Section"),
-            Paragraph(inlines=[Text(content="Existing content")])
+            Heading(level=3, text="Target"),
+            Paragraph(inlines=[Text(content="kept")]),
+            Heading(level=3, text="Other"),
+            Paragraph(inlines=[Text(content="second")]),
+            Paragraph(inlines=[Text(content="first")]),
         ]
-        
-        move = {
-            'block_idx': 1,
-            'target_section_idx': 2,
-            'move_type': 'to_section_end'
-        }
-        
-        result = _apply_content_move(blocks, move)
-        
-        # Should move paragraph to end of document
-        assert len(result) == 4
-        assert result[0].text == "Other Section"
-        assert result[1].text == "Target Section"
-        assert result[2].inlines[0].content == "Existing content"
-        assert result[3].inlines[0].content == "Content to move"
\ No newline at end of file
+        rules = [ReorderRule(match="first", target="Target"), ReorderRule(match="second", target="Target")]
+
+        result = run(InternalDoc(blocks=blocks), rules)
+
+        assert self._texts(result.blocks) == ["Target", "kept", "first", "second", "Other"]
+
+    def test_default_rules_move_all_blocks_in_one_pass(self):
+        """Test that matched blocks are gathered before the next section in rule order."""
+        blocks = [
+            Heading(level=3, text="2.1 Основные компоненты"),
+            Paragraph(inlines=[Text(content="Intro")]),
+            Heading(level=3, text="2.2 Next section"),
+            Paragraph(inlines=[Text(content="СУБД PostgreSQL — хранение основной структурированной информации")]),
+            Paragraph(inlines=[Text(content="Other")]),
+            Paragraph(inlines=[Text(content="CMS-сервер (Winter CMS) — основной элемент серверной части")]),
+        ]
+
+        result = _apply_content_moves(blocks, _identify_content_moves(blocks))
+
+        assert result == [blocks[0], blocks[1], blocks[5], blocks[3], blocks[2], blocks[4]]
+
+    def test_rule_requires_matcher(self):
+        """Test that a rule without match or pattern is rejected."""
+        with pytest.raises(ValueError):
+            ReorderRule(target="2.1 Основные компоненты")
+
+    def test_rules_loaded_from_config(self):
+        """Test that reorder rules are read from configuration."""
+        config = PipelineConfig.from_dict({
+            "reorder_rules": [{"match": "moved", "target": "Section", "target_level": 2}]
+        })
+
+        assert config.reorder_rules == [ReorderRule(match="moved", target="Section", target_level=2)]
+        assert len(PipelineConfig().reorder_rules) == 8
@@ -0,0 +1,68 @@
+"""Tests for doc2chapmd profile: cProfile stats, collapsed stacks and the module summary."""
+
+import pstats
+import re
+import time
+
+import pytest
+from typer.testing import CliRunner
+
+import doc2chapmd
+from core.output.hierarchical_writer import export_docx_hierarchy_centralized
+from core.utils.cpu_profile import CpuProfiler, format_summary, module_group, module_summary
+
+
+@pytest.fixture
+def docx_path(tmp_path, docx_bytes):
+    path = tmp_path / "guide.docx"
+    path.write_bytes(docx_bytes)
+    return path
+
+
+def _spin(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_collapsed_stacks_start_below_the_profiled_block(tmp_path):
+    with CpuProfiler(interval=0.001) as profiler:
+        _spin(0.2)
+    _, collapsed_path = profiler.save(tmp_path / "spin")
+
+    lines = collapsed_path.read_text().splitlines()
+    assert lines and all(re.fullmatch(r"\S+ \d+", line) for line in lines)
+    assert all(line.split(";")[0].split(":")[1].split(" ")[0] == "_spin" for line in lines)
+
+
+def test_summary_groups_functions_by_module(docx_path, tmp_path):
+    with CpuProfiler() as profiler:
+        export_docx_hierarchy_centralized(docx_path, tmp_path / "out")
+    pstats_path, _ = profiler.save(tmp_path / "guide")
+
+    summary = module_summary(pstats.Stats(str(pstats_path)), top=3)
+    own = [record.module for record in summary if record.own]
+    assert {"docx_parser", "hierarchical_writer", "markdown_renderer"} <= set(own)
+    assert own == [record.module for record in summary[: len(own)]]
+    assert "cpu_profile" not in own
+    parser = next(record for record in summary if record.module == "docx_parser")
+    assert len(parser.functions) == 3
+    assert parser.functions[0].cumulative_seconds >= parser.functions[-1].cumulative_seconds
+    assert "docx_parser  self" in format_summary(summary, 1.0)
+
+
+def test_module_groups():
+    assert module_group("core.numbering.heading_numbering") == "heading_numbering"
+    assert module_group("xml.etree.ElementTree") == "xml"
+    assert module_group("builtins") == "builtins"
+
+
+def test_profile_command(docx_path, tmp_path):
+    result = CliRunner().invoke(
+        doc2chapmd.app, ["profile", str(docx_path), "--prefix", str(tmp_path / "prof" / "guide"), "--out", str(tmp_path / "out")]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "docx_parser" in result.output
+    assert (tmp_path / "prof" / "guide.pstats").is_file() and (tmp_path / "prof" / "guide.collapsed").is_file()
+    assert any((tmp_path / "out").rglob("*.md"))
@@ -44,3 +44,22 @@ def test_note_paragraph_detection():
     for text, expected in test_cases:
         result = is_note_paragraph(text)
         assert result == expected, f"Failed for text: '{text}', expected {expected}, got {result}"
+
+
+def test_numbered_heading_fields_come_from_the_numbering(monkeypatch):
+    """Numbered headings get number and title from the numbering, not from re-splitting their text."""
+    import core.model.internal_doc as internal_doc
+    from core.adapters.docx_parser import _heading_block
+    from core.numbering.heading_numbering import NumberedHeading
+
+    def no_split(text):
+        raise AssertionError(f"heading text re-split: {text!r}")
+
+    monkeypatch.setattr(internal_doc, "split_heading_text", no_split)
+    numbered = NumberedHeading(level=3, text="2FA Настройка", number="Б.1.2", anchor="2fa-настройка")
+
+    heading = _heading_block(numbered, 3, "2FA Настройка")
+
+    assert heading.text == "Б.1.2 2FA Настройка"
+    assert (heading.number, heading.number_parts, heading.title) == ("Б.1.2", [2, 1, 2], "2FA Настройка")
+    assert heading.anchor == "2fa-настройка"
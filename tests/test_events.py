@@ -0,0 +1,90 @@
+"""Tests for the JSON Lines event stream (--events jsonl)."""
+
+import io
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from core.adapters.docx_parser import parse_docx_to_internal_doc
+from core.utils.events import EventObserver, EventWriter
+
+SCRIPT = Path(__file__).resolve().parent.parent / "doc2chapmd.py"
+
+
+@pytest.fixture
+def docx_path(tmp_path, docx_bytes):
+    path = tmp_path / "guide.docx"
+    path.write_bytes(docx_bytes)
+    return path
+
+
+def _events(text: str) -> list:
+    return [json.loads(line) for line in text.splitlines()]
+
+
+def test_writer_emits_one_object_per_line():
+    stream = io.StringIO()
+    writer = EventWriter(stream)
+
+    writer.emit("batch_started", total=2)
+    writer.write_line('{"event": "progress"}\n')
+
+    first, second = _events(stream.getvalue())
+    assert first["event"] == "batch_started" and first["total"] == 2 and first["time"] > 0
+    assert second == {"event": "progress"}
+
+
+def test_parse_reports_progress_up_to_the_total(docx_bytes):
+    job = EventObserver(EventWriter(io.StringIO()), "guide.docx")
+
+    parse_docx_to_internal_doc(io.BytesIO(docx_bytes), observer=job)
+
+    progress = [event for event in _events(job.events.stream.getvalue()) if event["event"] == "progress"]
+    assert progress and {event["stage"] for event in progress} == {"parse"}
+    done = [event["done"] for event in progress]
+    assert done == sorted(done) and done[-1] == progress[-1]["total"]
+
+
+def test_running_reports_the_failure():
+    job = EventObserver(EventWriter(io.StringIO()), "guide.docx")
+
+    with pytest.raises(ValueError):
+        with job.running("guide.docx", 10):
+            raise ValueError("broken numbering")
+
+    started, failed = _events(job.events.stream.getvalue())
+    assert started["event"] == "job_started" and started["bytes_in"] == 10
+    assert failed["event"] == "job_failed" and failed["error"] == "ValueError: broken numbering"
+
+
+def test_build_streams_events_to_stdout(docx_path, tmp_path):
+    result = subprocess.run(
+        [sys.executable, str(SCRIPT), "build", str(docx_path), "--out", str(tmp_path / "out"), "--events", "jsonl"],
+        cwd=tmp_path, capture_output=True, text=True, check=True,
+    )
+
+    events = _events(result.stdout)
+    assert events[0]["event"] == "job_started" and events[0]["job"] == "guide.docx"
+    assert events[-1]["event"] == "job_finished"
+    assert events[-1]["images"] == 1 and events[-1]["outputs"] > 0 and events[-1]["bytes_out"] > 0
+    finished = [event["stage"] for event in events if event["event"] == "stage_finished"]
+    assert "parse" in finished and "render" in finished
+    assert any(event["event"] == "progress" for event in events)
+    assert "guide" in result.stderr
+
+
+def test_build_reports_failures(docx_path, tmp_path):
+    events_file = tmp_path / "events.jsonl"
+    result = subprocess.run(
+        [sys.executable, str(SCRIPT), "build", str(docx_path), "--out", str(tmp_path / "out"), "--only", "99",
+         "--events", "jsonl", "--events-file", str(events_file)],
+        cwd=tmp_path, capture_output=True, text=True,
+    )
+
+    assert result.returncode != 0
+    events = _events(events_file.read_text(encoding="utf-8"))
+    assert [event["event"] for event in events][0] == "job_started"
+    assert events[-1]["event"] == "job_failed" and events[-1]["error"]
@@ -0,0 +1,99 @@
+"""Tests for the parser heuristic counters and timers."""
+
+import io
+
+from docx import Document
+
+from core.adapters import docx_parser
+from core.adapters.docx_parser import HEURISTICS, parse_docx_to_internal_doc
+from core.adapters.text_rules import default_text_rules
+from core.utils.heuristics import HeuristicStats, format_heuristics
+from core.utils.metrics import ConversionMetrics, ConversionStats
+from core.utils.stages import ProgressCallback, combine_observers
+
+
+def _manual() -> bytes:
+    doc = Document()
+    doc.add_heading("Установка", level=1)
+    doc.add_paragraph("Выполните команду:")
+    doc.add_paragraph("sudo apt install nginx")
+    doc.add_paragraph("Примечание: перезапустите службу.")
+    doc.add_heading("Настройка", level=2)
+    doc.add_paragraph("Первый пункт", style="List Bullet")
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def test_uninstrumented_parser_keeps_its_functions():
+    heuristics = docx_parser._Heuristics()
+    rules = default_text_rules()
+
+    assert heuristics.heading_level is docx_parser.heading_level
+    assert heuristics.rules(rules) is rules
+    assert docx_parser._Heuristics(HeuristicStats()).rules(rules).classify is not rules.classify
+    assert "classify" not in vars(rules)
+
+
+def test_stats_see_their_own_parse_only():
+    source = _manual()
+
+    def counts(nested: bool) -> dict:
+        def parse_another(stage, done, total):
+            if nested:
+                parse_docx_to_internal_doc(io.BytesIO(source))
+
+        with ConversionStats(trace_heuristics=True) as stats:
+            observer = combine_observers(stats, ProgressCallback(parse_another))
+            parse_docx_to_internal_doc(io.BytesIO(source), observer=observer)
+        return {name: record["calls"] for name, record in stats.heuristics.items()}
+
+    # An untraced parse running meanwhile (e.g. another conversion of the service) is not counted
+    assert counts(nested=True) == counts(nested=False)
+
+
+def test_parallel_parse_records_the_workers(monkeypatch):
+    source = _manual()
+    monkeypatch.setattr(docx_parser, "PARALLEL_MIN_CHUNK", 2)
+    counts = []
+    for workers in (1, 2):
+        with ConversionStats(trace_heuristics=True) as stats:
+            parse_docx_to_internal_doc(io.BytesIO(source), workers=workers, observer=stats)
+        counts.append({name: (record["calls"], record["hits"]) for name, record in stats.heuristics.items()})
+
+    assert counts[1] == counts[0] and counts[0]["heading_detection"][0] >= 6
+
+
+def test_parse_records_calls_and_hits():
+    source = _manual()
+    plain, _ = parse_docx_to_internal_doc(io.BytesIO(source))
+
+    with ConversionStats(trace_heuristics=True) as stats:
+        doc, _ = parse_docx_to_internal_doc(io.BytesIO(source), observer=stats)
+
+    assert doc.blocks == plain.blocks
+    records = stats.heuristics
+    assert set(records) == set(HEURISTICS)
+    assert records["heading_detection"]["calls"] >= 6 and records["heading_detection"]["hits"] == 2
+    assert records["list_info"]["hits"] == 1
+    assert records["caption_search"]["calls"] == 0
+    assert all(record["hits"] <= record["calls"] and record["seconds"] >= 0 for record in records.values())
+    assert format_heuristics(records).splitlines()[0].startswith("heuristic")
+
+
+def test_heuristics_are_emitted_with_the_metrics():
+    metrics = ConversionMetrics()
+    metrics.record({"heuristics": {"code_style": {"calls": 10, "hits": 0, "seconds": 0.25}}}, True)
+
+    text = metrics.render()
+    assert 'doc2chapmd_parser_heuristic_calls_total{heuristic="code_style"} 10' in text
+    assert 'doc2chapmd_parser_heuristic_hits_total{heuristic="code_style"} 0' in text
+    assert 'doc2chapmd_parser_heuristic_seconds_total{heuristic="code_style"} 0.25' in text
+
+
+def test_stats_without_tracing_leave_heuristics_out():
+    with ConversionStats() as stats:
+        parse_docx_to_internal_doc(io.BytesIO(_manual()), observer=stats)
+
+    assert stats.heuristics == {}
+    assert stats.heuristic_stats() is None
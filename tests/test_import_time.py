@@ -0,0 +1,65 @@
+"""Cold-start import regression tests for the command line entry points."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Cumulative import time of an entry point, in milliseconds (best of RUNS)
+IMPORT_BUDGET_MS = float(os.environ.get("DOC2CHAPMD_IMPORT_BUDGET_MS", "400"))
+RUNS = 3
+
+# Loaded on first use only
+PIPELINE_MODULES = ("core.adapters.docx_parser", "core.output.hierarchical_writer", "core.model.internal_doc")
+
+
+def _import_times(module: str) -> Dict[str, int]:
+    """Cumulative import time (us) of every module loaded by ``import module`` in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize(
+    "entry_point, lazy_modules",
+    [
+        ("doc2chapmd", PIPELINE_MODULES + ("pydantic", "yaml")),
+        ("batch_convert", PIPELINE_MODULES + ("slugify", "rich.progress")),
+    ],
+)
+def test_entry_point_defers_pipeline_imports(entry_point, lazy_modules):
+    loaded = _import_times(entry_point)
+
+    assert entry_point in loaded
+    assert not set(lazy_modules) & set(loaded)
+
+
+def test_pipeline_defers_parser_and_multiprocessing():
+    loaded = _import_times("core.pipeline")
+
+    assert "core.adapters.docx_parser" not in loaded
+    assert "multiprocessing" not in loaded
+
+
+@pytest.mark.parametrize("entry_point", ["doc2chapmd", "batch_convert"])
+def test_entry_point_import_time_budget(entry_point):
+    best_ms = min(_import_times(entry_point)[entry_point] for _ in range(RUNS)) / 1000
+
+    assert best_ms <= IMPORT_BUDGET_MS, (
+        f"importing {entry_point} took {best_ms:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms); "
+        f"run `python -X importtime -c 'import {entry_point}'` to find the new heavy import"
+    )
@@ -0,0 +1,96 @@
+"""Tests for the per-job limits of batch conversion."""
+
+import sys
+import time
+from pathlib import Path
+
+from core.utils.job_limits import ADDRESS_SPACE, CPU_TIME, WALL_CLOCK, JobLimits, run_limited
+
+
+def _python(code: str) -> list:
+    return [sys.executable, "-c", code]
+
+
+def _alive(pid: int) -> bool:
+    try:
+        state = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()[0]
+    except (OSError, IndexError):
+        return False
+    return state != "Z"
+
+
+def test_finished_job_passes_through():
+    result = run_limited(_python("print('done')"), JobLimits(timeout=30, cpu_seconds=30, address_space=4 << 30))
+
+    assert result.ok and result.limit is None
+    assert result.stdout == "done\n"
+
+
+def test_wall_clock_timeout_kills_the_process_group():
+    spawn = (
+        "import subprocess, sys, time\n"
+        "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+        "print(child.pid, flush=True)\n"
+        "time.sleep(60)\n"
+    )
+    start = time.monotonic()
+    result = run_limited(_python(spawn), JobLimits(timeout=1))
+
+    assert time.monotonic() - start < 30
+    assert not result.ok and result.limit == WALL_CLOCK
+    grandchild = int(result.stdout)
+    deadline = time.monotonic() + 5
+    while _alive(grandchild) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not _alive(grandchild)
+    assert "wall-clock limit of 1 s" in JobLimits(timeout=1).describe(result.limit)
+
+
+def test_cpu_limit():
+    result = run_limited(_python("while True: pass"), JobLimits(timeout=60, cpu_seconds=1))
+
+    assert not result.ok and result.limit == CPU_TIME
+
+
+def test_cpu_limit_of_a_pool_worker():
+    spin = (
+        "from concurrent.futures import ProcessPoolExecutor\n"
+        "def spin():\n"
+        "    while True: pass\n"
+        "if __name__ == '__main__':\n"
+        "    with ProcessPoolExecutor(1) as pool:\n"
+        "        pool.submit(spin).result()\n"
+    )
+    result = run_limited(_python(spin), JobLimits(timeout=60, cpu_seconds=1))
+
+    assert result.returncode == 1 and result.limit == CPU_TIME
+
+
+def test_crashed_pool_worker_is_no_cpu_limit():
+    crash = (
+        "import os, signal\n"
+        "from concurrent.futures import ProcessPoolExecutor\n"
+        "def crash():\n"
+        "    os.kill(os.getpid(), signal.SIGSEGV)\n"
+        "if __name__ == '__main__':\n"
+        "    with ProcessPoolExecutor(1) as pool:\n"
+        "        pool.submit(crash).result()\n"
+    )
+    result = run_limited(_python(crash), JobLimits(timeout=60, cpu_seconds=30))
+
+    assert result.returncode == 1 and result.limit is None
+    assert result.worker_crashed
+
+
+def test_address_space_limit():
+    limits = JobLimits(timeout=60, address_space=512 << 20)
+    result = run_limited(_python("data = bytearray(1 << 30)"), limits)
+
+    assert not result.ok and result.limit == ADDRESS_SPACE
+    assert limits.describe(result.limit) == "ran out of the address-space limit of 512.0 MiB"
+
+
+def test_ordinary_failure_names_no_limit():
+    result = run_limited(_python("raise SystemExit(3)"), JobLimits(timeout=30, cpu_seconds=30))
+
+    assert result.returncode == 3 and result.limit is None
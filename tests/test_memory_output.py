@@ -0,0 +1,39 @@
+"""Tests for converting DOCX bytes into an in-memory output tree."""
+
+import io
+from pathlib import Path
+
+from core.model.config import PipelineConfig
+from core.output.hierarchical_writer import export_docx_hierarchy_centralized, export_docx_hierarchy_to_tree
+from core.pipeline import DocumentPipeline
+
+
+def _tree(root: Path) -> dict:
+    return {path.relative_to(root).as_posix(): path.read_bytes() for path in root.rglob("*") if path.is_file()}
+
+
+def test_hierarchy_tree_matches_disk_export(tmp_path, docx_bytes):
+    data = docx_bytes
+    (tmp_path / "guide.docx").write_bytes(data)
+    export_docx_hierarchy_centralized(tmp_path / "guide.docx", tmp_path / "out", "guide")
+
+    tree = export_docx_hierarchy_to_tree(data, "guide")
+    lazy_tree = export_docx_hierarchy_to_tree(io.BytesIO(data), "guide", lazy_images=True)
+
+    assert dict(tree) == _tree(tmp_path / "out")
+    assert dict(lazy_tree) == dict(tree)
+    images = [path for path in lazy_tree if path.endswith(".png")]
+    assert images and all(lazy_tree.is_lazy(path) for path in images)
+
+
+def test_pipeline_tree_matches_process(tmp_path, docx_bytes):
+    data = docx_bytes
+    (tmp_path / "guide.docx").write_bytes(data)
+    pipeline = DocumentPipeline(PipelineConfig())
+    result = pipeline.process(str(tmp_path / "guide.docx"), str(tmp_path / "out"))
+
+    tree = pipeline.process_to_tree(data, "guide")
+
+    assert result.success
+    assert dict(tree) == _tree(tmp_path / "out")
+    assert {"guide/0.index.md", "guide/manifest.json"} <= set(tree)
@@ -0,0 +1,68 @@
+"""Tests for per-stage memory profiling and the RSS guard."""
+
+import time
+
+import pytest
+
+from core.model.config import PipelineConfig
+from core.output.hierarchical_writer import export_docx_hierarchy_centralized
+from core.pipeline import DocumentPipeline
+from core.utils.memory_profile import MemoryLimitExceeded, MemoryProfiler, current_rss, format_report, parse_size
+from core.utils.stages import STAGES, stage
+
+
+@pytest.fixture
+def docx_path(tmp_path, docx_bytes):
+    path = tmp_path / "guide.docx"
+    path.write_bytes(docx_bytes)
+    return path
+
+
+def test_pipeline_reports_memory_per_stage(docx_path, tmp_path):
+    result = DocumentPipeline(PipelineConfig(profile_memory=True)).process(str(docx_path), str(tmp_path))
+
+    report = result.memory_profile
+    assert result.success
+    assert [record["stage"] for record in report["stages"]] == list(STAGES)
+    assert report["blocks"]["heading"] == 2 and report["blocks"]["image"] == 1
+    assert report["peak_rss"] > 0 and all(record["rss"] > 0 for record in report["stages"])
+    assert any(record["top"] for record in report["stages"])
+    assert "numbering" in format_report(report)
+
+
+def test_exporter_stages(docx_path, tmp_path):
+    with MemoryProfiler(trace=False) as profiler:
+        export_docx_hierarchy_centralized(docx_path, tmp_path, observer=profiler)
+
+    assert [record.stage for record in profiler.stages] == ["numbering", "parse", "assets", "render"]
+    assert all(not record.top for record in profiler.stages)
+
+
+def test_pipeline_fails_cleanly_over_the_limit(docx_path, tmp_path):
+    result = DocumentPipeline(PipelineConfig(max_rss=1024)).process(str(docx_path), str(tmp_path))
+
+    assert not result.success
+    assert "exceeded the limit of 1.0 KiB during numbering" in result.error_message
+    assert result.memory_profile["max_rss"] == 1024
+
+
+def test_guard_interrupts_a_growing_stage():
+    chunk = b"\x01" * (1 << 20)
+    grown = []
+    with pytest.raises(MemoryLimitExceeded) as excinfo:
+        with MemoryProfiler(trace=False, max_rss=current_rss() + (32 << 20), poll_interval=0.005) as profiler:
+            with stage(profiler, "parse"):
+                for _ in range(256):
+                    grown.append(bytearray(chunk))
+                    time.sleep(0.002)
+
+    assert excinfo.value.stage == "parse"
+    assert len(grown) < 256
+
+
+def test_parse_size():
+    assert parse_size("1500") == 1500
+    assert parse_size("512M") == 512 << 20
+    assert parse_size("2GiB") == 2 << 30
+    with pytest.raises(ValueError):
+        parse_size("lots")
@@ -0,0 +1,100 @@
+"""Tests for the Prometheus textfile metrics of batch and service runs."""
+
+import json
+
+import pytest
+
+from core.output.hierarchical_writer import export_docx_hierarchy, export_docx_hierarchy_centralized
+from core.service.server import ConversionService
+from core.utils.metrics import ConversionMetrics, ConversionStats, MetricsRegistry, write_textfile
+from core.utils.template_cache import get_template_cache
+
+
+@pytest.fixture
+def docx_path(tmp_path, docx_bytes):
+    path = tmp_path / "guide.docx"
+    path.write_bytes(docx_bytes)
+    return path
+
+
+def test_exposition_format():
+    registry = MetricsRegistry()
+    documents = registry.counter("jobs_total", "Jobs by outcome.", ["status"])
+    duration = registry.histogram("job_seconds", "Job duration.", buckets=(1, 5))
+    documents.inc(status="converted")
+    documents.inc(2, status='fa"iled')
+    for seconds in (0.5, 3, 9):
+        duration.observe(seconds)
+
+    assert registry.render().splitlines() == [
+        "# HELP jobs_total Jobs by outcome.",
+        "# TYPE jobs_total counter",
+        'jobs_total{status="converted"} 1',
+        'jobs_total{status="fa\\"iled"} 2',
+        "# HELP job_seconds Job duration.",
+        "# TYPE job_seconds histogram",
+        'job_seconds_bucket{le="1"} 1',
+        'job_seconds_bucket{le="5"} 2',
+        'job_seconds_bucket{le="+Inf"} 3',
+        "job_seconds_sum 12.5",
+        "job_seconds_count 3",
+    ]
+    with pytest.raises(ValueError):
+        documents.inc()
+
+
+def test_textfile_is_replaced_atomically(tmp_path):
+    path = tmp_path / "textfile" / "doc2chapmd.prom"
+    write_textfile(path, "old 1\n")
+    write_textfile(path, "new 2\n")
+
+    assert path.read_text() == "new 2\n"
+    assert [entry.name for entry in path.parent.iterdir()] == ["doc2chapmd.prom"]
+
+
+@pytest.mark.parametrize("export", [export_docx_hierarchy_centralized, export_docx_hierarchy])
+def test_conversion_stats(export, docx_path, tmp_path):
+    get_template_cache().clear()
+    with ConversionStats(bytes_in=docx_path.stat().st_size) as stats:
+        export(docx_path, tmp_path / "out", observer=stats)
+
+    figures = json.loads(json.dumps(stats.as_dict()))
+    assert figures["images"] == 1
+    assert {"numbering", "parse", "render"} <= set(figures["stages"])
+    assert figures["template_cache"]["misses"] == 2 and figures["seconds"] > 0
+    assert figures["bytes_out"] == sum(path.stat().st_size for path in (tmp_path / "out").rglob("*") if path.is_file())
+
+
+def test_metrics_accumulate_documents(tmp_path):
+    metrics = ConversionMetrics()
+    metrics.record({"seconds": 1.5, "bytes_in": 100, "bytes_out": 300, "images": 2,
+                    "stages": {"parse": 0.75}, "template_cache": {"hits": 2, "misses": 0}}, True)
+    metrics.record(None, False)
+    metrics.write(tmp_path / "batch.prom")
+
+    text = (tmp_path / "batch.prom").read_text()
+    assert 'doc2chapmd_documents_total{status="converted"} 1' in text
+    assert 'doc2chapmd_documents_total{status="failed"} 1' in text
+    assert 'doc2chapmd_stage_duration_seconds_bucket{stage="parse",le="1"} 1' in text
+    assert "doc2chapmd_output_bytes_total 300" in text
+    assert 'doc2chapmd_template_cache_lookups_total{result="hit"} 2' in text
+    assert 'result="miss"' not in text
+
+
+def test_service_writes_metrics(docx_path, tmp_path):
+    metrics_file = tmp_path / "service.prom"
+    service = ConversionService(workers=1, max_queue=1, metrics_file=metrics_file)
+    try:
+        assert 'doc2chapmd_documents_total' in metrics_file.read_text()
+        service.convert(docx_path, tmp_path / "out")
+        archive = service.convert_to_zip(docx_path)
+        with pytest.raises(FileNotFoundError):
+            service.convert(tmp_path / "missing.docx", tmp_path / "out")
+    finally:
+        service.close()
+
+    assert service.metrics.documents.value(status="converted") == 2
+    assert service.metrics.documents.value(status="failed") == 1
+    assert service.metrics.images.value() == 2
+    assert service.metrics.bytes_out.value() > len(archive)
+    assert 'doc2chapmd_documents_total{status="failed"} 1' in metrics_file.read_text()
@@ -79,3 +79,62 @@ def test_resource_ref_creation():
     assert resource.mime_type == "image/png"
     assert resource.content == content
 
+
+def test_heading_structured_fields():
+    """Tests that Heading splits its text into number, parts, title and anchor."""
+    heading = Heading(level=2, text="1.2 Установка системы")
+    assert heading.number == "1.2"
+    assert heading.number_parts == [1, 2]
+    assert heading.title == "Установка системы"
+    assert heading.anchor == "установка-системы"
+
+    appendix = Heading(level=1, text="Приложение Б. Протоколы")
+    assert appendix.number == "Приложение Б"
+    assert appendix.number_parts == [2]
+    assert appendix.title == "Протоколы"
+
+    plain = Heading(level=1, text="Введение")
+    assert plain.number == ""
+    assert plain.number_parts == []
+    assert plain.title == "Введение"
+
+
+def test_heading_explicit_fields_and_set_text():
+    """Tests that explicit structured fields are kept and set_text recomputes them."""
+    heading = Heading(level=2, text="2.1 Old", anchor="custom")
+    assert heading.anchor == "custom"
+    assert heading.title == "Old"
+
+    heading.set_text("3.4 New title")
+    assert heading.number_parts == [3, 4]
+    assert heading.title == "New title"
+    assert heading.anchor == "new-title"
+
+
+@pytest.mark.parametrize("text, display_title, index, slug", [
+    ("3.7 Настройка", "Настройка", 3, "nastroika"),
+    ("3.4.3 — Функции", "Функции", 3, "funktsii"),
+    ("(2.1) - Описание", "Описание", 2, "opisanie"),
+    ("IV. Chapter Four", "Chapter Four", 9, "chapter-four"),
+    ("Б.1 Протоколы", "Б.1 Протоколы", 2, "protokoly"),
+    ("Приложение В. Конфигурация", "Приложение В. Конфигурация", 3, "konfiguratsiia"),
+    ("Аннотация", "Аннотация", 9, "annotatsiia"),
+])
+def test_consumers_read_heading_fields(text, display_title, index, slug):
+    """Tests that renderer, file names and splitter agree on the structured heading fields."""
+    from core.output.file_naming import chapter_filename, generate_chapter_filename
+    from core.render.markdown_renderer import render_markdown
+    from core.split.chapter_splitter import ChapterRules, split_into_chapters
+
+    heading = Heading(level=2, text=text)
+    assert heading.display_title == display_title
+    assert render_markdown(InternalDoc(blocks=[heading]), {}).strip() == f"# {display_title}"
+
+    fields_index = heading.number_parts[0] if heading.number_parts else 9
+    assert chapter_filename(fields_index, heading.title) == f"{index:02d}-{slug}.md"
+    assert generate_chapter_filename(9, text) == f"{index:02d}-{slug}.md"
+
+    title_page = Paragraph(inlines=[Text(content="АО НТЦ ИТ РОСА")])
+    chapters = split_into_chapters(InternalDoc(blocks=[title_page, heading]), ChapterRules(level=2))
+    zero_chapter = heading.display_title.lower() in ChapterRules().zero_chapter_sections
+    assert len(chapters) == (1 if zero_chapter else 2)
@@ -0,0 +1,94 @@
+"""Tests for the document outline index and block-range views."""
+
+from core.model.internal_doc import (
+    InternalDoc, Heading, Paragraph, Text, Image, ListBlock, ListItem, Table, TableRow, TableCell,
+)
+from core.model.outline import DocumentView, OutlineIndex
+from core.split.chapter_splitter import split_into_chapters, ChapterRules
+
+
+def _doc() -> InternalDoc:
+    return InternalDoc(blocks=[
+        Paragraph(inlines=[Text(content="Title page")]),             # 0
+        Heading(level=1, text="1 Chapter"),                           # 1
+        Image(resource_id="img1"),                                    # 2
+        Heading(level=2, text="1.1 Section"),                         # 3
+        ListBlock(items=[ListItem(blocks=[Image(resource_id="img2")])]),  # 4
+        Heading(level=3, text="1.1.1 Topic"),                         # 5
+        Table(header=TableRow(cells=[TableCell(blocks=[Image(resource_id="img3")])])),  # 6
+        Heading(level=1, text="2 Chapter"),                           # 7
+        Paragraph(inlines=[Text(content="Text")]),                    # 8
+    ])
+
+
+def test_outline_heading_tree_and_ranges():
+    outline = _doc().outline
+
+    assert [(h.index, h.level, h.end, h.content_end) for h in outline.headings] == [
+        (1, 1, 7, 3), (3, 2, 7, 5), (5, 3, 7, 7), (7, 1, 9, 9),
+    ]
+    assert [h.parent for h in outline.headings] == [None, 0, 1, None]
+    assert outline.headings[0].children == [1]
+    assert outline.headings[2].path == (0, 1, 2)
+    assert outline.min_level == 1
+
+
+def test_outline_images_and_tables():
+    outline = _doc().outline
+
+    assert outline.images_in(0, 9) == ["img1", "img2", "img3"]
+    assert outline.images_in(0, 9, nested=False) == ["img1"]
+    assert outline.section_images(1) == ["img2"]
+    assert outline.table_positions == [6]
+    assert outline.tables_in(3, 7) == [6]
+
+
+def test_outline_is_built_once_and_rebuilt_when_blocks_change():
+    doc = _doc()
+    outline = doc.outline
+
+    assert doc.outline is outline
+    doc.blocks.append(Heading(level=2, text="2.1 New"))
+    assert doc.outline is not outline
+    assert len(doc.outline.headings) == 5
+
+
+def test_skipped_levels_leave_gaps_in_path():
+    doc = InternalDoc(blocks=[Heading(level=1, text="A"), Heading(level=3, text="B")])
+
+    assert doc.outline.headings[1].path == (0, None, 1)
+
+
+def test_chapters_are_range_views():
+    doc = _doc()
+
+    chapters = split_into_chapters(doc, ChapterRules(level=1))
+
+    assert all(isinstance(chapter, DocumentView) for chapter in chapters)
+    assert [chapter.ranges for chapter in chapters] == [[(0, 1)], [(1, 7)], [(7, 9)]]
+    assert chapters[1].blocks[0] is doc.blocks[1]
+    assert [h.text for h in chapters[1].headings()] == ["1 Chapter", "1.1 Section", "1.1.1 Topic"]
+    assert chapters[1].image_ids() == ["img1", "img2", "img3"]
+
+
+def test_zero_chapter_collects_non_contiguous_ranges():
+    doc = InternalDoc(blocks=[
+        Heading(level=1, text="Аннотация"),
+        Heading(level=1, text="1 Chapter"),
+        Heading(level=1, text="Содержание"),
+        Paragraph(inlines=[Text(content="TOC")]),
+    ])
+
+    chapters = split_into_chapters(doc, ChapterRules(level=1))
+
+    assert chapters[0].ranges == [(0, 1), (2, 4)]
+    assert [b.type for b in chapters[0].blocks] == ["heading", "heading", "paragraph"]
+    assert len(chapters) == 2
+
+
+def test_outline_of_plain_object():
+    doc = type("Doc", (), {"blocks": [Heading(level=2, text="A"), Image(resource_id="x")]})()
+
+    outline = OutlineIndex.of(doc)
+
+    assert outline.images_in(0, 2) == ["x"]
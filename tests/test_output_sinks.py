@@ -0,0 +1,122 @@
+"""Tests for the output sinks behind Writer and AssetsExporter."""
+
+import io
+import subprocess
+import sys
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from core.model.config import PipelineConfig
+from core.output.hierarchical_writer import export_docx_hierarchy, export_docx_hierarchy_centralized
+from core.output.sinks import MemorySink, OutputSink, TarSink, ZipSink, open_sink
+from core.pipeline import DocumentPipeline
+
+
+def _tree(root: Path) -> dict:
+    return {path.relative_to(root).as_posix(): path.read_bytes() for path in root.rglob("*") if path.is_file()}
+
+
+def _zip_tree(path: Path) -> dict:
+    with zipfile.ZipFile(path) as archive:
+        return {name: archive.read(name) for name in archive.namelist()}
+
+
+def _tar_tree(path: Path, tmp_path: Path) -> dict:
+    target = tmp_path / "extracted"
+    with tarfile.open(path) as archive:
+        archive.extractall(target, filter="data")
+    return _tree(target)
+
+
+@pytest.fixture
+def docx_path(tmp_path, docx_bytes):
+    path = tmp_path / "guide.docx"
+    path.write_bytes(docx_bytes)
+    return path
+
+
+@pytest.mark.parametrize("export", [export_docx_hierarchy_centralized, export_docx_hierarchy])
+def test_archive_formats_hold_the_directory_tree(export, docx_path, tmp_path):
+    export(docx_path, tmp_path / "dir")
+    export(docx_path, tmp_path / "zip", output_format="zip")
+    export(docx_path, tmp_path / "tar", output_format="tar")
+
+    expected = _tree(tmp_path / "dir" / "guide")
+    assert _zip_tree(tmp_path / "zip" / "guide.zip") == expected
+    assert _tar_tree(tmp_path / "tar" / "guide.tar", tmp_path) == expected
+    assert not (tmp_path / "zip" / "guide").exists()
+
+
+@pytest.mark.parametrize("export", [export_docx_hierarchy_centralized, export_docx_hierarchy])
+@pytest.mark.parametrize("output_format", ["tar", "zip"])
+def test_streamed_archive_extracts_to_the_directory_tree(export, output_format, docx_path, tmp_path):
+    export(docx_path, tmp_path / "dir")
+    stream = io.BytesIO()
+
+    export(docx_path, tmp_path / "unused", output_format=output_format, stream=stream)
+
+    archive = tmp_path / f"guide.{output_format}"
+    archive.write_bytes(stream.getvalue())
+    extracted = _zip_tree(archive) if output_format == "zip" else _tar_tree(archive, tmp_path)
+    assert extracted == _tree(tmp_path / "dir")
+    assert not (tmp_path / "unused").exists()
+
+
+def test_cli_build_streams_tar_to_stdout(docx_path, tmp_path):
+    script = Path(__file__).resolve().parent.parent / "doc2chapmd.py"
+    export_docx_hierarchy_centralized(docx_path, tmp_path / "dir")
+
+    result = subprocess.run([sys.executable, str(script), "build", str(docx_path), "--out", "-"],
+                            cwd=tmp_path, capture_output=True, check=True)
+
+    archive = tmp_path / "stdout.tar"
+    archive.write_bytes(result.stdout)
+    assert _tar_tree(archive, tmp_path) == _tree(tmp_path / "dir")
+    assert "guide/010000.vvedenie/0.index.md" in result.stderr.decode()
+
+
+def test_pipeline_output_format(docx_path, tmp_path):
+    DocumentPipeline(PipelineConfig()).process(str(docx_path), str(tmp_path / "dir"))
+
+    result = DocumentPipeline(PipelineConfig(output_format="zip")).process(str(docx_path), str(tmp_path / "zip"))
+
+    assert result.success and result.archive_file == str(tmp_path / "zip" / "guide.zip")
+    assert _zip_tree(Path(result.archive_file)) == _tree(tmp_path / "dir" / "guide")
+
+
+def test_links_repeat_content(tmp_path):
+    with ZipSink(tmp_path / "out.zip", root=tmp_path / "out") as zip_sink:
+        zip_sink.write_bytes(tmp_path / "out/a/image.png", b"png")
+        zip_sink.link(tmp_path / "out/b/image.png", tmp_path / "out/a/image.png")
+    stream = io.BytesIO()
+    with TarSink(stream) as tar_sink:
+        tar_sink.write_bytes("a/image.png", b"png")
+        tar_sink.link("b/image.png", "a/image.png")
+    memory = MemorySink()
+    memory.write_bytes("a/image.png", b"png")
+    memory.link("b/image.png", "a/image.png")
+
+    assert _zip_tree(tmp_path / "out.zip") == {"a/image.png": b"png", "b/image.png": b"png"}
+    with tarfile.open(fileobj=io.BytesIO(stream.getvalue())) as archive:
+        assert archive.getmember("b/image.png").islnk()
+    assert dict(memory.tree) == {"a/image.png": b"png", "b/image.png": b"png"}
+    assert zip_sink.bytes_written == tar_sink.bytes_written == memory.bytes_written == 6
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        open_sink("rar", tmp_path, "guide")
+    with pytest.raises(ValueError):
+        open_sink("directory", tmp_path, "guide", stream=io.BytesIO())
+
+
+def test_incomplete_sink_cannot_be_created():
+    class TextOnlySink(OutputSink):
+        def write_bytes(self, path, data):
+            pass
+
+    with pytest.raises(TypeError):
+        TextOnlySink()
@@ -0,0 +1,103 @@
+"""Parallel parsing by top-level body chunks must match serial parsing."""
+
+import io
+import multiprocessing
+import struct
+import zipfile
+import zlib
+from pathlib import Path
+from xml.etree import ElementTree as ET
+
+from docx import Document
+from docx.shared import Inches
+
+import core.adapters.docx_parser as docx_parser
+from core.adapters.docx_parser import parse_docx_to_internal_doc
+from core.utils.docx_utils import styles_map
+
+
+def _png(shade: int) -> io.BytesIO:
+    raw = b"".join(b"\x00" + bytes((shade, 80, 160)) * 2 for _ in range(2))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    return io.BytesIO(
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", 2, 2, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _build(path: Path) -> None:
+    """A document whose list, code, command/image and caption state crosses heading and table boundaries."""
+    doc = Document()
+    doc.styles.add_style("ROSA_Рисунок_Номер", 1)
+    doc.styles.add_style("ROSA_Команда", 1)
+    for chapter in range(1, 4):
+        doc.add_heading(f"Глава {chapter}", 1)
+        doc.add_paragraph("Первый пункт", style="List Bullet")
+        doc.add_paragraph("Вложенный пункт", style="List Bullet 2")
+        doc.add_heading(f"Раздел {chapter}.1", 2)
+        doc.add_paragraph("Второй пункт", style="List Bullet 2")
+        doc.add_paragraph("docker compose up -d")
+        table = doc.add_table(rows=2, cols=2)
+        table.cell(0, 0).text = "Имя"
+        table.cell(1, 0).paragraphs[0].add_run().add_picture(_png(chapter * 40), width=Inches(0.2))
+        doc.add_paragraph("sudo systemctl restart nginx")
+        doc.add_paragraph("tldr tar")
+        doc.add_picture(_png(chapter * 50), width=Inches(0.2))
+        doc.add_heading(f"Раздел {chapter}.2", 2)
+        doc.add_paragraph(f"Рисунок {chapter} – Схема", style="ROSA_Рисунок_Номер")
+        doc.add_paragraph("ls -la", style="ROSA_Команда")
+        doc.add_paragraph("Файл config.yml:")
+        doc.add_paragraph("version: 3")
+    doc.save(path)
+
+
+def _body_and_styles(path: Path):
+    with zipfile.ZipFile(path) as z:
+        doc_xml = z.read("word/document.xml")
+        styles_xml = z.read("word/styles.xml")
+    body = ET.fromstring(doc_xml).find(".//w:body", docx_parser.NS)
+    return list(body), styles_map(styles_xml)
+
+
+def test_parallel_parse_matches_serial(tmp_path: Path, monkeypatch):
+    path = tmp_path / "manual.docx"
+    _build(path)
+    serial, serial_resources = parse_docx_to_internal_doc(str(path))
+
+    monkeypatch.setattr(docx_parser, "PARALLEL_MIN_CHUNK", 2)
+    parallel, parallel_resources = parse_docx_to_internal_doc(str(path), workers=3)
+
+    assert parallel.model_dump() == serial.model_dump()
+    assert len(parallel_resources) == len(serial_resources)
+
+
+def test_workers_without_fork_parse_the_body_themselves(tmp_path: Path, monkeypatch):
+    path = tmp_path / "manual.docx"
+    _build(path)
+    serial, _ = parse_docx_to_internal_doc(str(path))
+
+    monkeypatch.setattr(docx_parser, "PARALLEL_MIN_CHUNK", 2)
+    monkeypatch.setattr(multiprocessing, "get_all_start_methods", lambda: ["spawn"])
+    parallel, _ = parse_docx_to_internal_doc(str(path), workers=2)
+
+    assert parallel.model_dump() == serial.model_dump()
+
+
+def test_chunks_start_at_headings_or_tables(tmp_path: Path):
+    path = tmp_path / "manual.docx"
+    _build(path)
+    body, style_map = _body_and_styles(path)
+
+    ranges = docx_parser._chunk_ranges(body, style_map, 3)
+
+    assert len(ranges) > 1
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(body)
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    for start, _ in ranges[1:]:
+        element = body[start]
+        assert element.tag == docx_parser._W_TBL or docx_parser.heading_level(element, style_map)
@@ -0,0 +1,116 @@
+"""Tests for converting selected sections only (build --only)."""
+
+import io
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from docx import Document
+
+from core.adapters.docx_parser import parse_docx_to_internal_doc
+from core.output.hierarchical_writer import SectionSelectionError, export_docx_hierarchy, export_docx_hierarchy_centralized
+
+
+def _tree(root: Path) -> dict:
+    return {path.relative_to(root).as_posix(): path.read_bytes() for path in root.rglob("*") if path.is_file()}
+
+
+@pytest.fixture
+def manual(tmp_path, make_png) -> Path:
+    doc = Document()
+    for width, chapter in enumerate(("Введение", "Установка", "Настройка"), start=1):
+        doc.add_heading(chapter, level=1)
+        doc.add_paragraph(f"Текст главы «{chapter}».")
+        doc.add_picture(io.BytesIO(make_png(width, 2)))
+        for section in ("Требования", "Порядок действий"):
+            doc.add_heading(section, level=2)
+            doc.add_paragraph(f"{section}: sudo apt install nginx")
+    path = tmp_path / "manual.docx"
+    doc.save(path)
+    return path
+
+
+@pytest.mark.parametrize("export", [export_docx_hierarchy_centralized, export_docx_hierarchy])
+@pytest.mark.parametrize("only, chapters", [(["2"], {"020000"}), (["2.2"], {"020000"}), (["настр*", "1.1"], {"010000", "030000"})])
+def test_selected_sections_match_full_conversion(export, only, chapters, manual, tmp_path):
+    export(manual, tmp_path / "full")
+    full = _tree(tmp_path / "full")
+
+    written = export(manual, tmp_path / "part", only=only)
+
+    part = _tree(tmp_path / "part")
+    assert written and all(path.is_file() for path in written)
+    assert all(full[name] == content for name, content in part.items())
+    assert {name.split("/")[1][:6] for name in part if name.endswith(".md")} == chapters
+
+
+def test_selection_includes_subsections(manual, tmp_path):
+    written = export_docx_hierarchy_centralized(manual, tmp_path, only=["2"])
+    assert [path.name for path in written] == [
+        "0.index.md", "020100.trebovaniya.md", "020200.poryadok-deistvii.md",
+    ]
+
+    written = export_docx_hierarchy_centralized(manual, tmp_path, only=["2.2"])
+    assert [path.name for path in written] == ["020200.poryadok-deistvii.md"]
+
+
+def test_existing_output_is_left_alone(manual, tmp_path):
+    export_docx_hierarchy_centralized(manual, tmp_path)
+    kept = next(tmp_path.glob("manual/010000.*/0.index.md"))
+    kept.write_text("edited by hand", encoding="utf-8")
+
+    export_docx_hierarchy_centralized(manual, tmp_path, only=["3"])
+
+    assert kept.read_text(encoding="utf-8") == "edited by hand"
+
+
+def test_heading_absorbed_by_code_keeps_numbering_aligned(tmp_path):
+    doc = Document()
+    doc.add_heading("Введение", level=1)
+    doc.add_paragraph("sudo apt install nginx")
+    doc.add_heading("systemctl restart nginx", level=2)  # continues the command block
+    doc.add_heading("Установка", level=1)
+    doc.add_heading("Требования", level=2)
+    doc.add_paragraph("Текст раздела.")
+    path = tmp_path / "commands.docx"
+    doc.save(path)
+
+    full, _ = parse_docx_to_internal_doc(str(path))
+    export_docx_hierarchy_centralized(path, tmp_path / "full")
+    export_docx_hierarchy_centralized(path, tmp_path / "part", only=["2"])
+
+    assert [block.text for block in full.blocks if block.type == "heading"] == ["Введение", "Установка", "2.1 Требования"]
+    full_tree = _tree(tmp_path / "full")
+    part = _tree(tmp_path / "part")
+    assert part and all(full_tree[name] == content for name, content in part.items())
+
+
+def test_parser_stops_after_the_range(manual):
+    full, _ = parse_docx_to_internal_doc(str(manual))
+    headings = [block.text for block in full.blocks if block.type == "heading"]
+
+    doc, _ = parse_docx_to_internal_doc(str(manual), heading_range=lambda found: (3, 6))
+
+    # Skipped headings keep their numbers; no content before or after the range
+    assert [block.text for block in doc.blocks if block.type == "heading"] == headings[:6]
+    assert doc.blocks[:3] == [full.blocks[0], full.blocks[3], full.blocks[5]]
+    assert doc.blocks[3:] == full.blocks[7:14]
+
+
+def test_unknown_section_is_rejected(manual, tmp_path):
+    with pytest.raises(ValueError):
+        export_docx_hierarchy_centralized(manual, tmp_path, only=["7"])
+    assert not (tmp_path / "manual").exists()
+    with pytest.raises(SectionSelectionError):
+        export_docx_hierarchy_centralized(manual, tmp_path, only=[" "])
+
+
+def test_cli_rejects_an_empty_selection_before_converting(manual, tmp_path):
+    script = Path(__file__).resolve().parent.parent / "doc2chapmd.py"
+
+    result = subprocess.run([sys.executable, str(script), "build", str(manual), "--out", str(tmp_path / "out"), "--only", ","],
+                            cwd=tmp_path, capture_output=True, text=True)
+
+    assert result.returncode == 1 and "--only: no sections to select" in result.stdout
+    assert not (tmp_path / "out").exists()
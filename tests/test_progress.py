@@ -0,0 +1,88 @@
+"""Tests for progress callbacks and cooperative cancellation of conversions."""
+
+import pytest
+
+from core.model.config import PipelineConfig
+from core.output.hierarchical_writer import export_docx_hierarchy, export_docx_hierarchy_centralized
+from core.pipeline import DocumentPipeline
+from core.utils.stages import (
+    PROGRESS_STEPS, CancelToken, ConversionCancelled, ProgressCallback, combine_observers, progress_step,
+)
+
+
+@pytest.fixture
+def docx_path(tmp_path, docx_bytes):
+    path = tmp_path / "guide.docx"
+    path.write_bytes(docx_bytes)
+    return path
+
+
+def _final(reports):
+    """Last (done, total) reported per stage."""
+    return {stage: (done, total) for stage, done, total in reports}
+
+
+@pytest.mark.parametrize("export", [export_docx_hierarchy, export_docx_hierarchy_centralized])
+def test_export_reports_progress_of_every_loop(export, docx_path, tmp_path):
+    reports = []
+
+    written = export(docx_path, tmp_path / "out", observer=ProgressCallback(lambda *report: reports.append(report)))
+
+    final = _final(reports)
+    assert final["parse"][0] == final["parse"][1] > 0
+    assert final["render"] == (len(written), len(written))
+    if export is export_docx_hierarchy_centralized:
+        assert final["assets"] == (1, 1)
+    for stage in final:
+        done = [report[1] for report in reports if report[0] == stage]
+        assert done == sorted(done)
+
+
+@pytest.mark.parametrize("total", [1, 99, 100, 101, 199, 860, 10_000])
+def test_progress_step_caps_the_reports(total):
+    reports = sum(1 for done in range(1, total + 1) if done % progress_step(total) == 0 or done == total)
+
+    assert reports <= PROGRESS_STEPS + 1
+    assert reports >= min(total, PROGRESS_STEPS // 2)
+
+
+def test_cancel_stops_the_parse(docx_path, tmp_path):
+    token = CancelToken()
+    reports = []
+
+    def cancel_on_first_report(stage, done, total):
+        reports.append(stage)
+        token.cancel()
+
+    with pytest.raises(ConversionCancelled):
+        export_docx_hierarchy_centralized(
+            docx_path, tmp_path / "out", observer=combine_observers(ProgressCallback(cancel_on_first_report), token)
+        )
+
+    assert reports == ["parse"]
+    assert not any((tmp_path / "out").rglob("*.md"))
+
+
+def test_cancel_stops_the_render(docx_path, tmp_path):
+    token = CancelToken()
+
+    def cancel_when_rendering(stage, done, total):
+        if stage == "render" and done == 1:
+            token.cancel()
+
+    with pytest.raises(ConversionCancelled):
+        export_docx_hierarchy(
+            docx_path, tmp_path / "out", observer=combine_observers(ProgressCallback(cancel_when_rendering), token)
+        )
+
+    assert len(list((tmp_path / "out").rglob("*.md"))) == 1
+
+
+def test_cancelled_pipeline_run_is_unsuccessful(docx_path, tmp_path):
+    token = CancelToken()
+    token.cancel()
+
+    result = DocumentPipeline(PipelineConfig()).process(str(docx_path), str(tmp_path / "out"), observer=token)
+
+    assert not result.success and result.error_message == "conversion cancelled"
+    assert token.cancelled
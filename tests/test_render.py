@@ -1,10 +1,13 @@
 import hashlib
 from pathlib import Path
 
-from core.model.internal_doc import InternalDoc, Heading, Paragraph, Text, Bold, Image, CodeBlock
+from core.model.internal_doc import (
+    InternalDoc, Heading, Paragraph, Text, Bold, Image, CodeBlock,
+    ListBlock, ListItem, Table, TableRow, TableCell,
+)
 from core.model.resource_ref import ResourceRef
 from core.render.assets_exporter import export_assets
-from core.render.markdown_renderer import render_markdown
+from core.render.markdown_renderer import render_markdown, render_markdown_to
 
 def test_export_assets(tmp_path: Path):
     """
@@ -215,3 +218,42 @@ def test_render_images_use_resource_id_for_paths():
     assert "sign: Рисунок 1 – Описание первого изображения" in markdown_output
     assert "sign: Рисунок 2 – Описание второго изображения" in markdown_output
     assert "sign: Схема работы системы" in markdown_output
+
+
+def test_render_markdown_to_streams_same_output():
+    """Tests that the streaming emitter writes the same Markdown as render_markdown."""
+    import io
+
+    nested = ListBlock(items=[
+        ListItem(blocks=[
+            Paragraph(inlines=[Text(content="Child")]),
+            CodeBlock(code="ls -la", language="bash"),
+            Paragraph(inlines=[]),
+        ]),
+    ])
+    doc = InternalDoc(blocks=[
+        Heading(level=2, text="1.1 Setup"),
+        ListBlock(ordered=True, items=[
+            ListItem(blocks=[Paragraph(inlines=[Text(content="Parent")]), nested]),
+        ]),
+        ListBlock(items=[ListItem(blocks=[Paragraph(inlines=[Text(content="Next")])])]),
+        Table(
+            header=TableRow(cells=[TableCell(blocks=[Paragraph(inlines=[Text(content="A")])])]),
+            rows=[TableRow(cells=[TableCell(blocks=[CodeBlock(code="x\ny")])])],
+        ),
+    ])
+
+    stream = io.StringIO()
+    render_markdown_to(stream, doc, {})
+
+    assert stream.getvalue() == render_markdown(doc, {})
+    assert stream.getvalue().splitlines()[2:7] == [
+        "1. Parent",
+        "  - Child",
+        "    ```bash",
+        "    ls -la",
+        "    ```",
+    ]
+    # The trailing empty paragraph of the nested list is dropped before the next list
+    assert stream.getvalue().splitlines()[7] == "- Next"
+
@@ -0,0 +1,127 @@
+"""Tests for the ResourceStore memory budget and spill-to-disk behaviour."""
+
+import hashlib
+import io
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from core.model.internal_doc import InternalDoc, Heading, Image
+from core.model.resource_store import ResourceStore
+from core.render.assets_exporter import AssetsExporter, export_assets
+
+
+def _zip_with_media(path: Path, members: dict) -> None:
+    with zipfile.ZipFile(path, "w") as z:
+        for name, content in members.items():
+            z.writestr(name, content)
+
+
+class TestResourceStore:
+    """Test keeping resources in memory up to a budget."""
+
+    def test_small_resources_stay_in_memory(self):
+        store = ResourceStore(memory_budget=100)
+        entry = store.add("img1", "image/png", b"x" * 40)
+
+        assert entry.location == "memory"
+        assert entry.sha256 == hashlib.sha256(b"x" * 40).hexdigest()
+        assert store.memory_used == 40
+        assert store.read("img1") == b"x" * 40
+
+    def test_resources_over_budget_are_spilled(self):
+        with ResourceStore(memory_budget=50) as store:
+            store.add("img1", "image/png", b"a" * 40)
+            entry = store.add("img2", "image/png", b"b" * 40)
+
+            assert entry.location == "spill"
+            assert store.memory_used == 40
+            with store.open("img2") as stream:
+                assert stream.read() == b"b" * 40
+            spill_dir = store._spill_dir
+            assert spill_dir.exists()
+
+        assert not spill_dir.exists()
+
+    def test_archive_members_over_budget_stay_in_archive(self, tmp_path):
+        docx = tmp_path / "doc.docx"
+        _zip_with_media(docx, {"word/media/image1.png": b"p" * 64})
+
+        store = ResourceStore(memory_budget=10)
+        with zipfile.ZipFile(docx) as z:
+            entry = store.add_from_archive("image1", "image/png", z, "word/media/image1.png")
+
+        assert entry.location == "archive"
+        assert entry.size == 64
+        assert store.memory_used == 0
+        assert store.read("image1") == b"p" * 64
+
+    def test_archive_streams_are_spilled(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as z:
+            z.writestr("word/media/image1.png", b"q" * 64)
+
+        with ResourceStore(memory_budget=10) as store:
+            with zipfile.ZipFile(buffer) as z:
+                entry = store.add_from_archive("image1", "image/png", z, "word/media/image1.png")
+            assert entry.location == "spill"
+            assert store.read("image1") == b"q" * 64
+
+    def test_empty_archive_members_are_skipped(self, tmp_path):
+        docx = tmp_path / "doc.docx"
+        _zip_with_media(docx, {"word/media/empty.png": b""})
+
+        store = ResourceStore()
+        with zipfile.ZipFile(docx) as z:
+            assert store.add_from_archive("empty", "image/png", z, "word/media/empty.png") is None
+        assert len(store) == 0
+
+    def test_release_frees_memory(self):
+        store = ResourceStore(memory_budget=100)
+        store.add("img1", "image/png", b"x" * 40)
+        store.release("img1")
+
+        assert store.memory_used == 0
+        assert "img1" not in store
+        with pytest.raises(KeyError):
+            store.open("img1")
+
+    def test_iteration_yields_resource_refs(self):
+        store = ResourceStore(memory_budget=0)
+        store.add("img1", "image/png", b"data")
+
+        refs = list(store)
+
+        assert [r.id for r in refs] == ["img1"]
+        assert refs[0].content == b"data"
+
+
+class TestExportFromStore:
+    """Test that exporters stream from the store and release exported resources."""
+
+    def test_export_assets_releases_resources(self, tmp_path):
+        store = ResourceStore(memory_budget=0)
+        store.add("img1", "image/png", b"one")
+        store.add("img2", "image/png", b"one")
+
+        asset_map = export_assets(store, str(tmp_path / "assets"))
+
+        assert (tmp_path / "assets" / "img1.png").read_bytes() == b"one"
+        assert asset_map["img2"] == asset_map["img1"]
+        assert len(store) == 0
+
+    def test_hierarchical_export_from_spilled_store(self, tmp_path):
+        store = ResourceStore(memory_budget=0)
+        store.add("image1", "image/png", b"png-bytes")
+        doc = InternalDoc(blocks=[
+            Heading(level=1, text="1 Setup"),
+            Image(resource_id="image1"),
+        ])
+
+        exporter = AssetsExporter(tmp_path / "doc")
+        asset_map = exporter.export_hierarchical_images(doc, store)
+
+        assert asset_map == {"image1": "doc/setup/image1.png"}
+        assert (tmp_path / "doc" / "setup" / "image1.png").read_bytes() == b"png-bytes"
+        assert "image1" not in store
@@ -0,0 +1,88 @@
+"""Tests for the local conversion service and its client."""
+
+import io
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+import pytest
+from docx import Document
+
+from core.output.hierarchical_writer import export_docx_hierarchy_centralized
+from core.service.client import ServiceClient, ServiceError
+from core.service.server import ConversionService, ServiceBusy, job_options, make_server, server_url
+
+
+def _make_docx(path: Path) -> Path:
+    doc = Document()
+    doc.add_heading("Введение", level=1)
+    doc.add_paragraph("Текст первой главы.")
+    doc.add_heading("Установка", level=1)
+    doc.add_paragraph("sudo apt install nginx")
+    doc.save(path)
+    return path
+
+
+def _tree(root: Path) -> dict:
+    return {path.relative_to(root).as_posix(): path.read_bytes() for path in root.rglob("*") if path.is_file()}
+
+
+@pytest.fixture
+def running_service(tmp_path):
+    service = ConversionService(workers=1, max_queue=1)
+    server = make_server(service, socket_path=tmp_path / "service.sock")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield service, server_url(server)
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def test_service_output_matches_direct_export(running_service, tmp_path):
+    _, url = running_service
+    docx_path = _make_docx(tmp_path / "guide.docx")
+    export_docx_hierarchy_centralized(docx_path, tmp_path / "direct")
+    client = ServiceClient(url)
+
+    written = client.convert(docx_path, tmp_path / "served")
+    archive = zipfile.ZipFile(io.BytesIO(client.convert_to_zip(docx_path)))
+
+    assert written and all(path.is_file() for path in written)
+    assert _tree(tmp_path / "served") == _tree(tmp_path / "direct")
+    assert {name: archive.read(name) for name in archive.namelist()} == _tree(tmp_path / "direct")
+    assert client.health()["workers"] == 1
+
+
+def test_service_reports_bad_requests(running_service, tmp_path):
+    _, url = running_service
+
+    with pytest.raises(ServiceError) as excinfo:
+        ServiceClient(url).convert(tmp_path / "missing.docx", tmp_path / "out")
+
+    assert excinfo.value.status == 404
+
+
+def test_full_queue_is_rejected():
+    service = ConversionService(workers=1, max_queue=0)
+    try:
+        service.warm_up()
+        busy = threading.Thread(target=service._run, args=(time.sleep, 0.5))
+        busy.start()
+        time.sleep(0.1)
+
+        with pytest.raises(ServiceBusy):
+            service._run(time.sleep, 0)
+        busy.join()
+        service._run(time.sleep, 0)
+    finally:
+        service.close()
+
+
+def test_job_options_validation():
+    assert job_options({"folder_name": "x", "ast_export": "true", "parse_workers": "1"}) == {
+        "folder_name": "x", "ast_export": True,
+    }
+    with pytest.raises(ValueError):
+        job_options({"parse_workers": 0})
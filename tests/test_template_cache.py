@@ -0,0 +1,90 @@
+"""Tests for the cross-document style and numbering template cache."""
+
+from pathlib import Path
+
+from core.numbering.heading_numbering import _parse_numbering, _style_to_level
+from core.utils.docx_utils import numbering_formats, style_num_map, styles_map
+from core.utils.template_cache import TemplateCache
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+STYLES_XML = f"""<w:styles {W}>
+  <w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/></w:style>
+  <w:style w:type="paragraph" w:styleId="ROSA2"><w:name w:val="ROSA_Заголовок 2"/>
+    <w:pPr><w:outlineLvl w:val="1"/></w:pPr></w:style>
+  <w:style w:type="paragraph" w:styleId="ListBullet"><w:name w:val="List Bullet"/>
+    <w:pPr><w:numPr><w:numId w:val="3"/></w:numPr></w:pPr></w:style>
+</w:styles>""".encode("utf-8")
+
+NUMBERING_XML = f"""<w:numbering {W}>
+  <w:abstractNum w:abstractNumId="0">
+    <w:lvl w:ilvl="0"><w:start w:val="1"/><w:numFmt w:val="bullet"/><w:lvlText w:val="-"/></w:lvl>
+    <w:lvl w:ilvl="1"><w:numFmt w:val="upperLetter"/><w:lvlRestart w:val="0"/></w:lvl>
+  </w:abstractNum>
+  <w:num w:numId="3"><w:abstractNumId w:val="0"/></w:num>
+</w:numbering>""".encode("utf-8")
+
+
+def test_tables_match_direct_parsing():
+    cache = TemplateCache()
+
+    styles = cache.style_tables(STYLES_XML)
+    numbering = cache.numbering_tables(NUMBERING_XML)
+
+    assert styles.names == styles_map(STYLES_XML)
+    assert styles.levels == _style_to_level(STYLES_XML)
+    assert styles.num_ids == style_num_map(STYLES_XML)
+    assert numbering.formats == numbering_formats(NUMBERING_XML)
+    assert numbering.definitions == _parse_numbering(NUMBERING_XML)
+
+
+def test_identical_parts_are_parsed_once():
+    cache = TemplateCache()
+
+    first = cache.style_tables(STYLES_XML)
+    second = cache.style_tables(bytes(STYLES_XML))
+    cache.style_tables(STYLES_XML.replace(b"heading 1", b"heading 3"))
+
+    assert second is first
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+
+
+def test_missing_parts_give_empty_tables():
+    cache = TemplateCache()
+
+    assert cache.style_tables(None).names == {}
+    assert cache.numbering_tables(None).definitions == {}
+
+
+def test_disk_cache_is_shared_between_instances(tmp_path: Path):
+    TemplateCache(tmp_path).numbering_tables(NUMBERING_XML)
+    cache = TemplateCache(tmp_path)
+
+    numbering = cache.numbering_tables(NUMBERING_XML)
+
+    assert cache.stats.disk_hits == 1 and cache.stats.misses == 0
+    assert numbering.definitions == _parse_numbering(NUMBERING_XML)
+    assert numbering.definitions[3].lvls[1].restart == 0
+
+
+def test_corrupt_disk_entry_is_rebuilt(tmp_path: Path):
+    TemplateCache(tmp_path).style_tables(STYLES_XML)
+    for path in tmp_path.glob("styles-*.json"):
+        path.write_text("{not json", encoding="utf-8")
+    cache = TemplateCache(tmp_path)
+
+    styles = cache.style_tables(STYLES_XML)
+
+    assert cache.stats.misses == 1
+    assert styles.names == styles_map(STYLES_XML)
+    assert TemplateCache(tmp_path).style_tables(STYLES_XML).names == styles.names
+
+
+def test_memory_entries_are_bounded():
+    cache = TemplateCache(max_entries=1)
+
+    cache.style_tables(STYLES_XML)
+    cache.numbering_tables(NUMBERING_XML)
+    cache.style_tables(STYLES_XML)
+
+    assert cache.stats.misses == 3
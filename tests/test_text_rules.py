@@ -0,0 +1,68 @@
+"""Tests for the YAML text rule registry of the DOCX parser."""
+
+from pathlib import Path
+
+import pytest
+import yaml
+from docx import Document
+from pydantic import ValidationError
+
+from core.adapters.docx_parser import parse_docx_to_internal_doc
+from core.adapters.text_rules import DEFAULT_TEXT_RULES_PATH, TextRules, default_text_rules, load_text_rules
+from core.model.internal_doc import CodeBlock, Paragraph
+
+
+def test_default_rules_classify_in_one_match():
+    rules = default_text_rules()
+
+    bash = rules.classify("sudo systemctl restart nginx")
+    yaml_start = rules.classify("services:")
+    sql_tail = rules.classify("  id int);")
+
+    assert rules.detect_language(bash) == "bash"
+    assert rules.starts(yaml_start, "yaml")
+    assert not rules.starts(rules.classify("name: value"), "yaml")
+    assert rules.continues(sql_tail, "sql") and not rules.belongs_to(sql_tail, "sql")
+    assert rules.is_note(rules.classify("Примечание — текст"))
+    assert rules.is_table_caption(rules.classify("таблица 2 – Параметры"))
+
+
+def test_yaml_hint_opens_titled_block():
+    rules = default_text_rules()
+    hint = rules.classify("Файл docker-compose.yml:")
+
+    assert rules.starts_after_hint(rules.classify("version: 3"), hint, "yaml")
+    assert rules.hint_title("yaml", "Файл docker-compose.yml:") == "docker-compose.yml"
+
+
+def test_clean_prompt():
+    assert default_text_rules().clean_prompt("# apt install foo") == "apt install foo"
+    assert default_text_rules().clean_prompt("#comment") == "#comment"
+
+
+def test_invalid_regex_is_rejected():
+    with pytest.raises(ValidationError):
+        TextRules.model_validate({"note": {"patterns": ["(unclosed"]}})
+
+
+def test_default_language_needs_a_rule():
+    with pytest.raises(ValidationError):
+        TextRules.model_validate({"code_languages": [{"language": "sql", "line": "SELECT"}]})
+
+
+def test_custom_language_from_yaml(tmp_path: Path):
+    data = yaml.safe_load(DEFAULT_TEXT_RULES_PATH.read_text(encoding="utf-8"))
+    data["code_languages"].append({"language": "powershell", "title": "PowerShell", "line": r"(Get|Set)-\w+"})
+    rules_path = tmp_path / "rules.yaml"
+    rules_path.write_text(yaml.safe_dump(data, allow_unicode=True), encoding="utf-8")
+    doc = Document()
+    doc.add_paragraph("Список процессов")
+    doc.add_paragraph("Get-Process")
+    doc.add_paragraph("Set-Location C:\\")
+    docx_path = tmp_path / "ps.docx"
+    doc.save(docx_path)
+
+    internal_doc, _ = parse_docx_to_internal_doc(str(docx_path), text_rules=load_text_rules(rules_path))
+
+    assert isinstance(internal_doc.blocks[0], Paragraph)
+    assert internal_doc.blocks[1] == CodeBlock(code="Get-Process\nSet-Location C:\\", language="powershell", title="PowerShell")
@@ -0,0 +1,100 @@
+"""Tests for the degraded conversion mode of an exhausted time budget."""
+
+import io
+import json
+
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+
+from core.adapters.docx_parser import parse_docx_to_internal_doc
+from core.model.config import PipelineConfig
+from core.model.internal_doc import Image, InternalDoc, Paragraph, Table, TableCell, TableRow, Text
+from core.output import hierarchical_writer
+from core.output.hierarchical_writer import export_docx_hierarchy_centralized
+from core.pipeline import DocumentPipeline
+from core.render.markdown_renderer import MarkdownRenderer
+from core.utils.stages import CancelToken, combine_observers
+from core.utils.time_budget import DEGRADED_FILE, TimeBudget
+
+
+def _captioned(make_png) -> bytes:
+    doc = Document()
+    doc.styles.add_style("ROSA_Рисунок_Номер", WD_STYLE_TYPE.PARAGRAPH)
+    doc.add_heading("Настройка", level=1)
+    doc.add_picture(io.BytesIO(make_png()))
+    doc.add_paragraph("Схема подключения", style="ROSA_Рисунок_Номер")
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _images(doc):
+    return [block for block in doc.blocks if isinstance(block, Image)]
+
+
+def test_exhausted_budget_skips_the_caption_search(make_png):
+    source = _captioned(make_png)
+    plain, _ = parse_docx_to_internal_doc(io.BytesIO(source))
+    budget = TimeBudget(0)
+
+    degraded, _ = parse_docx_to_internal_doc(io.BytesIO(source), observer=budget)
+
+    assert [image.caption for image in _images(plain)] == ["Схема подключения"]
+    assert [image.caption for image in _images(degraded)] == [""]
+    assert any(isinstance(block, Paragraph) and block.inlines[0].content == "Схема подключения"
+               for block in degraded.blocks)
+    assert budget.exceeded and budget.exceeded_in == "parse"
+
+
+def test_image_action_lists_render_as_plain_cells():
+    cell = TableCell(blocks=[
+        Image(resource_id="save", alt="", caption="Сохранить"),
+        Paragraph(inlines=[Text(content="– сохранить файл")]),
+    ])
+    header = TableRow(cells=[TableCell(blocks=[Paragraph(inlines=[Text(content="Кнопки")])])])
+    doc = InternalDoc(blocks=[Table(header=header, rows=[TableRow(cells=[cell])])])
+
+    assert "- [Сохранить](/save.png) сохранить файл" in MarkdownRenderer().render(doc)
+    assert "- [Сохранить]" not in MarkdownRenderer(image_action_lists=False).render(doc)
+
+
+def test_export_within_budget_is_unchanged(docx_bytes, tmp_path):
+    path = tmp_path / "guide.docx"
+    path.write_bytes(docx_bytes)
+    export_docx_hierarchy_centralized(path, tmp_path / "plain")
+    budget = TimeBudget(3600)
+
+    export_docx_hierarchy_centralized(path, tmp_path / "budget", observer=budget)
+
+    plain = {p.relative_to(tmp_path / "plain"): p.read_bytes() for p in (tmp_path / "plain").rglob("*") if p.is_file()}
+    within = {p.relative_to(tmp_path / "budget"): p.read_bytes() for p in (tmp_path / "budget").rglob("*") if p.is_file()}
+    assert within == plain and not budget.exceeded
+
+
+def test_degraded_export_is_marked(docx_bytes, tmp_path):
+    path = tmp_path / "guide.docx"
+    path.write_bytes(docx_bytes)
+
+    export_docx_hierarchy_centralized(path, tmp_path / "out", observer=TimeBudget(0))
+    export_docx_hierarchy_centralized(path, tmp_path / "group", observer=combine_observers(CancelToken(), TimeBudget(1e-9)))
+
+    marker = json.loads((tmp_path / "out" / "guide" / DEGRADED_FILE).read_text(encoding="utf-8"))
+    assert marker["degraded"] is True and marker["skipped"] == list(hierarchical_writer.DEGRADED_SKIPS)
+    assert "content_reorder" not in marker["skipped"]
+    assert marker["time_budget_seconds"] == 0
+    grouped = json.loads((tmp_path / "group" / "guide" / DEGRADED_FILE).read_text(encoding="utf-8"))
+    assert grouped["time_budget_seconds"] == 1e-9
+
+
+def test_degraded_pipeline_marks_the_manifest(docx_bytes, tmp_path):
+    path = tmp_path / "guide.docx"
+    path.write_bytes(docx_bytes)
+
+    result = DocumentPipeline(PipelineConfig(time_budget=1e-9, profile_transforms=True)).process(str(path), str(tmp_path / "out"))
+
+    assert result.success and result.degraded
+    assert "content_reorder" not in result.transform_stats
+    manifest = json.loads((tmp_path / "out" / "guide" / "manifest.json").read_text(encoding="utf-8"))
+    assert manifest["degraded"]["time_budget_seconds"] == 1e-9
+    assert "content_reorder" in manifest["degraded"]["skipped"]
+    assert not DocumentPipeline(PipelineConfig()).process(str(path), str(tmp_path / "plain")).degraded
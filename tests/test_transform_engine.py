@@ -0,0 +1,155 @@
+"""Tests for the fused transform engine and the normalize transform."""
+
+from core.model.internal_doc import (
+    InternalDoc, Heading, Paragraph, Text, Code, Image, CodeBlock,
+    ListBlock, ListItem, Table, TableRow, TableCell,
+)
+from core.transforms.content_reorder import ContentReorder
+from core.transforms.engine import Transform, TransformEngine, run_transforms
+from core.transforms.normalize import NormalizeText, run as normalize
+from core.model.config import PipelineConfig, ReorderRule
+from core.pipeline import DocumentPipeline
+
+
+class _Recorder(Transform):
+    name = "recorder"
+
+    def __init__(self):
+        self.blocks = []
+        self.inlines = []
+
+    def visit_block(self, block):
+        self.blocks.append(block.type)
+
+    def visit_inline(self, inline):
+        self.inlines.append(inline.content)
+
+
+def _nested_doc() -> InternalDoc:
+    return InternalDoc(blocks=[
+        Heading(level=2, text="Title"),
+        ListBlock(items=[ListItem(blocks=[
+            Paragraph(inlines=[Text(content="item")]),
+            ListBlock(items=[ListItem(blocks=[Paragraph(inlines=[Text(content="nested")])])]),
+        ])]),
+        Table(
+            header=TableRow(cells=[TableCell(blocks=[Paragraph(inlines=[Text(content="head")])])]),
+            rows=[TableRow(cells=[TableCell(blocks=[Image(resource_id="img1")])])],
+        ),
+    ])
+
+
+def test_engine_visits_nested_blocks_once():
+    recorder = _Recorder()
+
+    run_transforms(_nested_doc(), [recorder])
+
+    assert recorder.blocks == ["heading", "list", "paragraph", "list", "paragraph", "table", "paragraph", "image"]
+    assert recorder.inlines == ["item", "nested", "head"]
+
+
+def test_top_level_visit_follows_the_nested_visits():
+    seen = []
+
+    class TopLevel(_Recorder):
+        def visit_top_level(self, index, block):
+            seen.append((index, block.type, len(self.blocks)))
+
+    run_transforms(_nested_doc(), [TopLevel()])
+
+    assert seen == [(0, "heading", 1), (1, "list", 5), (2, "table", 8)]
+
+
+def test_reorder_does_not_rescan_in_finish(monkeypatch):
+    import core.transforms.content_reorder as content_reorder
+
+    def rescan(*args):
+        raise AssertionError("blocks scanned again in finish")
+
+    monkeypatch.setattr(content_reorder, "_identify_content_moves", rescan)
+    doc = InternalDoc(blocks=[
+        Heading(level=3, text="Target"),
+        Heading(level=3, text="Other"),
+        Paragraph(inlines=[Text(content="move me")]),
+    ])
+    reorder = ContentReorder([ReorderRule(match="move me", target="Target")])
+
+    result = run_transforms(doc, [reorder])
+
+    assert [b.type for b in result.blocks] == ["heading", "paragraph", "heading"]
+    assert run_transforms(result, [reorder]).blocks == result.blocks
+
+
+def test_engine_reports_cost_per_transform():
+    engine = TransformEngine([_Recorder(), NormalizeText(), ContentReorder([])])
+
+    engine.run(_nested_doc())
+
+    assert set(engine.stats) == {"recorder", "normalize", "content_reorder"}
+    assert all(seconds >= 0 for seconds in engine.stats.values())
+
+
+def test_untimed_traversal_reads_no_clock(monkeypatch):
+    readings = []
+    monkeypatch.setattr("core.transforms.engine.time.perf_counter", lambda: readings.append(1) or 0.0)
+    recorder = _Recorder()
+
+    run_transforms(_nested_doc(), [recorder])
+    assert readings == [] and len(recorder.blocks) == 8
+
+    stats = {}
+    run_transforms(_nested_doc(), [_Recorder()], stats)
+    assert readings and set(stats) == {"recorder"}
+
+
+def test_pipeline_times_transforms_only_when_asked(docx_bytes, tmp_path):
+    path = tmp_path / "guide.docx"
+    path.write_bytes(docx_bytes)
+
+    plain = DocumentPipeline(PipelineConfig()).process(str(path), str(tmp_path / "plain"))
+    profiled = DocumentPipeline(PipelineConfig(profile_transforms=True)).process(str(path), str(tmp_path / "profiled"))
+
+    assert plain.success and plain.transform_stats is None
+    assert profiled.success and "normalize" in profiled.transform_stats
+
+
+def test_finish_runs_after_traversal():
+    doc = InternalDoc(blocks=[
+        Heading(level=3, text="Target"),
+        Heading(level=3, text="Other"),
+        Paragraph(inlines=[Text(content="move\u00adme")]),
+    ])
+    rules = [ReorderRule(match="moveme", target="Target")]
+
+    result = run_transforms(doc, [NormalizeText(), ContentReorder(rules)])
+
+    # Normalization has already removed the soft hyphen when the rule is matched
+    assert [b.type for b in result.blocks] == ["heading", "paragraph", "heading"]
+
+
+def test_normalize_removes_soft_hyphens_and_zero_width_spaces():
+    doc = InternalDoc(blocks=[
+        Heading(level=2, text="Уста\u00adновка"),
+        Paragraph(inlines=[Text(content="\ufeffна\u200bстройка"), Code(content="a\u00adb")]),
+        Image(resource_id="img1", caption="Рису\u00adнок 1"),
+        CodeBlock(code="echo\u00ad"),
+        Table(
+            header=TableRow(cells=[TableCell(blocks=[Paragraph(inlines=[Text(content="ячей\u00adка")])])]),
+        ),
+    ])
+
+    result = normalize(doc)
+
+    assert result.blocks[0].text == "Установка"
+    assert result.blocks[0].title == "Установка"
+    assert result.blocks[1].inlines[0].content == "настройка"
+    assert result.blocks[1].inlines[1].content == "a\u00adb"
+    assert result.blocks[2].caption == "Рисунок 1"
+    assert result.blocks[3].code == "echo\u00ad"
+    assert result.blocks[4].header.cells[0].blocks[0].inlines[0].content == "ячейка"
+
+
+def test_normalize_keeps_zero_width_joiner():
+    doc = InternalDoc(blocks=[Paragraph(inlines=[Text(content="a\u200db")])])
+
+    assert normalize(doc).blocks[0].inlines[0].content == "a\u200db"
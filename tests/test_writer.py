@@ -4,6 +4,8 @@ import pytest
 import tempfile
 from pathlib import Path
 from core.output.writer import Writer
+from core.model.internal_doc import InternalDoc, Heading, Paragraph, Text
+from core.render.markdown_renderer import render_markdown
 
 
 class TestWriter:
@@ -138,4 +140,20 @@ class TestWriter:
             # Verify new content
             with open(test_file, "rb") as f:
                 read_content = f.read()
-            assert read_content == new_content
\ No newline at end of file
+            assert read_content == new_content
+    
+    def test_write_markdown_renders_into_file(self):
+        """Test that write_markdown streams rendered Markdown into a file."""
+        writer = Writer()
+        doc = InternalDoc(blocks=[
+            Heading(level=2, text="1 Введение"),
+            Paragraph(inlines=[Text(content="Текст")]),
+        ])
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            test_file = Path(temp_dir) / "chapter.md"
+            
+            writer.write_markdown(test_file, doc, {})
+            
+            assert test_file.read_text(encoding="utf-8") == render_markdown(doc, {})
+